@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import functools
 import json
+import time
 
 import frappe
 from frappe import _
@@ -25,6 +27,7 @@ from orderlift.orderlift_sales.utils.price_list_scope import (
     get_visible_price_lists,
 )
 from orderlift.startup_roles import SAV_TECHNICIAN_ROLE
+from orderlift.utils.transaction import in_write_transaction, run_after_commit
 
 
 SEGMENT_ASSIGNMENT_DOCTYPE = "CRM Segment Assignment"
@@ -79,6 +82,21 @@ ORDERLIFT_MANAGED_SHARE_DISABLED_DOCTYPES = tuple(
 READ_ONLY_PERMISSION_TYPES = {"read", "select", "report", "print", "email"}
 OWNED_ONLY_USER_FIELD = "custom_owned_documents_only"
 
+# Compiled permission query clauses, keyed by (site, user, doctype, interactive).
+# Only the active-company part is resolved per call; everything else (allowed
+# companies, meta probes, business-type and owned-only fragments) is reused while
+# the site-wide and per-user generations in Redis are unchanged. User / User
+# Permission / ToDo / company-session changes bump the user's generation once
+# committed, so every worker recompiles on its next query. The TTL only bounds
+# changes no hook sees. Without a site (scripts, unit tests) nothing is cached.
+COMPILED_QUERY_TTL_SECONDS = 30
+COMPILED_QUERY_MAX_ENTRIES = 4096
+COMPILED_QUERY_GENERATION_KEY = "orderlift:company_query:generation"
+_compiled_company_queries: dict[tuple, dict] = {}
+_compiled_company_query_stats = {"compiled": 0, "reused": 0}
+# Per-process generations, used on their own when Redis is unreachable.
+_local_company_query_generations: dict[tuple, int] = {}
+
 
 def has_company_permission(
     doc,
@@ -426,36 +444,154 @@ def print_format_query(user: str | None = None) -> str | None:
 
 def _company_query(doctype: str, user: str | None = None) -> str | None:
     user = user or frappe.session.user
-    allowed_companies = get_allowed_companies(user)
+    interactive = has_interactive_company_session(user)
+    compiled = _get_compiled_company_query(doctype, user, interactive)
+    if compiled["fixed"] is not None:
+        return compiled["fixed"]
+
+    table = compiled["table"]
+    field = compiled["field"]
+    if interactive:
+        active_company = _active_company_for_query(user, allowed_companies=compiled["allowed_companies"])
+        if not active_company:
+            return f"{table}.name is null"
+        _normalize_request_company_filter(doctype, field, active_company)
+        companies = (active_company,)
+    else:
+        companies = tuple(compiled["allowed_companies"])
+
+    company_clause = compiled["company_clauses"].get(companies)
+    if company_clause is None:
+        company_clause = _company_clause_for_doctype(doctype, table, field, list(companies))
+        compiled["company_clauses"][companies] = company_clause
+
+    clauses = [company_clause, *compiled["extra_clauses"]]
+    return " and ".join(f"({clause})" for clause in clauses if clause)
+
+
+def _compile_company_query(doctype: str, user: str) -> dict:
     table = _table_name(doctype)
+    compiled = {
+        "fixed": None,
+        "table": table,
+        "field": None,
+        "allowed_companies": [],
+        "extra_clauses": [],
+        "company_clauses": {},
+    }
+    allowed_companies = get_allowed_companies(user)
     if not allowed_companies:
-        return f"{table}.name is null"
+        compiled["fixed"] = f"{table}.name is null"
+        return compiled
 
     if doctype == "Company":
         escaped = ", ".join(frappe.db.escape(company) for company in allowed_companies)
-        return f"{table}.name in ({escaped})"
+        compiled["fixed"] = f"{table}.name in ({escaped})"
+        return compiled
 
     field = company_field_for(doctype)
     if not _has_company_field(doctype, field):
-        return f"{table}.name is null"
+        compiled["fixed"] = f"{table}.name is null"
+        return compiled
+
+    compiled["field"] = field
+    compiled["allowed_companies"] = list(allowed_companies)
+    compiled["extra_clauses"] = [
+        clause
+        for clause in (_business_type_clause(doctype, user), _owned_only_clause(doctype, user))
+        if clause
+    ]
+    return compiled
+
+
+def _get_compiled_company_query(doctype: str, user: str, interactive: bool) -> dict:
+    site = getattr(getattr(frappe, "local", None), "site", None)
+    if not site:
+        return _compile_company_query(doctype, user)
+
+    key = (site, user, doctype, bool(interactive))
+    generation = _company_query_generation(site, user)
+    now = time.monotonic()
+    cached = _compiled_company_queries.get(key)
+    if cached and cached["generation"] == generation and cached["expires_at"] > now:
+        _compiled_company_query_stats["reused"] += 1
+        return cached["compiled"]
+
+    compiled = _compile_company_query(doctype, user)
+    if len(_compiled_company_queries) >= COMPILED_QUERY_MAX_ENTRIES:
+        _compiled_company_queries.clear()
+    _compiled_company_queries[key] = {
+        "compiled": compiled,
+        "generation": generation,
+        "expires_at": now + COMPILED_QUERY_TTL_SECONDS,
+    }
+    _compiled_company_query_stats["compiled"] += 1
+    return compiled
 
-    if has_interactive_company_session(user):
-        active_company = _active_company_for_query(user, allowed_companies=allowed_companies)
-        if not active_company:
-            return f"{table}.name is null"
-        _normalize_request_company_filter(doctype, field, active_company)
-        company_clause = _company_clause_for_doctype(doctype, table, field, [active_company])
+
+def clear_company_query_cache(user: str | None = None) -> None:
+    """Invalidate compiled clauses for ``user`` (or everyone) in every worker.
+
+    Inside a write transaction the generation is bumped after commit, so another
+    worker cannot compile the old permissions under the new generation.
+    """
+    if in_write_transaction():
+        run_after_commit(functools.partial(_bump_company_query_generation, user))
     else:
-        company_clause = _company_clause_for_doctype(doctype, table, field, allowed_companies)
+        _bump_company_query_generation(user)
+
+
+def _bump_company_query_generation(user: str | None = None) -> None:
+    site = getattr(getattr(frappe, "local", None), "site", None)
+    local_key = (site, user or "")
+    _local_company_query_generations[local_key] = _local_company_query_generations.get(local_key, 0) + 1
+    for key in list(_compiled_company_queries):
+        if (not user or key[1] == user) and (not site or key[0] == site):
+            _compiled_company_queries.pop(key, None)
+    try:
+        cache = frappe.cache()
+        cache.incrby(cache.make_key(_company_query_generation_key(user)), 1)
+    except Exception:
+        pass
+
+
+def _company_query_generation(site: str, user: str) -> tuple:
+    local = (
+        _local_company_query_generations.get((site, ""), 0),
+        _local_company_query_generations.get((site, user), 0),
+    )
+    try:
+        cache = frappe.cache()
+        shared = tuple(
+            int(cache.get(cache.make_key(_company_query_generation_key(scope))) or 0) for scope in (None, user)
+        )
+    except Exception:
+        shared = None
+    return (shared, local)
+
+
+def _company_query_generation_key(user: str | None) -> str:
+    return f"{COMPILED_QUERY_GENERATION_KEY}:{user}" if user else COMPILED_QUERY_GENERATION_KEY
+
+
+def get_company_query_cache_stats() -> dict:
+    return {**_compiled_company_query_stats, "entries": len(_compiled_company_queries)}
 
-    bt_clause = _business_type_clause(doctype, user)
-    owned_clause = _owned_only_clause(doctype, user)
-    clauses = [company_clause]
-    if bt_clause:
-        clauses.append(bt_clause)
-    if owned_clause:
-        clauses.append(owned_clause)
-    return " and ".join(f"({clause})" for clause in clauses if clause)
+
+def invalidate_company_query_cache(doc, method: str | None = None) -> None:
+    """Doc event hook: drop compiled clauses for the user a change applies to."""
+    doctype = getattr(doc, "doctype", None)
+    if doctype == "User":
+        user = doc.get("name")
+    elif doctype == "ToDo":
+        user = doc.get("allocated_to")
+        previous = doc.get_doc_before_save() if hasattr(doc, "get_doc_before_save") else None
+        previous_user = previous.get("allocated_to") if previous else None
+        if previous_user and previous_user != user:
+            clear_company_query_cache(user=previous_user)
+    else:
+        user = doc.get("user")
+    clear_company_query_cache(user=user or None)
 
 
 def _sav_ticket_query(user: str | None = None) -> str | None:
@@ -980,6 +1116,9 @@ def _owned_or_opportunity_child_clause(owner_clause: str, child_clause: str) ->
 
 
 def _opportunity_user_clause(opportunity_ref: str, user: str) -> str:
+    indexed = _user_visibility_clause("Opportunity", opportunity_ref, user)
+    if indexed:
+        return indexed
     escaped = frappe.db.escape(user)
     checks = []
     if _has_company_field("Opportunity", "opportunity_owner"):
@@ -1108,30 +1247,45 @@ def _project_user_clause(project_ref: str, user: str) -> str:
 
 
 def _quotation_user_clause(quotation_ref: str, user: str) -> str:
+    indexed = _user_visibility_clause("Quotation", quotation_ref, user)
+    if indexed:
+        return indexed
     checks = _owner_assignment_checks("Quotation", quotation_ref, user)
     checks.append(_quotation_opportunity_child_clause(quotation_ref, user))
     return "(" + " or ".join(checks) + ")"
 
 
 def _sales_order_user_clause(sales_order_ref: str, user: str) -> str:
+    indexed = _user_visibility_clause("Sales Order", sales_order_ref, user)
+    if indexed:
+        return indexed
     checks = _owner_assignment_checks("Sales Order", sales_order_ref, user)
     checks.append(_sales_order_opportunity_child_clause(sales_order_ref, user))
     return "(" + " or ".join(checks) + ")"
 
 
 def _sales_invoice_user_clause(invoice_ref: str, user: str) -> str:
+    indexed = _user_visibility_clause("Sales Invoice", invoice_ref, user)
+    if indexed:
+        return indexed
     checks = _owner_assignment_checks("Sales Invoice", invoice_ref, user)
     checks.append(_sales_invoice_sales_order_child_clause(invoice_ref, user))
     return "(" + " or ".join(checks) + ")"
 
 
 def _delivery_note_user_clause(delivery_note_ref: str, user: str) -> str:
+    indexed = _user_visibility_clause("Delivery Note", delivery_note_ref, user)
+    if indexed:
+        return indexed
     checks = _owner_assignment_checks("Delivery Note", delivery_note_ref, user)
     checks.append(_delivery_note_sales_order_child_clause(delivery_note_ref, user))
     return "(" + " or ".join(checks) + ")"
 
 
 def _customer_user_clause(customer_ref: str, user: str) -> str:
+    indexed = _user_visibility_clause("Customer", customer_ref, user)
+    if indexed:
+        return indexed
     escaped = frappe.db.escape(user)
     clauses = [f"{customer_ref}.owner = {escaped}"]
     if _has_company_field("Customer", "account_manager"):
@@ -1156,6 +1310,9 @@ def _customer_sales_team_clause(customer_ref: str, sales_person: str) -> str:
 
 
 def _lead_user_clause(lead_ref: str, user: str) -> str:
+    indexed = _user_visibility_clause("Lead", lead_ref, user)
+    if indexed:
+        return indexed
     escaped = frappe.db.escape(user)
     clauses = []
     if _has_company_field("Lead", "lead_owner"):
@@ -1168,6 +1325,9 @@ def _lead_user_clause(lead_ref: str, user: str) -> str:
 
 
 def _prospect_user_clause(prospect_ref: str, user: str) -> str:
+    indexed = _user_visibility_clause("Prospect", prospect_ref, user)
+    if indexed:
+        return indexed
     escaped = frappe.db.escape(user)
     clauses = []
     if _has_company_field("Prospect", "prospect_owner"):
@@ -1587,6 +1747,12 @@ def _delivery_note_sales_order_child_clause(table: str, user: str) -> str:
     )
 
 
+def _user_visibility_clause(doctype: str, table_ref: str, user: str) -> str | None:
+    from orderlift.user_visibility import user_visibility_clause
+
+    return user_visibility_clause(doctype, table_ref, user)
+
+
 def _owned_or_assigned_clause(doctype: str, owner_clause: str, user: str) -> str:
     return f"({owner_clause} or {_open_todo_assignment_clause(doctype, user)})"
 
@@ -147,9 +147,20 @@ doc_events = {
         ],
         "after_insert": "orderlift.orderlift_crm.attachment_propagation.copy_sales_order_attachments_to_downstream",
         # Update Sales Commission approval state from invoice payment status
-        "on_submit": "orderlift.sales.utils.commission_calculator.sync_commissions_from_invoice",
+        "on_submit": [
+            "orderlift.sales.utils.commission_calculator.sync_commissions_from_invoice",
+            "orderlift.orderlift_finance.cash_flow_snapshot.queue_snapshot_update",
+            "orderlift.orderlift_logistics.stock_planning.queue_stock_update_recalculation",
+        ],
         "on_update_after_submit": "orderlift.sales.utils.commission_calculator.sync_commissions_from_invoice",
-        "on_cancel": "orderlift.sales.utils.commission_calculator.cancel_commissions",
+        "on_cancel": [
+            "orderlift.sales.utils.commission_calculator.cancel_commissions",
+            "orderlift.orderlift_finance.cash_flow_snapshot.queue_snapshot_update",
+            "orderlift.orderlift_logistics.stock_planning.queue_stock_update_recalculation",
+        ],
+        "on_update": "orderlift.user_visibility.sync_document_visibility",
+        "after_delete": "orderlift.user_visibility.remove_document_visibility",
+        "after_rename": "orderlift.user_visibility.rename_document_visibility",
     },
     "Purchase Invoice": {
         "before_print": "orderlift.orderlift_sales.print_controls.require_submitted_document_print",
@@ -163,6 +174,15 @@ doc_events = {
             "orderlift.orderlift_sales.utils.price_list_usage_guard.validate_purchase_invoice_price_list",
             "orderlift.orderlift_sales.utils.tax_inclusive.sync_purchase_invoice_tax_inclusive_fields",
         ],
+        # Cash-flow snapshots rebuild the contexts a submitted or cancelled source feeds.
+        "on_submit": [
+            "orderlift.orderlift_finance.cash_flow_snapshot.queue_snapshot_update",
+            "orderlift.orderlift_logistics.stock_planning.queue_stock_update_recalculation",
+        ],
+        "on_cancel": [
+            "orderlift.orderlift_finance.cash_flow_snapshot.queue_snapshot_update",
+            "orderlift.orderlift_logistics.stock_planning.queue_stock_update_recalculation",
+        ],
     },
     "Payment Entry": {
         "before_print": "orderlift.orderlift_sales.print_controls.require_submitted_document_print",
@@ -172,11 +192,36 @@ doc_events = {
             "orderlift.orderlift_finance.payment_entry_currency.apply_source_currency_payment",
         ],
         "validate": "orderlift.orderlift_finance.account_governance.validate_finance_document",
-        "on_submit": "orderlift.sales.utils.commission_calculator.sync_commissions_from_payment_entry",
-        "on_cancel": "orderlift.sales.utils.commission_calculator.sync_commissions_from_payment_entry",
+        "on_submit": [
+            "orderlift.sales.utils.commission_calculator.sync_commissions_from_payment_entry",
+            "orderlift.orderlift_finance.cash_flow_snapshot.queue_snapshot_update",
+        ],
+        "on_cancel": [
+            "orderlift.sales.utils.commission_calculator.sync_commissions_from_payment_entry",
+            "orderlift.orderlift_finance.cash_flow_snapshot.queue_snapshot_update",
+        ],
     },
     "ToDo": {
         "before_validate": "orderlift.orderlift_crm.todo_hooks.normalize_todo_priority_on_validate",
+        "on_update": [
+            "orderlift.company_access.invalidate_company_query_cache",
+            "orderlift.user_visibility.sync_todo_visibility",
+        ],
+        "on_trash": "orderlift.company_access.invalidate_company_query_cache",
+        "after_delete": "orderlift.user_visibility.sync_todo_visibility",
+    },
+    # Owned-only visibility rows follow the Sales Person's linked user.
+    "Sales Person": {
+        "on_update": "orderlift.user_visibility.sync_sales_person_visibility",
+    },
+    # Compiled company permission clauses depend on the user's flags and permissions.
+    "User": {
+        "on_update": "orderlift.company_access.invalidate_company_query_cache",
+    },
+    "User Permission": {
+        "after_insert": "orderlift.company_access.invalidate_company_query_cache",
+        "on_update": "orderlift.company_access.invalidate_company_query_cache",
+        "on_trash": "orderlift.company_access.invalidate_company_query_cache",
     },
     "DocShare": {
         "validate": "orderlift.company_access.validate_managed_docshare",
@@ -231,6 +276,7 @@ doc_events = {
             "orderlift.orderlift_sig.utils.project_status_guard.on_sales_order_submit",
             "orderlift.orderlift_logistics.stock_planning.sync_sales_order_demand_plans",
             "orderlift.orderlift_sig.technical_list.on_sales_order_submit_or_project_link",
+            "orderlift.orderlift_finance.cash_flow_snapshot.queue_snapshot_update",
         ],
         "after_insert": [
             "orderlift.orderlift_crm.attachment_propagation.copy_quotation_attachments_to_sales_order",
@@ -240,11 +286,17 @@ doc_events = {
             "orderlift.orderlift_crm.api.campaign.sync_doc_campaign_rollup",
             "orderlift.orderlift_crm.api.pipeline.sync_pipeline_assignment_on_update",
             "orderlift.annex_chain.sync_sales_order_annexes",
+            "orderlift.user_visibility.sync_document_visibility",
         ],
+        "after_delete": "orderlift.user_visibility.remove_document_visibility",
+        "after_rename": "orderlift.user_visibility.rename_document_visibility",
         "before_update_after_submit": "orderlift.orderlift_finance.cash_flow_setup.protect_forecast_finality",
+        # Payment Schedule rows are edited through their submitted parent.
+        "on_update_after_submit": "orderlift.orderlift_finance.cash_flow_snapshot.queue_snapshot_update",
         "on_cancel": [
             "orderlift.sales.utils.commission_calculator.cancel_sales_order_commissions",
             "orderlift.orderlift_logistics.stock_planning.cancel_sales_order_demand_plans",
+            "orderlift.orderlift_finance.cash_flow_snapshot.queue_snapshot_update",
         ],
     },
     "Opportunity": {
@@ -265,7 +317,9 @@ doc_events = {
             "orderlift.orderlift_crm.api.campaign.sync_doc_campaign_rollup",
             "orderlift.orderlift_crm.opportunity_hooks.sync_opportunity_assignment_todo",
             "orderlift.orderlift_crm.api.pipeline.sync_pipeline_assignment_on_update",
+            "orderlift.user_visibility.sync_document_visibility",
         ],
+        "after_delete": "orderlift.user_visibility.remove_document_visibility",
     },
     "Quotation": {
         "onload": "orderlift.orderlift_sales.utils.sales_team.redact_sales_team",
@@ -299,7 +353,10 @@ doc_events = {
         "on_update": [
             "orderlift.orderlift_crm.api.campaign.sync_doc_campaign_rollup",
             "orderlift.annex_chain.sync_quotation_annexes",
+            "orderlift.user_visibility.sync_document_visibility",
         ],
+        "after_delete": "orderlift.user_visibility.remove_document_visibility",
+        "after_rename": "orderlift.user_visibility.rename_document_visibility",
         "before_submit": "orderlift.annex_chain.on_quotation_submit",
         "on_submit": "orderlift.orderlift_crm.api.campaign.sync_doc_campaign_rollup",
         "on_trash": "orderlift.orderlift_crm.opportunity_hooks.cleanup_quotation_delete_links",
@@ -326,21 +383,49 @@ doc_events = {
         "on_trash": [
             "orderlift.orderlift_sales.utils.item_price_tools.cleanup_item_price_mirror_rows",
             "orderlift.orderlift_sales.utils.price_list_sharing.sync_shared_item_price_on_trash",
+            "orderlift.orderlift_sales.utils.pricing_sheet_queue.on_buying_item_price_change",
         ],
         "after_insert": [
             "orderlift.orderlift_sales.utils.price_list_auto_rebuild.on_item_price_change",
             "orderlift.orderlift_sales.utils.price_list_sharing.sync_shared_item_price",
+            "orderlift.orderlift_sales.utils.pricing_sheet_queue.on_buying_item_price_change",
         ],
         "on_update": [
             "orderlift.orderlift_sales.utils.item_price_tools.sync_builder_override_from_item_price",
             "orderlift.orderlift_sales.utils.price_list_auto_rebuild.on_item_price_change",
             "orderlift.orderlift_sales.utils.price_list_sharing.sync_shared_item_price",
+            "orderlift.orderlift_sales.utils.pricing_sheet_queue.on_buying_item_price_change",
         ],
     },
     "Role": {
         "before_validate": "orderlift.role_capabilities.normalize_role_capabilities",
-        "after_insert": "orderlift.role_capabilities.sync_purchase_agent_rule_permissions_for_role",
-        "on_update": "orderlift.role_capabilities.sync_purchase_agent_rule_permissions_for_role",
+        # Drop cached capabilities first so the permission sync reads the saved values.
+        "after_insert": [
+            "orderlift.role_capabilities.clear_role_capability_cache",
+            "orderlift.role_capabilities.sync_purchase_agent_rule_permissions_for_role",
+            "orderlift.menu_access.clear_menu_access_cache",
+        ],
+        "on_update": [
+            "orderlift.role_capabilities.clear_role_capability_cache",
+            "orderlift.role_capabilities.sync_purchase_agent_rule_permissions_for_role",
+            "orderlift.menu_access.clear_menu_access_cache",
+        ],
+        "on_trash": [
+            "orderlift.role_capabilities.clear_role_capability_cache",
+            "orderlift.menu_access.clear_menu_access_cache",
+        ],
+    },
+    "Orderlift Menu Access Rule": {
+        "on_update": "orderlift.menu_access.clear_menu_access_cache",
+        "on_trash": "orderlift.menu_access.clear_menu_access_cache",
+    },
+    "Page": {
+        "on_update": "orderlift.menu_access.clear_menu_access_cache",
+        "on_trash": "orderlift.menu_access.clear_menu_access_cache",
+    },
+    "Report": {
+        "on_update": "orderlift.menu_access.clear_menu_access_cache",
+        "on_trash": "orderlift.menu_access.clear_menu_access_cache",
     },
     "Agent Pricing Rules": {
         "validate": "orderlift.orderlift_sales.utils.sales_team.validate_agent_pricing_rules",
@@ -376,8 +461,13 @@ doc_events = {
             "orderlift.orderlift_sales.utils.purchase_order_pricing.publish_approved_purchase_order_prices",
             "orderlift.orderlift_logistics.stock_planning.queue_supply_recalculation",
             "orderlift.intercompany.create_draft_sales_order_from_purchase_order",
+            "orderlift.orderlift_finance.cash_flow_snapshot.queue_snapshot_update",
+        ],
+        "on_update_after_submit": "orderlift.orderlift_finance.cash_flow_snapshot.queue_snapshot_update",
+        "on_cancel": [
+            "orderlift.orderlift_logistics.stock_planning.queue_supply_recalculation",
+            "orderlift.orderlift_finance.cash_flow_snapshot.queue_snapshot_update",
         ],
-        "on_cancel": "orderlift.orderlift_logistics.stock_planning.queue_supply_recalculation",
     },
     "Material Request": {
         "before_print": "orderlift.orderlift_sales.print_controls.require_submitted_document_print",
@@ -435,6 +525,24 @@ doc_events = {
     "Stock Demand Plan": {
         "validate": "orderlift.company_scope.apply_company_scope",
     },
+    "Stock Reconciliation": {
+        "on_submit": "orderlift.orderlift_logistics.stock_planning.queue_supply_recalculation",
+        "on_cancel": "orderlift.orderlift_logistics.stock_planning.queue_supply_recalculation",
+    },
+    # Stock and inbound-date changes re-plan only the affected items. ERPNext moves
+    # Bin quantities with db_set, so stock documents queue their own items above;
+    # this catches the Bin saves that do fire.
+    "Bin": {
+        "on_update": "orderlift.orderlift_logistics.stock_planning.queue_bin_recalculation",
+    },
+    "Custom Field": {
+        "on_update": "orderlift.orderlift_crm.deal_abbreviation.clear_participating_doctypes",
+        "on_trash": "orderlift.orderlift_crm.deal_abbreviation.clear_participating_doctypes",
+    },
+    "Forecast Load Plan": {
+        "on_update": "orderlift.orderlift_logistics.stock_planning.queue_forecast_plan_recalculation",
+        "on_trash": "orderlift.orderlift_logistics.stock_planning.queue_forecast_plan_recalculation",
+    },
     "Sales Order Technical List": {
         "validate": "orderlift.company_scope.apply_company_scope",
     },
@@ -476,8 +584,17 @@ doc_events = {
         ],
         "after_insert": "orderlift.orderlift_crm.attachment_propagation.copy_sales_order_attachments_to_downstream",
         "before_submit": "orderlift.orderlift_logistics.utils.delivery_note_reservation_guard.validate_delivery_note_pick_list_reservation",
-        "on_submit": "orderlift.logistics.utils.delivery_note_logistics.analyze_delivery_note",
-        "on_cancel": "orderlift.logistics.utils.delivery_note_logistics.cancel_delivery_note_analysis",
+        "on_submit": [
+            "orderlift.logistics.utils.delivery_note_logistics.analyze_delivery_note",
+            "orderlift.orderlift_logistics.stock_planning.queue_supply_recalculation",
+        ],
+        "on_cancel": [
+            "orderlift.logistics.utils.delivery_note_logistics.cancel_delivery_note_analysis",
+            "orderlift.orderlift_logistics.stock_planning.queue_supply_recalculation",
+        ],
+        "on_update": "orderlift.user_visibility.sync_document_visibility",
+        "after_delete": "orderlift.user_visibility.remove_document_visibility",
+        "after_rename": "orderlift.user_visibility.rename_document_visibility",
     },
     "Request for Quotation": {
         "before_print": "orderlift.orderlift_sales.print_controls.require_submitted_document_print",
@@ -492,7 +609,12 @@ doc_events = {
             "orderlift.company_scope.apply_company_scope",
             "orderlift.orderlift_crm.party_management.prepare_party",
         ],
-        "on_update": "orderlift.sales.utils.customer_tier.apply_dynamic_customer_tier",
+        "on_update": [
+            "orderlift.sales.utils.customer_tier.apply_dynamic_customer_tier",
+            "orderlift.user_visibility.sync_document_visibility",
+        ],
+        "after_delete": "orderlift.user_visibility.remove_document_visibility",
+        "after_rename": "orderlift.user_visibility.rename_document_visibility",
     },
     "Supplier": {
         "validate": [
@@ -506,6 +628,9 @@ doc_events = {
             "orderlift.company_scope.apply_company_scope",
             "orderlift.orderlift_crm.party_management.prepare_party",
         ],
+        "on_update": "orderlift.user_visibility.sync_document_visibility",
+        "after_delete": "orderlift.user_visibility.remove_document_visibility",
+        "after_rename": "orderlift.user_visibility.rename_document_visibility",
     },
     "Lead": {
         "before_save": "orderlift.sales.utils.customer_tier.sync_customer_tier_mode",
@@ -513,6 +638,9 @@ doc_events = {
             "orderlift.company_scope.apply_company_scope",
             "orderlift.orderlift_crm.party_management.prepare_party",
         ],
+        "on_update": "orderlift.user_visibility.sync_document_visibility",
+        "after_delete": "orderlift.user_visibility.remove_document_visibility",
+        "after_rename": "orderlift.user_visibility.rename_document_visibility",
     },
     "Price List": {
         "before_insert": [
@@ -530,22 +658,66 @@ doc_events = {
             "orderlift.orderlift_sales.utils.price_list_sharing.validate_sharing_rows",
         ],
         "before_save": "orderlift.orderlift_sales.utils.price_list_sharing.ensure_shared_price_lists",
-        "on_update": "orderlift.orderlift_sales.utils.price_list_sharing.handle_sharing_rows_deletion",
-        "on_trash": "orderlift.orderlift_sales.utils.price_list_sharing.on_price_list_trash",
+        "on_update": [
+            "orderlift.orderlift_sales.utils.price_list_sharing.handle_sharing_rows_deletion",
+            "orderlift.orderlift_sales.utils.pricing_reference_cache.invalidate_pricing_reference_cache",
+            "orderlift.orderlift_sales.utils.pricing_sheet_queue.on_buying_price_list_change",
+        ],
+        "on_trash": [
+            "orderlift.orderlift_sales.utils.price_list_sharing.on_price_list_trash",
+            "orderlift.orderlift_sales.utils.pricing_reference_cache.invalidate_pricing_reference_cache",
+        ],
+    },
+    # Invalidate the cached currency and exchange-rate lookups used by pricing.
+    "Currency Exchange": {
+        "on_update": "orderlift.orderlift_sales.utils.pricing_reference_cache.invalidate_pricing_reference_cache",
+        "on_trash": "orderlift.orderlift_sales.utils.pricing_reference_cache.invalidate_pricing_reference_cache",
+    },
+    # Cached training leaderboard rows are refreshed after writes to the employees,
+    # programs, modules, assignments, progress and quiz attempts they are built from.
+    "Employee": {
+        "on_update": "orderlift.orderlift_hr.api.leaderboard.invalidate_leaderboard_cache",
+        "on_trash": "orderlift.orderlift_hr.api.leaderboard.invalidate_leaderboard_cache",
+    },
+    "Training Program": {
+        "on_update": "orderlift.orderlift_hr.api.leaderboard.invalidate_leaderboard_cache",
+        "on_trash": "orderlift.orderlift_hr.api.leaderboard.invalidate_leaderboard_cache",
+    },
+    "Training Module": {
+        "on_update": "orderlift.orderlift_hr.api.leaderboard.invalidate_leaderboard_cache",
+        "on_trash": "orderlift.orderlift_hr.api.leaderboard.invalidate_leaderboard_cache",
+    },
+    "Training Program Assignment": {
+        "on_update": "orderlift.orderlift_hr.api.leaderboard.invalidate_leaderboard_cache",
+        "on_trash": "orderlift.orderlift_hr.api.leaderboard.invalidate_leaderboard_cache",
+    },
+    "Employee Training Progress": {
+        "on_update": "orderlift.orderlift_hr.api.leaderboard.invalidate_leaderboard_cache",
+        "on_trash": "orderlift.orderlift_hr.api.leaderboard.invalidate_leaderboard_cache",
+    },
+    "Training Quiz Attempt": {
+        "on_update": "orderlift.orderlift_hr.api.leaderboard.invalidate_leaderboard_cache",
+        "on_trash": "orderlift.orderlift_hr.api.leaderboard.invalidate_leaderboard_cache",
     },
     "Pricing Sheet": {
-        "onload": "orderlift.orderlift_sales.utils.sales_team.redact_sales_team",
+        "onload": [
+            "orderlift.orderlift_sales.utils.sales_team.redact_sales_team",
+            "orderlift.orderlift_sales.utils.pricing_sheet_queue.promote_open_pricing_sheet",
+        ],
         "before_validate": "orderlift.orderlift_sales.utils.sales_team.preserve_hidden_sales_team",
         "validate": "orderlift.company_scope.apply_company_scope",
     },
     "Pricing Scenario": {
         "validate": "orderlift.company_scope.apply_company_scope",
+        "on_update": "orderlift.orderlift_sales.utils.pricing_sheet_queue.on_pricing_policy_change",
     },
     "Pricing Benchmark Policy": {
         "validate": "orderlift.company_scope.apply_company_scope",
+        "on_update": "orderlift.orderlift_sales.utils.pricing_sheet_queue.on_pricing_policy_change",
     },
     "Pricing Customs Policy": {
         "validate": "orderlift.company_scope.apply_company_scope",
+        "on_update": "orderlift.orderlift_sales.utils.pricing_sheet_queue.on_pricing_policy_change",
     },
     "Customer Segmentation Engine": {
         "validate": "orderlift.company_scope.apply_company_scope",
@@ -597,6 +769,7 @@ doc_events = {
             "orderlift.orderlift_sig.technical_list.on_sales_order_submit_or_project_link",
             "orderlift.annex_chain.sync_project_annexes",
             "orderlift.orderlift_crm.api.pipeline.sync_pipeline_assignment_on_update",
+            "orderlift.orderlift_finance.cash_flow_snapshot.queue_snapshot_update",
         ],
     },
     "Delivery Trip": {
@@ -751,16 +924,28 @@ override_doctype_class = {
 # Scheduled Tasks
 # ---------------------------------------------------------
 scheduler_events = {
+    "cron": {
+        # Start Pricing Sheet recalculation workers once debounced requests are due
+        "* * * * *": [
+            "orderlift.orderlift_sales.utils.pricing_sheet_queue.dispatch_pricing_sheet_queue",
+            # Start debounced stock planning runs once hook triggers have settled
+            "orderlift.orderlift_logistics.stock_planning.dispatch_planning_runs",
+        ],
+    },
     "hourly": [
         "orderlift.orderlift_logistics.stock_planning.run_scheduled_planning",
     ],
     "daily": [
+        # Full stock planning pass for changes that bypass the hourly dirty-item run
+        "orderlift.orderlift_logistics.stock_planning.run_full_scheduled_planning",
         # Check reorder levels and draft Purchase Orders
         "orderlift.logistics.utils.reorder_manager.check_reorder_levels",
         # Recompute every open Appraisal Cycle's performance snapshots
         "orderlift.orderlift_hr.api.performance.recompute_open_cycles",
         # Repair commission eligibility after payment reconciliations/reposts.
         "orderlift.sales.utils.commission_calculator.reconcile_open_commissions",
+        # Repair owned-only visibility rows changed outside document hooks.
+        "orderlift.user_visibility.run_scheduled_consistency_check",
     ],
     "weekly": [
         # Flag slow-moving and overstock items for dashboard
@@ -786,6 +971,7 @@ after_migrate = [
     "orderlift.company_scope.after_migrate",
     "orderlift.orderlift_logistics.stock_planning.after_migrate",
     "orderlift.company_access.normalize_managed_docperms",
+    "orderlift.user_visibility.after_migrate",
     "orderlift.orderlift_sales.doctype.customer_segmentation_engine.customer_segmentation_engine.after_migrate",
     "orderlift.orderlift_finance.account_governance.after_migrate",
     "orderlift.orderlift_finance.payment_entry_currency.after_migrate",
@@ -813,6 +999,11 @@ on_logout = [
     "orderlift.menu_access.clear_session_company_context",
 ]
 
+clear_cache = [
+    "orderlift.menu_access.clear_menu_access_cache",
+    "orderlift.role_capabilities.clear_role_capability_cache",
+]
+
 before_request = [
     "orderlift.company_access.normalize_company_filters_for_request",
     "orderlift.dashboard_permissions.install_runtime_patches",
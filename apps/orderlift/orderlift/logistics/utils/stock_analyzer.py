@@ -11,14 +11,25 @@ import frappe
 from frappe.utils import add_days, flt, getdate, nowdate
 
 
+# Default thresholds. Override them per site with a ``stock_analyzer_thresholds``
+# dict in site_config.json, or per call through ``analyze_inventory``.
+DEFAULT_THRESHOLDS = {
+    "slow_moving_days": 90,  # No movement in 90+ days
+    "dormant_days": 30,  # No movement in 30+ days (zero stock)
+    "overstock_multiplier": 3,  # stock > reorder_qty * 3
+}
+FLAG_PRIORITY = (
+    ("dormant", "Dormant"),
+    ("slow_moving", "Slow Moving"),
+    ("overstock", "Overstock"),
+)
+# Items per batched UPDATE when writing inventory flags.
+UPDATE_CHUNK_SIZE = 1000
+
+
 def flag_slow_moving_items():
     """Identify and tag slow-moving / overstock / dormant items."""
 
-    # Define thresholds
-    SLOW_MOVING_DAYS = 90  # No movement in 90+ days
-    DORMANT_DAYS = 30  # No movement in 30+ days (zero stock)
-    OVERSTOCK_MULTIPLIER = 3  # stock > reorder_qty * 3
-
     # Get all items with stock
     all_items = frappe.get_all(
         "Item",
@@ -30,22 +41,16 @@ def flag_slow_moving_items():
     if not all_items:
         return
 
+    analysis = analyze_inventory([item.name for item in all_items], restrict_queries=False)
     flags_to_set = {
         "slow_moving": [],
         "overstock": [],
         "dormant": [],
     }
-
     for item in all_items:
-        item_code = item.name
-        flags = _analyze_item(item_code)
-
-        if flags.get("slow_moving"):
-            flags_to_set["slow_moving"].append(item_code)
-        if flags.get("overstock"):
-            flags_to_set["overstock"].append(item_code)
-        if flags.get("dormant"):
-            flags_to_set["dormant"].append(item_code)
+        for flag, items in flags_to_set.items():
+            if analysis[item.name][flag]:
+                items.append(item.name)
 
     # Apply flags to items
     _apply_inventory_flags(flags_to_set)
@@ -54,61 +59,129 @@ def flag_slow_moving_items():
     _log_analysis_results(flags_to_set)
 
 
+def analyze_inventory(item_codes, thresholds=None, restrict_queries=True):
+    """Classify every item in ``item_codes`` from a few grouped queries.
+
+    Returns ``{item_code: summary}``. Each summary carries the flags, stock totals,
+    last movement, zero-stock-since and reorder quantity, and a ``warehouses``
+    breakdown with the same fields per warehouse. ``restrict_queries=False`` scans
+    every item in one pass, which is cheaper than a huge IN list for full runs.
+    """
+    item_codes = list(dict.fromkeys(code for code in item_codes if code))
+    if not item_codes:
+        return {}
+    limits = _thresholds(thresholds)
+    today = nowdate()
+    slow_moving_before = getdate(add_days(today, -int(limits["slow_moving_days"])))
+    dormant_before = getdate(add_days(today, -int(limits["dormant_days"])))
+    multiplier = flt(limits["overstock_multiplier"])
+
+    scope = item_codes if restrict_queries else None
+    warehouses = {item_code: {} for item_code in item_codes}
+
+    def warehouse_row(item_code, warehouse):
+        return warehouses[item_code].setdefault(
+            warehouse or "",
+            {"qty": 0.0, "last_movement": None, "zero_stock_since": None, "reorder_qty": 0.0},
+        )
+
+    for row in _stock_by_warehouse(scope):
+        if row.item_code in warehouses:
+            warehouse_row(row.item_code, row.warehouse)["qty"] = flt(row.qty)
+    for row in _movements_by_warehouse(scope):
+        if row.item_code in warehouses:
+            entry = warehouse_row(row.item_code, row.warehouse)
+            entry["last_movement"] = getdate(row.last_movement) if row.last_movement else None
+            entry["zero_stock_since"] = getdate(row.last_outflow) if row.last_outflow else None
+    for row in _reorder_by_warehouse(scope):
+        if row.item_code in warehouses:
+            warehouse_row(row.item_code, row.warehouse)["reorder_qty"] = flt(row.reorder_qty)
+
+    analysis = {}
+    for item_code in item_codes:
+        rows = warehouses[item_code]
+        for entry in rows.values():
+            entry.update(_classify(entry, slow_moving_before, dormant_before, multiplier))
+        summary = {
+            "qty": sum(entry["qty"] for entry in rows.values()),
+            "last_movement": max((e["last_movement"] for e in rows.values() if e["last_movement"]), default=None),
+            "zero_stock_since": max(
+                (e["zero_stock_since"] for e in rows.values() if e["zero_stock_since"]), default=None
+            ),
+            # Item Reorder rows are per warehouse; the item-level check uses the largest.
+            "reorder_qty": max((entry["reorder_qty"] for entry in rows.values()), default=0.0),
+        }
+        summary.update(_classify(summary, slow_moving_before, dormant_before, multiplier))
+        summary["warehouses"] = rows
+        analysis[item_code] = summary
+    return analysis
+
+
 def _analyze_item(item_code):
     """Analyze single item for slow-moving, overstock, dormant flags."""
-
-    flags = {
-        "slow_moving": False,
-        "overstock": False,
-        "dormant": False,
+    summary = analyze_inventory([item_code])[item_code]
+    return {flag: summary[flag] for flag in ("slow_moving", "overstock", "dormant")}
+
+
+def _classify(entry, slow_moving_before, dormant_before, multiplier):
+    qty = entry["qty"]
+    last_movement = entry["last_movement"]
+    zero_stock_since = entry["zero_stock_since"]
+    reorder_qty = entry["reorder_qty"]
+    return {
+        "slow_moving": last_movement is None or last_movement < slow_moving_before,
+        # Dormant: no stock left, and the last outflow that emptied it is old.
+        "dormant": qty <= 0 and bool(zero_stock_since) and zero_stock_since < dormant_before,
+        "overstock": bool(reorder_qty) and qty > reorder_qty * multiplier,
     }
 
-    # Get current stock across all warehouses
-    total_qty = frappe.db.sql("""
-        SELECT COALESCE(SUM(actual_qty), 0) as qty
-        FROM `tabBin`
-        WHERE item_code = %s
-    """, item_code, as_dict=True)[0].qty
 
-    # Check for slow-moving (no movement in 90+ days)
-    ninety_days_ago = getdate(add_days(nowdate(), -90))
-    last_movement = frappe.db.sql("""
-        SELECT MAX(posting_date) as last_date
+def _thresholds(overrides=None):
+    limits = dict(DEFAULT_THRESHOLDS)
+    conf = getattr(frappe, "conf", None) or {}
+    limits.update(conf.get("stock_analyzer_thresholds") or {})
+    limits.update(overrides or {})
+    return limits
+
+
+def _item_scope(column, item_codes):
+    if item_codes is None:
+        return "", {}
+    return f" AND {column} IN %(item_codes)s", {"item_codes": tuple(item_codes)}
+
+
+def _stock_by_warehouse(item_codes):
+    condition, values = _item_scope("item_code", item_codes)
+    return frappe.db.sql(f"""
+        SELECT item_code, warehouse, COALESCE(SUM(actual_qty), 0) as qty
+        FROM `tabBin`
+        WHERE 1 = 1{condition}
+        GROUP BY item_code, warehouse
+    """, values, as_dict=True)
+
+
+def _movements_by_warehouse(item_codes):
+    condition, values = _item_scope("item_code", item_codes)
+    return frappe.db.sql(f"""
+        SELECT
+            item_code,
+            warehouse,
+            MAX(posting_date) as last_movement,
+            MAX(CASE WHEN actual_qty <= 0 THEN posting_date END) as last_outflow
         FROM `tabStock Ledger Entry`
-        WHERE item_code = %s AND is_cancelled = 0
-    """, item_code, as_dict=True)[0].last_date
-
-    if last_movement is None or getdate(last_movement) < ninety_days_ago:
-        flags["slow_moving"] = True
-
-    # Check for dormant (zero stock for 30+ days)
-    if total_qty <= 0:
-        thirty_days_ago = getdate(add_days(nowdate(), -30))
-        zero_stock_since = frappe.db.sql("""
-            SELECT MIN(posting_date) as earliest_zero_date
-            FROM `tabStock Ledger Entry`
-            WHERE item_code = %s
-              AND actual_qty <= 0
-              AND is_cancelled = 0
-            ORDER BY posting_date DESC
-            LIMIT 1
-        """, item_code, as_dict=True)
-
-        if zero_stock_since and zero_stock_since[0].earliest_zero_date:
-            if getdate(zero_stock_since[0].earliest_zero_date) < thirty_days_ago:
-                flags["dormant"] = True
-
-    # Check for overstock (qty > reorder_qty * 3)
-    reorder_qty = frappe.db.sql("""
-        SELECT MAX(warehouse_reorder_qty) as max_reorder_qty
-        FROM `tabItem Reorder`
-        WHERE parent = %s
-    """, item_code, as_dict=True)[0].max_reorder_qty
+        WHERE is_cancelled = 0{condition}
+        GROUP BY item_code, warehouse
+    """, values, as_dict=True)
 
-    if reorder_qty and total_qty > (reorder_qty * 3):
-        flags["overstock"] = True
 
-    return flags
+def _reorder_by_warehouse(item_codes):
+    condition, values = _item_scope("parent", item_codes)
+    return frappe.db.sql(f"""
+        SELECT parent as item_code, warehouse, MAX(warehouse_reorder_qty) as reorder_qty
+        FROM `tabItem Reorder`
+        WHERE parenttype = 'Item'{condition}
+        GROUP BY parent, warehouse
+    """, values, as_dict=True)
 
 
 def _apply_inventory_flags(flags_to_set):
@@ -122,20 +195,16 @@ def _apply_inventory_flags(flags_to_set):
     """)
 
     # Then set new flags (priority: dormant > slow_moving > overstock)
-    for item_code in flags_to_set["dormant"]:
-        frappe.db.set_value("Item", item_code, "custom_inventory_flag", "Dormant")
-
-    for item_code in flags_to_set["slow_moving"]:
-        # Only set if not already dormant
-        existing = frappe.db.get_value("Item", item_code, "custom_inventory_flag")
-        if not existing:
-            frappe.db.set_value("Item", item_code, "custom_inventory_flag", "Slow Moving")
-
-    for item_code in flags_to_set["overstock"]:
-        # Only set if not already dormant or slow moving
-        existing = frappe.db.get_value("Item", item_code, "custom_inventory_flag")
-        if not existing:
-            frappe.db.set_value("Item", item_code, "custom_inventory_flag", "Overstock")
+    flagged = set()
+    for flag, label in FLAG_PRIORITY:
+        item_codes = [item_code for item_code in flags_to_set[flag] if item_code not in flagged]
+        flagged.update(item_codes)
+        for start in range(0, len(item_codes), UPDATE_CHUNK_SIZE):
+            frappe.db.sql("""
+                UPDATE `tabItem`
+                SET custom_inventory_flag = %(flag)s
+                WHERE name IN %(item_codes)s
+            """, {"flag": label, "item_codes": tuple(item_codes[start : start + UPDATE_CHUNK_SIZE])})
 
     frappe.clear_cache()
 
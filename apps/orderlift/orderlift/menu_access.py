@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import time
 from contextlib import suppress
 
 import frappe
@@ -20,6 +22,7 @@ from orderlift.menu_registry import (
 )
 from orderlift.startup_roles import ORDERLIFT_MANAGED_ROLE_FIELD
 from orderlift.retired_pages import RETIRED_PAGE_NAMES
+from orderlift.utils.transaction import in_write_transaction, run_after_commit
 
 
 MENU_ACCESS_DOCTYPE = "Orderlift Menu Access Rule"
@@ -28,6 +31,14 @@ BUSINESS_TYPE_DOCTYPE = "CRM Business Type"
 LAST_SELECTED_COMPANY_DEFAULT_KEY = "orderlift_last_selected_company"
 LEGACY_PREFERRED_COMPANY_DEFAULT_KEY = "orderlift_preferred_company"
 SESSION_COMPANY_CACHE_PREFIX = "orderlift:company_context"
+# The compiled menu policy lives in Redis until a menu rule, Role, Page or Report write
+# commits; it is never cached from inside a write transaction. Per-user visible keys are
+# layered on top, keyed by the policy version and role set; they also depend on DocType
+# permissions, so they stay short-lived.
+MENU_POLICY_CACHE_KEY = "orderlift:menu_access:policy"
+MENU_VISIBLE_KEYS_CACHE_PREFIX = "orderlift:menu_access:visible"
+MENU_POLICY_TTL_SECONDS = 6 * 60 * 60
+MENU_VISIBLE_KEYS_TTL_SECONDS = 10 * 60
 ADMIN_BYPASS_ROLES = {"System Manager", "Administrator"}
 BUSINESS_SCOPE_BYPASS_ROLES = {"Orderlift Admin"}
 SUPPORTING_PAGE_MENU_KEYS = {
@@ -154,6 +165,7 @@ def sync_menu_access_rules() -> dict:
     for name in stale_names:
         frappe.db.set_value(MENU_ACCESS_DOCTYPE, name, "enabled", 0, update_modified=False)
 
+    clear_menu_access_cache()
     return {"created": created, "updated": updated, "disabled_stale": len(stale_names)}
 
 
@@ -239,6 +251,7 @@ def save_menu_access_for_role(role: str, menu_keys: list[str] | str) -> dict:
             frappe.db.set_value(MENU_ACCESS_DOCTYPE, doc.name, values)
             changed += 1
 
+    clear_menu_access_cache()
     frappe.clear_cache()
     return {"role": role, "changed": changed, "selected": len(selected_keys)}
 
@@ -293,6 +306,7 @@ def set_menu_key_access_for_role(role: str, menu_key: str, enabled: bool) -> boo
         values["denied_roles_json"] = json.dumps(next_denied_roles)
     if values:
         frappe.db.set_value(MENU_ACCESS_DOCTYPE, doc.name, values)
+        clear_menu_access_cache()
         return True
     return False
 
@@ -313,17 +327,16 @@ def user_can_access_menu_key(
     rule = (rules if rules is not None else _menu_rule_map()).get(menu_key)
     if not _rule_enabled(rule):
         return False
-    allowed_roles = _rule_roles(rule, menu_key)
-    if roles.intersection(_rule_denied_roles(rule)):
-        return False
-    if not _roles_allow(allowed_roles, roles):
+    if not _rule_allows_roles(rule, menu_key, roles):
         return False
     if menu_key in {"sales.commission_dashboard", "sales.commissions"} and not _commission_access_allowed(
         user, roles
     ):
         return False
-    item = menu_item_by_key(menu_key) or {}
-    return _required_capability_allowed(item.get("required_capability"), user=user, roles=roles)
+    capability = rule.get("required_capability") if rule is not None else None
+    if capability is None:
+        capability = (menu_item_by_key(menu_key) or {}).get("required_capability")
+    return _required_capability_allowed(capability, user=user, roles=roles)
 
 
 def user_can_access_page(page_name: str, user: str | None = None, rules: dict[str, object] | None = None) -> bool:
@@ -341,11 +354,7 @@ def user_can_access_page(page_name: str, user: str | None = None, rules: dict[st
     if not menu_keys and page_name in SUPPORTING_PAGE_MENU_KEYS:
         menu_keys = [SUPPORTING_PAGE_MENU_KEYS[page_name]]
     if not menu_keys:
-        if frappe.db.exists("Page", page_name):
-            module = frappe.db.get_value("Page", page_name, "module") or ""
-            if module.startswith("Orderlift"):
-                return False
-        return True
+        return page_name not in _menu_policy()["orderlift_pages"]
     rules = rules if rules is not None else _menu_rule_map()
     visible_items = [
         item
@@ -371,6 +380,7 @@ def filter_sidebar_rows(rows: list[dict], user: str | None = None) -> list[dict]
     if _is_admin_user(user, roles):
         return rows
     rules = _menu_rule_map()
+    visible_keys = set(_visible_menu_keys(user, roles, rules))
 
     filtered: list[dict] = []
     pending_section: dict | None = None
@@ -396,11 +406,10 @@ def filter_sidebar_rows(rows: list[dict], user: str | None = None) -> list[dict]
             continue
 
         item = menu_item_for_row(row)
-        if not item:
+        if not item or item["key"] not in visible_keys:
             continue
-        if not user_can_access_menu_key(item["key"], user=user, roles=roles, rules=rules):
-            continue
-        if not _link_target_allowed(row, user=user, roles=roles, rules=rules):
+        # Visible keys were checked against the registry link; recheck rows pointing elsewhere.
+        if _row_link(row) != _row_link(item) and not _link_target_allowed(row, user=user, roles=roles, rules=rules):
             continue
 
         filtered.append(row)
@@ -451,22 +460,68 @@ def _build_main_dashboard_sidebar() -> dict:
 def get_boot_menu_access(user: str | None = None) -> dict:
     user = user or frappe.session.user
     roles = _get_roles(user)
-    rules = _menu_rule_map()
-    visible_keys = []
-    for item in iter_menu_items():
-        if user_can_access_menu_key(item["key"], user=user, roles=roles, rules=rules) and _link_target_allowed(
-            item,
-            user=user,
-            roles=roles,
-            rules=rules,
-        ):
-            visible_keys.append(item["key"])
     return {
-        "visible_menu_keys": visible_keys,
+        "visible_menu_keys": _visible_menu_keys(user, roles, _menu_rule_map()),
         "is_admin": _is_admin_user(user, roles),
     }
 
 
+def clear_menu_access_cache(doc=None, method=None) -> None:
+    """Doc event / clear_cache hook: drop the compiled policy after menu rule, Role, Page or Report writes.
+
+    The shared copy is deleted once the write commits or rolls back, so no other
+    worker can reload the old rules and cache them for the policy TTL.
+    """
+    _clear_local_menu_policy()
+    run_after_commit(_drop_menu_policy, on_rollback=True)
+
+
+def _drop_menu_policy() -> None:
+    cache = getattr(frappe, "cache", None)
+    if cache:
+        with suppress(Exception):
+            cache.delete_value(MENU_POLICY_CACHE_KEY)
+    _clear_local_menu_policy()
+
+
+def _clear_local_menu_policy() -> None:
+    local = getattr(frappe, "local", None)
+    if local is not None and hasattr(local, "orderlift_menu_policy"):
+        delattr(local, "orderlift_menu_policy")
+
+
+def _visible_menu_keys(user: str, roles: set[str], rules: dict[str, object]) -> list[str]:
+    cache = getattr(frappe, "cache", None)
+    cache_key = _visible_menu_keys_cache_key(user, roles)
+    if cache:
+        with suppress(Exception):
+            cached = cache.get_value(cache_key, expires=True)
+            if isinstance(cached, list):
+                return cached
+
+    visible_keys = [
+        item["key"]
+        for item in iter_menu_items()
+        if user_can_access_menu_key(item["key"], user=user, roles=roles, rules=rules)
+        and _link_target_allowed(item, user=user, roles=roles, rules=rules)
+    ]
+    if cache:
+        with suppress(Exception):
+            cache.set_value(cache_key, visible_keys, expires_in_sec=MENU_VISIBLE_KEYS_TTL_SECONDS)
+    return visible_keys
+
+
+def _visible_menu_keys_cache_key(user: str, roles: set[str]) -> str:
+    # A new policy version or a changed role assignment lands on a fresh key;
+    # superseded entries simply expire.
+    role_digest = hashlib.sha1("\n".join(sorted(roles)).encode()).hexdigest()[:16]
+    return f"{MENU_VISIBLE_KEYS_CACHE_PREFIX}:{_menu_policy()['version']}:{user}:{role_digest}"
+
+
+def _row_link(row: dict) -> tuple:
+    return (row.get("link_type") or "", row.get("link_to") or "")
+
+
 def _frappe_whitelist():
     whitelist = getattr(frappe, "whitelist", None)
     if whitelist:
@@ -660,6 +715,7 @@ def set_session_current_company(company: str, user: str | None = None) -> dict:
     local = getattr(frappe, "local", None)
     if local is not None:
         local.orderlift_company_context = {**context, "sid": sid}
+    _clear_company_query_cache(user)
     return context
 
 
@@ -675,6 +731,14 @@ def clear_session_company_context(user: str | None = None) -> None:
     local = getattr(frappe, "local", None)
     if local is not None and hasattr(local, "orderlift_company_context"):
         delattr(local, "orderlift_company_context")
+    _clear_company_query_cache(user)
+
+
+def _clear_company_query_cache(user: str | None) -> None:
+    # company_access imports this module, so resolve the cache lazily.
+    from orderlift.company_access import clear_company_query_cache
+
+    clear_company_query_cache(user=user)
 
 
 def has_interactive_company_session(user: str | None = None) -> bool:
@@ -902,18 +966,129 @@ def save_user_business_type_access(user: str, business_types: list[str] | str) -
 
 
 def _menu_rule_map() -> dict[str, object]:
+    return _menu_policy()["rules"]
+
+
+def _menu_policy() -> dict:
+    """Compiled per-site access policy, memoised per request and cached in Redis."""
+    local = getattr(frappe, "local", None)
+    policy = getattr(local, "orderlift_menu_policy", None) if local is not None else None
+    if isinstance(policy, dict):
+        return policy
+
+    cache = getattr(frappe, "cache", None)
+    policy = None
+    if cache:
+        with suppress(Exception):
+            policy = cache.get_value(MENU_POLICY_CACHE_KEY, expires=True)
+    if not isinstance(policy, dict):
+        policy = _compile_menu_policy()
+        if cache and not in_write_transaction():
+            with suppress(Exception):
+                cache.set_value(MENU_POLICY_CACHE_KEY, policy, expires_in_sec=MENU_POLICY_TTL_SECONDS)
+    if local is not None:
+        with suppress(Exception):
+            local.orderlift_menu_policy = policy
+    return policy
+
+
+def _compile_menu_policy() -> dict:
+    """Read every input of a menu access decision in a handful of queries.
+
+    Rules keep their decoded role lists and gain ``allowed_mask``/``denied_mask``
+    bitsets over ``role_bits`` so a check is two integer ANDs.
+    """
+    role_bits: dict[str, int] = {}
+
+    def role_mask(role_names: list[str]) -> int:
+        mask = 0
+        for role in role_names:
+            mask |= role_bits.setdefault(role, 1 << len(role_bits))
+        return mask
+
+    rules = _load_menu_rules()
+    for menu_key, rule in rules.items():
+        allowed_roles = _clean_list(rule.get("allowed_roles_json"))
+        denied_roles = _clean_list(rule.get("denied_roles_json"))
+        item = menu_item_by_key(menu_key) or {}
+        rule.update(
+            {
+                "allowed_roles_json": allowed_roles,
+                "denied_roles_json": denied_roles,
+                "all_users": ALL_USERS_ROLE in allowed_roles,
+                "allowed_mask": role_mask(allowed_roles),
+                "denied_mask": role_mask(denied_roles),
+                "required_capability": item.get("required_capability") or "",
+                "role_bits": role_bits,
+            }
+        )
+
+    child_roles = _load_child_roles(("Page", "Report"))
+    return {
+        "version": time.time_ns(),
+        "role_bits": role_bits,
+        "rules": rules,
+        "page_roles": child_roles.get("Page", {}),
+        "report_roles": child_roles.get("Report", {}),
+        "orderlift_pages": _load_orderlift_pages(),
+        "managed_roles": _load_managed_roles(),
+    }
+
+
+def _load_menu_rules() -> dict[str, object]:
     if not _doctype_available(MENU_ACCESS_DOCTYPE):
         return {}
     with suppress(Exception):
         rows = frappe.get_all(
             MENU_ACCESS_DOCTYPE,
-            fields=["name", "menu_key"],
+            fields=["name", "menu_key", "enabled", "label", "menu_order", "allowed_roles_json", "denied_roles_json"],
             limit_page_length=0,
         )
-        return {row.menu_key: frappe.get_doc(MENU_ACCESS_DOCTYPE, row.name) for row in rows if row.get("menu_key")}
+        return {row.menu_key: row for row in rows if row.get("menu_key")}
     return {}
 
 
+def _load_child_roles(parenttypes: tuple[str, ...]) -> dict[str, dict[str, set[str]]]:
+    out: dict[str, dict[str, set[str]]] = {}
+    with suppress(Exception):
+        for row in frappe.get_all(
+            "Has Role",
+            filters={"parenttype": ["in", list(parenttypes)]},
+            fields=["parenttype", "parent", "role"],
+            limit_page_length=0,
+        ):
+            if row.get("parent") and row.get("role"):
+                out.setdefault(row.parenttype, {}).setdefault(row.parent, set()).add(row.role)
+    return out
+
+
+def _load_orderlift_pages() -> set[str]:
+    with suppress(Exception):
+        return set(
+            frappe.get_all(
+                "Page",
+                filters={"module": ["like", "Orderlift%"]},
+                pluck="name",
+                limit_page_length=0,
+            )
+        )
+    return set()
+
+
+def _load_managed_roles() -> set[str]:
+    with suppress(Exception):
+        if frappe.get_meta("Role").get_field(ORDERLIFT_MANAGED_ROLE_FIELD):
+            return set(
+                frappe.get_all(
+                    "Role",
+                    filters={ORDERLIFT_MANAGED_ROLE_FIELD: 1, "disabled": 0},
+                    pluck="name",
+                    limit_page_length=0,
+                )
+            )
+    return set()
+
+
 def _rule_enabled(rule) -> bool:
     if rule is None:
         return True
@@ -933,6 +1108,20 @@ def _rule_denied_roles(rule) -> list[str]:
     return _clean_list(rule.get("denied_roles_json"))
 
 
+def _rule_allows_roles(rule, menu_key: str, roles: set[str]) -> bool:
+    role_bits = rule.get("role_bits") if rule is not None else None
+    if role_bits is not None:
+        role_mask = 0
+        for role in roles:
+            role_mask |= role_bits.get(role, 0)
+        if role_mask & rule.get("denied_mask"):
+            return False
+        return bool(rule.get("all_users") or role_mask & rule.get("allowed_mask"))
+    if roles.intersection(_rule_denied_roles(rule)):
+        return False
+    return _roles_allow(_rule_roles(rule, menu_key), roles)
+
+
 def _roles_allow(allowed_roles: list[str], user_roles: set[str]) -> bool:
     if ALL_USERS_ROLE in allowed_roles:
         return True
@@ -1016,7 +1205,7 @@ def _link_target_allowed(row: dict, *, user: str, roles: set[str], rules: dict[s
             return False
         return _page_required_doctypes_allowed(row, user=user)
     if link_type == "Report":
-        report_roles = _child_roles("Report", link_to)
+        report_roles = _menu_policy()["report_roles"].get(link_to) or set()
         return not report_roles or bool(roles.intersection(report_roles))
     return True
 
@@ -1038,22 +1227,7 @@ def _required_doctypes_allowed(required_doctypes, *, user: str) -> bool:
 
 
 def _page_roles(page_name: str) -> set[str]:
-    return _child_roles("Page", page_name)
-
-
-def _child_roles(parenttype: str, parent: str) -> set[str]:
-    if not parent:
-        return set()
-    with suppress(Exception):
-        return set(
-            frappe.get_all(
-                "Has Role",
-                filters={"parenttype": parenttype, "parent": parent},
-                pluck="role",
-                limit_page_length=0,
-            )
-        )
-    return set()
+    return set(_menu_policy()["page_roles"].get(page_name) or ())
 
 
 def _get_roles(user: str | None = None) -> set[str]:
@@ -1076,20 +1250,7 @@ def _is_orderlift_business_user(user: str, roles: set[str]) -> bool:
         return False
     if user == "Administrator" or roles.intersection(BUSINESS_ROLES):
         return True
-    with suppress(Exception):
-        if frappe.get_meta("Role").get_field(ORDERLIFT_MANAGED_ROLE_FIELD):
-            return bool(
-                frappe.get_all(
-                    "Role",
-                    filters={
-                        "name": ["in", list(roles)],
-                        ORDERLIFT_MANAGED_ROLE_FIELD: 1,
-                        "disabled": 0,
-                    },
-                    limit_page_length=1,
-                )
-            )
-    return False
+    return bool(roles.intersection(_menu_policy()["managed_roles"]))
 
 
 def _clean_list(value: str | list | tuple | set | None) -> list[str]:
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import json
+
 import frappe
 from frappe import _
 from frappe.utils import cint, flt, nowdate
@@ -46,6 +48,138 @@ PIPELINE_STATUS_FIELDS = {
 }
 DEFAULT_DRAFT_PROSPECT = "Draft Unassigned Prospect"
 DEFAULT_OPPORTUNITY_STAGE = "1. Demande Client"
+PIPELINE_COLUMN_PAGE_LENGTH = 30
+MAX_PIPELINE_COLUMN_PAGE_LENGTH = 200
+PIPELINE_PROGRESS_LABELS = {
+    "per_delivered": ("Not delivered", "Partially delivered", "Delivered"),
+    "per_billed": ("Not billed", "Partially billed", "Billed"),
+}
+# How each board reads its doctype in SQL. Fields missing from the site's schema
+# (custom fields before migrate) are skipped wherever they appear.
+PIPELINE_BOARD_SOURCES = {
+    "Opportunity": {
+        "status_field": "sales_stage",
+        "legacy_status_field": None,
+        "owner_fields": ("opportunity_owner",),
+        "amount_field": "opportunity_amount",
+        "conditions": ("`tabOpportunity`.docstatus < 2",),
+        "fields": (
+            "name",
+            "title",
+            "party_name",
+            "customer_name",
+            "opportunity_amount",
+            "opportunity_owner",
+            "probability",
+            "status",
+            "sales_stage",
+            "company",
+            "opportunity_from",
+            "custom_source_channel",
+            "custom_crm_business_type",
+            "custom_crm_segment",
+        ),
+        "search_fields": ("name", "title", "customer_name", "party_name", "company", "custom_source_channel"),
+        "filter_fields": {
+            "owner": "opportunity_owner",
+            "company": "company",
+            "source": "custom_source_channel",
+            "business_type": "custom_crm_business_type",
+            "segment": "custom_crm_segment",
+        },
+        "facet_fields": {
+            "owners": "opportunity_owner",
+            "sources": "custom_source_channel",
+            "business_types": "custom_crm_business_type",
+            "segments": "custom_crm_segment",
+        },
+        "aggregates": {
+            "quoted": "EXISTS (SELECT 1 FROM `tabQuotation` quotation"
+            " WHERE quotation.opportunity = `tabOpportunity`.name AND quotation.docstatus < 2)",
+        },
+        "board_filters": ("search", "owner", "source", "company", "business_type", "segment"),
+    },
+    "Project": {
+        "status_field": "custom_project_status",
+        "legacy_status_field": "status",
+        "owner_fields": ("custom_project_owner", "owner"),
+        "amount_field": None,
+        "conditions": (),
+        "fields": (
+            "name",
+            "project_name",
+            "customer",
+            "company",
+            "status",
+            "owner",
+            "custom_project_owner",
+            "custom_project_status",
+            "custom_qc_status",
+            "custom_crm_business_type",
+            "custom_crm_segment",
+            "custom_source_opportunity",
+        ),
+        "search_fields": ("name", "project_name", "customer", "company"),
+        "filter_fields": {
+            "owner": "custom_project_owner",
+            "company": "company",
+            "business_type": "custom_crm_business_type",
+            "segment": "custom_crm_segment",
+        },
+        "facet_fields": {
+            "owners": "custom_project_owner",
+            "business_types": "custom_crm_business_type",
+            "segments": "custom_crm_segment",
+        },
+        "aggregates": {},
+        "board_filters": ("search", "company", "owner", "status", "business_type", "segment"),
+    },
+    "Sales Order": {
+        "status_field": "custom_orderlift_order_status",
+        "legacy_status_field": "status",
+        "owner_fields": ("owner",),
+        "amount_field": "grand_total",
+        "conditions": ("`tabSales Order`.docstatus < 2", "ifnull(`tabSales Order`.project, '') = ''"),
+        "fields": (
+            "name",
+            "customer",
+            "company",
+            "owner",
+            "status",
+            "grand_total",
+            "per_delivered",
+            "per_billed",
+            "project",
+            "custom_orderlift_order_status",
+            "custom_crm_business_type",
+            "custom_crm_segment",
+            "custom_partner_campaign_target",
+        ),
+        "search_fields": ("name", "customer", "company"),
+        "filter_fields": {
+            "owner": "owner",
+            "company": "company",
+            "business_type": "custom_crm_business_type",
+            "segment": "custom_crm_segment",
+        },
+        "facet_fields": {
+            "owners": "owner",
+            "business_types": "custom_crm_business_type",
+            "segments": "custom_crm_segment",
+        },
+        "aggregates": {},
+        "board_filters": (
+            "search",
+            "company",
+            "owner",
+            "status",
+            "business_type",
+            "segment",
+            "delivery_progress",
+            "billing_progress",
+        ),
+    },
+}
 
 
 def _format_amount(value, company: str | None = None) -> str:
@@ -71,41 +205,38 @@ def get_opportunity_pipeline_data(
     company: str | None = None,
     business_type: str | None = None,
     segment: str | None = None,
+    page_length: int | None = None,
 ) -> dict:
     company = _resolve_pipeline_company(company)
-    statuses = _filter_statuses_by_business_type(
-        list_editable_statuses("Opportunity", include_inactive=False, company=company),
-        business_type,
-    )
-    cards = _opportunity_cards(
-        search=search,
-        owner=owner,
-        source=source,
-        company=company,
-        business_type=business_type,
-        segment=segment,
-        statuses=statuses,
+    statuses = _pipeline_board_statuses("Opportunity", company, business_type)
+    board = _pipeline_board(
+        "Opportunity",
+        statuses,
+        {
+            "search": search,
+            "owner": owner,
+            "source": source,
+            "company": company,
+            "business_type": business_type,
+            "segment": segment,
+        },
+        page_length=page_length,
     )
+    totals = board["totals"].values()
     return {
-        "columns": _build_columns(statuses, cards),
+        "columns": board["columns"],
         "quick_actions": get_company_pipeline_quick_actions("Opportunity", company=company),
         "kpis": {
             "primary_label": _("Opportunities"),
-            "primary_value": len(cards),
+            "primary_value": sum(cint(total.get("count")) for total in totals),
             "secondary_label": _("Pipeline Amount"),
-            "secondary_value": _format_amount(sum(flt(card.get('amount')) for card in cards), company),
+            "secondary_value": _format_amount(sum(flt(total.get("amount")) for total in totals), company),
             "tertiary_label": _("Quoted"),
-            "tertiary_value": len([card for card in cards if any(doc.get("doctype") == "Quotation" for doc in card.get("docs", []))]),
+            "tertiary_value": sum(cint(total.get("quoted")) for total in totals),
             "quaternary_label": _("Stages"),
             "quaternary_value": len(statuses),
         },
-        "filters": {
-            "owners": sorted({card.get("owner") for card in cards if card.get("owner")}),
-            "sources": sorted({card.get("source") for card in cards if card.get("source")}),
-            "companies": _allowed_pipeline_companies(),
-            "business_types": sorted({tag for card in cards for tag in [card.get("business_type")] if tag}),
-            "segments": sorted({card.get("crm_segment") for card in cards if card.get("crm_segment")}),
-        },
+        "filters": {**board["facets"], "companies": _allowed_pipeline_companies()},
         "selected_company": company,
     }
 
@@ -157,41 +288,41 @@ def get_project_pipeline_data(
     status: str | None = None,
     business_type: str | None = None,
     segment: str | None = None,
+    page_length: int | None = None,
 ) -> dict:
     company = _resolve_pipeline_company(company)
-    statuses = _filter_statuses_by_business_type(
-        list_editable_statuses("Project", include_inactive=False, company=company),
-        business_type,
-    )
-    cards = _project_cards(
-        search=search,
-        company=company,
-        owner=owner,
-        status=status,
-        business_type=business_type,
-        segment=segment,
-        statuses=statuses,
+    statuses = _pipeline_board_statuses("Project", company, business_type)
+    board = _pipeline_board(
+        "Project",
+        statuses,
+        {
+            "search": search,
+            "company": company,
+            "owner": owner,
+            "status": status,
+            "business_type": business_type,
+            "segment": segment,
+        },
+        page_length=page_length,
     )
-    completed_count = len([card for card in cards if card.get("stage") == "Completed"])
+    totals = board["totals"]
     return {
-        "columns": _build_columns(statuses, cards),
+        "columns": board["columns"],
         "quick_actions": get_company_pipeline_quick_actions("Project", company=company),
         "kpis": {
             "primary_label": _("Projects"),
-            "primary_value": len(cards),
+            "primary_value": sum(cint(total.get("count")) for total in totals.values()),
             "secondary_label": _("Completed"),
-            "secondary_value": completed_count,
+            "secondary_value": cint((totals.get("Completed") or {}).get("count")),
             "tertiary_label": _("Blocked"),
-            "tertiary_value": len([card for card in cards if card.get("stage") == "Blocked"]),
+            "tertiary_value": cint((totals.get("Blocked") or {}).get("count")),
             "quaternary_label": _("Stages"),
             "quaternary_value": len(statuses),
         },
         "filters": {
+            **board["facets"],
             "companies": _allowed_pipeline_companies(),
-            "owners": sorted({card.get("owner") for card in cards if card.get("owner")}),
             "statuses": [status["name"] for status in statuses],
-            "business_types": sorted({card.get("business_type") for card in cards if card.get("business_type")}),
-            "segments": sorted({card.get("crm_segment") for card in cards if card.get("crm_segment")}),
         },
         "selected_company": company,
     }
@@ -227,46 +358,70 @@ def get_sales_order_pipeline_data(
     segment: str | None = None,
     delivery_progress: str | None = None,
     billing_progress: str | None = None,
+    page_length: int | None = None,
 ) -> dict:
     company = _resolve_pipeline_company(company)
-    statuses = list_editable_statuses("Sales Order", include_inactive=False, company=company)
-    cards = _sales_order_cards(
-        search=search,
-        company=company,
-        owner=owner,
-        status=status,
-        business_type=business_type,
-        segment=segment,
-        delivery_progress=delivery_progress,
-        billing_progress=billing_progress,
-        statuses=statuses,
+    statuses = _pipeline_board_statuses("Sales Order", company, business_type)
+    board = _pipeline_board(
+        "Sales Order",
+        statuses,
+        {
+            "search": search,
+            "company": company,
+            "owner": owner,
+            "status": status,
+            "business_type": business_type,
+            "segment": segment,
+            "delivery_progress": delivery_progress,
+            "billing_progress": billing_progress,
+        },
+        page_length=page_length,
     )
+    totals = board["totals"]
     return {
-        "columns": _build_columns(statuses, cards),
+        "columns": board["columns"],
         "quick_actions": get_company_pipeline_quick_actions("Sales Order", company=company),
         "kpis": {
             "primary_label": _("Sales Orders"),
-            "primary_value": len(cards),
+            "primary_value": sum(cint(total.get("count")) for total in totals.values()),
             "secondary_label": _("Order Amount"),
-            "secondary_value": _format_amount(sum(flt(card.get('amount')) for card in cards), company),
+            "secondary_value": _format_amount(sum(flt(total.get("amount")) for total in totals.values()), company),
             "tertiary_label": _("Delivered"),
-            "tertiary_value": len([card for card in cards if card.get("stage") in {"Delivered", "Completed"}]),
+            "tertiary_value": sum(cint((totals.get(stage) or {}).get("count")) for stage in ("Delivered", "Completed")),
             "quaternary_label": _("Stages"),
             "quaternary_value": len(statuses),
         },
         "filters": {
+            **board["facets"],
             "companies": _allowed_pipeline_companies(),
-            "owners": sorted({card.get("owner") for card in cards if card.get("owner")}),
             "statuses": [status["name"] for status in statuses],
-            "business_types": sorted({card.get("business_type") for card in cards if card.get("business_type")}),
-            "segments": sorted({card.get("crm_segment") for card in cards if card.get("crm_segment")}),
-            "delivery_progress": ["Not delivered", "Partially delivered", "Delivered"],
-            "billing_progress": ["Not billed", "Partially billed", "Billed"],
+            "delivery_progress": list(PIPELINE_PROGRESS_LABELS["per_delivered"]),
+            "billing_progress": list(PIPELINE_PROGRESS_LABELS["per_billed"]),
         },
         "selected_company": company,
     }
 
 
+@frappe.whitelist()
+def get_pipeline_column_page(
+    document_type: str,
+    stage: str,
+    cursor: str | None = None,
+    filters: str | dict | None = None,
+    page_length: int | None = None,
+) -> dict:
+    """Next page of one Kanban column, continuing after ``cursor`` under the board's filters."""
+    if document_type not in SUPPORTED_PIPELINE_DOCUMENT_TYPES:
+        frappe.throw(_("Unsupported pipeline document type: {0}").format(document_type))
+    filters = frappe.parse_json(filters) if isinstance(filters, str) else dict(filters or {})
+    filters = {key: filters.get(key) for key in PIPELINE_BOARD_SOURCES[document_type]["board_filters"]}
+    filters["company"] = _resolve_pipeline_company(filters.get("company"))
+    statuses = _pipeline_board_statuses(document_type, filters["company"], filters.get("business_type"))
+    query = _board_query(document_type, statuses, filters)
+    rows, next_cursor = _board_column_rows(query, stage, cursor=cursor, page_length=page_length)
+    return {"stage": stage, "cards": _board_cards(document_type, rows, statuses), "next_cursor": next_cursor}
+
+
 @frappe.whitelist()
 def update_sales_order_stage(sales_order: str, stage: str) -> dict:
     doc = frappe.get_doc("Sales Order", sales_order)
@@ -665,48 +820,241 @@ def _opportunity_sales_orders(opportunity: str) -> list[dict]:
     return opportunity_sales_orders(opportunity)
 
 
-def _opportunity_cards(search=None, owner=None, source=None, company=None, business_type=None, segment=None, statuses=None) -> list[dict]:
-    filters = {"docstatus": ["<", 2]}
-    if owner and owner != "All":
-        filters["opportunity_owner"] = owner
-    if company and company != "All":
-        filters["company"] = company
-    if source and source != "All" and _has_field("Opportunity", "custom_source_channel"):
-        filters["custom_source_channel"] = source
-    if business_type and business_type != "All" and _has_field("Opportunity", "custom_crm_business_type"):
-        filters["custom_crm_business_type"] = business_type
-    if segment and segment != "All" and _has_field("Opportunity", "custom_crm_segment"):
-        filters["custom_crm_segment"] = segment
-
-    fields = [
-        "name",
-        "title",
-        "party_name",
-        "customer_name",
-        "opportunity_amount",
-        "opportunity_owner",
-        "probability",
-        "status",
-        "sales_stage",
-        "company",
-        "opportunity_from",
-    ]
-    for custom_field in ["custom_source_channel", "custom_crm_business_type", "custom_crm_segment"]:
-        if _has_field("Opportunity", custom_field):
-            fields.append(custom_field)
+def _pipeline_board_statuses(document_type: str, company: str, business_type: str | None = None) -> list[dict]:
+    statuses = list_editable_statuses(document_type, include_inactive=False, company=company)
+    if document_type == "Sales Order":
+        return statuses
+    return _filter_statuses_by_business_type(statuses, business_type)
+
+
+def _pipeline_board(document_type: str, statuses: list[dict], filters: dict, page_length=None) -> dict:
+    """Columns, per-stage totals and filter facets of a Kanban board.
 
-    rows = frappe.get_list("Opportunity", filters=filters, fields=fields, order_by="modified desc", limit_page_length=200)
-    cards = [_opportunity_card(row, statuses or []) for row in rows]
+    Counts, amounts and facets are aggregated over every matching document in
+    SQL; only the first page of each non-empty column is loaded as cards. The
+    rest of a column is fetched through ``get_pipeline_column_page``.
+    """
+    query = _board_query(document_type, statuses, filters)
+    totals = _board_stage_totals(query)
+    stages = [UNASSIGNED_STATUS, *(status["name"] for status in statuses)]
+    pages = {
+        stage: _board_column_rows(query, stage, page_length=page_length)
+        for stage in stages
+        if cint((totals.get(stage) or {}).get("count"))
+    }
+    cards = _board_cards(document_type, [row for rows, _cursor in pages.values() for row in rows], statuses)
+    columns = _build_columns(statuses, cards)
+    for column in columns:
+        total = totals.get(column["name"]) or {}
+        column["count"] = cint(total.get("count"))
+        column["amount"] = flt(total.get("amount"))
+        column["next_cursor"] = pages[column["name"]][1] if column["name"] in pages else None
+    return {"columns": columns, "totals": totals, "facets": _board_facets(query)}
+
+
+def _board_cards(document_type: str, rows: list, statuses: list[dict]) -> list[dict]:
+    card_builder = {
+        "Opportunity": _opportunity_card,
+        "Project": _project_card,
+        "Sales Order": _sales_order_card,
+    }[document_type]
+    related = _board_related(document_type, rows)
+    return [card_builder(row, statuses, related=related) for row in rows]
+
+
+def _board_query(document_type: str, statuses: list[dict], filters: dict) -> dict:
+    """WHERE clause, values and stage expression shared by every query of one board.
+
+    Mirrors what the card builders resolve in Python: the stage column follows
+    ``_resolve_opportunity_stage`` / ``resolve_status_column``, and owned-only
+    users see documents they own or hold the open pipeline ToDo for.
+    """
+    frappe.has_permission(document_type, "read", throw=True)
+    source = PIPELINE_BOARD_SOURCES[document_type]
+    table = f"`tab{document_type}`"
+    values = {"document_type": document_type}
+    stage = _board_stage_expression(document_type, table, statuses, values)
+    conditions = list(source["conditions"])
+    match_conditions = _board_match_conditions(document_type)
+    if match_conditions:
+        conditions.append(match_conditions)
+
+    owner = filters.get("owner")
+    for key, fieldname in source["filter_fields"].items():
+        value = filters.get(key)
+        if value and value != "All" and _board_has_field(document_type, fieldname):
+            conditions.append(f"{table}.`{fieldname}` = %(filter_{key})s")
+            values[f"filter_{key}"] = value
+    status = filters.get("status")
+    if status and status != "All":
+        conditions.append(f"({stage}) = %(filter_status)s")
+        values["filter_status"] = status
+    for fieldname, key in (("per_delivered", "delivery_progress"), ("per_billed", "billing_progress")):
+        condition = _progress_condition(f"{table}.`{fieldname}`", filters.get(key), PIPELINE_PROGRESS_LABELS[fieldname])
+        if condition:
+            conditions.append(condition)
     if _owned_pipeline_visibility_enabled() and not (owner and owner != "All"):
-        cards = [card for card in cards if _card_visible_to_session_user(card)]
-    if search:
-        needle = search.strip().lower()
-        cards = [
-            card
-            for card in cards
-            if needle in f"{card.get('name')} {card.get('title')} {card.get('subtitle')} {card.get('company')} {card.get('source')}".lower()
+        owner_expression = _board_owner_expression(document_type, table, source["owner_fields"])
+        values["session_user"] = frappe.session.user or ""
+        values["assignment_marker"] = f"%{PIPELINE_ASSIGNMENT_MARKER}%"
+        conditions.append(
+            f"""({owner_expression} = %(session_user)s OR EXISTS (
+                SELECT 1 FROM `tabToDo` todo
+                WHERE todo.reference_type = %(document_type)s AND todo.reference_name = {table}.name
+                    AND todo.status = 'Open' AND todo.allocated_to = %(session_user)s
+                    AND todo.description LIKE %(assignment_marker)s
+            ))"""
+        )
+    search = (filters.get("search") or "").strip()
+    search_fields = [fieldname for fieldname in source["search_fields"] if _board_has_field(document_type, fieldname)]
+    if search and search_fields:
+        values["search"] = f"%{search}%"
+        conditions.append("(" + " OR ".join(f"{table}.`{fieldname}` LIKE %(search)s" for fieldname in search_fields) + ")")
+
+    return {
+        "doctype": document_type,
+        "table": table,
+        "stage": stage,
+        "where": " AND ".join(conditions) or "1 = 1",
+        "values": values,
+        "fields": [fieldname for fieldname in source["fields"] if _board_has_field(document_type, fieldname)],
+    }
+
+
+def _board_stage_expression(document_type: str, table: str, statuses: list[dict], values: dict) -> str:
+    source = PIPELINE_BOARD_SOURCES[document_type]
+    values["unassigned_stage"] = UNASSIGNED_STATUS
+    primary = f"{table}.`{source['status_field']}`" if _board_has_field(document_type, source["status_field"]) else "NULL"
+    if document_type == "Opportunity":
+        if not statuses:
+            return "%(unassigned_stage)s"
+        values["stage_names"] = tuple(status["name"] for status in statuses)
+        values["default_stage"] = next((status["name"] for status in statuses if status.get("is_default")), statuses[0]["name"])
+        return f"CASE WHEN {primary} IN %(stage_names)s THEN {primary} ELSE %(default_stage)s END"
+    active = tuple(status["name"] for status in statuses if status.get("is_active"))
+    if not active:
+        return "%(unassigned_stage)s"
+    values["active_stages"] = active
+    legacy_field = source["legacy_status_field"]
+    legacy = ""
+    if legacy_field and _board_has_field(document_type, legacy_field):
+        legacy = f" WHEN {table}.`{legacy_field}` IN %(active_stages)s THEN {table}.`{legacy_field}`"
+    return f"CASE WHEN {primary} IN %(active_stages)s THEN {primary}{legacy} ELSE %(unassigned_stage)s END"
+
+
+def _board_owner_expression(document_type: str, table: str, owner_fields: tuple[str, ...]) -> str:
+    columns = [f"NULLIF({table}.`{fieldname}`, '')" for fieldname in owner_fields if _board_has_field(document_type, fieldname)]
+    columns.append("''")
+    return f"COALESCE({', '.join(columns)})"
+
+
+def _progress_condition(column: str, value: str | None, labels: tuple[str, str, str]) -> str:
+    not_started, partial, complete = labels
+    if value == complete:
+        return f"ifnull({column}, 0) >= 100"
+    if value == partial:
+        return f"ifnull({column}, 0) > 0 AND ifnull({column}, 0) < 100"
+    if value == not_started:
+        return f"ifnull({column}, 0) <= 0"
+    return ""
+
+
+def _board_match_conditions(document_type: str) -> str:
+    from frappe.model.db_query import DatabaseQuery
+
+    return DatabaseQuery(document_type).build_match_conditions(as_condition=True)
+
+
+def _board_has_field(document_type: str, fieldname: str) -> bool:
+    return fieldname in {"name", "owner", "modified", "docstatus"} or _has_field(document_type, fieldname)
+
+
+def _board_stage_totals(query: dict) -> dict[str, dict]:
+    """Document count, amount and extra aggregates per stage over the whole filtered board."""
+    source = PIPELINE_BOARD_SOURCES[query["doctype"]]
+    table = query["table"]
+    aggregates = ["COUNT(*) AS count"]
+    if source["amount_field"] and _board_has_field(query["doctype"], source["amount_field"]):
+        aggregates.append(f"SUM(ifnull({table}.`{source['amount_field']}`, 0)) AS amount")
+    aggregates.extend(f"SUM({expression}) AS {alias}" for alias, expression in source["aggregates"].items())
+    rows = frappe.db.sql(
+        f"""
+        SELECT {query['stage']} AS board_stage, {', '.join(aggregates)}
+        FROM {table}
+        WHERE {query['where']}
+        GROUP BY board_stage
+        """,
+        query["values"],
+        as_dict=True,
+    )
+    return {row.get("board_stage"): row for row in rows}
+
+
+def _board_column_rows(query: dict, stage: str, cursor=None, page_length=None) -> tuple[list, str | None]:
+    """One page of a column, newest first, keyed on (modified, name) so pages never overlap or skip rows."""
+    table = query["table"]
+    page_length = min(max(cint(page_length) or PIPELINE_COLUMN_PAGE_LENGTH, 1), MAX_PIPELINE_COLUMN_PAGE_LENGTH)
+    values = dict(query["values"], column_stage=stage, page_length=page_length + 1)
+    conditions = [query["where"], f"({query['stage']}) = %(column_stage)s"]
+    position = _decode_board_cursor(cursor)
+    if position:
+        values["cursor_modified"], values["cursor_name"] = position
+        conditions.append(
+            f"({table}.modified < %(cursor_modified)s"
+            f" OR ({table}.modified = %(cursor_modified)s AND {table}.name < %(cursor_name)s))"
+        )
+    fields = ", ".join(f"{table}.`{fieldname}`" for fieldname in dict.fromkeys([*query["fields"], "modified"]))
+    rows = frappe.db.sql(
+        f"""
+        SELECT {fields}
+        FROM {table}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {table}.modified DESC, {table}.name DESC
+        LIMIT %(page_length)s
+        """,
+        values,
+        as_dict=True,
+    )
+    if len(rows) <= page_length:
+        return rows, None
+    rows = rows[:page_length]
+    return rows, json.dumps([str(rows[-1].get("modified")), rows[-1].get("name")])
+
+
+def _decode_board_cursor(cursor) -> tuple[str, str] | None:
+    if not cursor:
+        return None
+    try:
+        modified, name = json.loads(cursor) if isinstance(cursor, str) else cursor
+    except (TypeError, ValueError):
+        frappe.throw(_("Invalid pipeline page cursor."))
+    return str(modified), str(name)
+
+
+def _board_facets(query: dict) -> dict[str, list[str]]:
+    """Distinct filter values present on the filtered board, one grouped query per facet."""
+    source = PIPELINE_BOARD_SOURCES[query["doctype"]]
+    table = query["table"]
+    facets = {}
+    for key, fieldname in source["facet_fields"].items():
+        if not _board_has_field(query["doctype"], fieldname):
+            facets[key] = []
+            continue
+        column = f"{table}.`{fieldname}`"
+        facets[key] = [
+            row[0]
+            for row in frappe.db.sql(
+                f"""
+                SELECT {column}
+                FROM {table}
+                WHERE {query['where']} AND ifnull({column}, '') != ''
+                GROUP BY {column}
+                ORDER BY {column}
+                """,
+                query["values"],
+            )
         ]
-    return cards
+    return facets
 
 
 def _owned_pipeline_visibility_enabled() -> bool:
@@ -718,17 +1066,12 @@ def _owned_pipeline_visibility_enabled() -> bool:
     return bool(cint(frappe.db.get_value("User", user, "custom_owned_documents_only") or 0))
 
 
-def _card_visible_to_session_user(card: dict) -> bool:
-    user = frappe.session.user or ""
-    if not user:
-        return False
-    return (card.get("owner") or "") == user or (card.get("assigned_user") or "") == user
-
-
-def _opportunity_card(row, statuses: list[dict]) -> dict:
-    docs = _opportunity_related_docs(row.get("name"))
+def _opportunity_card(row, statuses: list[dict], related: dict | None = None) -> dict:
+    docs = related["docs"].get(row.get("name"), []) if related else _opportunity_related_docs(row.get("name"))
     stage = _resolve_opportunity_stage(row, docs, statuses)
-    assignment = _assignment_for_card("Opportunity", row.get("name"), stage, statuses)
+    assignment = _assignment_for_card(
+        "Opportunity", row.get("name"), stage, statuses, todos=related["todos"] if related else None
+    )
     return {
         "name": row.get("name"),
         "title": row.get("title") or row.get("name"),
@@ -771,56 +1114,78 @@ def _resolve_opportunity_stage(row, docs: list[dict], statuses: list[dict]) -> s
 
 
 def _opportunity_related_docs(opportunity: str) -> list[dict]:
-    docs = []
-    seen = set()
-    quotation_names = []
+    return _opportunity_related_docs_by_name([opportunity]).get(opportunity, [])
 
-    for quotation in frappe.get_all(
-        "Quotation",
-        filters={"opportunity": opportunity, "docstatus": ["<", 2]},
-        fields=["name", "status"],
-        order_by="modified desc",
-        limit_page_length=5,
-    ):
-        quotation_names.append(quotation.name)
-        _append_unique_doc(docs, seen, "Quotation", quotation.name, _("Quotation"), quotation.status)
 
+def _opportunity_related_docs_by_name(opportunities: list[str]) -> dict[str, list[dict]]:
+    """Quotations, Sales Orders and Projects per Opportunity, newest first, in grouped queries."""
+    opportunities = [name for name in dict.fromkeys(opportunities) if name]
+    if not opportunities:
+        return {}
+    quotations = _group_linked_rows(
+        _newest_rows_per_link("Quotation", "opportunity", opportunities, ["name", "status"], 5),
+        lambda row: [row.opportunity],
+        5,
+    )
+    direct_sales_orders = {}
     if _has_field("Sales Order", "opportunity"):
-        direct_sales_orders = frappe.get_all(
-            "Sales Order",
-            filters={"opportunity": opportunity, "docstatus": ["<", 2]},
-            fields=["name", "status", "project"],
-            order_by="modified desc",
-            limit_page_length=5,
+        direct_sales_orders = _group_linked_rows(
+            _newest_rows_per_link("Sales Order", "opportunity", opportunities, ["name", "status", "project"], 5),
+            lambda row: [row.opportunity],
+            5,
         )
-        for sales_order in direct_sales_orders:
-            _append_opportunity_sales_order_docs(docs, seen, sales_order)
-
+    quotation_names = [row.name for rows in quotations.values() for row in rows]
+    quoted_sales_orders = {}
     if quotation_names:
-        quoted_sales_orders = frappe.db.sql(
-            """
-            SELECT DISTINCT so.name, so.status, so.project
-            FROM `tabSales Order Item` soi
-            INNER JOIN `tabSales Order` so ON so.name = soi.parent
-            WHERE soi.prevdoc_docname IN ({placeholders}) AND so.docstatus < 2
-            ORDER BY so.modified DESC
-            LIMIT 5
-            """.format(placeholders=", ".join(["%s"] * len(quotation_names))),
-            tuple(quotation_names),
-            as_dict=True,
+        quoted_sales_orders = _group_linked_rows(
+            _newest_linked_rows(
+                "Sales Order",
+                """
+                SELECT DISTINCT so.name, so.status, so.project, so.modified, qtn.opportunity AS link_key
+                FROM `tabSales Order Item` soi
+                INNER JOIN `tabSales Order` so ON so.name = soi.parent
+                INNER JOIN `tabQuotation` qtn ON qtn.name = soi.prevdoc_docname
+                WHERE soi.prevdoc_docname IN ({placeholders}) AND so.docstatus < 2
+                """.format(placeholders=", ".join(["%s"] * len(quotation_names))),
+                tuple(quotation_names),
+                5,
+            ),
+            lambda row: [row.link_key],
+            5,
         )
-        for sales_order in quoted_sales_orders:
-            _append_opportunity_sales_order_docs(docs, seen, sales_order)
-
+    direct_projects = {}
     if frappe.db.has_column("Project", "custom_source_opportunity"):
-        direct_projects = frappe.get_all(
-            "Project",
-            filters={"custom_source_opportunity": opportunity},
-            fields=["name", "custom_project_status", "status"],
-            order_by="modified desc",
-            limit_page_length=5,
+        direct_projects = _group_linked_rows(
+            _newest_rows_per_link(
+                "Project",
+                "custom_source_opportunity",
+                opportunities,
+                ["name", "custom_project_status", "status"],
+                5,
+                submittable=False,
+            ),
+            lambda row: [row.custom_source_opportunity],
+            5,
         )
-        for project in direct_projects:
+    project_statuses = _project_status_labels(
+        row.project
+        for rows in (*direct_sales_orders.values(), *quoted_sales_orders.values())
+        for row in rows
+        if row.get("project")
+    )
+
+    related = {}
+    for opportunity in opportunities:
+        docs = []
+        seen = set()
+        for quotation in quotations.get(opportunity, []):
+            _append_unique_doc(docs, seen, "Quotation", quotation.name, _("Quotation"), quotation.status)
+        for sales_order in (*direct_sales_orders.get(opportunity, []), *quoted_sales_orders.get(opportunity, [])):
+            _append_unique_doc(docs, seen, "Sales Order", sales_order.name, _("Sales Order"), sales_order.status)
+            project_name = sales_order.get("project")
+            if project_name in project_statuses:
+                _append_unique_doc(docs, seen, "Project", project_name, _("Project"), project_statuses[project_name])
+        for project in direct_projects.get(opportunity, []):
             _append_unique_doc(
                 docs,
                 seen,
@@ -829,30 +1194,8 @@ def _opportunity_related_docs(opportunity: str) -> list[dict]:
                 _("Project"),
                 project.get("custom_project_status") or project.get("status") or "-",
             )
-    return docs
-
-
-def _append_opportunity_sales_order_docs(docs: list[dict], seen: set[tuple[str, str]], sales_order) -> None:
-    _append_unique_doc(docs, seen, "Sales Order", sales_order.name, _("Sales Order"), sales_order.status)
-    project_name = sales_order.get("project")
-    if not project_name:
-        return
-    project_status = frappe.db.get_value(
-        "Project",
-        project_name,
-        ["custom_project_status", "status"],
-        as_dict=True,
-    )
-    if not project_status:
-        return
-    _append_unique_doc(
-        docs,
-        seen,
-        "Project",
-        project_name,
-        _("Project"),
-        project_status.get("custom_project_status") or project_status.get("status") or "-",
-    )
+        related[opportunity] = docs
+    return related
 
 
 def _append_unique_doc(docs: list[dict], seen: set[tuple[str, str]], doctype: str, name: str, label: str, status: str | None) -> None:
@@ -863,36 +1206,13 @@ def _append_unique_doc(docs: list[dict], seen: set[tuple[str, str]], doctype: st
     docs.append(_doc_link(doctype, name, label, status))
 
 
-def _project_cards(search=None, company=None, owner=None, status=None, business_type=None, segment=None, statuses=None) -> list[dict]:
-    filters = {}
-    if company and company != "All":
-        filters["company"] = company
-    if owner and owner != "All" and _has_field("Project", "custom_project_owner"):
-        filters["custom_project_owner"] = owner
-    fields = ["name", "project_name", "customer", "company", "status"]
-    for fieldname in ["custom_project_owner", "custom_project_status", "custom_qc_status", "custom_crm_business_type", "custom_crm_segment", "custom_source_opportunity"]:
-        if _has_field("Project", fieldname):
-            fields.append(fieldname)
-    rows = frappe.get_list("Project", filters=filters, fields=fields, order_by="modified desc", limit_page_length=200)
-    cards = [_project_card(row, statuses or []) for row in rows]
-    if _owned_pipeline_visibility_enabled() and not (owner and owner != "All"):
-        cards = [card for card in cards if _card_visible_to_session_user(card)]
-    cards = _filter_cards_by_common_criteria(cards, status=status, business_type=business_type, segment=segment)
-    if search:
-        needle = search.strip().lower()
-        cards = [
-            card
-            for card in cards
-            if needle in f"{card.get('name')} {card.get('title')} {card.get('subtitle')} {card.get('company')}".lower()
-        ]
-    return cards
-
-
-def _project_card(row, statuses: list[dict]) -> dict:
-    docs = _project_related_docs(row.get("name"))
+def _project_card(row, statuses: list[dict], related: dict | None = None) -> dict:
+    docs = related["docs"].get(row.get("name"), []) if related else _project_related_docs(row.get("name"))
     stage = resolve_status_column("Project", row.get("custom_project_status"), row.get("status"), statuses)
     crm_info = _project_crm_info(row)
-    assignment = _assignment_for_card("Project", row.get("name"), stage, statuses)
+    assignment = _assignment_for_card(
+        "Project", row.get("name"), stage, statuses, todos=related["todos"] if related else None
+    )
     tags = []
     for tag in [crm_info.get("business_type"), crm_info.get("crm_segment")]:
         if tag:
@@ -924,74 +1244,80 @@ def _project_card(row, statuses: list[dict]) -> dict:
 
 
 def _project_related_docs(project: str) -> list[dict]:
-    docs = []
-    for row in frappe.db.sql(
-        """
-        SELECT name, status
-        FROM `tabSales Order`
-        WHERE docstatus < 2 AND project = %s
-        ORDER BY modified DESC
-        LIMIT 3
-        """,
-        (project,),
-        as_dict=True,
-    ):
-        docs.append(_doc_link("Sales Order", row.name, _("Sales Order"), row.status))
-    for row in _linked_status_rows(
-        "Purchase Order",
-        """
-        SELECT DISTINCT po.name, po.status
-        FROM `tabPurchase Order` po
-        LEFT JOIN `tabPurchase Order Item` poi ON poi.parent = po.name
-        WHERE po.docstatus < 2 AND (po.project = %s OR poi.project = %s)
-        ORDER BY po.modified DESC
-        LIMIT 3
-        """,
-        (project, project),
-    ):
-        docs.append(_doc_link("Purchase Order", row["name"], _("Purchase Order"), row["status"]))
-    for row in _linked_status_rows(
-        "Delivery Note",
-        """
-        SELECT DISTINCT dn.name, dn.status
-        FROM `tabDelivery Note` dn
-        LEFT JOIN `tabDelivery Note Item` dni ON dni.parent = dn.name
-        WHERE dn.docstatus < 2 AND (dn.project = %s OR dni.project = %s)
-        ORDER BY dn.modified DESC
-        LIMIT 3
-        """,
-        (project, project),
-    ):
-        docs.append(_doc_link("Delivery Note", row["name"], _("Delivery Note"), row["status"]))
-    for row in _linked_status_rows(
-        "Sales Invoice",
-        """
-        SELECT DISTINCT si.name, si.status
-        FROM `tabSales Invoice` si
-        LEFT JOIN `tabSales Invoice Item` sii ON sii.parent = si.name
-        WHERE si.docstatus < 2 AND (si.project = %s OR sii.project = %s)
-        ORDER BY si.modified DESC
-        LIMIT 3
-        """,
-        (project, project),
-    ):
-        docs.append(_doc_link("Sales Invoice", row["name"], _("Sales Invoice"), row["status"]))
-
     opportunity = (
         frappe.db.get_value("Project", project, "custom_source_opportunity")
         if _has_field("Project", "custom_source_opportunity")
         else None
     )
-    if opportunity:
-        for row in frappe.get_all(
-            "Quotation",
-            filters={"opportunity": opportunity, "docstatus": ["<", 2]},
-            fields=["name", "status"],
-            order_by="modified desc",
-            limit_page_length=3,
-        ):
-            docs.append(_doc_link("Quotation", row.name, _("Quotation"), row.status))
-    return docs
+    return _project_related_docs_by_name({project: opportunity}).get(project, [])
+
+
+def _project_related_docs_by_name(projects: dict[str, str | None]) -> dict[str, list[dict]]:
+    """Linked documents per Project, given each Project's source Opportunity, in grouped queries."""
+    names = [name for name in projects if name]
+    if not names:
+        return {}
+    placeholders = ", ".join(["%s"] * len(names))
+    linked = {
+        "Sales Order": _group_linked_rows(
+            _newest_rows_per_link("Sales Order", "project", names, ["name", "status"], 3),
+            lambda row: [row.project],
+            3,
+        )
+    }
+    for doctype, child_doctype in (
+        ("Purchase Order", "Purchase Order Item"),
+        ("Delivery Note", "Delivery Note Item"),
+        ("Sales Invoice", "Sales Invoice Item"),
+    ):
+        # A document links to a Project through its header or any item row; UNION
+        # keeps one row per (document, Project) however many items carry the link.
+        linked[doctype] = _group_linked_rows(
+            _newest_linked_rows(
+                doctype,
+                f"""
+                SELECT parent.name, parent.status, parent.modified, parent.project AS link_key
+                FROM `tab{doctype}` parent
+                WHERE parent.docstatus < 2 AND parent.project IN ({placeholders})
+                UNION
+                SELECT parent.name, parent.status, parent.modified, item.project AS link_key
+                FROM `tab{doctype}` parent
+                INNER JOIN `tab{child_doctype}` item ON item.parent = parent.name
+                WHERE parent.docstatus < 2 AND item.project IN ({placeholders})
+                """,
+                (*names, *names),
+                3,
+            ),
+            lambda row: [row["link_key"]],
+            3,
+        )
+    opportunities = {name: opportunity for name, opportunity in projects.items() if name and opportunity}
+    quotations = {}
+    if opportunities:
+        quotations = _group_linked_rows(
+            _newest_rows_per_link("Quotation", "opportunity", opportunities.values(), ["name", "status"], 3),
+            lambda row: [row.opportunity],
+            3,
+        )
+
+    related = {}
+    for name in names:
+        docs = [
+            _doc_link(doctype, row["name"], label, row["status"])
+            for doctype, label in (
+                ("Sales Order", _("Sales Order")),
+                ("Purchase Order", _("Purchase Order")),
+                ("Delivery Note", _("Delivery Note")),
+                ("Sales Invoice", _("Sales Invoice")),
+            )
+            for row in linked[doctype].get(name, [])
+        ]
+        docs.extend(
+            _doc_link("Quotation", row.name, _("Quotation"), row.status)
+            for row in quotations.get(opportunities.get(name), [])
+        )
+        related[name] = docs
+    return related
 
 
 @frappe.whitelist()
@@ -1257,60 +1583,21 @@ def get_sales_order_documents(sales_order: str) -> dict:
     return {"opportunity": opportunity, "groups": groups, "total": total}
 
 
-def _sales_order_cards(
-    search=None,
-    company=None,
-    owner=None,
-    status=None,
-    business_type=None,
-    segment=None,
-    delivery_progress=None,
-    billing_progress=None,
-    statuses=None,
-) -> list[dict]:
-    filters = {"docstatus": ["<", 2], "project": ["is", "not set"]}
-    if company and company != "All":
-        filters["company"] = company
-    if owner and owner != "All":
-        filters["owner"] = owner
-    fields = ["name", "customer", "company", "owner", "status", "grand_total", "per_delivered", "per_billed", "project"]
-    for fieldname in ["custom_orderlift_order_status", "custom_crm_business_type", "custom_crm_segment", "custom_partner_campaign_target"]:
-        if _has_field("Sales Order", fieldname):
-            fields.append(fieldname)
-    rows = frappe.get_list("Sales Order", filters=filters, fields=fields, order_by="modified desc", limit_page_length=200)
-    cards = [_sales_order_card(row, statuses or []) for row in rows]
-    if _owned_pipeline_visibility_enabled() and not (owner and owner != "All"):
-        cards = [card for card in cards if _card_visible_to_session_user(card)]
-    cards = _filter_cards_by_common_criteria(cards, status=status, business_type=business_type, segment=segment)
-    cards = [
-        card
-        for card in cards
-        if _progress_bucket(card.get("delivered_pct"), "delivered") == delivery_progress or not delivery_progress or delivery_progress == "All"
-    ]
-    cards = [
-        card
-        for card in cards
-        if _progress_bucket(card.get("billed_pct"), "billed") == billing_progress or not billing_progress or billing_progress == "All"
-    ]
-    if search:
-        needle = search.strip().lower()
-        cards = [
-            card
-            for card in cards
-            if needle in f"{card.get('name')} {card.get('title')} {card.get('subtitle')} {card.get('company')}".lower()
-        ]
-    return cards
-
-
-def _sales_order_card(row, statuses: list[dict]) -> dict:
-    docs = _sales_order_related_docs(row.get("name"), row.get("project"))
+def _sales_order_card(row, statuses: list[dict], related: dict | None = None) -> dict:
+    docs = (
+        related["docs"].get(row.get("name"), [])
+        if related
+        else _sales_order_related_docs(row.get("name"), row.get("project"))
+    )
     stage = resolve_status_column("Sales Order", row.get("custom_orderlift_order_status"), row.get("status"), statuses)
     delivered_pct = flt(row.get("per_delivered") or 0)
     billed_pct = flt(row.get("per_billed") or 0)
     crm_info = _sales_order_crm_info(row)
     business_type = crm_info.get("business_type") or _sales_order_business_type(row)
     crm_segment = crm_info.get("crm_segment") or ""
-    assignment = _assignment_for_card("Sales Order", row.get("name"), stage, statuses)
+    assignment = _assignment_for_card(
+        "Sales Order", row.get("name"), stage, statuses, todos=related["todos"] if related else None
+    )
     return {
         "name": row.get("name"),
         "title": _sales_order_title(row) or row.get("customer") or row.get("name"),
@@ -1361,76 +1648,159 @@ def _opportunity_display_title(opportunity: str | None) -> str:
 
 
 def _sales_order_related_docs(sales_order: str, project_name: str | None) -> list[dict]:
-    docs = []
-    if project_name:
-        project_status = frappe.db.get_value(
-            "Project",
-            project_name,
-            ["custom_project_status", "status"],
-            as_dict=True,
+    return _sales_order_related_docs_by_name({sales_order: project_name}).get(sales_order, [])
+
+
+def _sales_order_related_docs_by_name(sales_orders: dict[str, str | None]) -> dict[str, list[dict]]:
+    """Project and downstream documents per Sales Order, given each order's Project, in grouped queries."""
+    names = [name for name in sales_orders if name]
+    if not names:
+        return {}
+    placeholders = ", ".join(["%s"] * len(names))
+    project_statuses = _project_status_labels(sales_orders[name] for name in names if sales_orders[name])
+    linked = {}
+    for doctype, child_doctype, link_field in (
+        ("Material Request", "Material Request Item", "sales_order"),
+        ("Purchase Order", "Purchase Order Item", "sales_order"),
+        ("Delivery Note", "Delivery Note Item", "against_sales_order"),
+        ("Sales Invoice", "Sales Invoice Item", "sales_order"),
+    ):
+        linked[doctype] = _group_linked_rows(
+            _newest_linked_rows(
+                doctype,
+                f"""
+                SELECT DISTINCT parent.name, parent.status, parent.modified, item.{link_field} AS link_key
+                FROM `tab{doctype}` parent
+                INNER JOIN `tab{child_doctype}` item ON item.parent = parent.name
+                WHERE parent.docstatus < 2 AND item.{link_field} IN ({placeholders})
+                """,
+                tuple(names),
+                3,
+            ),
+            lambda row: [row["link_key"]],
+            3,
         )
-        if project_status:
-            docs.append(
-                _doc_link(
-                    "Project",
-                    project_name,
-                    _("Project"),
-                    project_status.get("custom_project_status") or project_status.get("status") or "-",
-                )
+
+    related = {}
+    for name in names:
+        docs = []
+        project_name = sales_orders[name]
+        if project_name in project_statuses:
+            docs.append(_doc_link("Project", project_name, _("Project"), project_statuses[project_name]))
+        docs.extend(
+            _doc_link(doctype, row["name"], label, row["status"])
+            for doctype, label in (
+                ("Material Request", _("Material Request")),
+                ("Purchase Order", _("Purchase Order")),
+                ("Delivery Note", _("Delivery Note")),
+                ("Sales Invoice", _("Sales Invoice")),
             )
-    for row in _linked_status_rows(
-        "Material Request",
-        """
-        SELECT DISTINCT mr.name, mr.status
-        FROM `tabMaterial Request` mr
-        INNER JOIN `tabMaterial Request Item` mri ON mri.parent = mr.name
-        WHERE mr.docstatus < 2 AND mri.sales_order = %s
-        ORDER BY mr.modified DESC
-        LIMIT 3
-        """,
-        (sales_order,),
-    ):
-        docs.append(_doc_link("Material Request", row["name"], _("Material Request"), row["status"]))
-    for row in _linked_status_rows(
-        "Purchase Order",
-        """
-        SELECT DISTINCT po.name, po.status
-        FROM `tabPurchase Order` po
-        INNER JOIN `tabPurchase Order Item` poi ON poi.parent = po.name
-        WHERE po.docstatus < 2 AND poi.sales_order = %s
-        ORDER BY po.modified DESC
-        LIMIT 3
-        """,
-        (sales_order,),
-    ):
-        docs.append(_doc_link("Purchase Order", row["name"], _("Purchase Order"), row["status"]))
-    for row in _linked_status_rows(
-        "Delivery Note",
-        """
-        SELECT DISTINCT dn.name, dn.status
-        FROM `tabDelivery Note` dn
-        INNER JOIN `tabDelivery Note Item` dni ON dni.parent = dn.name
-        WHERE dn.docstatus < 2 AND dni.against_sales_order = %s
-        ORDER BY dn.modified DESC
-        LIMIT 3
+            for row in linked[doctype].get(name, [])
+        )
+        related[name] = docs
+    return related
+
+
+def _board_related(document_type: str, rows: list) -> dict:
+    """Related documents and open pipeline ToDos for every card on a board.
+
+    The card builders otherwise query both per card; a 200-card board costs a
+    fixed number of grouped queries this way instead of several per card.
+    """
+    names = [row.get("name") for row in rows if row.get("name")]
+    if not names:
+        return {"docs": {}, "todos": {}}
+    if document_type == "Opportunity":
+        docs = _opportunity_related_docs_by_name(names)
+    elif document_type == "Project":
+        docs = _project_related_docs_by_name({row.get("name"): row.get("custom_source_opportunity") for row in rows})
+    else:
+        docs = _sales_order_related_docs_by_name({row.get("name"): row.get("project") for row in rows})
+    return {"docs": docs, "todos": _open_pipeline_todos(document_type, names)}
+
+
+def _group_linked_rows(rows, keys_for, limit: int) -> dict[str, list]:
+    """Group newest-first rows under each key they link to, keeping ``limit`` distinct documents per key."""
+    grouped = {}
+    for row in rows:
+        for key in keys_for(row):
+            if not key:
+                continue
+            bucket = grouped.setdefault(key, [])
+            if len(bucket) < limit and all(existing["name"] != row["name"] for existing in bucket):
+                bucket.append(row)
+    return grouped
+
+
+def _newest_rows_per_link(doctype: str, link_field: str, keys, fields: list[str], limit: int, submittable: bool = True) -> list:
+    """The ``limit`` newest ``doctype`` rows per ``link_field`` value, newest first.
+
+    A single card reads them with a plain limited ``get_all``; a board ranks
+    them per linked record so heavily linked records still return ``limit`` rows.
+    """
+    keys = sorted(set(keys))
+    if len(keys) == 1:
+        filters = {link_field: keys[0]}
+        if submittable:
+            filters["docstatus"] = ["<", 2]
+        return frappe.get_all(
+            doctype,
+            filters=filters,
+            fields=[*fields, link_field],
+            order_by="modified desc",
+            limit_page_length=limit,
+        )
+    conditions = [f"`{link_field}` IN ({', '.join(['%s'] * len(keys))})"]
+    if submittable:
+        conditions.append("docstatus < 2")
+    columns = ", ".join(f"`{fieldname}`" for fieldname in fields)
+    return frappe.db.sql(
+        f"""
+        SELECT ranked.*
+        FROM (
+            SELECT {columns}, `{link_field}`, modified,
+                ROW_NUMBER() OVER (PARTITION BY `{link_field}` ORDER BY modified DESC) AS link_rank
+            FROM `tab{doctype}`
+            WHERE {' AND '.join(conditions)}
+        ) ranked
+        WHERE ranked.link_rank <= %s
+        ORDER BY ranked.modified DESC
         """,
-        (sales_order,),
-    ):
-        docs.append(_doc_link("Delivery Note", row["name"], _("Delivery Note"), row["status"]))
-    for row in _linked_status_rows(
-        "Sales Invoice",
-        """
-        SELECT DISTINCT si.name, si.status
-        FROM `tabSales Invoice` si
-        INNER JOIN `tabSales Invoice Item` sii ON sii.parent = si.name
-        WHERE si.docstatus < 2 AND sii.sales_order = %s
-        ORDER BY si.modified DESC
-        LIMIT 3
+        (*keys, limit),
+        as_dict=True,
+    )
+
+
+def _newest_linked_rows(doctype: str, linked_query: str, params: tuple, limit: int) -> list[dict]:
+    """Run ``linked_query`` - distinct ``name``/``modified``/``link_key`` rows - keeping ``limit`` newest per key."""
+    return _linked_status_rows(
+        doctype,
+        f"""
+        SELECT ranked.*
+        FROM (
+            SELECT linked.*,
+                ROW_NUMBER() OVER (PARTITION BY linked.link_key ORDER BY linked.modified DESC) AS link_rank
+            FROM ({linked_query}) linked
+        ) ranked
+        WHERE ranked.link_rank <= %s
+        ORDER BY ranked.modified DESC
         """,
-        (sales_order,),
-    ):
-        docs.append(_doc_link("Sales Invoice", row["name"], _("Sales Invoice"), row["status"]))
-    return docs
+        (*params, limit),
+    )
+
+
+def _project_status_labels(projects) -> dict[str, str]:
+    names = sorted(set(projects))
+    if not names:
+        return {}
+    return {
+        row.name: row.get("custom_project_status") or row.get("status") or "-"
+        for row in frappe.get_all(
+            "Project",
+            filters={"name": ["in", names]},
+            fields=["name", "custom_project_status", "status"],
+        )
+    }
 
 
 def _sales_order_business_type(row) -> str:
@@ -1910,25 +2280,6 @@ def _filter_statuses_by_business_type(statuses: list[dict], business_type: str |
     return statuses
 
 
-def _filter_cards_by_common_criteria(cards: list[dict], status=None, business_type=None, segment=None) -> list[dict]:
-    if status and status != "All":
-        cards = [card for card in cards if card.get("stage") == status]
-    if business_type and business_type != "All":
-        cards = [card for card in cards if card.get("business_type") == business_type]
-    if segment and segment != "All":
-        cards = [card for card in cards if card.get("crm_segment") == segment]
-    return cards
-
-
-def _progress_bucket(value, kind: str) -> str:
-    percentage = flt(value or 0)
-    if percentage >= 100:
-        return "Delivered" if kind == "delivered" else "Billed"
-    if percentage > 0:
-        return "Partially delivered" if kind == "delivered" else "Partially billed"
-    return "Not delivered" if kind == "delivered" else "Not billed"
-
-
 def _doc_link(doctype: str, name: str, label: str, status: str | None) -> dict:
     return {"doctype": doctype, "name": name, "label": label, "status": status or "-"}
 
@@ -2089,12 +2440,19 @@ def _notify_pipeline_assignment(document_type: str, document_name: str, user: st
         frappe.log_error(frappe.get_traceback(), "Orderlift pipeline assignment notification failed")
 
 
-def _assignment_for_card(document_type: str, document_name: str | None, stage: str | None, statuses: list[dict]) -> dict:
+def _assignment_for_card(
+    document_type: str, document_name: str | None, stage: str | None, statuses: list[dict], todos: dict | None = None
+) -> dict:
     if not document_name:
         return _assignment_payload("")
-    todo = _find_open_pipeline_todo(document_type, document_name)
+    todo = todos.get(document_name) if todos is not None else _find_open_pipeline_todo(document_type, document_name)
     if todo and todo.get("allocated_to"):
-        return _assignment_payload(todo.get("allocated_to"), source="todo", todo_name=todo.get("name"))
+        return _assignment_payload(
+            todo.get("allocated_to"),
+            source="todo",
+            todo_name=todo.get("name"),
+            label=todo.get("allocated_to_label"),
+        )
     return _assignment_payload("")
 
 
@@ -2119,6 +2477,32 @@ def _find_open_pipeline_todo(document_type: str, document_name: str, user: str |
     return None
 
 
+def _open_pipeline_todos(document_type: str, document_names: list[str]) -> dict:
+    """Newest open pipeline ToDo per document, as ``_find_open_pipeline_todo`` returns it, with assignee labels."""
+    todos = {}
+    for row in frappe.get_all(
+        "ToDo",
+        filters={
+            "reference_type": document_type,
+            "reference_name": ["in", sorted(set(document_names))],
+            "status": "Open",
+        },
+        fields=["name", "allocated_to", "description", "reference_name"],
+        order_by="modified desc",
+    ):
+        if row.reference_name not in todos and PIPELINE_ASSIGNMENT_MARKER in (row.get("description") or ""):
+            todos[row.reference_name] = row
+    users = sorted({row.allocated_to for row in todos.values() if row.get("allocated_to")})
+    if users:
+        labels = {
+            user.name: user.get("full_name") or user.name
+            for user in frappe.get_all("User", filters={"name": ["in", users]}, fields=["name", "full_name"])
+        }
+        for row in todos.values():
+            row["allocated_to_label"] = labels.get(row.get("allocated_to"))
+    return todos
+
+
 def _close_other_pipeline_assignment_todos(document_type: str, document_name: str, keep_user: str) -> None:
     rows = frappe.get_all(
         "ToDo",
@@ -2153,13 +2537,15 @@ def _assignment_description(document_type: str, document_name: str, stage: str |
     return f"{PIPELINE_ASSIGNMENT_MARKER} Follow up {document_type} {document_name}."
 
 
-def _assignment_payload(user: str | None, source: str = "", todo_name: str | None = None) -> dict:
+def _assignment_payload(
+    user: str | None, source: str = "", todo_name: str | None = None, label: str | None = None
+) -> dict:
     user = (user or "").strip()
     if not user:
         return {"user": "", "label": "", "source": "", "todo": ""}
     return {
         "user": user,
-        "label": _user_label(user),
+        "label": label or _user_label(user),
         "source": source,
         "todo": todo_name or "",
     }
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import json
 import re
+import time
+from collections import defaultdict
 
 import frappe
 from frappe import _
@@ -35,6 +37,47 @@ TARGET_DOCTYPES = (
     "Work Order",
     "SAV Ticket",
 )
+TARGET_DOCTYPE_SET = frozenset(TARGET_DOCTYPES)
+# Per-site registry of target doctypes that actually carry the deal fields. The
+# "*" hooks run for every save of every doctype, so non-target doctypes are
+# rejected by set membership before any meta or database access.
+PARTICIPATING_DOCTYPES_TTL_SECONDS = 300
+_participating_doctypes: dict[str, tuple[float, frozenset[str]]] = {}
+# Upstream fields read by _upstream_references. Reference documents are loaded
+# with only these columns, one query per doctype and child table.
+UPSTREAM_HEADER_FIELDS = (
+    "opportunity",
+    "custom_source_opportunity",
+    "project",
+    "sales_order",
+    "purchase_order",
+    "material_request",
+    "custom_forecast_plan",
+    "reference_type",
+    "reference_name",
+    "delivery_note",
+    "sales_invoice",
+    "purchase_receipt",
+    "installation_project",
+    "quality_inspection",
+)
+UPSTREAM_TABLE_FIELDS = {
+    "items": (
+        "prevdoc_docname",
+        "sales_order",
+        "against_sales_order",
+        "project",
+        "material_request",
+        "request_for_quotation",
+        "purchase_order",
+        "purchase_receipt",
+        "delivery_note",
+        "source_doctype",
+        "source_name",
+    ),
+    "delivery_stops": ("delivery_note",),
+    "locations": ("sales_order", "material_request"),
+}
 LIST_VIEW_DOCTYPES = {
     "Opportunity",
     "Quotation",
@@ -152,7 +195,11 @@ def _deal_suffixed_name(doc, abbreviation: str) -> str:
 
 
 def propagate_opportunity_deal_abbreviation(doc, method=None) -> None:
-    if not doc or doc.doctype != "Opportunity" or not _has_field(doc, DEAL_ABBREVIATION_FIELD):
+    if not doc or getattr(doc, "doctype", None) not in TARGET_DOCTYPE_SET:
+        return
+    # The saved document may already sit in this request's reference cache.
+    _forget_reference(doc.doctype, doc.name)
+    if doc.doctype != "Opportunity" or not _is_supported_document(doc):
         return
     if not _field_changed(doc, DEAL_ABBREVIATION_FIELD):
         return
@@ -263,6 +310,7 @@ def update_renamed_deal_opportunity(doc, method=None, old: str | None = None, ne
                 _source_marker(opportunities),
                 update_modified=False,
             )
+            _forget_reference(doctype, row.name)
 
 
 def propagate_deal_abbreviation_from_opportunity(opportunity: str, abbreviation: str | None = None) -> None:
@@ -296,42 +344,78 @@ def propagate_deal_abbreviation_from_opportunity(opportunity: str, abbreviation:
                 },
                 update_modified=False,
             )
+            _forget_reference(doctype, row.name)
 
 
 def resolve_source_opportunities(doc) -> set[str]:
-    return _resolve_source_opportunities(doc, visited=set(), cache={})
+    return _resolve_source_opportunities(doc, visited=set(), cache=_request_cache())
 
 
-def _resolve_source_opportunities(doc, *, visited: set[tuple[str, str]], cache: dict[tuple[str, str], object]) -> set[str]:
+def _resolve_source_opportunities(doc, *, visited: set[tuple[str, str]], cache: dict) -> set[str]:
     if not doc:
         return set()
     doctype = (getattr(doc, "doctype", None) or _value(doc, "doctype") or "").strip()
     name = (getattr(doc, "name", None) or _value(doc, "name") or "").strip()
-    identity = (doctype, name or f"new:{id(doc)}")
-    if identity in visited:
-        return set()
-    visited.add(identity)
 
     if doctype == "Opportunity":
         return {name} if name and not name.startswith("new-") else set()
 
+    # Load every reachable upstream document level by level, batched per doctype,
+    # then check all referenced Opportunities in one query before walking the graph.
+    references = cache.setdefault("references", {})
+    root_references = _upstream_references(doc)
+    frontier = [reference for reference in root_references if reference[0] != "Opportunity"]
+    opportunity_names = {reference[1] for reference in root_references if reference[0] == "Opportunity"}
+    seen = set()
+    while frontier:
+        _load_references(frontier, cache)
+        next_frontier = []
+        for key in frontier:
+            if key in seen:
+                continue
+            seen.add(key)
+            source = references.get(key)
+            if not source:
+                continue
+            opportunity_names.update(_opportunities_from_marker(source.get(DEAL_SOURCE_FIELD)))
+            for reference in _upstream_references(source):
+                if reference[0] == "Opportunity":
+                    opportunity_names.add(reference[1])
+                elif reference not in seen:
+                    next_frontier.append(reference)
+        frontier = next_frontier
+    existing = _existing_opportunities(opportunity_names, cache)
+
+    opportunities = _walk_source_opportunities(doc, (doctype, name or f"new:{id(doc)}"), visited, references, existing)
+    if not opportunities and name and not _document_is_new(doc):
+        marker = frappe.db.get_value(doctype, name, DEAL_SOURCE_FIELD) or ""
+        candidates = _opportunities_from_marker(marker)
+        opportunities.update(candidates & _existing_opportunities(candidates, cache))
+    return opportunities
+
+
+def _walk_source_opportunities(doc, identity, visited, references: dict, existing: set[str]) -> set[str]:
+    if identity in visited:
+        return set()
+    visited.add(identity)
+
     opportunities = set()
     for reference_doctype, reference_name in _upstream_references(doc):
         if reference_doctype == "Opportunity":
-            if reference_name and frappe.db.exists("Opportunity", reference_name):
+            if reference_name in existing:
                 opportunities.add(reference_name)
             continue
-        source = _load_reference(reference_doctype, reference_name, cache)
+        source = references.get((reference_doctype, reference_name))
         if source:
-            opportunities.update(_resolve_source_opportunities(source, visited=visited, cache=cache))
+            opportunities.update(
+                _walk_source_opportunities(
+                    source, (reference_doctype, reference_name), visited, references, existing
+                )
+            )
 
-    if not opportunities and name and not _document_is_new(doc):
-        marker = frappe.db.get_value(doctype, name, DEAL_SOURCE_FIELD) or ""
-        opportunities.update(
-            opportunity
-            for opportunity in _opportunities_from_marker(marker)
-            if frappe.db.exists("Opportunity", opportunity)
-        )
+    # Loaded references carry their stored marker; the document being saved reads it separately.
+    if not opportunities and getattr(doc, "_deal_reference", False):
+        opportunities.update(_opportunities_from_marker(doc.get(DEAL_SOURCE_FIELD)) & existing)
     return opportunities
 
 
@@ -453,25 +537,119 @@ def _unique_references(references: list[tuple[str, str]]) -> list[tuple[str, str
     return list(dict.fromkeys(references))
 
 
-def _load_reference(doctype: str, name: str, cache: dict[tuple[str, str], object]):
-    key = (doctype, name)
-    if key in cache:
-        return cache[key]
-    if not name or not frappe.db.exists(doctype, name):
-        cache[key] = None
-        return None
-    cache[key] = frappe.get_doc(doctype, name)
-    return cache[key]
+def _load_references(references: list[tuple[str, str]], cache: dict) -> None:
+    """Load upstream documents into the request cache, one query per doctype and child table."""
+    loaded = cache.setdefault("references", {})
+    names_by_doctype = defaultdict(list)
+    for doctype, name in references:
+        if (doctype, name) not in loaded and name not in names_by_doctype[doctype]:
+            names_by_doctype[doctype].append(name)
+
+    for doctype, names in names_by_doctype.items():
+        schema = _reference_schema(doctype, cache)
+        documents = {}
+        if schema:
+            header_fields, tables = schema
+            for row in frappe.get_all(
+                doctype,
+                filters={"name": ["in", names]},
+                fields=["name", *header_fields],
+                limit_page_length=0,
+            ):
+                document = frappe._dict(row)
+                document.doctype = doctype
+                document._deal_reference = True
+                for table_field in tables:
+                    document[table_field] = []
+                documents[row.name] = document
+            for table_field, (child_doctype, child_fields) in tables.items():
+                if not documents:
+                    break
+                for row in frappe.get_all(
+                    child_doctype,
+                    filters={"parent": ["in", list(documents)], "parenttype": doctype, "parentfield": table_field},
+                    fields=["parent", *child_fields],
+                    order_by="idx asc",
+                    limit_page_length=0,
+                ):
+                    documents[row.parent][table_field].append(row)
+        for name in names:
+            loaded[(doctype, name)] = documents.get(name)
+
+
+def _reference_schema(doctype: str, cache: dict):
+    """Return the (header fields, {table field: (child doctype, fields)}) a reference load reads."""
+    schemas = cache.setdefault("schemas", {})
+    if doctype in schemas:
+        return schemas[doctype]
+    schema = None
+    if frappe.db.exists("DocType", doctype):
+        meta = frappe.get_meta(doctype)
+        header_fields = [
+            fieldname for fieldname in (*UPSTREAM_HEADER_FIELDS, DEAL_SOURCE_FIELD) if meta.get_field(fieldname)
+        ]
+        tables = {}
+        for table_field, fieldnames in UPSTREAM_TABLE_FIELDS.items():
+            field = meta.get_field(table_field)
+            if not field or field.fieldtype not in ("Table", "Table MultiSelect") or not field.options:
+                continue
+            child_meta = frappe.get_meta(field.options)
+            child_fields = [fieldname for fieldname in fieldnames if child_meta.get_field(fieldname)]
+            if child_fields:
+                tables[table_field] = (field.options, child_fields)
+        schema = (header_fields, tables)
+    schemas[doctype] = schema
+    return schema
+
+
+def _existing_opportunities(names, cache: dict) -> set[str]:
+    names = {name for name in names if name}
+    known = cache.setdefault("opportunities", {})
+    missing = sorted(name for name in names if name not in known)
+    if missing:
+        found = set(
+            frappe.get_all("Opportunity", filters={"name": ["in", missing]}, pluck="name", limit_page_length=0)
+        )
+        known.update({name: name in found for name in missing})
+    return {name for name in names if known.get(name)}
+
+
+def _request_cache() -> dict:
+    """Reference documents, Opportunity existence and schemas for the current request or job."""
+    local = getattr(frappe, "local", None)
+    if local is None:
+        return {}
+    cache = getattr(local, "orderlift_deal_reference_cache", None)
+    if cache is None:
+        cache = {}
+        try:
+            local.orderlift_deal_reference_cache = cache
+        except AttributeError:
+            pass
+    return cache
+
+
+def _forget_reference(doctype: str, name: str | None) -> None:
+    local = getattr(frappe, "local", None)
+    cache = getattr(local, "orderlift_deal_reference_cache", None) if local is not None else None
+    if cache and name:
+        cache.get("references", {}).pop((doctype, name), None)
+        if doctype == "Opportunity":
+            cache.get("opportunities", {}).pop(name, None)
 
 
 def _abbreviation_for_opportunities(opportunities: set[str]) -> str:
     if not opportunities:
         return ""
+    rows = frappe.get_all(
+        "Opportunity",
+        filters={"name": ["in", sorted(opportunities)]},
+        fields=["name", DEAL_ABBREVIATION_FIELD],
+        limit_page_length=0,
+    )
+    values = {row.name: row.get(DEAL_ABBREVIATION_FIELD) for row in rows}
     abbreviations = {
-        normalize_deal_abbreviation(
-            frappe.db.get_value("Opportunity", opportunity, DEAL_ABBREVIATION_FIELD) or ""
-        )
-        for opportunity in opportunities
+        normalize_deal_abbreviation(values.get(opportunity) or "") for opportunity in opportunities
     }
     if len(abbreviations) > 1:
         return MIXED_ABBREVIATION
@@ -545,6 +723,7 @@ def ensure_deal_abbreviation_fields() -> None:
     create_custom_fields(fields_by_doctype, update=True)
     for doctype in fields_by_doctype:
         frappe.clear_cache(doctype=doctype)
+    clear_participating_doctypes()
 
 
 def backfill_deal_abbreviations() -> dict:
@@ -579,12 +758,35 @@ def after_migrate() -> dict:
     return backfill_deal_abbreviations()
 
 
-def _is_supported_document(doc) -> bool:
-    return bool(doc and getattr(doc, "doctype", None) in TARGET_DOCTYPES and _has_field(doc, DEAL_ABBREVIATION_FIELD))
+def participating_doctypes() -> frozenset[str]:
+    """Target doctypes that carry the deal abbreviation field on the current site."""
+    site = getattr(getattr(frappe, "local", None), "site", None)
+    if not site:
+        return _build_participating_doctypes()
+    now = time.monotonic()
+    cached = _participating_doctypes.get(site)
+    if cached and cached[0] > now:
+        return cached[1]
+    doctypes = _build_participating_doctypes()
+    _participating_doctypes[site] = (now + PARTICIPATING_DOCTYPES_TTL_SECONDS, doctypes)
+    return doctypes
+
 
+def clear_participating_doctypes(doc=None, method=None) -> None:
+    """Drop the site registry; also the Custom Field hook for the deal fields."""
+    if doc is not None and doc.get("fieldname") not in (DEAL_ABBREVIATION_FIELD, DEAL_SOURCE_FIELD):
+        return
+    site = getattr(getattr(frappe, "local", None), "site", None)
+    _participating_doctypes.pop(site, None)
+
+
+def _build_participating_doctypes() -> frozenset[str]:
+    return frozenset(doctype for doctype in TARGET_DOCTYPES if _doctype_has_fields(doctype, DEAL_ABBREVIATION_FIELD))
 
-def _has_field(doc, fieldname: str) -> bool:
-    return bool(getattr(doc, "meta", None) and doc.meta.get_field(fieldname))
+
+def _is_supported_document(doc) -> bool:
+    doctype = getattr(doc, "doctype", None) if doc else None
+    return doctype in TARGET_DOCTYPE_SET and doctype in participating_doctypes()
 
 
 def _doctype_has_fields(doctype: str, *fieldnames: str) -> bool:
@@ -55,20 +55,24 @@
         }, 0);
     }
 
+    function boardArgs() {
+        return {
+            search: STATE.search,
+            company: STATE.company,
+            owner: STATE.owner,
+            status: STATE.status,
+            business_type: STATE.business_type,
+            segment: STATE.segment,
+            delivery_progress: STATE.delivery_progress,
+            billing_progress: STATE.billing_progress,
+        };
+    }
+
     async function load(page, restore = {}) {
         try {
             const res = await frappe.call({
                 method: "orderlift.orderlift_crm.api.pipeline.get_sales_order_pipeline_data",
-                args: {
-                    search: STATE.search,
-                    company: STATE.company,
-                    owner: STATE.owner,
-                    status: STATE.status,
-                    business_type: STATE.business_type,
-                    segment: STATE.segment,
-                    delivery_progress: STATE.delivery_progress,
-                    billing_progress: STATE.billing_progress,
-                },
+                args: boardArgs(),
             });
             const data = res.message || {};
             STATE.columns = data.columns || [];
@@ -186,6 +190,11 @@
                 setTimeout(() => $(target).removeClass("is-focused"), 1200);
             }
         });
+        page.main.find("[data-load-more]").on("click", function (event) {
+            event.preventDefault();
+            event.stopPropagation();
+            loadMoreCards(page, String($(this).attr("data-load-more") || ""), $(this));
+        });
         page.main.find("[data-toggle-column]").on("click", function (event) {
             event.preventDefault();
             event.stopPropagation();
@@ -427,18 +436,50 @@
             <article class="olp-column stage-${color(column.color)} ${isCollapsed ? "is-collapsed" : ""}" data-column="${escapedName}">
                 <div class="olp-column-head" title="${escapedLabel}">
                     <h2>${escapedLabel}</h2>
-                    <span>${(column.cards || []).length}</span>
+                    <span>${columnCount(column)}</span>
                     <button type="button" class="olp-column-toggle" data-toggle-column="${escapedName}" aria-label="${frappe.utils.escape_html(isCollapsed ? __("Expand column") : __("Collapse column"))}">${isCollapsed ? "+" : "-"}</button>
                 </div>
                 <div class="olp-card-stack">
                     ${(column.cards || []).length ? column.cards.map(cardMarkup).join("") : `<div class="olp-empty-column">${column.name === "__unassigned__" ? __("Statuses not set yet") : __("Drop cards here")}</div>`}
+                    ${loadMoreMarkup(column)}
                 </div>
             </article>
         `;
     }
 
+    function columnCount(column) {
+        return column.count === undefined ? (column.cards || []).length : column.count;
+    }
+
+    function loadMoreMarkup(column) {
+        if (!column.next_cursor) return "";
+        const remaining = Math.max(columnCount(column) - (column.cards || []).length, 0);
+        return `<button type="button" class="olp-load-more" data-load-more="${frappe.utils.escape_html(column.name)}">${__("Load more ({0})", [remaining])}</button>`;
+    }
+
+    async function loadMoreCards(page, columnName, button) {
+        const column = findColumn(columnName);
+        if (!column || !column.next_cursor) return;
+        const stackScrollTop = button.closest(".olp-card-stack").scrollTop();
+        button.prop("disabled", true);
+        try {
+            const res = await frappe.call({
+                method: "orderlift.orderlift_crm.api.pipeline.get_pipeline_column_page",
+                args: { document_type: "Sales Order", stage: column.name, cursor: column.next_cursor, filters: boardArgs() },
+            });
+            const data = res.message || {};
+            column.cards = [...(column.cards || []), ...(data.cards || [])];
+            column.next_cursor = data.next_cursor || null;
+            render(page, false, { boardScrollLeft: getBoardScrollLeft(page) });
+            page.main.find(`.olp-column[data-column="${cssEscape(columnName)}"] .olp-card-stack`).scrollTop(stackScrollTop);
+        } catch (error) {
+            console.error("Sales Order Pipeline column page failed", error);
+            button.prop("disabled", false);
+        }
+    }
+
     function stageSummaryMarkup(column) {
-        const count = (column.cards || []).length;
+        const count = columnCount(column);
         return `
             <button type="button" class="olp-stage-summary stage-${color(column.color)} ${count ? "has-cards" : "is-empty"} ${STATE.focusedColumn === column.name ? "is-focused" : ""}" data-stage-jump="${frappe.utils.escape_html(column.name)}" title="${frappe.utils.escape_html(__("Jump to {0}", [column.label]))}">
                 <strong>${frappe.utils.escape_html(column.label)}</strong>
@@ -1086,6 +1127,9 @@
             .olp-column.is-collapsed .olp-column-head { min-height: 230px; margin-bottom: 0; padding: 8px 0; flex-direction: column; justify-content: flex-start; gap: 8px; background: #fff; border: 1px solid #e2e8f0; border-radius: 16px; box-shadow: 0 1px 2px rgba(15,23,42,.04); }
             .olp-column.is-collapsed .olp-column-head h2 { flex: 0 1 auto; writing-mode: vertical-rl; transform: rotate(180deg); max-height: 132px; max-width: 24px; color: #64748b; text-align: center; text-overflow: ellipsis; }
             .olp-column.is-collapsed .olp-card-stack { display: none; }
+            .olp-load-more { justify-self: stretch; border: 1px dashed #cbd5e1; border-radius: 12px; background: #f8fafc; color: #475569; font-size: 12px; font-weight: 600; padding: 8px 10px; cursor: pointer; }
+            .olp-load-more:hover { border-color: #00b0c8; color: #0f766e; }
+            .olp-load-more:disabled { opacity: .6; cursor: progress; }
             .olp-card-stack { display: grid; align-content: start; align-items: start; gap: 10px; min-height: 520px; max-height: calc(100vh - 265px); overflow-y: auto; border-radius: 16px; padding: 2px 2px 6px; transition: background .2s cubic-bezier(.16, 1, .3, 1), box-shadow .2s cubic-bezier(.16, 1, .3, 1); scrollbar-width: thin; scrollbar-color: #cbd5e1 transparent; }
             .olp-card { align-self: start; position: relative; overflow: hidden; border-radius: 18px; padding: 0; background: #fff; border: 1.5px solid #cbd5e1; box-shadow: 0 2px 5px rgba(15,23,42,.08), 0 18px 42px -24px rgba(15,23,42,.35); cursor: grab; transition: transform .22s cubic-bezier(.16, 1, .3, 1), box-shadow .22s cubic-bezier(.16, 1, .3, 1), border-color .18s ease, opacity .18s ease; }
             .olp-card::before { content: ""; position: absolute; left: 0; top: 0; bottom: 0; width: 4px; background: #0891b2; opacity: .72; z-index: 1; }
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
 import json
+import time
+from bisect import bisect_right
 from collections import defaultdict
 from datetime import date, datetime, timedelta
+from functools import lru_cache
+from itertools import chain
 
 import frappe
 from frappe import _
 from frappe.utils import flt
 
+from orderlift.orderlift_finance import cash_flow_snapshot
 from orderlift.menu_access import (
     get_allowed_companies,
     get_session_company_context,
@@ -18,9 +23,13 @@ from orderlift.menu_access import (
 
 FINANCE_ROLES = {"Orderlift Admin", "Finance User", "Finance Admin", "System Manager"}
 FORECAST_CONTROL_ROLES = {"Orderlift Admin", "Finance Admin", "System Manager"}
-MAX_CONTEXT_ROWS = 500
-MAX_FINANCIAL_ROWS = 5000
+# Source documents are read in keyset pages of this size; child rows are
+# requested for at most one page of parents at a time.
+SOURCE_PAGE_SIZE = 500
 MAX_DETAIL_EVENTS = 2000
+# Attribution warnings about documents outside every context; a filtered
+# load never reads those documents, so filtered views leave them out.
+UNASSIGNED_QUALITY_CODES = {"unassigned_invoice", "unassigned_purchase_order"}
 FRAPPE_SYSTEM_FIELDS = {
     "name",
     "owner",
@@ -70,35 +79,19 @@ PROFIT_AMOUNT_FIELDS = (
 
 @frappe.whitelist()
 def get_portfolio_data(filters: str | dict | None = None) -> dict:
-    _user, company = _authorize()
+    user, company = _authorize()
     active_filters = _clean_filters(filters, company)
-    data = _load_data(company, active_filters)
-    model = build_cash_flow_model(data, company=company)
-    portfolio_bounds = _horizon_bounds(
-        active_filters.get("horizon") or "13_weeks",
-        active_filters.get("from_date"),
-        active_filters.get("to_date"),
-        model["events"],
-    )
-    rows = [
-        _context_for_horizon(row, model["events"], portfolio_bounds, model.get("accruals", []))
-        for row in model["contexts"].values()
-    ]
-    rows = [row for row in rows if _matches_output_filters(row, active_filters)]
-    visible_contexts = {(row["context_type"], row["context_name"]) for row in rows}
-    events = [event for event in model["events"] if _event_context_key(event) in visible_contexts]
-    portfolio_start = _as_date(portfolio_bounds["from_date"])
-    portfolio_end = _as_date(portfolio_bounds["to_date"])
-    monthly_events = [
-        event
-        for event in events
-        if portfolio_start <= _as_date(event.get("date"), portfolio_start) <= portfolio_end
-    ]
+    view = _portfolio_view(company, user, active_filters)
+    rows = view["rows"]
+    events = view["events"]
+    portfolio_bounds = view["bounds"]
+    model = view["model"]
+    summary = _summarize(rows, model["data_quality"], events=events, bounds=portfolio_bounds)
 
     return {
         "active_company": company,
         "company": company,
-        "company_currency": data["company_currency"],
+        "company_currency": view["company_currency"],
         "active_filters": active_filters,
         "modes": ["projects", "standalone_sales_orders"],
         "counts": {
@@ -107,8 +100,8 @@ def get_portfolio_data(filters: str | dict | None = None) -> dict:
             "customers": len({row["customer"] for row in rows if row["customer"]}),
             "contexts": len(rows),
         },
-        "summary": _summarize(rows, model["data_quality"], events=events, bounds=portfolio_bounds),
-        "kpis": _summarize(rows, model["data_quality"], events=events, bounds=portfolio_bounds),
+        "summary": summary,
+        "kpis": dict(summary),
         "project_rows": [row for row in rows if row["context_type"] == "Project"],
         "standalone_order_rows": [row for row in rows if row["context_type"] == "Sales Order"],
         "profitability_rows": rows,
@@ -116,7 +109,7 @@ def get_portfolio_data(filters: str | dict | None = None) -> dict:
         "customer_rows": _group_rows(
             rows, "customer", "Customer", events=events, bounds=portfolio_bounds
         ),
-        "monthly_rows": _monthly_performance(monthly_events, data["company_currency"]),
+        "monthly_rows": _monthly_performance(_monthly_events(events, portfolio_bounds), view["company_currency"]),
         "data_quality_rows": model["data_quality"],
         "data_quality": model["data_quality"],
         "detail_completeness": _detail_completeness(model["data_quality"]),
@@ -133,23 +126,32 @@ def get_cash_flow_detail(
     from_date: str | None = None,
     to_date: str | None = None,
 ) -> dict:
-    _user, company = _authorize()
+    user, company = _authorize()
     context_type = _normalize_context_type(context_type)
     context_name = (context_name or "").strip()
     if not context_name:
         frappe.throw(_("A project or standalone Sales Order is required."))
 
     filters = {"context_type": context_type, "context_name": context_name}
-    data = _load_data(company, filters)
-    model = build_cash_flow_model(data, company=company)
     key = (context_type, context_name)
+    snapshot = _company_snapshot(company, user)
+    if key in snapshot["contexts"]:
+        data = snapshot
+        model = _snapshot_model(snapshot, filters)
+    else:
+        # Contexts outside the snapshot (for example created after it was built)
+        # are modeled directly so the detail never lags behind the document.
+        data = _load_data(company, filters)
+        model = build_cash_flow_model(data, company=company)
     identity = model["contexts"].get(key)
     if not identity:
         frappe.throw(_("The requested cash-flow context is unavailable."), frappe.PermissionError)
 
-    events = [event for event in model["events"] if _event_context_key(event) == key]
-    bounds = _horizon_bounds(horizon, from_date, to_date, events)
-    identity = _context_for_horizon(identity, events, bounds, model.get("accruals", []))
+    events = _EventTable([event for event in model["events"] if _event_context_key(event) == key])
+    bounds = _horizon_bounds(horizon, from_date, to_date, events.events)
+    identity = _context_for_horizon(
+        identity, events, bounds, _accruals_by_context(model.get("accruals", []))
+    )
     detail_events = sorted(_events_for_horizon_detail(events, bounds), key=_event_sort_key)
     bounded_events = detail_events[:MAX_DETAIL_EVENTS]
     buckets = _bucket_events(events, bounds, detail_events=bounded_events)
@@ -222,17 +224,24 @@ def get_cash_flow_detail(
 
 @frappe.whitelist()
 def get_customer_performance(filters: str | dict | None = None) -> list[dict]:
-    return get_portfolio_data(filters).get("customer_rows", [])
+    user, company = _authorize()
+    view = _portfolio_view(company, user, _clean_filters(filters, company))
+    return _group_rows(view["rows"], "customer", "Customer", events=view["events"], bounds=view["bounds"])
 
 
 @frappe.whitelist()
 def get_monthly_performance(filters: str | dict | None = None) -> list[dict]:
-    return get_portfolio_data(filters).get("monthly_rows", [])
+    user, company = _authorize()
+    view = _portfolio_view(company, user, _clean_filters(filters, company))
+    return _monthly_performance(_monthly_events(view["events"], view["bounds"]), view["company_currency"])
 
 
 @frappe.whitelist()
 def get_data_quality(filters: str | dict | None = None) -> list[dict]:
-    return get_portfolio_data(filters).get("data_quality_rows", [])
+    user, company = _authorize()
+    active_filters = _clean_filters(filters, company)
+    snapshot = _company_snapshot(company, user)
+    return _snapshot_model(snapshot, active_filters)["data_quality"]
 
 
 @frappe.whitelist(methods=["POST"])
@@ -271,6 +280,7 @@ def set_forecast_finality(
         frappe.throw(_("Forecast finality must be true or false."))
     final_value = 1 if normalized_final in {"1", "true", "yes"} else 0
     doc.db_set(fieldname, final_value, notify=True)
+    cash_flow_snapshot.record_changes(company, [(context_type, context_name)])
     state = _("Final") if final_value else _("Open")
     doc.add_comment("Info", _("{0} forecast marked {1} from Project & Order Finance.").format(forecast.title(), state))
     return get_cash_flow_detail(context_type, context_name)
@@ -354,36 +364,12 @@ def chronological_funding_position(events: list[dict], bounds: dict) -> dict:
     commitments already overdue at the start are applied first, then all events
     through the horizon end in deterministic chronological order.
     """
-    start = _as_date(bounds["from_date"])
-    end = _as_date(bounds["to_date"])
-    opening = sum(
-        flt(event["signed_amount"])
-        for event in events
-        if event["layer"] == "actual" and _as_date(event.get("date"), start) <= start
+    table = _event_table(events)
+    return table.funding_position(
+        range(len(table.events)),
+        _as_date(bounds["from_date"]).toordinal(),
+        _as_date(bounds["to_date"]).toordinal(),
     )
-    path_events = [
-        event
-        for event in events
-        if (
-            event["layer"] != "actual"
-            and _as_date(event.get("date"), start) <= end
-        )
-        or (
-            event["layer"] == "actual"
-            and start < _as_date(event.get("date"), start) <= end
-        )
-    ]
-    position = opening
-    minimum = opening
-    for event in sorted(path_events, key=_funding_event_sort_key):
-        position += flt(event["signed_amount"])
-        minimum = min(minimum, position)
-    return {
-        "opening_position": opening,
-        "forecast_net": position,
-        "minimum_position": minimum,
-        "funding_gap": max(-minimum, 0.0),
-    }
 
 
 def replace_scheduled_amounts(
@@ -819,18 +805,193 @@ def _normalize_context_type(value: str) -> str:
     frappe.throw(_("Context Type must be Project or Sales Order."))
 
 
+def _portfolio_view(company: str, user: str, filters: dict) -> dict:
+    """Apply output filters and horizon bucketing to the company snapshot."""
+    snapshot = _company_snapshot(company, user)
+    model = _snapshot_model(snapshot, filters)
+    bounds = _horizon_bounds(
+        filters.get("horizon") or "13_weeks",
+        filters.get("from_date"),
+        filters.get("to_date"),
+        model["events"],
+    )
+    table = _EventTable(model["events"])
+    accruals = _accruals_by_context(model.get("accruals", []))
+    rows = [_context_for_horizon(row, table, bounds, accruals) for row in model["contexts"].values()]
+    rows = [row for row in rows if _matches_output_filters(row, filters)]
+    return {
+        "model": model,
+        "rows": rows,
+        "events": table.subset((row["context_type"], row["context_name"]) for row in rows),
+        "bounds": bounds,
+        "company_currency": snapshot["company_currency"],
+    }
+
+
+def _monthly_events(events: _EventTable, bounds: dict) -> list[dict]:
+    start = _as_date(bounds["from_date"]).toordinal()
+    end = _as_date(bounds["to_date"]).toordinal()
+    return [
+        event
+        for event, ordinal in zip(events.events, events.ordinals)
+        if start <= (start if ordinal is None else ordinal) <= end
+    ]
+
+
+def _company_snapshot(company: str, user: str) -> dict:
+    """Return the user's unfiltered company model, rebuilding only changed contexts."""
+    as_of = time.time()
+    snapshot = cash_flow_snapshot.get_snapshot(company, user)
+    changed = set()
+    if snapshot:
+        full, changed = cash_flow_snapshot.pending_changes(company, since=snapshot["as_of"])
+        if full:
+            snapshot = None
+    if not snapshot:
+        data = _load_data(company, {})
+        snapshot = _new_snapshot(data, build_cash_flow_model(data, company=company), as_of)
+    elif changed:
+        _refresh_snapshot_contexts(snapshot, company, changed)
+        snapshot["as_of"] = as_of
+    else:
+        return snapshot
+    cash_flow_snapshot.store_snapshot(company, user, snapshot)
+    return snapshot
+
+
+def _new_snapshot(data: dict, model: dict, as_of: float) -> dict:
+    return {
+        "as_of": as_of,
+        "built_at": as_of,
+        "company_currency": data.get("company_currency") or "",
+        "projects": list(data.get("projects", [])),
+        "sales_orders": list(data.get("sales_orders", [])),
+        "contexts": model["contexts"],
+        "events": model["events"],
+        "accruals": model["accruals"],
+        "data_quality": model["data_quality"],
+        "currencies": model["currencies"],
+    }
+
+
+def _refresh_snapshot_contexts(snapshot: dict, company: str, keys) -> None:
+    """Rebuild the changed contexts from one load and replace their rows, events, accruals and quality."""
+    keys = set(keys)
+    data = _load_data(company, {"context_keys": sorted(keys)})
+    model = build_cash_flow_model(data, company=company)
+    names = {name for _context_type, name in keys}
+    project_names = {name for context_type, name in keys if context_type == "Project"}
+    order_names = {name for context_type, name in keys if context_type == "Sales Order"}
+
+    def owned(row) -> bool:
+        return (row.get("context_type"), row.get("context_name")) in keys
+
+    def owned_order(row) -> bool:
+        # A project-linked order belongs to its Project refresh; only the
+        # standalone row is owned by the Sales Order context.
+        project = _value(row, "project")
+        return project in project_names if project else _value(row, "name") in order_names
+
+    for key in keys:
+        snapshot["contexts"].pop(key, None)
+    snapshot["contexts"].update((key, context) for key, context in model["contexts"].items() if key in keys)
+    for field in ("events", "accruals"):
+        snapshot[field] = [row for row in snapshot[field] if not owned(row)] + [
+            row for row in model[field] if owned(row)
+        ]
+    snapshot["data_quality"] = [
+        row for row in snapshot["data_quality"] if row.get("context_name") not in names
+    ] + [row for row in model["data_quality"] if row.get("context_name") in names]
+    snapshot["projects"] = [
+        row for row in snapshot["projects"] if _value(row, "name") not in project_names
+    ] + [row for row in data.get("projects", []) if _value(row, "name") in project_names]
+    snapshot["sales_orders"] = [row for row in snapshot["sales_orders"] if not owned_order(row)] + [
+        row for row in data.get("sales_orders", []) if owned_order(row)
+    ]
+    snapshot["currencies"] = _model_currencies(
+        snapshot["contexts"].values(), snapshot["events"], snapshot["company_currency"]
+    )
+
+
+def _snapshot_model(snapshot: dict, filters: dict) -> dict:
+    """Narrow the snapshot to the contexts the load-time filters would have read."""
+    projects, sales_orders = _filter_context_rows(snapshot["projects"], snapshot["sales_orders"], filters)
+    allowed = {("Project", _value(row, "name")) for row in projects}
+    allowed.update(("Sales Order", _value(row, "name")) for row in sales_orders if not _value(row, "project"))
+    if filters.get("context_name"):
+        allowed = {
+            key
+            for key in allowed
+            if key[1] == filters["context_name"]
+            and (not filters.get("context_type") or key[0] == filters["context_type"])
+        }
+    contexts = {key: context for key, context in snapshot["contexts"].items() if key in allowed}
+    events = [event for event in snapshot["events"] if _event_context_key(event) in allowed]
+    accruals = [
+        row for row in snapshot["accruals"] if (row.get("context_type"), row.get("context_name")) in allowed
+    ]
+    quality = snapshot["data_quality"]
+    if _is_filtered(filters):
+        names = {name for _context_type, name in allowed}
+        quality = [
+            row
+            for row in quality
+            if (row.get("context_name") in names)
+            or (not row.get("context_name") and row.get("code") not in UNASSIGNED_QUALITY_CODES)
+        ]
+    return {
+        "contexts": contexts,
+        "events": events,
+        "accruals": accruals,
+        "data_quality": list(quality),
+        "currencies": _model_currencies(contexts.values(), events, snapshot["company_currency"]),
+    }
+
+
+def _is_filtered(filters: dict) -> bool:
+    return any(
+        filters.get(key)
+        for key in (
+            "context_name", "context_keys", "customer", "workflow_status", "project_type", "currency", "search"
+        )
+    )
+
+
+def _model_currencies(contexts, events: list[dict], company_currency: str) -> list[str]:
+    return sorted(
+        {
+            company_currency,
+            *[currency for context in contexts for currency in context.get("source_currencies") or []],
+            *[event.get("source_currency") for event in events],
+        }
+        - {"", None}
+    )
+
+
 def _load_data(company: str, filters: dict) -> dict:
     quality = []
     project_filters = {"company": company}
-    order_filters = {"company": company, "docstatus": 1}
+    order_filters = [{"company": company, "docstatus": 1}]
     context_type = filters.get("context_type")
     context_name = filters.get("context_name")
-    if context_name and context_type == "Project":
+    context_keys = filters.get("context_keys")
+    if context_keys:
+        # Several changed contexts are read in one pass: their projects, the
+        # orders linked to those projects and the named standalone orders.
+        project_names = sorted({name for key_type, name in context_keys if key_type == "Project"})
+        standalone_names = sorted({name for key_type, name in context_keys if key_type == "Sales Order"})
+        project_filters["name"] = ["in", project_names or ["__standalone_only__"]]
+        order_filters = [
+            {"company": company, "docstatus": 1, field: ["in", names]}
+            for field, names in (("project", project_names), ("name", standalone_names))
+            if names
+        ]
+    elif context_name and context_type == "Project":
         project_filters["name"] = context_name
-        order_filters["project"] = context_name
+        order_filters[0]["project"] = context_name
     elif context_name and context_type == "Sales Order":
         project_filters["name"] = "__standalone_only__"
-        order_filters["name"] = context_name
+        order_filters[0]["name"] = context_name
 
     projects = _get_list(
         "Project",
@@ -841,23 +1002,25 @@ def _load_data(company: str, filters: dict) -> dict:
             "custom_revenue_forecast_final", "custom_cost_forecast_final",
             "expected_start_date", "expected_end_date", "modified",
         ],
-        limit=MAX_CONTEXT_ROWS,
-        quality=quality,
-    )
-    sales_orders = _get_list(
-        "Sales Order",
-        filters=order_filters,
-        fields=[
-            "name", "title", "customer", "company", "project", "status",
-            "custom_orderlift_order_status", "currency", "conversion_rate", "grand_total",
-            "base_grand_total", "net_total", "base_net_total", "total_taxes_and_charges",
-            "base_total_taxes_and_charges", "custom_crm_business_type", "custom_crm_segment",
-            "custom_revenue_forecast_final", "custom_cost_forecast_final",
-            "transaction_date", "delivery_date", "modified",
-        ],
-        limit=MAX_CONTEXT_ROWS,
         quality=quality,
     )
+    sales_orders = {}
+    for order_filter in order_filters:
+        for row in _get_list(
+            "Sales Order",
+            filters=order_filter,
+            fields=[
+                "name", "title", "customer", "company", "project", "status",
+                "custom_orderlift_order_status", "currency", "conversion_rate", "grand_total",
+                "base_grand_total", "net_total", "base_net_total", "total_taxes_and_charges",
+                "base_total_taxes_and_charges", "custom_crm_business_type", "custom_crm_segment",
+                "custom_revenue_forecast_final", "custom_cost_forecast_final",
+                "transaction_date", "delivery_date", "modified",
+            ],
+            quality=quality,
+        ):
+            sales_orders.setdefault(_value(row, "name"), row)
+    sales_orders = list(sales_orders.values())
     projects, sales_orders = _filter_context_rows(projects, sales_orders, filters)
     project_names = {_value(row, "name") for row in projects}
     order_names = {
@@ -870,10 +1033,7 @@ def _load_data(company: str, filters: dict) -> dict:
     data = {
         "company_currency": frappe.get_cached_value("Company", company, "default_currency") or "",
         "data_quality": quality,
-        "include_unassigned": not any(
-            filters.get(key)
-            for key in ("context_name", "customer", "workflow_status", "project_type", "currency", "search")
-        ),
+        "include_unassigned": not _is_filtered(filters),
         "projects": projects,
         "sales_orders": sales_orders,
         "sales_order_items": _children(
@@ -900,7 +1060,9 @@ def _load_data(company: str, filters: dict) -> dict:
 
 def _load_sales_invoices(data: dict, company: str, order_names: set[str], project_names: set[str]) -> None:
     quality = data["data_quality"]
-    invoices = _get_list(
+    data["sales_invoices"] = []
+    data["sales_invoice_items"] = []
+    for invoices in _pages(
         "Sales Invoice",
         filters={"company": company, "docstatus": 1},
         fields=[
@@ -911,37 +1073,38 @@ def _load_sales_invoices(data: dict, company: str, order_names: set[str], projec
             "return_against", "custom_advance_sales_order", "custom_advance_payment_entry",
             "modified",
         ],
-        limit=MAX_FINANCIAL_ROWS,
         quality=quality,
-    )
-    names = {_value(row, "name") for row in invoices}
-    items = _children(
-        "Sales Invoice Item",
-        names,
-        ["parent", "name", "sales_order", "project", "amount", "base_amount", "net_amount", "base_net_amount"],
-        parent_doctype="Sales Invoice",
-        quality=quality,
-    )
-    relevant = {
-        _value(row, "parent")
-        for row in items
-        if _value(row, "sales_order") in order_names or _value(row, "project") in project_names
-    }
-    relevant.update(
-        _value(row, "name")
-        for row in invoices
-        if _value(row, "project") in project_names or _value(row, "custom_advance_sales_order") in order_names
-    )
-    if data.get("include_unassigned"):
-        relevant.update(names)
-    data["sales_invoices"] = [row for row in invoices if _value(row, "name") in relevant]
-    data["sales_invoice_items"] = [row for row in items if _value(row, "parent") in relevant]
+    ):
+        names = {_value(row, "name") for row in invoices}
+        items = _children(
+            "Sales Invoice Item",
+            names,
+            ["parent", "name", "sales_order", "project", "amount", "base_amount", "net_amount", "base_net_amount"],
+            parent_doctype="Sales Invoice",
+            quality=quality,
+        )
+        relevant = {
+            _value(row, "parent")
+            for row in items
+            if _value(row, "sales_order") in order_names or _value(row, "project") in project_names
+        }
+        relevant.update(
+            _value(row, "name")
+            for row in invoices
+            if _value(row, "project") in project_names or _value(row, "custom_advance_sales_order") in order_names
+        )
+        if data.get("include_unassigned"):
+            relevant.update(names)
+        data["sales_invoices"].extend(row for row in invoices if _value(row, "name") in relevant)
+        data["sales_invoice_items"].extend(row for row in items if _value(row, "parent") in relevant)
 
 
 def _load_purchase_documents(data: dict, company: str, project_names: set[str]) -> None:
     quality = data["data_quality"]
     order_names = {_value(row, "name") for row in data.get("sales_orders", [])}
-    purchase_orders = _get_list(
+    for key in ("purchase_orders", "purchase_order_items", "purchase_order_schedules"):
+        data[key] = []
+    for purchase_orders in _pages(
         "Purchase Order",
         filters={"company": company, "docstatus": 1},
         fields=[
@@ -950,38 +1113,42 @@ def _load_purchase_documents(data: dict, company: str, project_names: set[str])
             "total_taxes_and_charges", "base_total_taxes_and_charges", "transaction_date", "schedule_date",
             "modified",
         ],
-        limit=MAX_FINANCIAL_ROWS,
         quality=quality,
-    )
-    po_names = {_value(row, "name") for row in purchase_orders}
-    po_items = _children(
-        "Purchase Order Item",
-        po_names,
-        ["parent", "name", "project", "sales_order", "amount", "base_amount", "modified"],
-        parent_doctype="Purchase Order",
-        quality=quality,
-    )
-    relevant_po = {
-        _value(row, "parent")
-        for row in po_items
-        if _value(row, "project") in project_names or _value(row, "sales_order") in order_names
-    }
-    relevant_po.update(
-        _value(row, "name") for row in purchase_orders if _value(row, "project") in project_names
-    )
-    data["purchase_orders"] = [row for row in purchase_orders if _value(row, "name") in relevant_po]
-    data["purchase_order_items"] = [row for row in po_items if _value(row, "parent") in relevant_po]
+    ):
+        po_names = {_value(row, "name") for row in purchase_orders}
+        po_items = _children(
+            "Purchase Order Item",
+            po_names,
+            ["parent", "name", "project", "sales_order", "amount", "base_amount", "modified"],
+            parent_doctype="Purchase Order",
+            quality=quality,
+        )
+        relevant_po = {
+            _value(row, "parent")
+            for row in po_items
+            if _value(row, "project") in project_names or _value(row, "sales_order") in order_names
+        }
+        relevant_po.update(
+            _value(row, "name") for row in purchase_orders if _value(row, "project") in project_names
+        )
+        data["purchase_orders"].extend(row for row in purchase_orders if _value(row, "name") in relevant_po)
+        data["purchase_order_items"].extend(row for row in po_items if _value(row, "parent") in relevant_po)
+        data["purchase_order_schedules"].extend(
+            _children(
+                "Payment Schedule",
+                relevant_po,
+                ["parent", "name", "due_date", "payment_amount", "outstanding", "idx"],
+                parent_doctype="Purchase Order",
+                parenttype="Purchase Order",
+                quality=quality,
+            )
+        )
+    relevant_po = {_value(row, "name") for row in data["purchase_orders"]}
     relevant_po_items = {_value(row, "name") for row in data["purchase_order_items"]}
-    data["purchase_order_schedules"] = _children(
-        "Payment Schedule",
-        relevant_po,
-        ["parent", "name", "due_date", "payment_amount", "outstanding", "idx"],
-        parent_doctype="Purchase Order",
-        parenttype="Purchase Order",
-        quality=quality,
-    )
 
-    purchase_invoices = _get_list(
+    data["purchase_invoices"] = []
+    data["purchase_invoice_items"] = []
+    for purchase_invoices in _pages(
         "Purchase Invoice",
         filters={"company": company, "docstatus": 1},
         fields=[
@@ -992,40 +1159,47 @@ def _load_purchase_documents(data: dict, company: str, project_names: set[str])
             "return_against",
             "modified",
         ],
-        limit=MAX_FINANCIAL_ROWS,
-        quality=quality,
-    )
-    pi_names = {_value(row, "name") for row in purchase_invoices}
-    pi_items = _children(
-        "Purchase Invoice Item",
-        pi_names,
-        [
-            "parent", "name", "project", "purchase_order", "po_detail", "custom_sales_order",
-            "amount", "base_amount", "net_amount", "base_net_amount",
-        ],
-        parent_doctype="Purchase Invoice",
         quality=quality,
-    )
-    relevant_pi = {
-        _value(row, "parent")
-        for row in pi_items
-        if _value(row, "project") in project_names
-        or _value(row, "custom_sales_order") in order_names
-        or _value(row, "purchase_order") in relevant_po
-        or _value(row, "po_detail") in relevant_po_items
-    }
-    relevant_pi.update(
-        _value(row, "name") for row in purchase_invoices if _value(row, "project") in project_names
-    )
-    if data.get("include_unassigned"):
-        relevant_pi.update(pi_names)
-    data["purchase_invoices"] = [row for row in purchase_invoices if _value(row, "name") in relevant_pi]
-    data["purchase_invoice_items"] = [row for row in pi_items if _value(row, "parent") in relevant_pi]
+    ):
+        pi_names = {_value(row, "name") for row in purchase_invoices}
+        pi_items = _children(
+            "Purchase Invoice Item",
+            pi_names,
+            [
+                "parent", "name", "project", "purchase_order", "po_detail", "custom_sales_order",
+                "amount", "base_amount", "net_amount", "base_net_amount",
+            ],
+            parent_doctype="Purchase Invoice",
+            quality=quality,
+        )
+        relevant_pi = {
+            _value(row, "parent")
+            for row in pi_items
+            if _value(row, "project") in project_names
+            or _value(row, "custom_sales_order") in order_names
+            or _value(row, "purchase_order") in relevant_po
+            or _value(row, "po_detail") in relevant_po_items
+        }
+        relevant_pi.update(
+            _value(row, "name") for row in purchase_invoices if _value(row, "project") in project_names
+        )
+        if data.get("include_unassigned"):
+            relevant_pi.update(pi_names)
+        data["purchase_invoices"].extend(row for row in purchase_invoices if _value(row, "name") in relevant_pi)
+        data["purchase_invoice_items"].extend(row for row in pi_items if _value(row, "parent") in relevant_pi)
 
 
 def _load_payments(data: dict, company: str) -> None:
     quality = data["data_quality"]
-    payments = _get_list(
+    relevant_documents = {
+        "Sales Order": {_value(row, "name") for row in data.get("sales_orders", [])},
+        "Sales Invoice": {_value(row, "name") for row in data.get("sales_invoices", [])},
+        "Purchase Order": {_value(row, "name") for row in data.get("purchase_orders", [])},
+        "Purchase Invoice": {_value(row, "name") for row in data.get("purchase_invoices", [])},
+    }
+    data["payment_entries"] = []
+    data["payment_references"] = []
+    for payments in _pages(
         "Payment Entry",
         filters={"company": company, "docstatus": 1, "payment_type": ["in", ["Receive", "Pay"]]},
         fields=[
@@ -1034,59 +1208,56 @@ def _load_payments(data: dict, company: str) -> None:
             "custom_source_document_currency", "custom_source_payment_amount",
             "paid_from_account_currency", "paid_to_account_currency", "modified",
         ],
-        limit=MAX_FINANCIAL_ROWS,
         quality=quality,
-    )
-    names = {_value(row, "name") for row in payments}
-    references = _children(
-        "Payment Entry Reference",
-        names,
-        [
-            "parent", "name", "reference_doctype", "reference_name", "allocated_amount",
-            "exchange_rate",
-        ],
-        parent_doctype="Payment Entry",
-        parenttype="Payment Entry",
-        quality=quality,
-    )
-    relevant_documents = {
-        "Sales Order": {_value(row, "name") for row in data.get("sales_orders", [])},
-        "Sales Invoice": {_value(row, "name") for row in data.get("sales_invoices", [])},
-        "Purchase Order": {_value(row, "name") for row in data.get("purchase_orders", [])},
-        "Purchase Invoice": {_value(row, "name") for row in data.get("purchase_invoices", [])},
-    }
-    context_refs = [
-        row for row in references
-        if _value(row, "reference_name") in relevant_documents.get(_value(row, "reference_doctype"), set())
-    ]
-    payment_names = {_value(row, "parent") for row in context_refs}
-    data["payment_entries"] = [row for row in payments if _value(row, "name") in payment_names]
-    data["payment_references"] = [row for row in references if _value(row, "parent") in payment_names]
+    ):
+        references = _children(
+            "Payment Entry Reference",
+            {_value(row, "name") for row in payments},
+            [
+                "parent", "name", "reference_doctype", "reference_name", "allocated_amount",
+                "exchange_rate",
+            ],
+            parent_doctype="Payment Entry",
+            parenttype="Payment Entry",
+            quality=quality,
+        )
+        payment_names = {
+            _value(row, "parent")
+            for row in references
+            if _value(row, "reference_name") in relevant_documents.get(_value(row, "reference_doctype"), set())
+        }
+        data["payment_entries"].extend(row for row in payments if _value(row, "name") in payment_names)
+        data["payment_references"].extend(row for row in references if _value(row, "parent") in payment_names)
 
 
 def _get_list(
-    doctype: str, *, filters: dict, fields: list[str], limit: int, quality: list[dict]
+    doctype: str, *, filters: dict, fields: list[str], quality: list[dict], limit: int | None = None
 ) -> list:
-    if not _can_read(doctype, quality):
-        return []
-    available = _available_fields(doctype, fields)
-    rows = frappe.get_list(
-        doctype,
-        filters=filters,
-        fields=available,
-        order_by="modified desc, name desc" if "modified" in available else "name desc",
-        limit_page_length=limit + 1,
-    )
-    if len(rows) > limit:
-        quality.append(
-            _quality(
-                "source_truncated",
-                _("{0} results are truncated at {1} recent rows.").format(doctype, limit),
-                document_type=doctype,
-                limit=limit,
+    """Return every readable row; an explicit ``limit`` truncates and reports it."""
+    rows = []
+    page_size = min(SOURCE_PAGE_SIZE, limit + 1) if limit else SOURCE_PAGE_SIZE
+    for page in _pages(doctype, filters=filters, fields=fields, quality=quality, page_size=page_size):
+        rows.extend(page)
+        if limit and len(rows) > limit:
+            quality.append(
+                _quality(
+                    "source_truncated",
+                    _("{0} results are truncated at {1} rows.").format(doctype, limit),
+                    document_type=doctype,
+                    limit=limit,
+                )
             )
-        )
-    return rows[:limit]
+            return rows[:limit]
+    return rows
+
+
+def _pages(
+    doctype: str, *, filters: dict, fields: list[str], quality: list[dict], page_size: int = SOURCE_PAGE_SIZE
+):
+    """Yield readable rows page by page so loaders keep only the rows they attribute."""
+    if not _can_read(doctype, quality):
+        return
+    yield from _keyset_pages(doctype, filters, fields, limit=page_size)
 
 
 def _children(
@@ -1109,28 +1280,72 @@ def _children(
             )
         )
         return []
-    filters = {"parent": ["in", sorted(parents)]}
-    if parenttype and _has_field(doctype, "parenttype"):
-        filters["parenttype"] = parenttype
-    limit = MAX_FINANCIAL_ROWS * 10
-    rows = frappe.get_list(
-        doctype,
-        filters=filters,
-        fields=_available_fields(doctype, fields),
-        order_by="parent asc, idx asc" if _has_field(doctype, "idx") else "parent asc",
-        limit_page_length=limit + 1,
-        parent_doctype=parent_doctype,
+    has_parenttype = bool(parenttype) and _has_field(doctype, "parenttype")
+    parents = sorted(parents)
+    rows = []
+    # Parents are batched so no query carries more than one page of names.
+    for offset in range(0, len(parents), SOURCE_PAGE_SIZE):
+        filters = {"parent": ["in", parents[offset : offset + SOURCE_PAGE_SIZE]]}
+        if has_parenttype:
+            filters["parenttype"] = parenttype
+        for page in _keyset_pages(doctype, filters, fields, parent_doctype=parent_doctype):
+            rows.extend(page)
+    rows.sort(key=lambda row: (_value(row, "parent") or "", _value(row, "idx") or 0))
+    return rows
+
+
+def _keyset_pages(
+    doctype: str,
+    filters: dict,
+    fields: list[str],
+    *,
+    limit: int = SOURCE_PAGE_SIZE,
+    parent_doctype: str | None = None,
+):
+    """Yield ``frappe.get_list`` pages ordered by the ``(modified, name)`` keyset.
+
+    Each page continues after the last row of the previous one instead of using
+    an offset, so rows inserted or deleted mid-scan cannot shift later pages. A
+    document modified during the scan moves behind the cursor and is read again;
+    it is only yielded once.
+    """
+    available = _available_fields(
+        doctype, [*fields, *(field for field in ("modified", "name") if field not in fields)]
     )
-    if len(rows) > limit:
-        quality.append(
-            _quality(
-                "source_truncated",
-                _("{0} results are truncated at {1} recent rows.").format(doctype, limit),
-                document_type=doctype,
-                limit=limit,
-            )
+    keyset = [field for field in ("modified", "name") if field in available]
+    base_filters = [
+        [field, *(condition if isinstance(condition, (list, tuple)) else ("=", condition))]
+        for field, condition in filters.items()
+    ]
+    cursor = None
+    seen = set()
+    while True:
+        page_filters = list(base_filters)
+        or_filters = None
+        if cursor and len(keyset) == 2:
+            page_filters.append(["modified", ">=", cursor[0]])
+            or_filters = [["modified", ">", cursor[0]], ["name", ">", cursor[1]]]
+        elif cursor:
+            page_filters.append([keyset[0], ">", cursor[0]])
+        rows = frappe.get_list(
+            doctype,
+            filters=page_filters,
+            or_filters=or_filters,
+            fields=available,
+            order_by=", ".join(f"{field} asc" for field in keyset),
+            limit_page_length=limit,
+            parent_doctype=parent_doctype,
         )
-    return rows[:limit]
+        if not rows:
+            return
+        next_cursor = tuple(_value(rows[-1], field) for field in keyset)
+        page = [row for row in rows if _value(row, "name") not in seen]
+        seen.update(_value(row, "name") for row in page)
+        if page:
+            yield page
+        if len(rows) < limit or not keyset or next_cursor == cursor:
+            return
+        cursor = next_cursor
 
 
 def _can_read(doctype: str, quality: list[dict]) -> bool:
@@ -1845,21 +2060,23 @@ def _apply_events_to_contexts(
         elif event["layer"] == "forecast" and event["direction"] == "outflow":
             context["forecast_outflow"] += amount
 
-    today = date.today()
+    today = date.today().toordinal()
+    table = _EventTable(events)
     for key, context in contexts.items():
-        context_events = [event for event in events if _event_context_key(event) == key]
-        position = chronological_funding_position(
-            context_events, _horizon_bounds("lifetime", None, None, context_events)
-        )
-        context.update(position)
+        rows = table.contexts.get(key, [])
+        ordinals = [today if table.ordinals[index] is None else table.ordinals[index] for index in rows]
+        start = date.fromordinal(min(ordinals, default=today)).replace(day=1).toordinal()
+        context.update(table.funding_position(rows, start, max(ordinals, default=today)))
+        context_events = [table.events[index] for index in rows]
         currencies = sorted(source_currencies.get(key) or {company_currency})
         context["source_currencies"] = currencies
         context["source_currency"] = currencies[0] if len(currencies) == 1 else "Mixed"
         context["currency"] = company_currency
         context["company_currency"] = company_currency
         future = [
-            event for event in context_events
-            if event["layer"] != "actual" and _as_date(event.get("date"), today) >= today
+            table.events[index]
+            for index, ordinal in zip(rows, ordinals)
+            if table.layers[index] != "actual" and ordinal >= today
         ]
         next_event = min(future, key=_event_sort_key) if future else None
         context["next_cash_event"] = (
@@ -1874,10 +2091,8 @@ def _apply_events_to_contexts(
             else None
         )
         overdue = any(
-            event["layer"] == "committed"
-            and flt(event["amount"]) > 0
-            and _as_date(event.get("date"), today) < today
-            for event in context_events
+            table.layers[index] == "committed" and table.amounts[index] > 0 and ordinal < today
+            for index, ordinal in zip(rows, ordinals)
         )
         if context["funding_gap"] > 0:
             context["risk_status"] = "Funding Gap"
@@ -2063,6 +2278,80 @@ def _funding_event_sort_key(event: dict):
     )
 
 
+class _EventTable:
+    """Column view of an event list for horizon, bucket and funding passes.
+
+    Events are sorted once in funding order and each field the passes read is
+    held in its own column. ``contexts`` maps a context key to its row numbers,
+    which stay in funding order, so per-context and per-group work touches only
+    its own rows. Undated events keep a ``None`` ordinal and take the default
+    date each pass applies (the horizon start, or the bucket start).
+    """
+
+    def __init__(self, events: list[dict]):
+        self.events = sorted(events, key=_funding_event_sort_key)
+        self.company_currency = next(
+            (event.get("company_currency") for event in events if event.get("company_currency")), ""
+        )
+        self.ordinals = [_date_ordinal(event.get("date")) for event in self.events]
+        self.amounts = [flt(event["amount"]) for event in self.events]
+        self.signed = [flt(event["signed_amount"]) for event in self.events]
+        self.layers = [event["layer"] for event in self.events]
+        self.fields = [f"{event['layer']}_{event['direction']}" for event in self.events]
+        self.contexts = defaultdict(list)
+        for index, event in enumerate(self.events):
+            self.contexts[_event_context_key(event)].append(index)
+
+    def rows_for(self, keys) -> list[int]:
+        """Row numbers of several contexts, merged back into funding order."""
+        return sorted(chain.from_iterable(self.contexts.get(key, ()) for key in keys))
+
+    def subset(self, keys) -> _EventTable:
+        return _EventTable([self.events[index] for index in self.rows_for(keys)])
+
+    def funding_position(self, rows, start: int, end: int) -> dict:
+        opening = 0.0
+        path = 0.0
+        lowest = 0.0
+        for index in rows:
+            ordinal = self.ordinals[index]
+            if ordinal is None:
+                ordinal = start
+            if ordinal > end:
+                continue
+            if self.layers[index] == "actual" and ordinal <= start:
+                opening += self.signed[index]
+                continue
+            path += self.signed[index]
+            lowest = min(lowest, path)
+        return {
+            "opening_position": opening,
+            "forecast_net": opening + path,
+            "minimum_position": opening + lowest,
+            "funding_gap": max(-(opening + lowest), 0.0),
+        }
+
+
+def _event_table(events) -> _EventTable:
+    return events if isinstance(events, _EventTable) else _EventTable(events)
+
+
+def _date_ordinal(value) -> int | None:
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    return _text_ordinal(str(value or "")[:10])
+
+
+@lru_cache(maxsize=8192)
+def _text_ordinal(text: str) -> int | None:
+    try:
+        return date.fromisoformat(text).toordinal()
+    except ValueError:
+        return None
+
+
 def _context_confidence(events: list[dict]) -> str:
     values = {event.get("confidence") for event in events}
     if "Low" in values:
@@ -2203,7 +2492,7 @@ def _summarize(
     rows: list[dict],
     quality: list[dict] | None = None,
     *,
-    events: list[dict] | None = None,
+    events: list[dict] | _EventTable | None = None,
     bounds: dict | None = None,
 ) -> dict:
     summary = {
@@ -2262,7 +2551,7 @@ def _group_rows(
     fieldname: str,
     context_type: str,
     *,
-    events: list[dict] | None = None,
+    events: list[dict] | _EventTable | None = None,
     bounds: dict | None = None,
 ) -> list[dict]:
     grouped = {}
@@ -2319,27 +2608,37 @@ def _group_rows(
             target["confidence"] = "Low"
         elif row.get("confidence") == "Medium" and target["confidence"] == "High":
             target["confidence"] = "Medium"
+    table = _event_table(events) if events is not None and bounds else None
     for target in grouped.values():
         _refresh_profit_percentages(target)
-        if events is not None and bounds:
-            group_events = [
-                event for event in events if _event_context_key(event) in target["_context_keys"]
-            ]
-            target.update(chronological_funding_position(group_events, bounds))
+        if table:
+            target.update(
+                table.funding_position(
+                    table.rows_for(target["_context_keys"]),
+                    _as_date(bounds["from_date"]).toordinal(),
+                    _as_date(bounds["to_date"]).toordinal(),
+                )
+            )
         target.pop("_context_keys", None)
     return sorted(grouped.values(), key=lambda row: row["name"])
 
 
-def _monthly_performance(events: list[dict], company_currency: str) -> list[dict]:
+def _monthly_performance(events, company_currency: str) -> list[dict]:
+    table = _event_table(events)
+    today = date.today().toordinal()
     rows = {}
-    for event in events:
-        event_date = _as_date(event.get("date"))
-        month = event_date.strftime("%Y-%m")
-        row = rows.setdefault(
-            month,
-            {
+    months = {}
+    for index, ordinal in enumerate(table.ordinals):
+        ordinal = today if ordinal is None else ordinal
+        if ordinal not in months:
+            event_date = date.fromordinal(ordinal)
+            months[ordinal] = (event_date.strftime("%Y-%m"), event_date.strftime("%b %Y"))
+        month, label = months[ordinal]
+        row = rows.get(month)
+        if row is None:
+            row = rows[month] = {
                 "month": month,
-                "label": event_date.strftime("%b %Y"),
+                "label": label,
                 "company_currency": company_currency,
                 "currency": company_currency,
                 "actual_inflow": 0.0,
@@ -2348,12 +2647,11 @@ def _monthly_performance(events: list[dict], company_currency: str) -> list[dict
                 "committed_outflow": 0.0,
                 "forecast_outflow": 0.0,
                 "net": 0.0,
-            },
-        )
-        field = f"{event['layer']}_{event['direction']}"
+            }
+        field = table.fields[index]
         if field in row:
-            row[field] += flt(event["amount"])
-        row["net"] += flt(event["signed_amount"])
+            row[field] += table.amounts[index]
+        row["net"] += table.signed[index]
     return [rows[key] for key in sorted(rows)]
 
 
@@ -2421,60 +2719,49 @@ def _horizon_options() -> list[dict]:
 
 
 def _context_for_horizon(
-    context: dict, events: list[dict], bounds: dict, accruals: list[dict] | None = None
+    context: dict, events, bounds: dict, accruals: dict | None = None
 ) -> dict:
+    """Horizon view of one context; ``accruals`` is grouped by context key."""
     row = dict(context)
     key = (row["context_type"], row["context_name"])
-    start = _as_date(bounds["from_date"])
-    end = _as_date(bounds["to_date"])
-    context_events = [event for event in events if _event_context_key(event) == key]
-    forward_events = [
-        event
-        for event in context_events
-        if event["layer"] != "actual"
-        and _as_date(event.get("date"), start) <= end
-    ]
-    actual_events = [
-        event
-        for event in context_events
-        if event["layer"] == "actual" and _as_date(event.get("date"), start) <= end
-    ]
-    context_accruals = [
-        row
-        for row in accruals or []
-        if (row.get("context_type"), row.get("context_name")) == key
-        and _as_date(row.get("date"), start) <= end
-    ]
+    table = _event_table(events)
+    start = _as_date(bounds["from_date"]).toordinal()
+    end = _as_date(bounds["to_date"]).toordinal()
     for field in ("ordered", "invoiced", "actual_cost"):
-        row[field] = sum(flt(item["amount"]) for item in context_accruals if item.get("field") == field)
-    row["net_cash"] = sum(flt(event["signed_amount"]) for event in actual_events)
-    row["collected"] = sum(
-        flt(event["signed_amount"]) for event in actual_events if event.get("flow_group") == "customer"
-    )
-    row["supplier_paid"] = -sum(
-        flt(event["signed_amount"]) for event in actual_events if event.get("flow_group") == "supplier"
-    )
-    row["committed_inflow"] = sum(
-        flt(event["amount"])
-        for event in forward_events
-        if event["layer"] == "committed" and event["direction"] == "inflow"
+        row[field] = 0.0
+    for item in (accruals or {}).get(key, ()):
+        ordinal = _date_ordinal(item.get("date"))
+        if item.get("field") in ("ordered", "invoiced", "actual_cost") and (ordinal is None or ordinal <= end):
+            row[item["field"]] += flt(item["amount"])
+
+    totals = dict.fromkeys(
+        ("net_cash", "collected", "supplier_paid", "committed_inflow", "committed_outflow", "forecast_outflow"), 0.0
     )
-    row["committed_outflow"] = sum(
-        flt(event["amount"])
-        for event in forward_events
-        if event["layer"] == "committed" and event["direction"] == "outflow"
-    )
-    row["forecast_outflow"] = sum(
-        flt(event["amount"])
-        for event in forward_events
-        if event["layer"] == "forecast" and event["direction"] == "outflow"
-    )
-    row.update(chronological_funding_position(context_events, bounds))
-    upcoming = [
-        event
-        for event in forward_events
-        if _as_date(event.get("date"), start) >= start
-    ]
+    upcoming = []
+    overdue = False
+    rows = table.contexts.get(key, [])
+    for index in rows:
+        ordinal = table.ordinals[index]
+        if ordinal is None:
+            ordinal = start
+        if ordinal > end:
+            continue
+        event = table.events[index]
+        if table.layers[index] == "actual":
+            totals["net_cash"] += table.signed[index]
+            if event.get("flow_group") == "customer":
+                totals["collected"] += table.signed[index]
+            elif event.get("flow_group") == "supplier":
+                totals["supplier_paid"] -= table.signed[index]
+            continue
+        if table.fields[index] in totals:
+            totals[table.fields[index]] += table.amounts[index]
+        if ordinal >= start:
+            upcoming.append(event)
+        elif table.layers[index] == "committed" and table.amounts[index] > 0:
+            overdue = True
+    row.update(totals)
+    row.update(table.funding_position(rows, start, end))
     next_event = min(upcoming, key=_event_sort_key) if upcoming else None
     row["next_cash_event"] = (
         {
@@ -2487,17 +2774,18 @@ def _context_for_horizon(
         if next_event
         else None
     )
-    overdue = any(
-        event["layer"] == "committed"
-        and flt(event["amount"]) > 0
-        and _as_date(event.get("date"), start) < start
-        for event in forward_events
-    )
     row["risk_status"] = "Funding Gap" if row["funding_gap"] > 0 else "Overdue" if overdue else "On Track"
     row["risk"] = row["risk_status"]
     return row
 
 
+def _accruals_by_context(accruals: list[dict]) -> dict:
+    grouped = defaultdict(list)
+    for row in accruals:
+        grouped[(row.get("context_type"), row.get("context_name"))].append(row)
+    return grouped
+
+
 def _horizon_bounds(horizon: str, from_date, to_date, events: list[dict]) -> dict:
     horizon = (horizon or "13_weeks").strip().lower()
     today = date.today()
@@ -2529,34 +2817,26 @@ def _horizon_bounds(horizon: str, from_date, to_date, events: list[dict]) -> dic
     return {"mode": mode, "from_date": str(start), "to_date": str(end), "interval": interval}
 
 
-def _events_for_horizon_detail(events: list[dict], bounds: dict) -> list[dict]:
+def _events_for_horizon_detail(events, bounds: dict) -> list[dict]:
     """Return the event rows represented within the selected liquidity path."""
-    start = _as_date(bounds["from_date"])
-    end = _as_date(bounds["to_date"])
-    return [
-        event
-        for event in events
-        if _as_date(event.get("date"), start) <= end
-        and (event["layer"] != "actual" or _as_date(event.get("date"), start) > start)
-    ]
-
-
-def _bucket_events(
-    events: list[dict], bounds: dict, *, detail_events: list[dict] | None = None
-) -> list[dict]:
+    table = _event_table(events)
+    start = _as_date(bounds["from_date"]).toordinal()
+    end = _as_date(bounds["to_date"]).toordinal()
+    detail = []
+    for index, ordinal in enumerate(table.ordinals):
+        if ordinal is None:
+            ordinal = start
+        if ordinal <= end and (table.layers[index] != "actual" or ordinal > start):
+            detail.append(table.events[index])
+    return detail
+
+
+def _bucket_events(events, bounds: dict, *, detail_events: list[dict] | None = None) -> list[dict]:
+    table = _event_table(events)
     start = _as_date(bounds["from_date"])
     end = _as_date(bounds["to_date"])
     interval = bounds["interval"]
-    company_currency = next((event.get("company_currency") for event in events if event.get("company_currency")), "")
-    actual_net = sum(
-        flt(event["signed_amount"])
-        for event in events
-        if event["layer"] == "actual" and _as_date(event.get("date"), start) <= start
-    )
-    overdue = [
-        event for event in events
-        if event["layer"] != "actual" and _as_date(event.get("date"), start) < start
-    ]
+    company_currency = table.company_currency
     periods = []
     cursor = start
     while cursor <= end:
@@ -2566,20 +2846,40 @@ def _bucket_events(
         )
         periods.append((cursor, period_end))
         cursor = period_end + timedelta(days=1)
+
+    # One pass in funding order assigns each event to its period, so every
+    # period's rows are already in the order the running position needs.
+    period_starts = [period_start.toordinal() for period_start, _period_end in periods]
+    start_ordinal = start.toordinal()
+    end_ordinal = end.toordinal()
+    members = [[] for _period in periods]
+    actual_net = 0.0
+    for index, ordinal in enumerate(table.ordinals):
+        is_actual = table.layers[index] == "actual"
+        if ordinal is None:
+            # Undated events fall on every period start: actual cash opens the
+            # position and repeats after the first period, commitments repeat everywhere.
+            if is_actual:
+                actual_net += table.signed[index]
+            for member in members[1:] if is_actual else members:
+                member.append(index)
+            continue
+        if is_actual and ordinal <= start_ordinal:
+            actual_net += table.signed[index]
+        elif ordinal > end_ordinal:
+            continue
+        elif not is_actual and ordinal < start_ordinal:
+            if members:
+                members[0].append(index)
+        else:
+            members[bisect_right(period_starts, ordinal) - 1].append(index)
+
     position = actual_net
     output = []
     detail_event_objects = (
         {id(event) for event in detail_events} if detail_events is not None else None
     )
-    for index, (period_start, period_end) in enumerate(periods):
-        bucket_events = [
-            event for event in events
-            if period_start <= _as_date(event.get("date"), period_start) <= period_end
-            and not (event["layer"] == "actual" and _as_date(event.get("date"), period_start) <= start)
-        ]
-        if index == 0:
-            bucket_events = overdue + bucket_events
-        bucket_events = sorted(bucket_events, key=_funding_event_sort_key)
+    for (period_start, period_end), rows in zip(periods, members):
         row = {
             "from_date": str(period_start),
             "to_date": str(period_end),
@@ -2598,19 +2898,19 @@ def _bucket_events(
             "forecast_outflow": 0.0,
             "events": sorted(
                 (
-                    event
-                    for event in bucket_events
-                    if detail_event_objects is None or id(event) in detail_event_objects
+                    table.events[index]
+                    for index in rows
+                    if detail_event_objects is None or id(table.events[index]) in detail_event_objects
                 ),
                 key=_event_sort_key,
             ),
         }
         minimum_position = position
-        for event in bucket_events:
-            field = f"{event['layer']}_{event['direction']}"
+        for index in rows:
+            field = table.fields[index]
             if field in row:
-                row[field] += flt(event["amount"])
-            position += flt(event["signed_amount"])
+                row[field] += table.amounts[index]
+            position += table.signed[index]
             minimum_position = min(minimum_position, position)
         row["closing_position"] = position
         row["funding_gap"] = max(-minimum_position, 0.0)
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import json
+import time
+from collections import defaultdict
+
+import frappe
+
+
+# Persisted cash-flow model snapshots.
+#
+# A snapshot holds the unfiltered company model (contexts, event ledger,
+# accruals, data quality) and the Project / Sales Order rows the contexts were
+# classified from. Snapshots are stored per company and per user because the
+# loaders apply the user's read permissions. Submitting or cancelling a cash-flow
+# source records the affected contexts in a per-company change log once the
+# transaction commits; the next read rebuilds only those contexts and splices
+# them into the user's snapshot. Snapshots are rebuilt in full after
+# SNAPSHOT_TTL_SECONDS so changes no hook sees still converge.
+SNAPSHOT_KEY = "orderlift:cash_flow:snapshot:{company}:{user}"
+CHANGES_KEY = "orderlift:cash_flow:changes:{company}"
+FULL_REBUILD_FIELD = "*"
+SNAPSHOT_TTL_SECONDS = 30 * 60
+# Changes are matched by wall clock across web and worker processes; re-applying
+# a change is idempotent, so overlap generously rather than miss one.
+CLOCK_SKEW_SECONDS = 5
+
+LINK_TARGETS = {
+    "project": "Project",
+    "sales_order": "Sales Order",
+    "custom_sales_order": "Sales Order",
+    "custom_advance_sales_order": "Sales Order",
+    "purchase_order": "Purchase Order",
+}
+SOURCE_LINKS = {
+    "Sales Order": {"header": ("project",), "child": None, "item": ()},
+    "Sales Invoice": {
+        "header": ("project", "custom_advance_sales_order"),
+        "child": "Sales Invoice Item",
+        "item": ("project", "sales_order"),
+    },
+    "Purchase Invoice": {
+        "header": ("project",),
+        "child": "Purchase Invoice Item",
+        "item": ("project", "custom_sales_order", "purchase_order"),
+    },
+    "Purchase Order": {
+        "header": ("project",),
+        "child": "Purchase Order Item",
+        "item": ("project", "sales_order"),
+    },
+}
+# Documents that report data quality when they cannot be attributed to a context.
+ATTRIBUTED_DOCTYPES = {"Sales Invoice", "Purchase Invoice", "Purchase Order"}
+
+
+def get_snapshot(company: str, user: str) -> dict | None:
+    """Return the stored snapshot, or ``None`` when missing, expired or Redis is unavailable."""
+    try:
+        snapshot = frappe.cache().get_value(_snapshot_key(company, user))
+    except Exception:
+        return None
+    if not snapshot or time.time() - float(snapshot.get("built_at") or 0) > SNAPSHOT_TTL_SECONDS:
+        return None
+    return snapshot
+
+
+def store_snapshot(company: str, user: str, snapshot: dict) -> None:
+    try:
+        ttl = max(int(SNAPSHOT_TTL_SECONDS - (time.time() - float(snapshot["built_at"]))), 1)
+        frappe.cache().set_value(_snapshot_key(company, user), snapshot, expires_in_sec=ttl)
+    except Exception:
+        return
+
+
+def pending_changes(company: str, since: float) -> tuple[bool, set[tuple[str, str]]]:
+    """Return ``(full_rebuild, context_keys)`` recorded for the company after ``since``."""
+    try:
+        entries = frappe.cache().hgetall(_changes_key(company)) or {}
+    except Exception:
+        return True, set()
+    cutoff = float(since or 0) - CLOCK_SKEW_SECONDS
+    full = False
+    keys = set()
+    for field, changed_at in entries.items():
+        if float(changed_at or 0) <= cutoff:
+            continue
+        field = field.decode() if isinstance(field, bytes) else str(field)
+        if field == FULL_REBUILD_FIELD:
+            full = True
+            continue
+        try:
+            context_type, context_name = json.loads(field)
+        except (TypeError, ValueError):
+            continue
+        keys.add((context_type, context_name))
+    return full, keys
+
+
+def record_changes(company: str, context_keys=None, full: bool = False) -> None:
+    """Log changed contexts (or a full rebuild) for the company's snapshots."""
+    if not company:
+        return
+    fields = [json.dumps(list(key)) for key in context_keys or [] if len(key) == 2 and all(key)]
+    if full:
+        fields.append(FULL_REBUILD_FIELD)
+    if not fields:
+        return
+    try:
+        cache = frappe.cache()
+        name = _changes_key(company)
+        now = time.time()
+        for field in fields:
+            cache.hset(name, field, now)
+        # No live snapshot is older than the TTL, so older entries can never apply again.
+        expired = [
+            field
+            for field, changed_at in (cache.hgetall(name) or {}).items()
+            if float(changed_at or 0) < now - SNAPSHOT_TTL_SECONDS - CLOCK_SKEW_SECONDS
+        ]
+        if expired:
+            cache.hdel(name, [field.decode() if isinstance(field, bytes) else field for field in expired])
+    except Exception:
+        return
+
+
+def queue_snapshot_update(doc, method=None) -> None:
+    """Submit/cancel hook: log the contexts the document feeds once the transaction commits."""
+    company = (doc.get("company") or "").strip()
+    if not company:
+        return
+    keys = document_context_keys(doc)
+    full = not keys and doc.doctype in ATTRIBUTED_DOCTYPES
+    if not keys and not full:
+        return
+    frappe.enqueue(
+        "orderlift.orderlift_finance.cash_flow_snapshot.record_changes",
+        queue="short",
+        enqueue_after_commit=True,
+        company=company,
+        context_keys=sorted(keys),
+        full=full,
+    )
+
+
+def document_context_keys(doc) -> set[tuple[str, str]]:
+    """Return the Project / standalone Sales Order contexts a cash-flow source feeds."""
+    if doc.doctype == "Project":
+        return {("Project", doc.name)}
+
+    links = defaultdict(set)
+    if doc.doctype == "Payment Entry":
+        references = defaultdict(set)
+        for row in doc.get("references") or []:
+            if row.get("reference_doctype") in SOURCE_LINKS and row.get("reference_name"):
+                references[row.get("reference_doctype")].add(row.get("reference_name"))
+        for doctype, names in references.items():
+            if doctype == "Sales Order":
+                links["Sales Order"].update(names)
+            else:
+                _collect_stored_links(doctype, names, links)
+    elif doc.doctype in SOURCE_LINKS:
+        spec = SOURCE_LINKS[doc.doctype]
+        if doc.doctype == "Sales Order":
+            links["Sales Order"].add(doc.name)
+        _collect_links(doc, spec["header"], links)
+        for item in doc.get("items") or []:
+            _collect_links(item, spec["item"], links)
+
+    if links["Purchase Order"]:
+        _collect_stored_links("Purchase Order", links.pop("Purchase Order"), links)
+    keys = {("Project", name) for name in links["Project"]}
+    if links["Sales Order"]:
+        for order in frappe.get_all(
+            "Sales Order",
+            filters={"name": ["in", sorted(links["Sales Order"])]},
+            fields=["name", "project"],
+        ):
+            keys.add(("Project", order.project) if order.project else ("Sales Order", order.name))
+    if doc.doctype == "Sales Order":
+        # A Sales Order moved onto or off a project must leave its previous context too.
+        keys.add(("Sales Order", doc.name))
+    return keys
+
+
+def _collect_links(row, fields, links: dict) -> None:
+    for field in fields:
+        value = (row.get(field) or "").strip()
+        if value:
+            links[LINK_TARGETS[field]].add(value)
+
+
+def _collect_stored_links(doctype: str, names, links: dict) -> None:
+    spec = SOURCE_LINKS[doctype]
+    meta = frappe.get_meta(doctype)
+    header_fields = [field for field in spec["header"] if meta.has_field(field)]
+    names = sorted(names)
+    if header_fields:
+        for row in frappe.get_all(doctype, filters={"name": ["in", names]}, fields=header_fields):
+            _collect_links(row, header_fields, links)
+    if spec["child"]:
+        child_meta = frappe.get_meta(spec["child"])
+        item_fields = [field for field in spec["item"] if child_meta.has_field(field)]
+        if item_fields:
+            for row in frappe.get_all(
+                spec["child"],
+                filters={"parenttype": doctype, "parent": ["in", names]},
+                fields=item_fields,
+            ):
+                _collect_links(row, item_fields, links)
+
+
+def _snapshot_key(company: str, user: str) -> str:
+    return SNAPSHOT_KEY.format(company=company, user=user)
+
+
+def _changes_key(company: str) -> str:
+    return CHANGES_KEY.format(company=company)
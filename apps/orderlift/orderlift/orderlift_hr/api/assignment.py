@@ -49,6 +49,50 @@ def resolve_assigned_programs(employee: str) -> list[str]:
     return sorted(matched)
 
 
+def resolve_assigned_programs_by_employee(employees) -> dict[str, list[str]]:
+    """Bulk form of ``resolve_assigned_programs``: employee -> active program names.
+
+    Reads employees, active programs and manual assignments once each.
+    """
+    names = sorted({employee for employee in employees if employee})
+    if not names:
+        return {}
+
+    employee_rows = frappe.get_all(
+        "Employee",
+        filters={"name": ["in", names]},
+        fields=["name", "department", "designation"],
+        limit_page_length=0,
+    )
+    programs = frappe.get_all(
+        "Training Program",
+        filters={"is_active": 1},
+        fields=["name", "target_department", "target_designation"],
+        limit_page_length=0,
+    )
+    active = {program.name for program in programs}
+    manual: dict[str, set[str]] = {}
+    for row in frappe.get_all(
+        "Training Program Assignment",
+        filters={"employee": ["in", names], "parenttype": "Training Program"},
+        fields=["employee", "parent"],
+        limit_page_length=0,
+    ):
+        if row.parent in active:
+            manual.setdefault(row.employee, set()).add(row.parent)
+
+    assigned = {}
+    for emp in employee_rows:
+        matched = set(manual.get(emp.name, ()))
+        for program in programs:
+            if (emp.department and program.target_department == emp.department) or (
+                emp.designation and program.target_designation == emp.designation
+            ):
+                matched.add(program.name)
+        assigned[emp.name] = sorted(matched)
+    return assigned
+
+
 @frappe.whitelist()
 def get_assigned_programs(employee: str | None = None) -> list[dict]:
     """Whitelisted helper returning program details for the current/given employee.
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import json
 from datetime import timedelta
 
 import frappe
@@ -9,14 +10,23 @@ from frappe.utils import flt, now_datetime
 
 from orderlift.orderlift_hr.api.assignment import (
     is_training_admin,
-    resolve_assigned_programs,
+    resolve_assigned_programs_by_employee,
 )
+from orderlift.utils.transaction import run_after_commit
 
 
 WEIGHT_MODULE = 0.60
 WEIGHT_QUIZ = 0.30
 WEIGHT_RECENCY = 0.10
 
+# Ranked rows are cached per filter set. Committed writes to the scored and
+# assigned records bump the generation; the TTL bounds how stale the time-based
+# recency score gets.
+LEADERBOARD_CACHE_PREFIX = "orderlift:training_leaderboard"
+LEADERBOARD_GENERATION_KEY = f"{LEADERBOARD_CACHE_PREFIX}:generation"
+LEADERBOARD_CACHE_TTL_SECONDS = 5 * 60
+LEADERBOARD_FILTER_KEYS = ("department", "designation", "program")
+
 
 @frappe.whitelist()
 def get_leaderboard(filters: dict | str | None = None) -> dict:
@@ -26,39 +36,15 @@ def get_leaderboard(filters: dict | str | None = None) -> dict:
     own row highlighted.
     """
     if isinstance(filters, str):
-        import json as _json
-
         try:
-            filters = _json.loads(filters or "{}")
-        except _json.JSONDecodeError:
+            filters = json.loads(filters or "{}")
+        except json.JSONDecodeError:
             filters = {}
     filters = filters or {}
 
     admin = is_training_admin()
 
-    employees = _candidate_employees(filters if admin else {})
-    rows = []
-    for employee in employees:
-        score_data = _compute_employee_score(employee.name)
-        rows.append(
-            {
-                "employee": employee.name,
-                "employee_name": employee.employee_name or employee.name,
-                "department": employee.department,
-                "designation": employee.designation,
-                "total_score": round(score_data["total_score"], 1),
-                "module_completion_pct": round(score_data["module_completion_pct"], 1),
-                "quiz_average_pct": round(score_data["quiz_average_pct"], 1),
-                "recent_activity_score": round(score_data["recent_activity_score"], 1),
-                "modules_completed": score_data["modules_completed"],
-                "modules_total": score_data["modules_total"],
-                "last_activity": score_data["last_activity"],
-            }
-        )
-
-    rows.sort(key=lambda r: (-r["total_score"], r["employee_name"]))
-    for index, row in enumerate(rows, start=1):
-        row["rank"] = index
+    rows = _ranked_rows(filters if admin else {})
 
     own_employee = frappe.db.get_value("Employee", {"user_id": frappe.session.user}, "name")
 
@@ -99,7 +85,84 @@ def recalculate_employee_score(employee: str) -> dict:
 # -- Internals ----------------------------------------------------------------
 
 
-def _candidate_employees(filters: dict) -> list:
+def _ranked_rows(filters: dict) -> list[dict]:
+    """Admin-shaped ranked rows for ``filters``, served from the leaderboard cache."""
+    key = _leaderboard_cache_key(filters)
+    rows = _cache_get(key) if key else None
+    if rows is None:
+        rows = _build_ranked_rows(filters)
+        if key:
+            _cache_set(key, rows)
+    return [dict(row) for row in rows]
+
+
+def _build_ranked_rows(filters: dict) -> list[dict]:
+    employees, programs_by_employee = _candidate_employees(filters)
+    scores = _compute_scores([employee.name for employee in employees], programs_by_employee)
+    rows = []
+    for employee in employees:
+        score_data = scores[employee.name]
+        rows.append(
+            {
+                "employee": employee.name,
+                "employee_name": employee.employee_name or employee.name,
+                "department": employee.department,
+                "designation": employee.designation,
+                "total_score": round(score_data["total_score"], 1),
+                "module_completion_pct": round(score_data["module_completion_pct"], 1),
+                "quiz_average_pct": round(score_data["quiz_average_pct"], 1),
+                "recent_activity_score": round(score_data["recent_activity_score"], 1),
+                "modules_completed": score_data["modules_completed"],
+                "modules_total": score_data["modules_total"],
+                "last_activity": score_data["last_activity"],
+            }
+        )
+
+    rows.sort(key=lambda r: (-r["total_score"], r["employee_name"]))
+    for index, row in enumerate(rows, start=1):
+        row["rank"] = index
+    return rows
+
+
+def invalidate_leaderboard_cache(doc=None, method=None):
+    """Doc event hook: bump the leaderboard generation once the write commits or rolls back."""
+    run_after_commit(_bump_leaderboard_generation, on_rollback=True)
+
+
+def _bump_leaderboard_generation():
+    try:
+        cache = frappe.cache()
+        cache.incrby(cache.make_key(LEADERBOARD_GENERATION_KEY), 1)
+    except Exception:
+        pass
+
+
+def _leaderboard_cache_key(filters: dict) -> str | None:
+    try:
+        cache = frappe.cache()
+        generation = int(cache.get(cache.make_key(LEADERBOARD_GENERATION_KEY)) or 0)
+    except Exception:
+        return None
+    scope = {key: filters.get(key) for key in LEADERBOARD_FILTER_KEYS if filters.get(key)}
+    return f"{LEADERBOARD_CACHE_PREFIX}:{generation}:{json.dumps(scope, sort_keys=True)}"
+
+
+def _cache_get(key: str):
+    try:
+        return frappe.cache().get_value(key)
+    except Exception:
+        return None
+
+
+def _cache_set(key: str, rows: list[dict]) -> None:
+    try:
+        frappe.cache().set_value(key, rows, expires_in_sec=LEADERBOARD_CACHE_TTL_SECONDS)
+    except Exception:
+        pass
+
+
+def _candidate_employees(filters: dict) -> tuple[list, dict[str, list[str]]]:
+    """Active employees matching ``filters`` and the programs assigned to each."""
     employee_filters = {"status": "Active"}
     if filters.get("department"):
         employee_filters["department"] = filters["department"]
@@ -112,19 +175,30 @@ def _candidate_employees(filters: dict) -> list:
         fields=["name", "employee_name", "department", "designation"],
         limit_page_length=0,
     )
+    programs_by_employee = resolve_assigned_programs_by_employee(employee.name for employee in employees)
 
     if filters.get("program"):
-        keep = []
-        for employee in employees:
-            if filters["program"] in resolve_assigned_programs(employee.name):
-                keep.append(employee)
-        employees = keep
+        employees = [
+            employee for employee in employees if filters["program"] in programs_by_employee.get(employee.name, ())
+        ]
 
-    return employees
+    return employees, programs_by_employee
 
 
 def _compute_employee_score(employee: str) -> dict:
-    program_names = resolve_assigned_programs(employee)
+    return _compute_scores([employee])[employee]
+
+
+def _compute_scores(employees, programs_by_employee: dict[str, list[str]] | None = None) -> dict[str, dict]:
+    """Leaderboard scores for every employee from a fixed number of grouped queries."""
+    employees = list(dict.fromkeys(employee for employee in employees if employee))
+    if not employees:
+        return {}
+    if programs_by_employee is None:
+        programs_by_employee = resolve_assigned_programs_by_employee(employees)
+
+    program_names = sorted({program for programs in programs_by_employee.values() for program in programs})
+    modules = []
     if program_names:
         modules = frappe.get_all(
             "Training Module",
@@ -133,72 +207,113 @@ def _compute_employee_score(employee: str) -> dict:
                 "is_active": 1,
                 "is_required": 1,
             },
-            fields=["name", "linked_quiz", "requires_quiz_pass"],
+            fields=["name", "program", "linked_quiz", "requires_quiz_pass"],
             limit_page_length=0,
         )
-    else:
-        modules = []
-
-    module_names = [m.name for m in modules]
-
-    progress_rows = frappe.get_all(
-        "Employee Training Progress",
-        filters={"employee": employee, "module": ["in", module_names]} if module_names else {"employee": employee, "module": ["in", ["__none__"]]},
-        fields=["module", "studied", "last_activity"],
+    modules_by_program: dict[str, list] = {}
+    for module in modules:
+        modules_by_program.setdefault(module.program, []).append(module)
+
+    studied = set()
+    if modules:
+        studied = {
+            (row.employee, row.module)
+            for row in frappe.get_all(
+                "Employee Training Progress",
+                filters={"employee": ["in", employees], "module": ["in", [m.name for m in modules]], "studied": 1},
+                fields=["employee", "module"],
+                limit_page_length=0,
+            )
+        }
+    passed = _passed_quizzes(
+        employees, {m.linked_quiz for m in modules if m.requires_quiz_pass and m.linked_quiz}
     )
-    progress_by_module = {row.module: row for row in progress_rows}
+    quiz_averages = _latest_quiz_averages(employees)
+    last_activity = _last_activity(employees)
 
-    modules_completed = 0
-    for module in modules:
-        row = progress_by_module.get(module.name)
-        if not row or not row.studied:
-            continue
-        if module.requires_quiz_pass and module.linked_quiz:
-            if not frappe.db.exists(
-                "Training Quiz Attempt",
-                {"quiz": module.linked_quiz, "employee": employee, "passed": 1},
-            ):
+    scores = {}
+    for employee in employees:
+        employee_modules = {
+            module.name: module
+            for program in programs_by_employee.get(employee, ())
+            for module in modules_by_program.get(program, ())
+        }
+        modules_completed = 0
+        for module in employee_modules.values():
+            if (employee, module.name) not in studied:
                 continue
-        modules_completed += 1
-
-    modules_total = len(modules)
-    module_completion_pct = (modules_completed / modules_total * 100.0) if modules_total else 0.0
+            if module.requires_quiz_pass and module.linked_quiz and (employee, module.linked_quiz) not in passed:
+                continue
+            modules_completed += 1
+
+        modules_total = len(employee_modules)
+        module_completion_pct = (modules_completed / modules_total * 100.0) if modules_total else 0.0
+        quiz_average_pct = flt(quiz_averages.get(employee))
+        last_activity_dt = last_activity.get(employee)
+        recent_activity_score = _recency_score(last_activity_dt)
+
+        total = (
+            WEIGHT_MODULE * module_completion_pct
+            + WEIGHT_QUIZ * quiz_average_pct
+            + WEIGHT_RECENCY * recent_activity_score
+        )
 
-    attempts = frappe.get_all(
-        "Training Quiz Attempt",
-        filters={"employee": employee, "completed_on": ["is", "set"]},
-        fields=["quiz", "score_percentage", "completed_on"],
-        order_by="completed_on desc",
+        scores[employee] = {
+            "total_score": total,
+            "module_completion_pct": module_completion_pct,
+            "quiz_average_pct": quiz_average_pct,
+            "recent_activity_score": recent_activity_score,
+            "modules_completed": modules_completed,
+            "modules_total": modules_total,
+            "last_activity": str(last_activity_dt) if last_activity_dt else None,
+        }
+    return scores
+
+
+def _passed_quizzes(employees: list[str], quizzes: set[str]) -> set[tuple[str, str]]:
+    if not quizzes:
+        return set()
+    rows = frappe.db.sql(
+        """
+        select distinct employee, quiz
+        from `tabTraining Quiz Attempt`
+        where passed = 1 and employee in %(employees)s and quiz in %(quizzes)s
+        """,
+        {"employees": tuple(employees), "quizzes": tuple(sorted(quizzes))},
     )
-    latest_by_quiz: dict[str, float] = {}
-    for row in attempts:
-        latest_by_quiz.setdefault(row.quiz, flt(row.score_percentage))
-    quiz_average_pct = (
-        sum(latest_by_quiz.values()) / len(latest_by_quiz) if latest_by_quiz else 0.0
+    return {(row[0], row[1]) for row in rows}
+
+
+def _latest_quiz_averages(employees: list[str]) -> dict[str, float]:
+    """Average of each employee's latest completed attempt per quiz."""
+    rows = frappe.db.sql(
+        """
+        select latest.employee, avg(latest.score_percentage)
+        from (
+            select employee, ifnull(score_percentage, 0) as score_percentage,
+                row_number() over (partition by employee, quiz order by completed_on desc, name desc) as attempt_rank
+            from `tabTraining Quiz Attempt`
+            where employee in %(employees)s and completed_on is not null
+        ) latest
+        where latest.attempt_rank = 1
+        group by latest.employee
+        """,
+        {"employees": tuple(employees)},
     )
-
-    last_activity = frappe.db.sql(
-        "select max(last_activity) from `tabEmployee Training Progress` where employee=%s",
-        employee,
+    return {row[0]: flt(row[1]) for row in rows}
+
+
+def _last_activity(employees: list[str]) -> dict:
+    rows = frappe.db.sql(
+        """
+        select employee, max(last_activity)
+        from `tabEmployee Training Progress`
+        where employee in %(employees)s
+        group by employee
+        """,
+        {"employees": tuple(employees)},
     )
-    last_activity_dt = last_activity[0][0] if last_activity and last_activity[0] else None
-    recent_activity_score = _recency_score(last_activity_dt)
-
-    total = (
-        WEIGHT_MODULE * module_completion_pct
-        + WEIGHT_QUIZ * quiz_average_pct
-        + WEIGHT_RECENCY * recent_activity_score
-    )
-
-    return {
-        "total_score": total,
-        "module_completion_pct": module_completion_pct,
-        "quiz_average_pct": quiz_average_pct,
-        "recent_activity_score": recent_activity_score,
-        "modules_completed": modules_completed,
-        "modules_total": modules_total,
-        "last_activity": str(last_activity_dt) if last_activity_dt else None,
-    }
+    return {row[0]: row[1] for row in rows if row[1]}
 
 
 def _recency_score(last_activity) -> float:
@@ -8,10 +8,42 @@ import frappe
 from frappe.utils import now_datetime
 
 from orderlift.orderlift_hr.api.assignment import is_hr_admin
-from orderlift.orderlift_hr.metrics import REGISTRY, MetricResult, normalise_score
+from orderlift.orderlift_hr.metrics import BATCH_REGISTRY, REGISTRY, MetricResult, normalise_score
 from orderlift.orderlift_hr.metrics.base import format_display
 
 
+SNAPSHOT_DOCTYPE = "Performance Metric Snapshot"
+SNAPSHOT_SERIES = "PMS-.YYYY.-.#####"
+METRIC_FIELDS = [
+    "metric_code",
+    "source_type",
+    "source_doctype",
+    "aggregate",
+    "value_field",
+    "employee_link_field",
+    "filters_json",
+    "unit",
+    "direction",
+    "default_target",
+    "score_curve",
+]
+SNAPSHOT_FIELDS = [
+    "employee",
+    "user",
+    "metric",
+    "appraisal_cycle",
+    "from_date",
+    "to_date",
+    "value",
+    "value_display",
+    "target_value",
+    "score_0_100",
+    "last_computed_on",
+    "compute_status",
+    "error_message",
+]
+
+
 def _ensure_admin():
     if not is_hr_admin():
         frappe.throw(frappe._("Not permitted"), frappe.PermissionError)
@@ -43,19 +75,29 @@ def _cycle_window(appraisal_cycle: str) -> tuple[str | None, str | None]:
 
 
 def _resolve_profile(profile: str | None, employee: str | None) -> dict | None:
+    return _resolve_profiles(profile, [employee]).get(employee)
+
+
+def _resolve_profiles(profile: str | None, employees) -> dict[str, dict]:
+    """Employee -> Performance Profile dict, loading each distinct profile once."""
+    employees = [employee for employee in dict.fromkeys(employees) if employee]
     if profile:
         if not frappe.db.exists("Performance Profile", profile):
-            return None
-        return frappe.get_doc("Performance Profile", profile).as_dict()
+            return {}
+        profile_doc = frappe.get_doc("Performance Profile", profile).as_dict()
+        return {employee: profile_doc for employee in employees}
 
-    if not employee:
-        return None
+    if not employees:
+        return {}
 
-    emp = frappe.db.get_value(
-        "Employee", employee, ["department", "designation"], as_dict=True
+    employee_rows = frappe.get_all(
+        "Employee",
+        filters={"name": ["in", employees]},
+        fields=["name", "department", "designation"],
+        limit_page_length=0,
     )
-    if not emp:
-        return None
+    if not employee_rows:
+        return {}
 
     candidates = frappe.get_all(
         "Performance Profile",
@@ -65,11 +107,24 @@ def _resolve_profile(profile: str | None, employee: str | None) -> dict | None:
         },
         fields=["name", "target_department", "target_designation"],
     )
+    profile_docs: dict[str, dict] = {}
+    resolved = {}
+    for emp in employee_rows:
+        name = _matching_profile(candidates, emp)
+        if not name:
+            continue
+        if name not in profile_docs:
+            profile_docs[name] = frappe.get_doc("Performance Profile", name).as_dict()
+        resolved[emp.name] = profile_docs[name]
+    return resolved
+
+
+def _matching_profile(candidates, emp) -> str | None:
     for cand in candidates:
         dept_ok = not cand.target_department or cand.target_department == emp.department
         desig_ok = not cand.target_designation or cand.target_designation == emp.designation
         if dept_ok and desig_ok:
-            return frappe.get_doc("Performance Profile", cand.name).as_dict()
+            return cand.name
     return None
 
 
@@ -120,57 +175,188 @@ def _run_metric(metric_doc, employee: str, from_date: str | None, to_date: str |
         return MetricResult(status="Error", error=str(exc), unit=metric_doc.get("unit") or "")
 
 
-def _upsert_snapshot(
-    employee: str,
-    metric_code: str,
-    appraisal_cycle: str,
-    from_date,
-    to_date,
-    result: MetricResult,
-    target_value: float | None,
-    score: float,
-) -> str:
-    existing = frappe.db.get_value(
-        "Performance Metric Snapshot",
-        {
-            "employee": employee,
-            "metric": metric_code,
-            "appraisal_cycle": appraisal_cycle,
-        },
-        "name",
-    )
+def _run_metric_batch(metric_doc, employees, from_date: str | None, to_date: str | None) -> dict[str, MetricResult]:
+    """One metric for every employee, through its batch form when it has one."""
+    code = metric_doc.get("metric_code") or metric_doc.get("name")
+    source_type = metric_doc.get("source_type") or "Builtin"
+    unit = metric_doc.get("unit") or ""
 
-    user_id = frappe.db.get_value("Employee", employee, "user_id")
-    if user_id and not frappe.db.exists("User", user_id):
-        user_id = None
-    payload = {
-        "employee": employee,
-        "user": user_id,
-        "metric": metric_code,
-        "appraisal_cycle": appraisal_cycle,
-        "from_date": from_date,
-        "to_date": to_date,
-        "value": float(result.value or 0.0),
-        "value_display": result.display or format_display(result.value or 0.0, result.unit or ""),
-        "target_value": float(target_value or 0.0),
-        "score_0_100": float(score or 0.0),
-        "last_computed_on": now_datetime(),
-        "compute_status": result.status,
-        "error_message": result.error or "",
+    if source_type == "Manual":
+        return {employee: MetricResult(status="No Data", unit=unit) for employee in employees}
+
+    fn = BATCH_REGISTRY.get("generic.doc_query" if source_type == "Doc Query" else code)
+    if not fn:
+        return {employee: _run_metric(metric_doc, employee, from_date, to_date) for employee in employees}
+
+    try:
+        return fn(list(employees), from_date, to_date, _params_for_metric(metric_doc))
+    except Exception as exc:
+        frappe.log_error(frappe.get_traceback(), f"Metric compute failed: {code}")
+        return {employee: MetricResult(status="Error", error=str(exc), unit=unit) for employee in employees}
+
+
+def _metric_docs(metric_names) -> dict[str, dict]:
+    metric_names = sorted({name for name in metric_names if name})
+    if not metric_names:
+        return {}
+    return {
+        row.name: row
+        for row in frappe.get_all(
+            "Performance Metric",
+            filters={"name": ["in", metric_names]},
+            fields=["name", *METRIC_FIELDS],
+            limit_page_length=0,
+        )
+        if row.get("metric_code")
     }
 
-    if existing:
-        doc = frappe.get_doc("Performance Metric Snapshot", existing)
-        doc.update(payload)
-        doc.flags.ignore_permissions = True
-        doc.save(ignore_permissions=True)
-        return doc.name
 
-    payload["doctype"] = "Performance Metric Snapshot"
-    doc = frappe.get_doc(payload)
-    doc.flags.ignore_permissions = True
-    doc.insert(ignore_permissions=True)
-    return doc.name
+def _recompute_snapshots(appraisal_cycle: str, profiles: dict[str, dict]) -> dict[str, list[dict]]:
+    """Recompute every profile metric of every employee with one pass per metric."""
+    from_date, to_date = _cycle_window(appraisal_cycle)
+    rows_by_employee = {
+        employee: [row for row in _profile_metrics(profile_doc) if row.get("metric")]
+        for employee, profile_doc in profiles.items()
+    }
+    metric_docs = _metric_docs(row.get("metric") for rows in rows_by_employee.values() for row in rows)
+
+    employees_by_metric: dict[str, dict[str, None]] = {}
+    for employee, rows in rows_by_employee.items():
+        for row in rows:
+            if row.get("metric") in metric_docs:
+                employees_by_metric.setdefault(row.get("metric"), {})[employee] = None
+    results = {
+        metric: _run_metric_batch(metric_docs[metric], list(employees), from_date, to_date)
+        for metric, employees in employees_by_metric.items()
+    }
+
+    entries = []
+    for employee, rows in rows_by_employee.items():
+        for row in rows:
+            metric_doc = metric_docs.get(row.get("metric"))
+            if not metric_doc:
+                continue
+            result = results[row.get("metric")][employee]
+            target = row.get("target_value") or metric_doc.get("default_target") or 0.0
+            score = normalise_score(
+                result.value or 0.0,
+                target,
+                direction=metric_doc.get("direction") or "Higher is better",
+                curve=metric_doc.get("score_curve") or "Linear",
+            )
+            if result.status != "Computed":
+                score = 0.0
+            entries.append(
+                {
+                    "employee": employee,
+                    "metric": metric_doc.get("metric_code"),
+                    "result": result,
+                    "target_value": target,
+                    "score": score,
+                }
+            )
+
+    names = _bulk_upsert_snapshots(appraisal_cycle, from_date, to_date, entries)
+    written: dict[str, list[dict]] = {employee: [] for employee in profiles}
+    for entry, name in zip(entries, names):
+        written[entry["employee"]].append({"snapshot": name, "metric": entry["metric"], "score": entry["score"]})
+    return written
+
+
+def _bulk_upsert_snapshots(appraisal_cycle: str, from_date, to_date, entries: list[dict]) -> list[str]:
+    """Write one snapshot per entry: a bulk update for existing rows, a bulk insert for new ones.
+
+    Returns the snapshot names in entry order.
+    """
+    if not entries:
+        return []
+    employees = sorted({entry["employee"] for entry in entries})
+    existing = {
+        (row.employee, row.metric): row.name
+        for row in frappe.get_all(
+            SNAPSHOT_DOCTYPE,
+            filters={"appraisal_cycle": appraisal_cycle, "employee": ["in", employees]},
+            fields=["name", "employee", "metric"],
+            limit_page_length=0,
+        )
+    }
+    user_ids = {
+        row.name: row.user_id
+        for row in frappe.get_all(
+            "Employee",
+            filters={"name": ["in", employees]},
+            fields=["name", "user_id"],
+            limit_page_length=0,
+        )
+        if row.user_id
+    }
+    known_users = set()
+    if user_ids:
+        known_users = set(
+            frappe.get_all(
+                "User",
+                filters={"name": ["in", sorted(set(user_ids.values()))]},
+                pluck="name",
+                limit_page_length=0,
+            )
+        )
+
+    timestamp = now_datetime()
+    updates: dict[str, dict] = {}
+    inserts: dict[tuple, dict] = {}
+    names = []
+    for entry in entries:
+        result = entry["result"]
+        user_id = user_ids.get(entry["employee"])
+        payload = {
+            "employee": entry["employee"],
+            "user": user_id if user_id in known_users else None,
+            "metric": entry["metric"],
+            "appraisal_cycle": appraisal_cycle,
+            "from_date": from_date,
+            "to_date": to_date,
+            "value": float(result.value or 0.0),
+            "value_display": result.display or format_display(result.value or 0.0, result.unit or ""),
+            "target_value": float(entry["target_value"] or 0.0),
+            "score_0_100": float(entry["score"] or 0.0),
+            "last_computed_on": timestamp,
+            "compute_status": result.status,
+            "error_message": result.error or "",
+        }
+        key = (entry["employee"], entry["metric"])
+        if key not in existing:
+            from frappe.model.naming import make_autoname
+
+            existing[key] = make_autoname(SNAPSHOT_SERIES, SNAPSHOT_DOCTYPE)
+            inserts[key] = {"name": existing[key]}
+        if key in inserts:
+            inserts[key].update(payload)
+        else:
+            updates[existing[key]] = payload
+        names.append(existing[key])
+
+    if updates:
+        frappe.db.bulk_update(SNAPSHOT_DOCTYPE, updates)
+    if inserts:
+        user = frappe.session.user
+        frappe.db.bulk_insert(
+            SNAPSHOT_DOCTYPE,
+            fields=["name", "naming_series", *SNAPSHOT_FIELDS, "creation", "modified", "owner", "modified_by", "docstatus"],
+            values=[
+                (
+                    row["name"],
+                    SNAPSHOT_SERIES,
+                    *(row[field] for field in SNAPSHOT_FIELDS),
+                    timestamp,
+                    timestamp,
+                    user,
+                    user,
+                    0,
+                )
+                for row in inserts.values()
+            ],
+        )
+    return names
 
 
 @frappe.whitelist()
@@ -211,58 +397,8 @@ def recompute_employee_snapshots(employee, appraisal_cycle, profile=None):
     if not profile_doc:
         return {"status": "no_profile", "snapshots": []}
 
-    from_date, to_date = _cycle_window(appraisal_cycle)
-    rows = _profile_metrics(profile_doc)
-    written = []
-    for row in rows:
-        metric_code = row.get("metric")
-        if not metric_code:
-            continue
-        metric_doc = frappe.db.get_value(
-            "Performance Metric",
-            metric_code,
-            [
-                "metric_code",
-                "source_type",
-                "source_doctype",
-                "aggregate",
-                "value_field",
-                "employee_link_field",
-                "filters_json",
-                "unit",
-                "direction",
-                "default_target",
-                "score_curve",
-            ],
-            as_dict=True,
-        )
-        if not metric_doc or not metric_doc.get("metric_code"):
-            continue
-
-        result = _run_metric(metric_doc, employee, from_date, to_date)
-        target = row.get("target_value") or metric_doc.get("default_target") or 0.0
-        score = normalise_score(
-            result.value or 0.0,
-            target,
-            direction=metric_doc.get("direction") or "Higher is better",
-            curve=metric_doc.get("score_curve") or "Linear",
-        )
-        if result.status != "Computed":
-            score = 0.0
-
-        name = _upsert_snapshot(
-            employee=employee,
-            metric_code=metric_doc.get("metric_code"),
-            appraisal_cycle=appraisal_cycle,
-            from_date=from_date,
-            to_date=to_date,
-            result=result,
-            target_value=target,
-            score=score,
-        )
-        written.append({"snapshot": name, "metric": metric_doc.get("metric_code"), "score": score})
-
-    return {"status": "ok", "profile": profile_doc.get("name"), "snapshots": written}
+    written = _recompute_snapshots(appraisal_cycle, {employee: profile_doc})
+    return {"status": "ok", "profile": profile_doc.get("name"), "snapshots": written[employee]}
 
 
 @frappe.whitelist()
@@ -276,12 +412,23 @@ def recompute_cycle(appraisal_cycle, profile=None):
         filters={"parent": appraisal_cycle, "parenttype": "Appraisal Cycle"},
         fields=["employee"],
     )
+    employees = list(dict.fromkeys(app.employee for app in appraisees if app.employee))
+    profiles = _resolve_profiles(profile, employees)
+    written = _recompute_snapshots(appraisal_cycle, profiles)
     summary = []
-    for app in appraisees:
-        if not app.employee:
+    for employee in employees:
+        profile_doc = profiles.get(employee)
+        if not profile_doc:
+            summary.append({"employee": employee, "status": "no_profile", "snapshots": []})
             continue
-        result = recompute_employee_snapshots(app.employee, appraisal_cycle, profile)
-        summary.append({"employee": app.employee, **result})
+        summary.append(
+            {
+                "employee": employee,
+                "status": "ok",
+                "profile": profile_doc.get("name"),
+                "snapshots": written[employee],
+            }
+        )
     return {"status": "ok", "count": len(summary), "items": summary}
 
 
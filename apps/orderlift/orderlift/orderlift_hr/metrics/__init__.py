@@ -1,16 +1,19 @@
 """Performance metric registry.
 
 Importing this package triggers registration of every builtin metric
-into the REGISTRY dict, keyed by `metric_code`.
+into the REGISTRY dict, keyed by `metric_code`. Metrics that can be computed
+for a whole appraisal cycle at once are also in BATCH_REGISTRY.
 """
 
 from __future__ import annotations
 
 from orderlift.orderlift_hr.metrics.base import (
+    BATCH_REGISTRY,
     REGISTRY,
     MetricResult,
     normalise_score,
     register,
+    register_batch,
 )
 
 # Side-effect imports populate REGISTRY.
@@ -23,4 +26,4 @@ from orderlift.orderlift_hr.metrics import (  # noqa: F401
     doc_query,
 )
 
-__all__ = ["REGISTRY", "MetricResult", "normalise_score", "register"]
+__all__ = ["BATCH_REGISTRY", "REGISTRY", "MetricResult", "normalise_score", "register", "register_batch"]
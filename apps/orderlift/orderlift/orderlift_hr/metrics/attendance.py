@@ -2,75 +2,102 @@
 
 from __future__ import annotations
 
-import frappe
-
-from orderlift.orderlift_hr.metrics.base import MetricResult, register
+from orderlift.orderlift_hr.metrics.base import MetricResult, aggregate_by, register_batch, totals_by
 
 
 def _date_filter(field: str, from_date: str, to_date: str):
     return {field: ["between", [from_date, to_date]]}
 
 
-def _attendance_rows(employee, from_date, to_date, fields):
-    return frappe.get_all(
+PRESENT_WEIGHTS = {"Present": 1.0, "Half Day": 0.5, "Work From Home": 1.0}
+
+
+def _attendance_totals(employees, from_date, to_date, aggregates, extra_filters=None, extra_group_fields=()):
+    return aggregate_by(
         "Attendance",
-        filters={
-            "employee": employee,
-            "docstatus": 1,
-            **_date_filter("attendance_date", from_date, to_date),
-        },
-        fields=fields,
-        limit_page_length=0,
+        "employee",
+        employees,
+        {"docstatus": 1, **_date_filter("attendance_date", from_date, to_date), **(extra_filters or {})},
+        aggregates,
+        extra_group_fields,
     )
 
 
-@register("attendance.present_rate")
-def attendance_present_rate(employee, from_date, to_date, params):
-    if not employee:
-        return MetricResult(status="No Data", unit="%")
-    rows = _attendance_rows(employee, from_date, to_date, ["status"])
-    if not rows:
-        return MetricResult(value=0.0, unit="%")
-    weight = 0.0
-    for r in rows:
-        if r.status == "Present":
-            weight += 1.0
-        elif r.status == "Half Day":
-            weight += 0.5
-        elif r.status == "Work From Home":
-            weight += 1.0
-    pct = (weight / len(rows)) * 100.0
-    return MetricResult(value=pct, unit="%", details={"counted": weight, "total": len(rows)})
-
-
-@register("attendance.absent_count")
-def attendance_absent_count(employee, from_date, to_date, params):
-    if not employee:
-        return MetricResult(status="No Data", unit="count")
-    rows = _attendance_rows(employee, from_date, to_date, ["status"])
-    absent = sum(1 for r in rows if r.status == "Absent")
-    return MetricResult(value=float(absent), unit="count")
-
-
-@register("attendance.late_days_count")
-def attendance_late_days_count(employee, from_date, to_date, params):
+def _status_counts(employees, from_date, to_date) -> dict[str, dict[str, int]]:
+    counts: dict[str, dict[str, int]] = {}
+    for row in _attendance_totals(
+        employees, from_date, to_date, {"days": ("count", "name")}, extra_group_fields=("status",)
+    ):
+        counts.setdefault(row.employee, {})[row.status] = row.days
+    return counts
+
+
+def _per_employee(employees, unit: str, build) -> dict[str, MetricResult]:
+    return {
+        employee: build(employee) if employee else MetricResult(status="No Data", unit=unit)
+        for employee in employees
+    }
+
+
+@register_batch("attendance.present_rate")
+def attendance_present_rate(employees, from_date, to_date, params):
+    counts = _status_counts(employees, from_date, to_date)
+
+    def build(employee):
+        statuses = counts.get(employee) or {}
+        total = sum(statuses.values())
+        if not total:
+            return MetricResult(value=0.0, unit="%")
+        weight = sum(PRESENT_WEIGHTS.get(status, 0.0) * days for status, days in statuses.items())
+        pct = (weight / total) * 100.0
+        return MetricResult(value=pct, unit="%", details={"counted": weight, "total": total})
+
+    return _per_employee(employees, "%", build)
+
+
+@register_batch("attendance.absent_count")
+def attendance_absent_count(employees, from_date, to_date, params):
+    counts = _status_counts(employees, from_date, to_date)
+    return _per_employee(
+        employees,
+        "count",
+        lambda employee: MetricResult(value=float((counts.get(employee) or {}).get("Absent", 0)), unit="count"),
+    )
+
+
+@register_batch("attendance.late_days_count")
+def attendance_late_days_count(employees, from_date, to_date, params):
     """Count of attendance days where the employee was marked late.
 
     params.late_minutes_threshold: int (unused; we rely on Attendance.late_entry flag).
     """
-    if not employee:
-        return MetricResult(status="No Data", unit="count")
-    rows = _attendance_rows(employee, from_date, to_date, ["late_entry"])
-    late = sum(1 for r in rows if r.late_entry)
-    return MetricResult(value=float(late), unit="count")
-
-
-@register("attendance.avg_working_hours")
-def attendance_avg_working_hours(employee, from_date, to_date, params):
-    if not employee:
-        return MetricResult(status="No Data", unit="hours")
-    rows = _attendance_rows(employee, from_date, to_date, ["working_hours"])
-    hours = [float(r.working_hours or 0) for r in rows if r.working_hours]
-    if not hours:
-        return MetricResult(value=0.0, unit="hours")
-    return MetricResult(value=sum(hours) / len(hours), unit="hours")
+    totals = totals_by(
+        _attendance_totals(employees, from_date, to_date, {"days": ("count", "name")}, {"late_entry": 1}), "employee"
+    )
+    return _per_employee(
+        employees,
+        "count",
+        lambda employee: MetricResult(value=float((totals.get(employee) or {}).get("days") or 0), unit="count"),
+    )
+
+
+@register_batch("attendance.avg_working_hours")
+def attendance_avg_working_hours(employees, from_date, to_date, params):
+    totals = totals_by(
+        _attendance_totals(
+            employees,
+            from_date,
+            to_date,
+            {"days": ("count", "name"), "hours": ("sum", "working_hours")},
+            {"working_hours": ["!=", 0]},
+        ),
+        "employee",
+    )
+
+    def build(employee):
+        row = totals.get(employee) or {}
+        if not row.get("days"):
+            return MetricResult(value=0.0, unit="hours")
+        return MetricResult(value=float(row.get("hours") or 0) / row.get("days"), unit="hours")
+
+    return _per_employee(employees, "hours", build)
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass, field
 from typing import Callable
 
@@ -19,9 +20,11 @@ class MetricResult:
 
 
 MetricFn = Callable[[str, str, str, dict], MetricResult]
+BatchMetricFn = Callable[[list, str, str, dict], dict]
 
 
 REGISTRY: dict[str, MetricFn] = {}
+BATCH_REGISTRY: dict[str, BatchMetricFn] = {}
 
 
 def register(code: str):
@@ -34,6 +37,28 @@ def register(code: str):
     return _wrap
 
 
+def register_batch(code: str):
+    """Decorator: register a metric computed for many employees at once.
+
+    The function takes ``(employees, from_date, to_date, params)`` and returns
+    ``{employee: MetricResult}``. Registering it also registers the
+    single-employee form under the same code, so both paths share one query.
+    """
+
+    def _wrap(fn: BatchMetricFn) -> BatchMetricFn:
+        BATCH_REGISTRY[code] = fn
+
+        def _single(employee, from_date, to_date, params):
+            return fn([employee], from_date, to_date, params)[employee]
+
+        _single.__name__ = fn.__name__
+        _single.__doc__ = fn.__doc__
+        REGISTRY[code] = _single
+        return fn
+
+    return _wrap
+
+
 def resolve_user(employee: str) -> str | None:
     if not employee:
         return None
@@ -50,6 +75,91 @@ def resolve_sales_persons(employee: str) -> list[str]:
     )
 
 
+def resolve_users(employees) -> dict[str, str]:
+    """Employee -> user_id for every employee that has one, in one query."""
+    names = sorted({employee for employee in employees if employee})
+    if not names:
+        return {}
+    rows = frappe.get_all(
+        "Employee",
+        filters={"name": ["in", names]},
+        fields=["name", "user_id"],
+        limit_page_length=0,
+    )
+    return {row.name: row.user_id for row in rows if row.user_id}
+
+
+def resolve_sales_persons_by_employee(employees) -> dict[str, list[str]]:
+    names = sorted({employee for employee in employees if employee})
+    if not names:
+        return {}
+    sales_persons: dict[str, list[str]] = {}
+    for row in frappe.get_all(
+        "Sales Person",
+        filters={"employee": ["in", names]},
+        fields=["name", "employee"],
+        limit_page_length=0,
+    ):
+        sales_persons.setdefault(row.employee, []).append(row.name)
+    return sales_persons
+
+
+AGGREGATE_FUNCTIONS = ("count", "sum", "avg", "min", "max")
+_FIELDNAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def aggregate_by(doctype, link_field, link_values, filters, aggregates, extra_group_fields=()) -> list:
+    """One GROUP BY query over every ``link_values`` row of ``doctype``.
+
+    ``aggregates`` maps an alias to a ``(function, field)`` pair, e.g.
+    ``{"count": ("count", "name")}``. Only AGGREGATE_FUNCTIONS over plain field
+    names are accepted; they are passed to ``frappe.get_all`` in its dict form,
+    never as SQL text. Rows carry the link field, any ``extra_group_fields`` and
+    the aliases.
+    """
+    link_values = sorted({value for value in link_values if value})
+    if not link_values:
+        return []
+    group_fields = [link_field, *extra_group_fields]
+    return frappe.get_all(
+        doctype,
+        filters={**filters, link_field: ["in", link_values]},
+        fields=[*group_fields, *(_aggregate_field(alias, *spec) for alias, spec in aggregates.items())],
+        group_by=", ".join(group_fields),
+        limit_page_length=0,
+    )
+
+
+def _aggregate_field(alias: str, function: str, fieldname: str) -> dict:
+    function = (function or "").lower()
+    if function not in AGGREGATE_FUNCTIONS:
+        raise ValueError(f"Unsupported aggregate: {function}")
+    for name in (fieldname, alias):
+        if not _FIELDNAME.match(name or ""):
+            raise ValueError(f"Invalid field name: {name}")
+    return {function.upper(): fieldname, "as": alias}
+
+
+def totals_by(rows, field: str) -> dict:
+    return {row.get(field): row for row in rows}
+
+
+def count_by(doctype, link_field, link_values, filters) -> dict[str, int]:
+    """``{link value: matching row count}`` from one GROUP BY query."""
+    return {
+        row.get(link_field): int(row.get("row_count") or 0)
+        for row in aggregate_by(doctype, link_field, link_values, filters, {"row_count": ("count", "name")})
+    }
+
+
+def per_user(employees, users: dict, unit: str, build) -> dict[str, MetricResult]:
+    """``build(user)`` for each employee with a user, "No Data" for the rest."""
+    return {
+        employee: build(users[employee]) if users.get(employee) else MetricResult(status="No Data", unit=unit)
+        for employee in employees
+    }
+
+
 def normalise_score(
     value: float,
     target: float | None,
@@ -2,12 +2,14 @@
 
 from __future__ import annotations
 
-import frappe
-
 from orderlift.orderlift_hr.metrics.base import (
     MetricResult,
-    register,
-    resolve_user,
+    aggregate_by,
+    count_by,
+    per_user,
+    register_batch,
+    resolve_users,
+    totals_by,
 )
 
 
@@ -18,155 +20,130 @@ def _date_filter(field: str, from_date: str, to_date: str):
 WON_STATUSES = ("Converted", "Closed")
 
 
-@register("crm.opportunities_owned")
-def crm_opportunities_owned(employee, from_date, to_date, params):
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="count")
-    rows = frappe.get_all(
-        "Opportunity",
-        filters={
-            "opportunity_owner": user,
-            **_date_filter("transaction_date", from_date, to_date),
-        },
-        fields=["name"],
-        limit_page_length=0,
-    )
-    return MetricResult(value=float(len(rows)), unit="count")
+def _count_metric(employees, doctype, link_field, filters):
+    users = resolve_users(employees)
+    counts = count_by(doctype, link_field, users.values(), filters)
+    return per_user(employees, users, "count", lambda user: MetricResult(value=float(counts.get(user, 0)), unit="count"))
 
 
-@register("crm.opportunities_won")
-def crm_opportunities_won(employee, from_date, to_date, params):
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="count")
-    rows = frappe.get_all(
-        "Opportunity",
-        filters={
-            "opportunity_owner": user,
-            "status": ["in", WON_STATUSES],
-            **_date_filter("transaction_date", from_date, to_date),
-        },
-        fields=["name"],
-        limit_page_length=0,
+@register_batch("crm.opportunities_owned")
+def crm_opportunities_owned(employees, from_date, to_date, params):
+    return _count_metric(
+        employees, "Opportunity", "opportunity_owner", _date_filter("transaction_date", from_date, to_date)
     )
-    return MetricResult(value=float(len(rows)), unit="count")
 
 
-@register("crm.opportunity_win_rate")
-def crm_opportunity_win_rate(employee, from_date, to_date, params):
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="%")
-    rows = frappe.get_all(
+@register_batch("crm.opportunities_won")
+def crm_opportunities_won(employees, from_date, to_date, params):
+    return _count_metric(
+        employees,
         "Opportunity",
-        filters={
-            "opportunity_owner": user,
-            **_date_filter("transaction_date", from_date, to_date),
-        },
-        fields=["status"],
-        limit_page_length=0,
-    )
-    if not rows:
-        return MetricResult(value=0.0, unit="%")
-    won = sum(1 for r in rows if r.status in WON_STATUSES)
-    return MetricResult(
-        value=(won / len(rows)) * 100.0,
-        unit="%",
-        details={"won": won, "total": len(rows)},
+        "opportunity_owner",
+        {"status": ["in", WON_STATUSES], **_date_filter("transaction_date", from_date, to_date)},
     )
 
 
-@register("crm.pipeline_value")
-def crm_pipeline_value(employee, from_date, to_date, params):
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="\u20ac")
-    rows = frappe.get_all(
+@register_batch("crm.opportunity_win_rate")
+def crm_opportunity_win_rate(employees, from_date, to_date, params):
+    users = resolve_users(employees)
+    by_status: dict[str, dict[str, int]] = {}
+    for row in aggregate_by(
         "Opportunity",
-        filters={
-            "opportunity_owner": user,
-            "status": ["not in", ("Lost", "Closed", "Converted")],
-            **_date_filter("transaction_date", from_date, to_date),
-        },
-        fields=["opportunity_amount"],
-        limit_page_length=0,
+        "opportunity_owner",
+        users.values(),
+        _date_filter("transaction_date", from_date, to_date),
+        {"opportunities": ("count", "name")},
+        extra_group_fields=("status",),
+    ):
+        by_status.setdefault(row.opportunity_owner, {})[row.status] = row.opportunities
+
+    def build(user):
+        statuses = by_status.get(user) or {}
+        total = sum(statuses.values())
+        if not total:
+            return MetricResult(value=0.0, unit="%")
+        won = sum(count for status, count in statuses.items() if status in WON_STATUSES)
+        return MetricResult(
+            value=(won / total) * 100.0,
+            unit="%",
+            details={"won": won, "total": total},
+        )
+
+    return per_user(employees, users, "%", build)
+
+
+@register_batch("crm.pipeline_value")
+def crm_pipeline_value(employees, from_date, to_date, params):
+    users = resolve_users(employees)
+    totals = totals_by(
+        aggregate_by(
+            "Opportunity",
+            "opportunity_owner",
+            users.values(),
+            {
+                "status": ["not in", ("Lost", "Closed", "Converted")],
+                **_date_filter("transaction_date", from_date, to_date),
+            },
+            {"amount": ("sum", "opportunity_amount")},
+        ),
+        "opportunity_owner",
+    )
+    return per_user(
+        employees,
+        users,
+        "\u20ac",
+        lambda user: MetricResult(value=float((totals.get(user) or {}).get("amount") or 0), unit="\u20ac"),
     )
-    total = sum(float(r.opportunity_amount or 0) for r in rows)
-    return MetricResult(value=total, unit="\u20ac")
 
 
-@register("crm.campaign_targets_assigned")
-def crm_campaign_targets_assigned(employee, from_date, to_date, params):
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="count")
-    rows = frappe.get_all(
-        "Partner Campaign Target",
-        filters={
-            "assigned_to": user,
-            **_date_filter("creation", from_date, to_date),
-        },
-        fields=["name"],
-        limit_page_length=0,
+@register_batch("crm.campaign_targets_assigned")
+def crm_campaign_targets_assigned(employees, from_date, to_date, params):
+    return _count_metric(
+        employees, "Partner Campaign Target", "assigned_to", _date_filter("creation", from_date, to_date)
     )
-    return MetricResult(value=float(len(rows)), unit="count")
 
 
-@register("crm.campaign_targets_contacted")
-def crm_campaign_targets_contacted(employee, from_date, to_date, params):
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="count")
-    rows = frappe.get_all(
+@register_batch("crm.campaign_targets_contacted")
+def crm_campaign_targets_contacted(employees, from_date, to_date, params):
+    return _count_metric(
+        employees,
         "Partner Campaign Target",
-        filters={
-            "assigned_to": user,
-            "last_contact_date": ["between", [from_date, to_date]],
-        },
-        fields=["name"],
-        limit_page_length=0,
+        "assigned_to",
+        {"last_contact_date": ["between", [from_date, to_date]]},
     )
-    return MetricResult(value=float(len(rows)), unit="count")
 
 
-@register("crm.campaign_targets_visited")
-def crm_campaign_targets_visited(employee, from_date, to_date, params):
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="count")
-    rows = frappe.get_all(
+@register_batch("crm.campaign_targets_visited")
+def crm_campaign_targets_visited(employees, from_date, to_date, params):
+    return _count_metric(
+        employees,
         "Partner Campaign Target",
-        filters={
-            "assigned_to": user,
-            "visit_date": ["between", [from_date, to_date]],
-            "visit_status": "Done",
-        },
-        fields=["name"],
-        limit_page_length=0,
+        "assigned_to",
+        {"visit_date": ["between", [from_date, to_date]], "visit_status": "Done"},
     )
-    return MetricResult(value=float(len(rows)), unit="count")
 
 
-@register("crm.contact_rate")
-def crm_contact_rate(employee, from_date, to_date, params):
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="%")
-    assigned = frappe.get_all(
+@register_batch("crm.contact_rate")
+def crm_contact_rate(employees, from_date, to_date, params):
+    users = resolve_users(employees)
+    filters = _date_filter("creation", from_date, to_date)
+    assigned = count_by("Partner Campaign Target", "assigned_to", users.values(), filters)
+    contacted = count_by(
         "Partner Campaign Target",
-        filters={
-            "assigned_to": user,
-            **_date_filter("creation", from_date, to_date),
-        },
-        fields=["last_contact_date"],
-        limit_page_length=0,
-    )
-    if not assigned:
-        return MetricResult(value=0.0, unit="%")
-    contacted = sum(1 for r in assigned if r.last_contact_date)
-    return MetricResult(
-        value=(contacted / len(assigned)) * 100.0,
-        unit="%",
-        details={"contacted": contacted, "assigned": len(assigned)},
+        "assigned_to",
+        users.values(),
+        {**filters, "last_contact_date": ["is", "set"]},
     )
+
+    def build(user):
+        total = assigned.get(user, 0)
+        if not total:
+            return MetricResult(value=0.0, unit="%")
+        reached = contacted.get(user, 0)
+        return MetricResult(
+            value=(reached / total) * 100.0,
+            unit="%",
+            details={"contacted": reached, "assigned": total},
+        )
+
+    return per_user(employees, users, "%", build)
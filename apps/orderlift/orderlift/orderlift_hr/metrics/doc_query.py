@@ -12,11 +12,13 @@ Configuration comes from the Performance Metric definition:
 from __future__ import annotations
 
 import json
-from statistics import mean
-
-import frappe
-
-from orderlift.orderlift_hr.metrics.base import MetricResult, register, resolve_user
+from orderlift.orderlift_hr.metrics.base import (
+    MetricResult,
+    aggregate_by,
+    register_batch,
+    resolve_users,
+    totals_by,
+)
 
 
 def _parse_filters(raw):
@@ -31,8 +33,11 @@ def _parse_filters(raw):
     return parsed if isinstance(parsed, dict) else {}
 
 
-@register("generic.doc_query")
-def generic_doc_query(employee, from_date, to_date, params):
+SQL_AGGREGATES = ("sum", "avg", "min", "max")
+
+
+@register_batch("generic.doc_query")
+def generic_doc_query(employees, from_date, to_date, params):
     params = params or {}
     doctype = params.get("source_doctype")
     aggregate = (params.get("aggregate") or "count").lower()
@@ -40,45 +45,61 @@ def generic_doc_query(employee, from_date, to_date, params):
     employee_link_field = params.get("employee_link_field") or "owner"
     date_field = params.get("date_field") or "creation"
     unit = params.get("unit") or ("count" if aggregate == "count" else "")
-    if not doctype:
-        return MetricResult(status="Error", error="source_doctype missing", unit=unit)
 
-    user = resolve_user(employee)
-    link_value = user if employee_link_field in ("owner", "modified_by") else (
-        user or employee
-    )
+    def _every(result):
+        return {employee: result for employee in employees}
+
+    if not doctype:
+        return _every(MetricResult(status="Error", error="source_doctype missing", unit=unit))
+    if aggregate != "count" and not value_field:
+        return _every(MetricResult(status="Error", error="value_field required", unit=unit))
+
+    users = resolve_users(employees)
+    link_values = {
+        employee: users.get(employee)
+        if employee_link_field in ("owner", "modified_by")
+        else (users.get(employee) or employee)
+        for employee in employees
+    }
 
     filters = _parse_filters(params.get("filters_json"))
-    filters[employee_link_field] = link_value
+    filters.pop(employee_link_field, None)
     if from_date and to_date:
         filters[date_field] = ["between", [from_date, to_date]]
 
-    fields = ["name"]
-    if aggregate != "count" and value_field:
-        fields.append(value_field)
+    aggregates = {"row_count": ("count", "name")}
+    if aggregate in SQL_AGGREGATES:
+        # NULL values count as 0, so min/max also need the non-null count.
+        aggregates["valued_count"] = ("count", value_field)
+        aggregates["total"] = ("sum", value_field)
+        if aggregate in ("min", "max"):
+            aggregates["extreme"] = (aggregate, value_field)
 
     try:
-        rows = frappe.get_all(doctype, filters=filters, fields=fields, limit_page_length=0)
+        totals = totals_by(
+            aggregate_by(doctype, employee_link_field, link_values.values(), filters, aggregates),
+            employee_link_field,
+        )
     except Exception as exc:
-        return MetricResult(status="Error", error=str(exc), unit=unit)
-
-    if aggregate == "count":
-        return MetricResult(value=float(len(rows)), unit=unit or "count")
-
-    if not value_field:
-        return MetricResult(status="Error", error="value_field required", unit=unit)
-
-    numbers = [float(getattr(r, value_field, None) or 0.0) for r in rows]
-    if not numbers:
-        return MetricResult(value=0.0, unit=unit)
-
-    if aggregate == "sum":
-        return MetricResult(value=sum(numbers), unit=unit)
-    if aggregate == "avg":
-        return MetricResult(value=mean(numbers), unit=unit)
-    if aggregate == "min":
-        return MetricResult(value=min(numbers), unit=unit)
-    if aggregate == "max":
-        return MetricResult(value=max(numbers), unit=unit)
-
-    return MetricResult(status="Error", error=f"Unsupported aggregate: {aggregate}", unit=unit)
+        return _every(MetricResult(status="Error", error=str(exc), unit=unit))
+
+    def build(link_value):
+        row = totals.get(link_value) if link_value else None
+        rows = int((row or {}).get("row_count") or 0)
+        if aggregate == "count":
+            return MetricResult(value=float(rows), unit=unit or "count")
+        if not rows:
+            return MetricResult(value=0.0, unit=unit)
+        total = float(row.get("total") or 0.0)
+        if aggregate == "sum":
+            return MetricResult(value=total, unit=unit)
+        if aggregate == "avg":
+            return MetricResult(value=total / rows, unit=unit)
+        if aggregate in ("min", "max"):
+            values = [float(row.get("extreme") or 0.0)]
+            if int(row.get("valued_count") or 0) < rows:
+                values.append(0.0)
+            return MetricResult(value=min(values) if aggregate == "min" else max(values), unit=unit)
+        return MetricResult(status="Error", error=f"Unsupported aggregate: {aggregate}", unit=unit)
+
+    return {employee: build(link_values[employee]) for employee in employees}
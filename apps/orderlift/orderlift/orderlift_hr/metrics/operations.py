@@ -6,9 +6,11 @@ import frappe
 
 from orderlift.orderlift_hr.metrics.base import (
     MetricResult,
+    count_by,
     hours_between,
-    register,
-    resolve_user,
+    per_user,
+    register_batch,
+    resolve_users,
 )
 
 
@@ -16,61 +18,46 @@ def _date_filter(field: str, from_date: str, to_date: str):
     return {field: ["between", [from_date, to_date]]}
 
 
-@register("ops.qc_items_verified")
-def ops_qc_items_verified(employee, from_date, to_date, params):
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="count")
-    rows = frappe.get_all(
-        "Installation QC Item",
-        filters={
-            "verified_by": user,
-            "is_verified": 1,
-            **_date_filter("verified_on", from_date, to_date),
-        },
-        fields=["name"],
-        limit_page_length=0,
-    )
-    return MetricResult(value=float(len(rows)), unit="count")
+def _verified_filters(from_date: str, to_date: str):
+    return {"is_verified": 1, **_date_filter("verified_on", from_date, to_date)}
 
 
-@register("ops.qc_avg_verification_hours")
-def ops_qc_avg_verification_hours(employee, from_date, to_date, params):
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="hours")
-    rows = frappe.get_all(
-        "Installation QC Item",
-        filters={
-            "verified_by": user,
-            "is_verified": 1,
-            **_date_filter("verified_on", from_date, to_date),
-        },
-        fields=["creation", "verified_on"],
-        limit_page_length=0,
-    )
-    deltas = []
+@register_batch("ops.qc_items_verified")
+def ops_qc_items_verified(employees, from_date, to_date, params):
+    users = resolve_users(employees)
+    counts = count_by("Installation QC Item", "verified_by", users.values(), _verified_filters(from_date, to_date))
+    return per_user(employees, users, "count", lambda user: MetricResult(value=float(counts.get(user, 0)), unit="count"))
+
+
+@register_batch("ops.qc_avg_verification_hours")
+def ops_qc_avg_verification_hours(employees, from_date, to_date, params):
+    users = resolve_users(employees)
+    verifiers = sorted(set(users.values()))
+    rows = []
+    if verifiers:
+        rows = frappe.get_all(
+            "Installation QC Item",
+            filters={"verified_by": ["in", verifiers], **_verified_filters(from_date, to_date)},
+            fields=["verified_by", "creation", "verified_on"],
+            limit_page_length=0,
+        )
+    deltas: dict[str, list[float]] = {}
     for r in rows:
         h = hours_between(r.creation, r.verified_on)
         if h > 0:
-            deltas.append(h)
-    if not deltas:
-        return MetricResult(value=0.0, unit="hours")
-    return MetricResult(value=sum(deltas) / len(deltas), unit="hours")
+            deltas.setdefault(r.verified_by, []).append(h)
+
+    def build(user):
+        values = deltas.get(user)
+        if not values:
+            return MetricResult(value=0.0, unit="hours")
+        return MetricResult(value=sum(values) / len(values), unit="hours")
+
+    return per_user(employees, users, "hours", build)
 
 
-@register("ops.projects_owned")
-def ops_projects_owned(employee, from_date, to_date, params):
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="count")
-    rows = frappe.get_all(
-        "Project",
-        filters={
-            "owner": user,
-            **_date_filter("creation", from_date, to_date),
-        },
-        fields=["name"],
-        limit_page_length=0,
-    )
-    return MetricResult(value=float(len(rows)), unit="count")
+@register_batch("ops.projects_owned")
+def ops_projects_owned(employees, from_date, to_date, params):
+    users = resolve_users(employees)
+    counts = count_by("Project", "owner", users.values(), _date_filter("creation", from_date, to_date))
+    return per_user(employees, users, "count", lambda user: MetricResult(value=float(counts.get(user, 0)), unit="count"))
@@ -8,256 +8,260 @@ import frappe
 
 from orderlift.orderlift_hr.metrics.base import (
     MetricResult,
+    aggregate_by,
+    count_by,
     hours_between,
-    register,
-    resolve_sales_persons,
-    resolve_user,
+    per_user,
+    register_batch,
+    resolve_sales_persons_by_employee,
+    resolve_users,
+    totals_by,
 )
 
 
+ORDERED_QUOTATION_STATUSES = ("Ordered", "Partially Ordered")
+
+
 def _date_filter(field: str, from_date: str, to_date: str):
     return {field: ["between", [from_date, to_date]]}
 
 
-@register("sales.so_count")
-def sales_so_count(employee, from_date, to_date, params):
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="count")
-    rows = frappe.get_all(
-        "Sales Order",
-        filters={
-            "owner": user,
-            "docstatus": 1,
-            **_date_filter("transaction_date", from_date, to_date),
-        },
-        fields=["name"],
-        limit_page_length=0,
-    )
-    return MetricResult(value=float(len(rows)), unit="count")
+def _submitted_filters(from_date: str, to_date: str):
+    return {"docstatus": 1, **_date_filter("transaction_date", from_date, to_date)}
 
 
-@register("sales.so_total_amount")
-def sales_so_total_amount(employee, from_date, to_date, params):
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="\u20ac")
-    rows = frappe.get_all(
-        "Sales Order",
-        filters={
-            "owner": user,
-            "docstatus": 1,
-            **_date_filter("transaction_date", from_date, to_date),
-        },
-        fields=["grand_total"],
-        limit_page_length=0,
+def _submitted_totals(doctype, users, from_date, to_date, aggregates, extra_group_fields=()) -> list:
+    return aggregate_by(
+        doctype, "owner", users.values(), _submitted_filters(from_date, to_date), aggregates, extra_group_fields
     )
-    total = sum(float(r.grand_total or 0) for r in rows)
-    return MetricResult(value=total, unit="\u20ac")
 
 
-@register("sales.so_avg_value")
-def sales_so_avg_value(employee, from_date, to_date, params):
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="\u20ac")
-    rows = frappe.get_all(
-        "Sales Order",
-        filters={
-            "owner": user,
-            "docstatus": 1,
-            **_date_filter("transaction_date", from_date, to_date),
-        },
-        fields=["grand_total"],
-        limit_page_length=0,
-    )
-    if not rows:
-        return MetricResult(value=0.0, unit="\u20ac")
-    amounts = [float(r.grand_total or 0) for r in rows]
-    return MetricResult(value=sum(amounts) / len(amounts), unit="\u20ac")
+@register_batch("sales.so_count")
+def sales_so_count(employees, from_date, to_date, params):
+    users = resolve_users(employees)
+    counts = count_by("Sales Order", "owner", users.values(), _submitted_filters(from_date, to_date))
+    return per_user(employees, users, "count", lambda user: MetricResult(value=float(counts.get(user, 0)), unit="count"))
 
 
-@register("sales.quotation_count")
-def sales_quotation_count(employee, from_date, to_date, params):
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="count")
-    rows = frappe.get_all(
-        "Quotation",
-        filters={
-            "owner": user,
-            "docstatus": 1,
-            **_date_filter("transaction_date", from_date, to_date),
-        },
-        fields=["name"],
-        limit_page_length=0,
+@register_batch("sales.so_total_amount")
+def sales_so_total_amount(employees, from_date, to_date, params):
+    users = resolve_users(employees)
+    totals = totals_by(
+        _submitted_totals("Sales Order", users, from_date, to_date, {"amount": ("sum", "grand_total")}), "owner"
+    )
+    return per_user(
+        employees,
+        users,
+        "\u20ac",
+        lambda user: MetricResult(value=float((totals.get(user) or {}).get("amount") or 0), unit="\u20ac"),
     )
-    return MetricResult(value=float(len(rows)), unit="count")
 
 
-@register("sales.quotation_total_amount")
-def sales_quotation_total_amount(employee, from_date, to_date, params):
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="\u20ac")
-    rows = frappe.get_all(
-        "Quotation",
-        filters={
-            "owner": user,
-            "docstatus": 1,
-            **_date_filter("transaction_date", from_date, to_date),
-        },
-        fields=["grand_total"],
-        limit_page_length=0,
+@register_batch("sales.so_avg_value")
+def sales_so_avg_value(employees, from_date, to_date, params):
+    users = resolve_users(employees)
+    totals = totals_by(
+        _submitted_totals(
+            "Sales Order", users, from_date, to_date, {"orders": ("count", "name"), "amount": ("sum", "grand_total")}
+        ),
+        "owner",
     )
-    total = sum(float(r.grand_total or 0) for r in rows)
-    return MetricResult(value=total, unit="\u20ac")
 
+    def build(user):
+        row = totals.get(user) or {}
+        if not row.get("orders"):
+            return MetricResult(value=0.0, unit="\u20ac")
+        return MetricResult(value=float(row.get("amount") or 0) / row.get("orders"), unit="\u20ac")
 
-@register("sales.conversion_rate")
-def sales_conversion_rate(employee, from_date, to_date, params):
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="%")
+    return per_user(employees, users, "\u20ac", build)
 
-    quotations = frappe.get_all(
-        "Quotation",
-        filters={
-            "owner": user,
-            "docstatus": 1,
-            **_date_filter("transaction_date", from_date, to_date),
-        },
-        fields=["name", "status"],
-        limit_page_length=0,
+
+@register_batch("sales.quotation_count")
+def sales_quotation_count(employees, from_date, to_date, params):
+    users = resolve_users(employees)
+    counts = count_by("Quotation", "owner", users.values(), _submitted_filters(from_date, to_date))
+    return per_user(employees, users, "count", lambda user: MetricResult(value=float(counts.get(user, 0)), unit="count"))
+
+
+@register_batch("sales.quotation_total_amount")
+def sales_quotation_total_amount(employees, from_date, to_date, params):
+    users = resolve_users(employees)
+    totals = totals_by(
+        _submitted_totals("Quotation", users, from_date, to_date, {"amount": ("sum", "grand_total")}), "owner"
+    )
+    return per_user(
+        employees,
+        users,
+        "\u20ac",
+        lambda user: MetricResult(value=float((totals.get(user) or {}).get("amount") or 0), unit="\u20ac"),
     )
-    total_q = len(quotations)
-    if not total_q:
-        return MetricResult(value=0.0, unit="%")
-    ordered = sum(1 for q in quotations if q.status in ("Ordered", "Partially Ordered"))
-    pct = (ordered / total_q) * 100.0
-    return MetricResult(value=pct, unit="%", details={"ordered": ordered, "total": total_q})
 
 
-def _quotation_speeds(user, from_date, to_date) -> list[float]:
+@register_batch("sales.conversion_rate")
+def sales_conversion_rate(employees, from_date, to_date, params):
+    users = resolve_users(employees)
+    by_status: dict[str, dict[str, int]] = {}
+    for row in _submitted_totals(
+        "Quotation", users, from_date, to_date, {"quotations": ("count", "name")}, extra_group_fields=("status",)
+    ):
+        by_status.setdefault(row.owner, {})[row.status] = row.quotations
+
+    def build(user):
+        statuses = by_status.get(user) or {}
+        total_q = sum(statuses.values())
+        if not total_q:
+            return MetricResult(value=0.0, unit="%")
+        ordered = sum(count for status, count in statuses.items() if status in ORDERED_QUOTATION_STATUSES)
+        pct = (ordered / total_q) * 100.0
+        return MetricResult(value=pct, unit="%", details={"ordered": ordered, "total": total_q})
+
+    return per_user(employees, users, "%", build)
+
+
+def _quotation_speeds(users, from_date, to_date) -> dict[str, list[float]]:
+    """Positive creation -> last-modified hours of each user's submitted Quotations."""
+    owners = sorted({user for user in users if user})
+    if not owners:
+        return {}
     rows = frappe.get_all(
         "Quotation",
-        filters={
-            "owner": user,
-            "docstatus": 1,
-            **_date_filter("transaction_date", from_date, to_date),
-        },
-        fields=["creation", "modified"],
+        filters={"owner": ["in", owners], **_submitted_filters(from_date, to_date)},
+        fields=["owner", "creation", "modified"],
         limit_page_length=0,
     )
-    speeds = []
+    speeds: dict[str, list[float]] = {}
     for r in rows:
         h = hours_between(r.creation, r.modified)
         if h > 0:
-            speeds.append(h)
+            speeds.setdefault(r.owner, []).append(h)
     return speeds
 
 
-@register("sales.quotation_speed_avg")
-def sales_quotation_speed_avg(employee, from_date, to_date, params):
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="hours")
-    speeds = _quotation_speeds(user, from_date, to_date)
-    if not speeds:
-        return MetricResult(value=0.0, unit="hours")
-    return MetricResult(value=sum(speeds) / len(speeds), unit="hours")
+@register_batch("sales.quotation_speed_avg")
+def sales_quotation_speed_avg(employees, from_date, to_date, params):
+    users = resolve_users(employees)
+    speeds = _quotation_speeds(users.values(), from_date, to_date)
+
+    def build(user):
+        values = speeds.get(user)
+        if not values:
+            return MetricResult(value=0.0, unit="hours")
+        return MetricResult(value=sum(values) / len(values), unit="hours")
+
+    return per_user(employees, users, "hours", build)
 
 
-@register("sales.quotation_speed_median")
-def sales_quotation_speed_median(employee, from_date, to_date, params):
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="hours")
-    speeds = _quotation_speeds(user, from_date, to_date)
-    if not speeds:
-        return MetricResult(value=0.0, unit="hours")
-    return MetricResult(value=statistics.median(speeds), unit="hours")
+@register_batch("sales.quotation_speed_median")
+def sales_quotation_speed_median(employees, from_date, to_date, params):
+    users = resolve_users(employees)
+    speeds = _quotation_speeds(users.values(), from_date, to_date)
 
+    def build(user):
+        values = speeds.get(user)
+        if not values:
+            return MetricResult(value=0.0, unit="hours")
+        return MetricResult(value=statistics.median(values), unit="hours")
 
-@register("sales.time_to_close_days")
-def sales_time_to_close_days(employee, from_date, to_date, params):
+    return per_user(employees, users, "hours", build)
+
+
+@register_batch("sales.time_to_close_days")
+def sales_time_to_close_days(employees, from_date, to_date, params):
     """Avg days from a user-owned Quotation submit to its Sales Order submit."""
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="days")
-    so_rows = frappe.get_all(
-        "Sales Order",
-        filters={
-            "owner": user,
-            "docstatus": 1,
-            **_date_filter("transaction_date", from_date, to_date),
-        },
-        fields=["name", "creation"],
-        limit_page_length=0,
-    )
-    if not so_rows:
-        return MetricResult(value=0.0, unit="days")
-    deltas = []
-    for so in so_rows:
-        quote_rows = frappe.get_all(
-            "Sales Order Item",
-            filters={"parent": so.name, "prevdoc_docname": ["!=", ""]},
-            fields=["prevdoc_docname"],
-            limit_page_length=1,
+    users = resolve_users(employees)
+    owners = sorted(set(users.values()))
+    so_rows = []
+    if owners:
+        so_rows = frappe.get_all(
+            "Sales Order",
+            filters={"owner": ["in", owners], **_submitted_filters(from_date, to_date)},
+            fields=["name", "owner", "creation"],
+            limit_page_length=0,
         )
-        if not quote_rows or not quote_rows[0].prevdoc_docname:
-            continue
-        q_creation = frappe.db.get_value("Quotation", quote_rows[0].prevdoc_docname, "creation")
+    source_quotations: dict[str, str] = {}
+    if so_rows:
+        for item in frappe.get_all(
+            "Sales Order Item",
+            filters={"parent": ["in", [so.name for so in so_rows]], "prevdoc_docname": ["!=", ""]},
+            fields=["parent", "prevdoc_docname"],
+            order_by="idx asc",
+            limit_page_length=0,
+        ):
+            if item.prevdoc_docname:
+                source_quotations.setdefault(item.parent, item.prevdoc_docname)
+    quotation_creation = {}
+    if source_quotations:
+        quotation_creation = {
+            row.name: row.creation
+            for row in frappe.get_all(
+                "Quotation",
+                filters={"name": ["in", sorted(set(source_quotations.values()))]},
+                fields=["name", "creation"],
+                limit_page_length=0,
+            )
+        }
+    deltas: dict[str, list[float]] = {}
+    for so in so_rows:
+        q_creation = quotation_creation.get(source_quotations.get(so.name))
         if not q_creation:
             continue
         delta_hours = hours_between(q_creation, so.creation)
         if delta_hours > 0:
-            deltas.append(delta_hours / 24.0)
-    if not deltas:
-        return MetricResult(value=0.0, unit="days")
-    return MetricResult(value=sum(deltas) / len(deltas), unit="days")
-
-
-@register("sales.commission_total")
-def sales_commission_total(employee, from_date, to_date, params):
-    sales_persons = resolve_sales_persons(employee)
-    if not sales_persons:
-        return MetricResult(value=0.0, unit="\u20ac")
-    rows = frappe.get_all(
-        "Sales Commission",
-        filters={
-            "salesperson": ["in", sales_persons],
-            "status": ["!=", "Cancelled"],
-            **_date_filter("posting_date", from_date, to_date),
-        },
-        fields=["commission_amount"],
-        limit_page_length=0,
+            deltas.setdefault(so.owner, []).append(delta_hours / 24.0)
+
+    def build(user):
+        values = deltas.get(user)
+        if not values:
+            return MetricResult(value=0.0, unit="days")
+        return MetricResult(value=sum(values) / len(values), unit="days")
+
+    return per_user(employees, users, "days", build)
+
+
+@register_batch("sales.commission_total")
+def sales_commission_total(employees, from_date, to_date, params):
+    sales_persons = resolve_sales_persons_by_employee(employees)
+    totals = totals_by(
+        aggregate_by(
+            "Sales Commission",
+            "salesperson",
+            [name for names in sales_persons.values() for name in names],
+            {"status": ["!=", "Cancelled"], **_date_filter("posting_date", from_date, to_date)},
+            {"amount": ("sum", "commission_amount")},
+        ),
+        "salesperson",
     )
-    total = sum(float(r.commission_amount or 0) for r in rows)
-    return MetricResult(value=total, unit="\u20ac")
+    return {
+        employee: MetricResult(
+            value=sum(float((totals.get(name) or {}).get("amount") or 0) for name in sales_persons.get(employee, [])),
+            unit="\u20ac",
+        )
+        for employee in employees
+    }
 
 
-@register("sales.discount_compliance_pct")
-def sales_discount_compliance_pct(employee, from_date, to_date, params):
+@register_batch("sales.discount_compliance_pct")
+def sales_discount_compliance_pct(employees, from_date, to_date, params):
     """Percent of user-owned Quotations where additional_discount_percentage <= max_allowed.
 
     params.max_allowed: float, default 10.0
     """
-    user = resolve_user(employee)
-    if not user:
-        return MetricResult(status="No Data", unit="%")
+    users = resolve_users(employees)
     max_allowed = float((params or {}).get("max_allowed", 10.0))
-    rows = frappe.get_all(
+    totals = count_by("Quotation", "owner", users.values(), _submitted_filters(from_date, to_date))
+    # Counting the breaches keeps quotations without a discount compliant.
+    breaches = count_by(
         "Quotation",
-        filters={
-            "owner": user,
-            "docstatus": 1,
-            **_date_filter("transaction_date", from_date, to_date),
-        },
-        fields=["additional_discount_percentage"],
-        limit_page_length=0,
+        "owner",
+        users.values(),
+        {**_submitted_filters(from_date, to_date), "additional_discount_percentage": [">", max_allowed]},
     )
-    if not rows:
-        return MetricResult(value=100.0, unit="%")
-    compliant = sum(1 for r in rows if (r.additional_discount_percentage or 0) <= max_allowed)
-    return MetricResult(value=(compliant / len(rows)) * 100.0, unit="%")
+
+    def build(user):
+        total = totals.get(user, 0)
+        if not total:
+            return MetricResult(value=100.0, unit="%")
+        compliant = total - breaches.get(user, 0)
+        return MetricResult(value=(compliant / total) * 100.0, unit="%")
+
+    return per_user(employees, users, "%", build)
@@ -2,40 +2,48 @@
 
 from __future__ import annotations
 
-from orderlift.orderlift_hr.api.leaderboard import _compute_employee_score
-from orderlift.orderlift_hr.metrics.base import MetricResult, register
-
-
-@register("training.module_completion_pct")
-def training_module_completion_pct(employee, from_date, to_date, params):
-    if not employee:
-        return MetricResult(status="No Data", unit="%")
-    snap = _compute_employee_score(employee)
-    return MetricResult(
-        value=float(snap.get("module_completion_pct") or 0.0),
-        unit="%",
-        details={
-            "modules_completed": snap.get("modules_completed"),
-            "modules_total": snap.get("modules_total"),
-        },
+from orderlift.orderlift_hr.api.leaderboard import _compute_scores
+from orderlift.orderlift_hr.metrics.base import MetricResult, register_batch
+
+
+def _per_employee(employees, build) -> dict[str, MetricResult]:
+    scores = _compute_scores(employees)
+    return {
+        employee: build(scores[employee]) if employee else MetricResult(status="No Data", unit="%")
+        for employee in employees
+    }
+
+
+@register_batch("training.module_completion_pct")
+def training_module_completion_pct(employees, from_date, to_date, params):
+    return _per_employee(
+        employees,
+        lambda snap: MetricResult(
+            value=float(snap.get("module_completion_pct") or 0.0),
+            unit="%",
+            details={
+                "modules_completed": snap.get("modules_completed"),
+                "modules_total": snap.get("modules_total"),
+            },
+        ),
     )
 
 
-@register("training.quiz_average_pct")
-def training_quiz_average_pct(employee, from_date, to_date, params):
-    if not employee:
-        return MetricResult(status="No Data", unit="%")
-    snap = _compute_employee_score(employee)
-    return MetricResult(value=float(snap.get("quiz_average_pct") or 0.0), unit="%")
+@register_batch("training.quiz_average_pct")
+def training_quiz_average_pct(employees, from_date, to_date, params):
+    return _per_employee(
+        employees,
+        lambda snap: MetricResult(value=float(snap.get("quiz_average_pct") or 0.0), unit="%"),
+    )
 
 
-@register("training.recency_score")
-def training_recency_score(employee, from_date, to_date, params):
-    if not employee:
-        return MetricResult(status="No Data", unit="%")
-    snap = _compute_employee_score(employee)
-    return MetricResult(
-        value=float(snap.get("recent_activity_score") or 0.0),
-        unit="%",
-        details={"last_activity": snap.get("last_activity")},
+@register_batch("training.recency_score")
+def training_recency_score(employees, from_date, to_date, params):
+    return _per_employee(
+        employees,
+        lambda snap: MetricResult(
+            value=float(snap.get("recent_activity_score") or 0.0),
+            unit="%",
+            details={"last_activity": snap.get("last_activity")},
+        ),
     )
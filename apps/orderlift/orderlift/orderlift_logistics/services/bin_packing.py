@@ -0,0 +1,363 @@
+"""Two-dimensional (weight x volume) bin packing for container consolidation.
+
+Shipments are packed with first-fit-decreasing and best-fit-decreasing, once
+per container profile used to open new containers, and the solution with the
+fewest (then cheapest) containers wins. A local search then tries to empty the
+least-filled containers into the others within a time budget, and each
+container is finally downsized to the cheapest profile that still holds its
+load. Profiles are expected in cost-rank order, cheapest first.
+"""
+
+import time
+
+from orderlift.orderlift_logistics.services.capacity_math import (
+    candidate_balance_score,
+    compute_utilization,
+    detect_limiting_factor,
+    round3,
+)
+
+
+DEFAULT_TIME_BUDGET_MS = 250
+EPSILON = 1e-9
+
+
+class _Item:
+    __slots__ = ("index", "payload", "weight", "volume", "size")
+
+    def __init__(self, index, payload, weight, volume):
+        self.index = index
+        self.payload = payload
+        self.weight = weight
+        self.volume = volume
+        self.size = 0.0
+
+
+class _Profile:
+    __slots__ = ("rank", "container", "max_weight", "max_volume")
+
+    def __init__(self, rank, container, max_weight, max_volume):
+        self.rank = rank
+        self.container = container
+        self.max_weight = max_weight
+        self.max_volume = max_volume
+
+    def holds(self, weight, volume):
+        return weight <= self.max_weight + EPSILON and volume <= self.max_volume + EPSILON
+
+
+class _Bin:
+    __slots__ = ("profile", "items", "weight", "volume")
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.items = []
+        self.weight = 0.0
+        self.volume = 0.0
+
+    def fits(self, item):
+        return self.profile.holds(self.weight + item.weight, self.volume + item.volume)
+
+    def slack_after(self, item):
+        return (
+            (self.profile.max_weight - self.weight - item.weight) / self.profile.max_weight
+            + (self.profile.max_volume - self.volume - item.volume) / self.profile.max_volume
+        )
+
+    def fill(self):
+        return max(self.weight / self.profile.max_weight, self.volume / self.profile.max_volume)
+
+    def add(self, item):
+        self.items.append(item)
+        self.weight += item.weight
+        self.volume += item.volume
+
+    def remove(self, item):
+        self.items.remove(item)
+        self.weight -= item.weight
+        self.volume -= item.volume
+
+
+def pack_shipments(
+    shipments,
+    containers,
+    weight_key="total_weight_kg",
+    volume_key="total_volume_m3",
+    time_budget_ms=DEFAULT_TIME_BUDGET_MS,
+    improve=True,
+):
+    """Pack shipments into as few, as cheap containers as possible.
+
+    :param shipments: Iterable of dicts carrying weight and volume under ``weight_key``/``volume_key``
+    :param containers: Container profiles ordered by cost_rank asc (dicts or docs with max_weight_kg/max_volume_m3)
+    :param time_budget_ms: Wall-clock budget for construction and local search
+    :param improve: Run the bin-elimination local search after construction
+    :return: dict with ``bins`` (container, shipments and utilization per container) and
+        ``unplaced`` (shipments no profile can hold)
+    """
+    started = time.monotonic()
+    deadline = started + max(float(time_budget_ms or 0), 0.0) / 1000.0
+    profiles = _profiles(containers)
+    items = [
+        _Item(index, shipment, _flt(shipment.get(weight_key)), _flt(shipment.get(volume_key)))
+        for index, shipment in enumerate(shipments or [])
+    ]
+    placeable = [item for item in items if any(profile.holds(item.weight, item.volume) for profile in profiles)]
+    placeable_ids = {id(item) for item in placeable}
+    unplaced = [item.payload for item in items if id(item) not in placeable_ids]
+
+    best_bins, heuristic = [], ""
+    if placeable:
+        ordered = _decreasing(placeable, profiles)
+        best_key = None
+        for opening in _opening_profiles(profiles):
+            for name, strategy in (("first_fit_decreasing", _first_fit), ("best_fit_decreasing", _best_fit)):
+                if best_key is not None and time.monotonic() > deadline:
+                    break
+                bins = _construct(ordered, profiles, opening, strategy)
+                key = _solution_key(bins, profiles)
+                if best_key is None or key < best_key:
+                    best_bins, best_key, heuristic = bins, key, name
+
+    improved = bool(improve and best_bins and _eliminate_bins(best_bins, deadline))
+    for packed in best_bins:
+        packed.profile = _cheapest_holding_profile(packed, profiles)
+    best_bins.sort(key=lambda packed: (packed.profile.rank, -packed.fill()))
+
+    return {
+        "bins": [_bin_summary(packed) for packed in best_bins],
+        "unplaced": unplaced,
+        "heuristic": heuristic,
+        "improved": improved,
+        "elapsed_ms": round3((time.monotonic() - started) * 1000.0),
+    }
+
+
+def select_shipments(
+    candidates,
+    max_weight_kg,
+    max_volume_m3,
+    weight_key="total_weight_kg",
+    volume_key="total_volume_m3",
+    time_budget_ms=DEFAULT_TIME_BUDGET_MS,
+):
+    """Choose the candidates that fill one container's remaining capacity best.
+
+    Several greedy orderings are tried and the fullest selection is improved by
+    one-for-one swaps within the time budget. Fullness is the utilization of the
+    binding dimension, then the combined utilization.
+
+    :return: dict with ``selected`` and ``rejected`` candidates and the used capacity
+    """
+    started = time.monotonic()
+    deadline = started + max(float(time_budget_ms or 0), 0.0) / 1000.0
+    capacity = _Profile(0, None, _flt(max_weight_kg), _flt(max_volume_m3))
+    items = [
+        _Item(index, candidate, _flt(candidate.get(weight_key)), _flt(candidate.get(volume_key)))
+        for index, candidate in enumerate(candidates or [])
+    ]
+    if capacity.max_weight <= 0 or capacity.max_volume <= 0:
+        return _selection_result([], items, capacity)
+    for item in items:
+        item.size = max(item.weight / capacity.max_weight, item.volume / capacity.max_volume)
+
+    orderings = (
+        lambda item: -candidate_balance_score(item.weight, item.volume, capacity.max_weight, capacity.max_volume),
+        lambda item: -item.size,
+        lambda item: -item.weight,
+        lambda item: -item.volume,
+    )
+    best = None
+    for ordering in orderings:
+        selection = _Bin(capacity)
+        for item in sorted(items, key=lambda item: (ordering(item), item.index)):
+            if selection.fits(item):
+                selection.add(item)
+        if best is None or _fill_key(selection) > _fill_key(best):
+            best = selection
+
+    _improve_selection(best, items, deadline)
+    return _selection_result(best.items, items, capacity)
+
+
+def _profiles(containers):
+    profiles = []
+    for container in containers or []:
+        max_weight = _flt(_value(container, "max_weight_kg"))
+        max_volume = _flt(_value(container, "max_volume_m3"))
+        if max_weight > 0 and max_volume > 0:
+            profiles.append(_Profile(len(profiles), container, max_weight, max_volume))
+    return profiles
+
+
+def _opening_profiles(profiles):
+    # The largest profile minimises the container count; every other profile is
+    # tried too so a cheaper format wins when it needs no more containers.
+    largest = max(profiles, key=lambda profile: (profile.max_weight * profile.max_volume, -profile.rank))
+    return [largest] + [profile for profile in profiles if profile is not largest]
+
+
+def _decreasing(items, profiles):
+    max_weight = max(profile.max_weight for profile in profiles)
+    max_volume = max(profile.max_volume for profile in profiles)
+    for item in items:
+        item.size = max(item.weight / max_weight, item.volume / max_volume)
+    return sorted(items, key=lambda item: (-item.size, -(item.weight / max_weight + item.volume / max_volume), item.index))
+
+
+def _construct(items, profiles, opening, strategy):
+    bins = []
+    open_bins = []
+    min_weight = min(item.weight for item in items)
+    min_volume = min(item.volume for item in items)
+    for item in items:
+        target = strategy(open_bins, item)
+        if target is None:
+            profile = opening if opening.holds(item.weight, item.volume) else _first_holding_profile(profiles, item)
+            target = _Bin(profile)
+            bins.append(target)
+            open_bins.append(target)
+        target.add(item)
+        # A container that cannot take even the smallest shipment is closed.
+        if (
+            target.profile.max_weight - target.weight < min_weight - EPSILON
+            or target.profile.max_volume - target.volume < min_volume - EPSILON
+        ):
+            open_bins.remove(target)
+    return bins
+
+
+def _first_fit(open_bins, item):
+    for candidate in open_bins:
+        if candidate.fits(item):
+            return candidate
+    return None
+
+
+def _best_fit(open_bins, item):
+    best, best_slack = None, None
+    for candidate in open_bins:
+        if candidate.fits(item):
+            slack = candidate.slack_after(item)
+            if best_slack is None or slack < best_slack:
+                best, best_slack = candidate, slack
+    return best
+
+
+def _eliminate_bins(bins, deadline):
+    """Empty the least-filled containers into the others while time allows."""
+    improved = False
+    progress = True
+    while progress and len(bins) > 1 and time.monotonic() < deadline:
+        progress = False
+        for victim in sorted(bins, key=lambda packed: packed.fill()):
+            if time.monotonic() >= deadline:
+                break
+            others = [packed for packed in bins if packed is not victim]
+            moved = []
+            for item in sorted(victim.items, key=lambda item: -item.size):
+                target = _best_fit(others, item)
+                if target is None:
+                    break
+                target.add(item)
+                moved.append((item, target))
+            if len(moved) == len(victim.items):
+                bins.remove(victim)
+                improved = progress = True
+                break
+            for item, target in moved:
+                target.remove(item)
+    return improved
+
+
+def _improve_selection(selection, items, deadline):
+    """Swap one selected shipment for a greedy refill of the free space while it helps."""
+    selected_ids = {id(item) for item in selection.items}
+    progress = True
+    while progress and time.monotonic() < deadline:
+        progress = False
+        current = _fill_key(selection)
+        unselected = sorted((item for item in items if id(item) not in selected_ids), key=lambda item: -item.size)
+        for removed in list(selection.items):
+            if time.monotonic() >= deadline:
+                break
+            selection.remove(removed)
+            added = []
+            for item in unselected:
+                if selection.fits(item):
+                    selection.add(item)
+                    added.append(item)
+            if added and _fill_key(selection) > current:
+                selected_ids.discard(id(removed))
+                selected_ids.update(id(item) for item in added)
+                progress = True
+                break
+            for item in added:
+                selection.remove(item)
+            selection.add(removed)
+
+
+def _fill_key(packed):
+    weight_fill = packed.weight / packed.profile.max_weight
+    volume_fill = packed.volume / packed.profile.max_volume
+    return (round(max(weight_fill, volume_fill), 9), round(weight_fill + volume_fill, 9))
+
+
+def _solution_key(bins, profiles):
+    return (len(bins), sum(_cheapest_holding_profile(packed, profiles).rank for packed in bins))
+
+
+def _cheapest_holding_profile(packed, profiles):
+    for profile in profiles:
+        if profile.holds(packed.weight, packed.volume):
+            return profile
+    return packed.profile
+
+
+def _first_holding_profile(profiles, item):
+    for profile in profiles:
+        if profile.holds(item.weight, item.volume):
+            return profile
+    return None
+
+
+def _bin_summary(packed):
+    utilization = compute_utilization(packed.weight, packed.volume, packed.profile.max_weight, packed.profile.max_volume)
+    return {
+        "container": packed.profile.container,
+        "shipments": [item.payload for item in sorted(packed.items, key=lambda item: item.index)],
+        "total_weight_kg": round3(packed.weight),
+        "total_volume_m3": round3(packed.volume),
+        "weight_utilization_pct": utilization["weight_utilization_pct"],
+        "volume_utilization_pct": utilization["volume_utilization_pct"],
+        "limiting_factor": detect_limiting_factor(
+            utilization["weight_utilization_pct"], utilization["volume_utilization_pct"]
+        ),
+    }
+
+
+def _selection_result(selected, items, capacity):
+    selected_ids = {id(item) for item in selected}
+    used_weight = sum(item.weight for item in selected)
+    used_volume = sum(item.volume for item in selected)
+    return {
+        "selected": [item.payload for item in selected],
+        "rejected": [item.payload for item in items if id(item) not in selected_ids],
+        "used_weight_kg": used_weight,
+        "used_volume_m3": used_volume,
+        "remaining_weight_kg": capacity.max_weight - used_weight,
+        "remaining_volume_m3": capacity.max_volume - used_volume,
+    }
+
+
+def _value(container, key):
+    if isinstance(container, dict):
+        return container.get(key)
+    return getattr(container, key, None)
+
+
+def _flt(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
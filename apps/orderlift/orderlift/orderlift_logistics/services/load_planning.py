@@ -1,6 +1,9 @@
+import math
+
 import frappe
 from frappe.utils import flt, getdate
 
+from orderlift.orderlift_logistics.services.bin_packing import pack_shipments, select_shipments
 from orderlift.orderlift_logistics.services.capacity_math import (
     candidate_pressure,
     candidate_balance_score,
@@ -38,6 +41,10 @@ def _get_packaging_metrics(item_code, qty=0, uom=None, packaging_profile=None):
         qty=qty,
         uom=uom,
     )
+    return _packaging_metrics_from_resolution(resolution, uom=uom)
+
+
+def _packaging_metrics_from_resolution(resolution, uom=None):
     source = resolution.get("resolved_source") or "item_fallback"
     if source == "item_fallback":
         return _empty_packaging_metrics(uom=uom)
@@ -99,16 +106,113 @@ def _get_row_metrics(row, parent_doctype=None, packaging_profile=None):
     )
 
 
+class _PackagingMetricsBatch:
+    """Packaging metrics for many rows, resolved once per (item, profile, uom).
+
+    The resolver is called for one unit of each distinct combination; rows then
+    scale the package count by their own qty the same way the resolver does.
+    """
+
+    def __init__(self):
+        self._unit_resolutions = {}
+
+    def row_metrics(self, row):
+        item_code = getattr(row, "item_code", None)
+        uom = getattr(row, "uom", None) or None
+        if not item_code:
+            return _empty_packaging_metrics(uom=uom)
+        packaging_profile = getattr(row, "custom_packaging_profile", None) or None
+        key = (item_code, packaging_profile, uom)
+        if key not in self._unit_resolutions:
+            self._unit_resolutions[key] = get_packaging_resolution(
+                item_code=item_code,
+                packaging_profile=packaging_profile,
+                qty=1,
+                uom=uom,
+            )
+        resolution = _scale_packaging_resolution(self._unit_resolutions[key], getattr(row, "qty", 0))
+        return _packaging_metrics_from_resolution(resolution, uom=uom)
+
+
+def _scale_packaging_resolution(unit_resolution, qty):
+    if (unit_resolution.get("resolved_source") or "item_fallback") == "item_fallback":
+        # Fallback metrics are empty whatever the qty.
+        return unit_resolution
+    # For one unit, stock_qty is the UOM conversion factor.
+    stock_qty = flt(qty) * flt(unit_resolution.get("stock_qty") or 0)
+    units_per_package = flt(unit_resolution.get("units_per_package") or 0)
+    resolution = dict(unit_resolution)
+    resolution["input_qty"] = flt(qty)
+    resolution["stock_qty"] = stock_qty
+    resolution["package_count"] = math.ceil(stock_qty / units_per_package) if units_per_package > 0 else 0
+    return resolution
+
+
 def compute_delivery_note_totals(delivery_note_name):
     doc = frappe.get_doc("Delivery Note", delivery_note_name)
+    return _delivery_note_totals_from_rows(
+        doc.name,
+        doc.customer,
+        doc.get("custom_destination_zone"),
+        doc.items or [],
+        lambda row: _get_row_metrics(row, parent_doctype="Delivery Note"),
+    )
+
+
+def compute_delivery_note_totals_batch(delivery_note_names):
+    """Totals for many Delivery Notes, keyed by name.
+
+    Item rows are read in one query and packaging is resolved once per distinct
+    (item, profile, uom), so each value matches compute_delivery_note_totals()
+    without loading every Delivery Note document.
+    """
+    names = list(dict.fromkeys(name for name in delivery_note_names or [] if name))
+    if not names:
+        return {}
+
+    headers = frappe.get_all(
+        "Delivery Note",
+        filters={"name": ["in", names]},
+        fields=["name", "customer", "custom_destination_zone"],
+        limit_page_length=0,
+    )
+    item_fields = ["parent", "item_code", "qty", "uom"]
+    if frappe.db.has_column("Delivery Note Item", "custom_packaging_profile"):
+        item_fields.append("custom_packaging_profile")
+    rows_by_parent = {}
+    for row in frappe.get_all(
+        "Delivery Note Item",
+        filters={"parenttype": "Delivery Note", "parent": ["in", names]},
+        fields=item_fields,
+        order_by="parent asc, idx asc",
+        limit_page_length=0,
+    ):
+        rows_by_parent.setdefault(row.parent, []).append(row)
+
+    metrics_batch = _PackagingMetricsBatch()
+    headers_by_name = {header.name: header for header in headers}
+    return {
+        name: _delivery_note_totals_from_rows(
+            name,
+            headers_by_name[name].customer,
+            headers_by_name[name].get("custom_destination_zone"),
+            rows_by_parent.get(name, []),
+            metrics_batch.row_metrics,
+        )
+        for name in names
+        if name in headers_by_name
+    }
+
+
+def _delivery_note_totals_from_rows(delivery_note, customer, destination_zone, rows, get_metrics):
     total_weight_kg = 0.0
     total_volume_m3 = 0.0
     items_summary = []
     missing_data_items = []
 
-    for row in doc.items or []:
+    for row in rows:
         qty = flt(row.qty)
-        metrics = _get_row_metrics(row, parent_doctype="Delivery Note")
+        metrics = get_metrics(row)
         unit_weight_kg = flt(metrics["unit_weight_kg"])
         unit_volume_m3 = flt(metrics["unit_volume_m3"])
 
@@ -141,9 +245,9 @@ def compute_delivery_note_totals(delivery_note_name):
         )
 
     return {
-        "delivery_note": doc.name,
-        "customer": doc.customer,
-        "destination_zone": (doc.get("custom_destination_zone") or "").strip(),
+        "delivery_note": delivery_note,
+        "customer": customer,
+        "destination_zone": (destination_zone or "").strip(),
         "total_weight_kg": round3(total_weight_kg),
         "total_volume_m3": round3(total_volume_m3),
         "items": items_summary,
@@ -515,6 +619,12 @@ def _sort_candidates_by_customer(candidates):
     return result
 
 
+def _fits_capacity(candidate, remaining_weight, remaining_volume):
+    return flt(candidate["total_weight_kg"]) <= flt(remaining_weight) and flt(candidate["total_volume_m3"]) <= flt(
+        remaining_volume
+    )
+
+
 def suggest_shipments_for_load_plan(load_plan):
     if not load_plan.container_profile:
         frappe.throw("Container Profile is required before suggesting shipments.")
@@ -527,22 +637,24 @@ def suggest_shipments_for_load_plan(load_plan):
     used_volume = flt(load_plan.total_volume_m3)
     remaining_weight = max(0, flt(profile.max_weight_kg) - used_weight)
     remaining_volume = max(0, flt(profile.max_volume_m3) - used_volume)
+    free_weight, free_volume = remaining_weight, remaining_volume
 
     candidates = []
     rejected = []
-    for dn in get_planning_candidates(
-        source_type=getattr(load_plan, "source_type", "Delivery Note") or "Delivery Note",
-        destination_zone=load_plan.destination_zone,
-        company=load_plan.company,
-        flow_scope=getattr(load_plan, "flow_scope", None),
-        shipping_responsibility=getattr(load_plan, "shipping_responsibility", None),
-    ):
-        if dn.name in already_added:
-            continue
-        if _delivery_note_assigned_elsewhere(load_plan.name, dn.name):
-            continue
-
-        totals = compute_delivery_note_totals(dn.name)
+    pending = [
+        dn
+        for dn in get_planning_candidates(
+            source_type=getattr(load_plan, "source_type", "Delivery Note") or "Delivery Note",
+            destination_zone=load_plan.destination_zone,
+            company=load_plan.company,
+            flow_scope=getattr(load_plan, "flow_scope", None),
+            shipping_responsibility=getattr(load_plan, "shipping_responsibility", None),
+        )
+        if dn.name not in already_added and not _delivery_note_assigned_elsewhere(load_plan.name, dn.name)
+    ]
+    totals_by_dn = compute_delivery_note_totals_batch([dn.name for dn in pending])
+    for dn in pending:
+        totals = totals_by_dn[dn.name]
         if totals["missing_data_items"]:
             rejected.append({"delivery_note": dn.name, "reason": "incomplete_data"})
             continue
@@ -557,28 +669,40 @@ def suggest_shipments_for_load_plan(load_plan):
             }
         )
 
-    # Apply grouping or sorting
     if frappe.utils.cint(load_plan.get("group_by_customer")):
+        # Customer grouping is a dispatch preference, so keep its order and fill greedily.
         candidates = _sort_candidates_by_customer(candidates)
+        selected = []
+        unselected = []
+        for candidate in candidates:
+            if _fits_capacity(candidate, remaining_weight, remaining_volume):
+                selected.append(candidate)
+                remaining_weight -= flt(candidate["total_weight_kg"])
+                remaining_volume -= flt(candidate["total_volume_m3"])
+            else:
+                unselected.append(candidate)
     else:
-        candidates.sort(key=lambda x: x["score"], reverse=True)
-
-    selected = []
-    for candidate in candidates:
-        fits_weight = flt(candidate["total_weight_kg"]) <= flt(remaining_weight)
-        fits_volume = flt(candidate["total_volume_m3"]) <= flt(remaining_volume)
+        # Pick the subset that fills the remaining capacity best, not just the top scores.
+        selection = select_shipments(candidates, remaining_weight, remaining_volume)
+        selected = sorted(selection["selected"], key=lambda x: x["score"], reverse=True)
+        unselected = selection["rejected"]
+        remaining_weight = selection["remaining_weight_kg"]
+        remaining_volume = selection["remaining_volume_m3"]
+
+    for candidate in unselected:
+        # Judge size against the space that was free before selecting, so a shipment
+        # left out in favour of a better mix is not reported as too big.
+        fits_weight = flt(candidate["total_weight_kg"]) <= flt(free_weight)
+        fits_volume = flt(candidate["total_volume_m3"]) <= flt(free_volume)
         if fits_weight and fits_volume:
-            selected.append(candidate)
-            remaining_weight -= flt(candidate["total_weight_kg"])
-            remaining_volume -= flt(candidate["total_volume_m3"])
+            reason = "displaced"
+        elif not fits_weight and not fits_volume:
+            reason = "both"
+        elif not fits_weight:
+            reason = "weight"
         else:
-            if not fits_weight and not fits_volume:
-                reason = "both"
-            elif not fits_weight:
-                reason = "weight"
-            else:
-                reason = "volume"
-            rejected.append({"delivery_note": candidate["delivery_note"], "reason": reason})
+            reason = "volume"
+        rejected.append({"delivery_note": candidate["delivery_note"], "reason": reason})
 
     return {
         "selected": selected,
@@ -590,8 +714,8 @@ def suggest_shipments_for_load_plan(load_plan):
 
 def consolidation_preview(company=None, departure_date=None, flow_scope=None):
     """
-    Groups all pending delivery notes by destination zone, simulates optimal
-    packing for each zone using greedy-fit, and returns a zone-by-zone summary.
+    Groups all pending delivery notes by destination zone, packs each zone into
+    as few, as cheap active containers as possible, and returns a zone-by-zone summary.
 
     Args:
         company: Optional company filter.
@@ -605,6 +729,7 @@ def consolidation_preview(company=None, departure_date=None, flow_scope=None):
 
     ref_date = getdate(departure_date) if departure_date else getdate(frappe.utils.today())
     all_pending = pending_delivery_notes(company=company, flow_scope=flow_scope)
+    totals_by_dn = compute_delivery_note_totals_batch([dn_row.name for dn_row in all_pending])
 
     # Group DNs by zone
     by_zone = defaultdict(list)
@@ -619,7 +744,7 @@ def consolidation_preview(company=None, departure_date=None, flow_scope=None):
         zone_weight = 0.0
         zone_volume = 0.0
         for dn_row in dn_rows:
-            totals = compute_delivery_note_totals(dn_row.name)
+            totals = totals_by_dn[dn_row.name]
             if totals.get("missing_data_items"):
                 continue  # skip incomplete DNs
             w = flt(totals["total_weight_kg"])
@@ -632,52 +757,22 @@ def consolidation_preview(company=None, departure_date=None, flow_scope=None):
 
         zone_name = zone if zone != "_unzoned" else ""
         containers = get_active_containers(destination_zone=zone_name, departure_date=ref_date)
+        packing = pack_shipments(candidates, containers)
         plans = []
-        leftover = list(candidates)
-
-        # Simulate greedy multi-container packing for the zone
-        MAX_PLANS = 5  # safety cap
-        plan_count = 0
-        while leftover and containers and plan_count < MAX_PLANS:
-            # Pick the cheapest (first by cost_rank) container
-            container = containers[0]
-            max_w = flt(container.max_weight_kg)
-            max_v = flt(container.max_volume_m3)
-            remaining_w = max_w
-            remaining_v = max_v
-            loaded = []
-            still_leftover = []
-
-            for cand in leftover:
-                if cand["total_weight_kg"] <= remaining_w and cand["total_volume_m3"] <= remaining_v:
-                    loaded.append(cand)
-                    remaining_w -= cand["total_weight_kg"]
-                    remaining_v -= cand["total_volume_m3"]
-                else:
-                    still_leftover.append(cand)
-
-            if loaded:
-                used_w = max_w - remaining_w
-                used_v = max_v - remaining_v
-                util = compute_utilization(used_w, used_v, max_w, max_v)
-                plans.append({
-                    "container_profile": container.name,
-                    "container_name": container.container_name,
-                    "container_type": container.container_type,
-                    "max_weight_kg": round3(max_w),
-                    "max_volume_m3": round3(max_v),
-                    "shipment_count": len(loaded),
-                    "weight_utilization_pct": util["weight_utilization_pct"],
-                    "volume_utilization_pct": util["volume_utilization_pct"],
-                    "limiting_factor": detect_limiting_factor(
-                        util["weight_utilization_pct"], util["volume_utilization_pct"]
-                    ),
-                })
-                leftover = still_leftover
-                plan_count += 1
-            else:
-                # None of the remaining DNs fit in this container — try next cheapest
-                containers = containers[1:]
+        for packed in packing["bins"]:
+            container = packed["container"]
+            plans.append({
+                "container_profile": container.name,
+                "container_name": container.container_name,
+                "container_type": container.container_type,
+                "max_weight_kg": round3(flt(container.max_weight_kg)),
+                "max_volume_m3": round3(flt(container.max_volume_m3)),
+                "shipment_count": len(packed["shipments"]),
+                "delivery_notes": [cand["delivery_note"] for cand in packed["shipments"]],
+                "weight_utilization_pct": packed["weight_utilization_pct"],
+                "volume_utilization_pct": packed["volume_utilization_pct"],
+                "limiting_factor": packed["limiting_factor"],
+            })
 
         result.append({
             "zone": zone_name or "(no zone)",
@@ -685,7 +780,7 @@ def consolidation_preview(company=None, departure_date=None, flow_scope=None):
             "total_weight_kg": round3(zone_weight),
             "total_volume_m3": round3(zone_volume),
             "plans": plans,
-            "leftover_count": len(leftover),
+            "leftover_count": len(packing["unplaced"]),
         })
 
     return result
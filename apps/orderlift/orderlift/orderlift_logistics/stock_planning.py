@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import time
+import uuid
 from collections import defaultdict
 from datetime import date
 from types import SimpleNamespace
@@ -33,6 +35,83 @@ STATUS_SHORTAGE = "Shortage"
 STATUS_REPLAN = "Replan Needed"
 STATUS_CANCELLED = "Cancelled"
 
+# Item codes whose plans must be re-planned, per company. Transaction hooks add to
+# the set; the incremental run drains it and re-plans only those item groups.
+DIRTY_ITEMS_KEY = "orderlift:stock_planning:dirty_items:{company}"
+
+# Debounced dispatch of hook-triggered runs, per company. Every trigger bumps the
+# trigger counter and the last-trigger timestamp and marks the company pending. The
+# minutely dispatcher enqueues one job once triggers have been quiet for
+# DEBOUNCE_SECONDS (or MAX_DEBOUNCE_SECONDS after the first one), so no worker
+# sleeps out the debounce. The job runs once for everything queued so far under
+# the company run lock. A full-run trigger sets FULL_RUN_KEY instead of dirty items.
+TRIGGER_COUNT_KEY = "orderlift:stock_planning:triggers:{company}"
+LAST_TRIGGER_KEY = "orderlift:stock_planning:last_trigger:{company}"
+FIRST_TRIGGER_KEY = "orderlift:stock_planning:first_trigger:{company}"
+PENDING_COMPANIES_KEY = "orderlift:stock_planning:pending_companies"
+FULL_RUN_KEY = "orderlift:stock_planning:full_run:{company}"
+SCHEDULED_KEY = "orderlift:stock_planning:scheduled:{company}"
+RUN_LOCK_KEY = "orderlift:stock_planning:lock:{company}"
+DEBOUNCE_SECONDS = 10
+MAX_DEBOUNCE_SECONDS = 60
+SCHEDULED_TTL_SECONDS = 15 * 60
+RUN_LOCK_TTL_SECONDS = 30 * 60
+# Delete the run lock only while it still holds this run's token.
+RELEASE_LOCK_SCRIPT = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+)
+
+# Stored plan fields a planning run may change. A plan is saved only when one of
+# them (or an allocation row) differs from what was loaded.
+PLAN_STATE_FIELDS = (
+    "source_type",
+    "demand_source_key",
+    "company",
+    "sales_order",
+    "sales_order_item",
+    "technical_list",
+    "technical_revision",
+    "technical_revision_item",
+    "customer",
+    "item_code",
+    "warehouse",
+    "stock_uom",
+    "required_qty",
+    "delivery_date",
+    "procurement_delay_days",
+    "procurement_safety_days",
+    "stock_protection_date",
+    "rely_on_incoming_stock",
+    "incoming_safety_days",
+    "latest_safe_incoming_date",
+    "source_cancelled",
+    "physical_available_qty",
+    "hard_reserved_qty",
+    "draft_pick_list_qty",
+    "pick_list_qty",
+    "reserved_qty",
+    "remaining_qty",
+    "latest_pick_list",
+    "incoming_allocated_qty",
+    "incoming_expected_qty",
+    "incoming_date",
+    "incoming_backup_check_date",
+    "shortage_qty",
+    "planning_status",
+    "next_action_date",
+    "risk_message",
+    "latest_material_request",
+    "last_alert_status",
+)
+ALLOCATION_STATE_FIELDS = (
+    "purchase_order",
+    "purchase_order_item",
+    "forecast_load_plan",
+    "allocated_qty",
+    "expected_date",
+    "status",
+)
+
 
 def validate_sales_order_stock_dates(doc, method=None) -> None:
     """Require delivery dates only when stock planning is enabled for the company."""
@@ -67,7 +146,7 @@ def sync_sales_order_demand_plans(doc, method=None) -> list[str]:
 
     names = _sync_effective_demand_plans(doc.get("company"), settings, sales_orders=[doc.get("name")])
 
-    _enqueue_company_recalculation(doc.get("company"))
+    _queue_item_recalculation(doc.get("company"), _sales_order_plan_items([doc.get("name")]))
     return names
 
 
@@ -78,7 +157,7 @@ def sync_technical_revision_demand_plans(doc, method=None) -> list[str]:
     if not settings or not cint(settings.enabled):
         return []
     names = _sync_effective_demand_plans(doc.get("company"), settings, sales_orders=[doc.get("sales_order")])
-    _enqueue_company_recalculation(doc.get("company"))
+    _queue_item_recalculation(doc.get("company"), _sales_order_plan_items([doc.get("sales_order")]))
     return names
 
 
@@ -104,33 +183,112 @@ def cancel_sales_order_demand_plans(doc, method=None) -> None:
             },
             update_modified=False,
         )
+        # Stock held for the cancelled demand is free for other plans of the same items.
+        _queue_item_recalculation(doc.get("company"), _sales_order_plan_items([doc.name]))
 
 
 def queue_supply_recalculation(doc, method=None) -> None:
     if not doc or not doc.get("company"):
         return
-    _enqueue_company_recalculation(doc.get("company"))
+    _queue_item_recalculation(doc.get("company"), _document_item_codes(doc))
+
+
+def queue_stock_update_recalculation(doc, method=None) -> None:
+    """Invoice hook: only invoices with ``update_stock`` move Bin quantities."""
+    if doc and cint(doc.get("update_stock")):
+        queue_supply_recalculation(doc, method)
+
+
+def queue_bin_recalculation(doc, method=None) -> None:
+    """Bin ``on_update`` hook: re-plan the item in the warehouse's company."""
+    if not doc or not doc.get("item_code") or not doc.get("warehouse"):
+        return
+    company = frappe.get_cached_value("Warehouse", doc.get("warehouse"), "company")
+    if company:
+        _queue_item_recalculation(company, [doc.get("item_code")])
+
+
+def queue_forecast_plan_recalculation(doc, method=None) -> None:
+    """Forecast Load Plan hook: its deadline is the expected date of the linked Purchase Orders."""
+    if not doc or not doc.get("company"):
+        return
+    item_codes = [
+        row.get("item_code")
+        for row in doc.get("items") or []
+        if row.get("source_doctype") == "Purchase Order"
+    ]
+    if item_codes:
+        _queue_item_recalculation(doc.get("company"), item_codes)
 
 
-def run_scheduled_planning() -> dict:
+def run_scheduled_planning(full: bool = False) -> dict:
+    """Hourly: re-plan dirty and date-due item groups. ``full`` re-plans every open plan."""
     companies = frappe.get_all(
         "Stock Planning Settings",
         filters={"enabled": 1},
         pluck="company",
         limit_page_length=0,
     )
+    today = getdate(nowdate())
     result = {}
     for company in companies:
+        lock_token = _acquire_run_lock(company)
+        if not lock_token:
+            # A hook-triggered run is in progress; it re-dispatches what is left.
+            result[company] = {"company": company, "locked": True}
+            continue
+        item_codes = None
         try:
-            result[company] = recalculate_company(company, process_actions=True)
+            if not full:
+                item_codes, merged_triggers = _claim_pending_run(company)
+                if item_codes is not None:
+                    item_codes = sorted(set(item_codes) | set(_due_item_codes(company, today)))
+            result[company] = recalculate_company(company, process_actions=True, item_codes=item_codes)
             frappe.db.commit()
         except Exception:
             frappe.db.rollback()
+            if not full:
+                _restore_pending_run(company, item_codes)
             frappe.log_error(
                 title=f"Stock planning failed for {company}",
                 message=frappe.get_traceback(),
             )
             result[company] = {"error": True}
+            _release_run_lock(company, lock_token, redispatch=False)
+            continue
+        if not full:
+            result[company]["merged_triggers"] = merged_triggers
+        _release_run_lock(company, lock_token)
+    return result
+
+
+def run_full_scheduled_planning() -> dict:
+    """Daily safety net for stock changes that bypass document hooks."""
+    return run_scheduled_planning(full=True)
+
+
+def recalculate_dirty_items(company: str, *, process_actions: bool = True) -> dict:
+    """Background job: one debounced run for every planning trigger queued for the company.
+
+    ``merged_triggers`` in the result counts the hook triggers this run absorbed.
+    """
+    # Free the dispatch slot before taking the lock: triggers arriving from now on
+    # schedule a follow-up job instead of being dropped.
+    _clear_scheduled(company)
+    lock_token = _acquire_run_lock(company)
+    if not lock_token:
+        # The running job re-dispatches the triggers left queued when it finishes.
+        return {"company": company, "locked": True, "merged_triggers": 0}
+    item_codes, merged_triggers = _claim_pending_run(company)
+    try:
+        result = recalculate_company(company, process_actions=process_actions, item_codes=item_codes)
+    except Exception:
+        _restore_pending_run(company, item_codes)
+        # Leave the restored work to the next trigger or the hourly run rather than retrying at once.
+        _release_run_lock(company, lock_token, redispatch=False)
+        raise
+    _release_run_lock(company, lock_token)
+    result["merged_triggers"] = merged_triggers
     return result
 
 
@@ -149,32 +307,48 @@ def recalculate_current_company() -> dict:
     return recalculate_company(company, process_actions=True)
 
 
-def recalculate_company(company: str, *, process_actions: bool = True) -> dict:
+def recalculate_company(company: str, *, process_actions: bool = True, item_codes=None) -> dict:
+    """Re-plan a company's open demand plans.
+
+    With ``item_codes`` only the plans of those items are loaded and re-planned;
+    every plan of an item is included because they share its stock and incoming
+    supply. ``None`` re-syncs all effective demand and re-plans every open plan.
+    Plans whose computed fields did not change are not saved.
+    """
     company = (company or "").strip()
     settings = get_company_settings(company)
     if not settings or not cint(settings.enabled):
         return {"company": company, "enabled": False, "plans": 0, "actions": []}
 
-    _sync_effective_demand_plans(company, settings)
-    plans = _open_plan_docs(company)
+    if item_codes is None:
+        _sync_effective_demand_plans(company, settings)
+    else:
+        item_codes = _clean_item_codes(item_codes)
+        if not item_codes:
+            return {"company": company, "enabled": True, "plans": 0, "saved": 0, "items": 0, "actions": []}
+    plans = _open_plan_docs(company, item_codes=item_codes)
     if not plans:
-        return {"company": company, "enabled": True, "plans": 0, "actions": []}
+        return {"company": company, "enabled": True, "plans": 0, "saved": 0, "actions": []}
 
     source_rows = _effective_source_rows(plans)
     pick_coverage = _pick_list_coverage(source_rows)
     logistics_dates = _forecast_plan_dates(company)
-    incoming_by_item = _incoming_supply(company, logistics_dates)
-    stock_by_item = _physical_stock(company, settings)
+    incoming_by_item = _incoming_supply(company, logistics_dates, item_codes=item_codes)
+    stock_by_item = _physical_stock(company, settings, item_codes=item_codes)
     today = getdate(nowdate())
     actions = []
+    saved = 0
 
     grouped = defaultdict(list)
+    loaded_states = {}
     for plan in plans:
         plan_key = _plan_source_key(plan)
         source = source_rows.get(plan_key)
         if not source or cint(source.get("docstatus")) != 1:
             _mark_cancelled(plan, _("Source demand is no longer active."))
+            saved += 1
             continue
+        loaded_states[id(plan)] = _plan_state(plan)
         _refresh_plan_source(plan, source, settings)
         grouped[plan.item_code].append(plan)
 
@@ -293,7 +467,6 @@ def recalculate_company(company: str, *, process_actions: bool = True) -> dict:
             plan.planning_status = status
             plan.next_action_date = next_date
             plan.risk_message = risk
-            plan.last_calculated_on = now_datetime()
 
             if (
                 shortage > 0
@@ -311,13 +484,19 @@ def recalculate_company(company: str, *, process_actions: bool = True) -> dict:
                     actions.append(material_request)
 
             _notify_actionable_status(plan)
+            if _plan_state(plan) == loaded_states[id(plan)]:
+                continue
+            plan.last_calculated_on = now_datetime()
             plan.flags.ignore_permissions = True
             plan.save(ignore_permissions=True)
+            saved += 1
 
     return {
         "company": company,
         "enabled": True,
         "plans": len(plans),
+        "saved": saved,
+        "items": len(grouped) if item_codes is None else len(item_codes),
         "actions": actions,
     }
 
@@ -419,9 +598,11 @@ def _sync_effective_demand_plans(company: str, settings, sales_orders=None) -> l
         if row.get("source_type") == "Sales Order" or sales_order_item_counts[row.get("sales_order_item")] == 1:
             fallback_sales_order_item = row.get("sales_order_item") or ""
         plan = _get_or_new_plan(key, fallback_sales_order_item)
+        loaded_state = None if plan.is_new() else _plan_state(plan)
         _apply_effective_source_values(plan, row, settings)
-        plan.flags.ignore_permissions = True
-        plan.save(ignore_permissions=True)
+        if loaded_state is None or _plan_state(plan) != loaded_state:
+            plan.flags.ignore_permissions = True
+            plan.save(ignore_permissions=True)
         names.append(plan.name)
 
     stale_filters = {"company": company, "source_cancelled": 0}
@@ -507,10 +688,13 @@ def _legacy_sync_missing_submitted_orders(company: str, settings) -> None:
         plan.insert(ignore_permissions=True)
 
 
-def _open_plan_docs(company: str) -> list:
+def _open_plan_docs(company: str, *, item_codes=None) -> list:
+    filters = {"company": company, "source_cancelled": 0}
+    if item_codes is not None:
+        filters["item_code"] = ["in", list(item_codes)]
     names = frappe.get_all(
         "Stock Demand Plan",
-        filters={"company": company, "source_cancelled": 0},
+        filters=filters,
         pluck="name",
         order_by="delivery_date asc, creation asc",
         limit_page_length=0,
@@ -569,12 +753,15 @@ def _pick_list_coverage(source_rows: dict) -> dict:
     return result
 
 
-def _physical_stock(company: str, settings, *, warehouses=None) -> dict:
+def _physical_stock(company: str, settings, *, warehouses=None, item_codes=None) -> dict:
     warehouse_condition = ""
     params = {"company": company}
     if warehouses:
         params["warehouses"] = tuple(warehouses)
         warehouse_condition = " AND b.warehouse IN %(warehouses)s"
+    if item_codes:
+        params["item_codes"] = tuple(item_codes)
+        warehouse_condition += " AND b.item_code IN %(item_codes)s"
     rows = frappe.db.sql(
         f"""
         SELECT b.item_code,
@@ -598,6 +785,9 @@ def _physical_stock(company: str, settings, *, warehouses=None) -> dict:
     if warehouses:
         draft_params["warehouses"] = tuple(warehouses)
         draft_condition = " AND pli.warehouse IN %(warehouses)s"
+    if item_codes:
+        draft_params["item_codes"] = tuple(item_codes)
+        draft_condition += " AND pli.item_code IN %(item_codes)s"
     draft_rows = frappe.db.sql(
         f"""
         SELECT pli.item_code, SUM(COALESCE(pli.stock_qty, 0)) AS draft_qty
@@ -623,9 +813,14 @@ def _physical_stock(company: str, settings, *, warehouses=None) -> dict:
     return result
 
 
-def _incoming_supply(company: str, logistics_dates: dict) -> dict:
+def _incoming_supply(company: str, logistics_dates: dict, *, item_codes=None) -> dict:
+    item_condition = ""
+    params = {"company": company}
+    if item_codes:
+        params["item_codes"] = tuple(item_codes)
+        item_condition = " AND poi.item_code IN %(item_codes)s"
     rows = frappe.db.sql(
-        """
+        f"""
         SELECT poi.name, poi.parent, poi.item_code, poi.stock_qty, poi.received_qty,
                poi.conversion_factor, poi.schedule_date, po.schedule_date AS parent_schedule_date
         FROM `tabPurchase Order Item` poi
@@ -633,9 +828,10 @@ def _incoming_supply(company: str, logistics_dates: dict) -> dict:
         WHERE po.company = %(company)s
           AND po.docstatus = 1
           AND po.status NOT IN ('Closed', 'Completed', 'Cancelled')
+          {item_condition}
         ORDER BY COALESCE(poi.schedule_date, po.schedule_date) ASC, po.creation ASC, poi.idx ASC
         """,
-        {"company": company},
+        params,
         as_dict=True,
     )
     result = defaultdict(list)
@@ -1171,8 +1367,12 @@ def _planning_alert_recipients(company: str, status: str) -> list[str]:
 
 
 def _enqueue_company_recalculation(company: str) -> None:
+    """Queue a full run through the dispatcher; without Redis enqueue it directly."""
     if not company:
         return
+    if _mark_full_run(company):
+        _dispatch_planning_run(company)
+        return
     frappe.enqueue(
         "orderlift.orderlift_logistics.stock_planning.recalculate_company",
         queue="short",
@@ -1183,6 +1383,268 @@ def _enqueue_company_recalculation(company: str) -> None:
     )
 
 
+def _queue_item_recalculation(company: str, item_codes) -> None:
+    """Mark items dirty and dispatch a debounced run; fall back to a full run."""
+    if not company:
+        return
+    item_codes = _clean_item_codes(item_codes)
+    if item_codes and _mark_items_dirty(company, item_codes):
+        _dispatch_planning_run(company)
+        return
+    _enqueue_company_recalculation(company)
+
+
+def dispatch_planning_runs() -> None:
+    """Scheduler job (every minute): enqueue the runs whose triggers have settled."""
+    try:
+        cache = frappe.cache()
+        companies = cache.smembers(PENDING_COMPANIES_KEY) or []
+    except Exception:
+        return
+    now = time.time()
+    for member in sorted(companies):
+        company = member.decode() if isinstance(member, bytes) else str(member)
+        if not _triggers_settled(cache, company, now):
+            continue
+        cache.srem(PENDING_COMPANIES_KEY, member)
+        cache.delete(cache.make_key(_first_trigger_key(company)))
+        _schedule_planning_job(company)
+
+
+def _dispatch_planning_run(company: str) -> None:
+    """Record a trigger; the dispatcher schedules the company's job once triggers settle."""
+    try:
+        cache = frappe.cache()
+        now = time.time()
+        cache.incrby(cache.make_key(_trigger_count_key(company)), 1)
+        cache.set(cache.make_key(_last_trigger_key(company)), now, ex=SCHEDULED_TTL_SECONDS)
+        cache.set(cache.make_key(_first_trigger_key(company)), now, nx=True, ex=SCHEDULED_TTL_SECONDS)
+        cache.sadd(PENDING_COMPANIES_KEY, company)
+    except Exception:
+        # Without Redis triggers cannot be debounced; run at once.
+        _schedule_planning_job(company)
+
+
+def _schedule_planning_job(company: str) -> None:
+    """Enqueue the company's job unless one is already scheduled."""
+    try:
+        cache = frappe.cache()
+        scheduled = cache.set(cache.make_key(_scheduled_key(company)), 1, nx=True, ex=SCHEDULED_TTL_SECONDS)
+    except Exception:
+        scheduled = True
+    if not scheduled:
+        return
+    frappe.enqueue(
+        "orderlift.orderlift_logistics.stock_planning.recalculate_dirty_items",
+        queue="short",
+        enqueue_after_commit=True,
+        job_name=f"stock-planning-items-{company}",
+        company=company,
+        process_actions=True,
+    )
+
+
+def _triggers_settled(cache, company: str, now: float) -> bool:
+    """True once triggers were quiet for DEBOUNCE_SECONDS or the first one is MAX_DEBOUNCE_SECONDS old."""
+    last_trigger = float(cache.get(cache.make_key(_last_trigger_key(company))) or 0)
+    first_trigger = float(cache.get(cache.make_key(_first_trigger_key(company))) or last_trigger)
+    return now >= min(last_trigger + DEBOUNCE_SECONDS, first_trigger + MAX_DEBOUNCE_SECONDS)
+
+
+def _claim_pending_run(company: str) -> tuple[list[str] | None, int]:
+    """Take the company's queued work: ``(item_codes, merged_triggers)``.
+
+    ``item_codes`` is ``None`` when a full run was requested or Redis is unavailable.
+    """
+    full_run = _pop_full_run(company)
+    item_codes = _drain_dirty_items(company)
+    merged_triggers = _pop_trigger_count(company)
+    return (None if full_run else item_codes), merged_triggers
+
+
+def _restore_pending_run(company: str, item_codes) -> None:
+    if item_codes is None:
+        _mark_full_run(company)
+    else:
+        _restore_dirty_items(company, item_codes)
+
+
+def _acquire_run_lock(company: str) -> str | None:
+    """Per-company run lock: the owner token, or ``None`` while another run holds it.
+
+    Without Redis runs cannot be coordinated and proceed.
+    """
+    token = uuid.uuid4().hex
+    try:
+        cache = frappe.cache()
+        acquired = cache.set(cache.make_key(_run_lock_key(company)), token, nx=True, ex=RUN_LOCK_TTL_SECONDS)
+    except Exception:
+        return token
+    return token if acquired else None
+
+
+def _release_run_lock(company: str, token: str, *, redispatch: bool = True) -> None:
+    """Release the lock this run owns and dispatch triggers queued while it held it."""
+    try:
+        cache = frappe.cache()
+        # A run that outlived the lock TTL must not free the lock a newer run took since.
+        cache.eval(RELEASE_LOCK_SCRIPT, 1, cache.make_key(_run_lock_key(company)), token)
+        # RedisWrapper.exists and smembers add the site prefix themselves.
+        pending = redispatch and (cache.exists(_full_run_key(company)) or cache.smembers(_dirty_items_key(company)))
+    except Exception:
+        return
+    if pending:
+        _schedule_planning_job(company)
+
+
+def _clear_scheduled(company: str) -> None:
+    try:
+        cache = frappe.cache()
+        cache.delete(cache.make_key(_scheduled_key(company)))
+    except Exception:
+        pass
+
+
+def _mark_full_run(company: str) -> bool:
+    try:
+        cache = frappe.cache()
+        cache.set(cache.make_key(_full_run_key(company)), 1)
+    except Exception:
+        return False
+    return True
+
+
+def _pop_full_run(company: str) -> bool:
+    try:
+        cache = frappe.cache()
+        return bool(cache.delete(cache.make_key(_full_run_key(company))))
+    except Exception:
+        return False
+
+
+def _pop_trigger_count(company: str) -> int:
+    try:
+        cache = frappe.cache()
+        key = cache.make_key(_trigger_count_key(company))
+        count = int(cache.get(key) or 0)
+        if count:
+            # Subtract what was read so triggers counted during the run carry forward.
+            cache.decrby(key, count)
+    except Exception:
+        return 0
+    return count
+
+
+def _mark_items_dirty(company: str, item_codes) -> bool:
+    try:
+        frappe.cache().sadd(_dirty_items_key(company), *item_codes)
+    except Exception:
+        return False
+    return True
+
+
+def _drain_dirty_items(company: str) -> list[str] | None:
+    """Pop the company's dirty items; ``None`` when Redis is unavailable."""
+    try:
+        cache = frappe.cache()
+        key = _dirty_items_key(company)
+        members = cache.smembers(key) or []
+        if members:
+            # Remove only what was read so items marked during the run stay queued.
+            cache.srem(key, *members)
+    except Exception:
+        return None
+    return sorted({member.decode() if isinstance(member, bytes) else str(member) for member in members})
+
+
+def _restore_dirty_items(company: str, item_codes) -> None:
+    if item_codes:
+        _mark_items_dirty(company, item_codes)
+
+
+def _dirty_items_key(company: str) -> str:
+    return DIRTY_ITEMS_KEY.format(company=company)
+
+
+def _trigger_count_key(company: str) -> str:
+    return TRIGGER_COUNT_KEY.format(company=company)
+
+
+def _last_trigger_key(company: str) -> str:
+    return LAST_TRIGGER_KEY.format(company=company)
+
+
+def _first_trigger_key(company: str) -> str:
+    return FIRST_TRIGGER_KEY.format(company=company)
+
+
+def _full_run_key(company: str) -> str:
+    return FULL_RUN_KEY.format(company=company)
+
+
+def _scheduled_key(company: str) -> str:
+    return SCHEDULED_KEY.format(company=company)
+
+
+def _run_lock_key(company: str) -> str:
+    return RUN_LOCK_KEY.format(company=company)
+
+
+def _due_item_codes(company: str, today) -> list[str]:
+    """Items with a plan whose next action date has come; their status is date-driven."""
+    return frappe.get_all(
+        "Stock Demand Plan",
+        filters={"company": company, "source_cancelled": 0, "next_action_date": ["<=", today]},
+        pluck="item_code",
+        distinct=True,
+        limit_page_length=0,
+    )
+
+
+def _sales_order_plan_items(sales_orders) -> list[str]:
+    sales_orders = [name for name in sales_orders or [] if name]
+    if not sales_orders:
+        return []
+    return frappe.get_all(
+        "Stock Demand Plan",
+        filters={"sales_order": ["in", sales_orders]},
+        pluck="item_code",
+        distinct=True,
+        limit_page_length=0,
+    )
+
+
+def _document_item_codes(doc) -> list[str]:
+    rows = list(doc.get("items") or []) + list(doc.get("locations") or [])
+    return _clean_item_codes(row.get("item_code") for row in rows)
+
+
+def _clean_item_codes(item_codes) -> list[str]:
+    return sorted({(item_code or "").strip() for item_code in item_codes or [] if (item_code or "").strip()})
+
+
+def _plan_state(plan) -> tuple:
+    return (
+        tuple(_state_value(plan.get(fieldname)) for fieldname in PLAN_STATE_FIELDS),
+        tuple(
+            tuple(_state_value(row.get(fieldname)) for fieldname in ALLOCATION_STATE_FIELDS)
+            for row in plan.get("allocations") or []
+        ),
+    )
+
+
+def _state_value(value):
+    if value is None or value == "":
+        return ""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return round(float(value), 6)
+    if isinstance(value, date):
+        return str(getdate(value))
+    return str(value)
+
+
 def _row_label(row) -> str:
     return _("Row #{0} {1}").format(row.get("idx") or "-", row.get("item_code") or "")
 
@@ -27,6 +27,19 @@ OPERATOR_MAP = {
     "≠ (not equal)": "!=",
 }
 
+# Safe comparisons without eval, keyed by OPERATOR_MAP values
+COMPARATORS = {
+    ">=": lambda actual, threshold: actual >= threshold,
+    ">": lambda actual, threshold: actual > threshold,
+    "<=": lambda actual, threshold: actual <= threshold,
+    "<": lambda actual, threshold: actual < threshold,
+    "==": lambda actual, threshold: actual == threshold,
+    "!=": lambda actual, threshold: actual != threshold,
+}
+
+# Customers per batched tier UPDATE when applying segments.
+APPLY_CHUNK_SIZE = 1000
+
 
 class CustomerSegmentationEngine(Document):
     """Rules engine for auto-assigning customer segments/tiers.
@@ -91,17 +104,18 @@ class CustomerSegmentationEngine(Document):
             frappe.throw(_("This engine is not active."))
 
         customers = self._get_target_customers()
+        table = self._customer_feature_table(customers)
+        segments, rule_indexes = self._assign_segments(table, len(customers))
         results = []
-        for cust in customers:
-            variables = self._build_customer_variables(cust)
-            segment, rule_idx, confidence = self._evaluate_rules(variables)
+        for position, cust in enumerate(customers):
+            matched = rule_indexes[position] is not None
             results.append({
                 "customer": cust.get("name"),
                 "customer_name": cust.get("customer_name"),
-                "assigned_segment": segment,
-                "matched_rule": rule_idx,
-                "variables": variables,
-                "confidence": confidence,
+                "assigned_segment": segments[position],
+                "matched_rule": rule_indexes[position],
+                "variables": _row_variables(table, position),
+                "confidence": 100 if matched else 0,
             })
 
         return results
@@ -110,31 +124,7 @@ class CustomerSegmentationEngine(Document):
     def apply_segments(self):
         """Run the engine and update customer records with assigned tiers."""
         results = self.calculate_segments()
-        updated = 0
-        for r in results:
-            if r["assigned_segment"]:
-                try:
-                    is_dynamic = 1
-                    if frappe.db.has_column("Customer", "enable_dynamic_segmentation"):
-                        is_dynamic = cint(
-                            frappe.db.get_value(
-                                "Customer", r["customer"], "enable_dynamic_segmentation"
-                            )
-                            or 0
-                        )
-                    if is_dynamic != 1:
-                        continue
-
-                    values = {"tier": r["assigned_segment"]}
-                    if frappe.db.has_column("Customer", "tier_source"):
-                        values["tier_source"] = self.engine_name or self.name
-                    if frappe.db.has_column("Customer", "tier_last_calculated_on"):
-                        values["tier_last_calculated_on"] = frappe.utils.now_datetime()
-
-                    frappe.db.set_value("Customer", r["customer"], values, update_modified=False)
-                    updated += 1
-                except Exception:
-                    pass
+        updated = self._write_changed_tiers(results)
 
         frappe.db.commit()
         frappe.msgprint(
@@ -144,6 +134,39 @@ class CustomerSegmentationEngine(Document):
         )
         return results
 
+    def _write_changed_tiers(self, results):
+        """Write assigned tiers with one batched UPDATE per chunk of changed, dynamic customers."""
+        assigned = {r["customer"]: r["assigned_segment"] for r in results if r["customer"] and r["assigned_segment"]}
+        if not assigned:
+            return 0
+
+        if not frappe.db.has_column("Customer", "tier"):
+            return 0
+        fields = ["name", "tier"]
+        if frappe.db.has_column("Customer", "enable_dynamic_segmentation"):
+            fields.append("enable_dynamic_segmentation")
+        current = frappe.get_all(
+            "Customer",
+            filters={"name": ["in", list(assigned)]},
+            fields=fields,
+            limit_page_length=0,
+        )
+        changed = [
+            (row.name, assigned[row.name])
+            for row in current
+            if cint(row.get("enable_dynamic_segmentation", 1)) == 1
+            and (row.get("tier") or "") != assigned[row.name]
+        ]
+
+        extra = {}
+        if frappe.db.has_column("Customer", "tier_source"):
+            extra["tier_source"] = self.engine_name or self.name
+        if frappe.db.has_column("Customer", "tier_last_calculated_on"):
+            extra["tier_last_calculated_on"] = now_datetime()
+        for start in range(0, len(changed), APPLY_CHUNK_SIZE):
+            _update_customer_tiers(changed[start : start + APPLY_CHUNK_SIZE], extra)
+        return len(changed)
+
     def _get_target_customers(self):
         """Fetch customers matching optional CRM audience filters."""
         filters = {"disabled": 0}
@@ -200,148 +223,188 @@ class CustomerSegmentationEngine(Document):
 
     def _build_customer_variables(self, customer):
         """Build evaluation variables for a customer."""
-        customer_name = customer.get("name")
-        creation = customer.get("creation")
-        age_days = date_diff(nowdate(), getdate(creation)) if creation else 0
-
-        # Revenue last 12 months
-        revenue_12m = flt(frappe.db.sql("""
-            SELECT COALESCE(SUM(grand_total), 0)
-            FROM `tabSales Order`
-            WHERE customer = %s
-            AND transaction_date >= DATE_SUB(CURDATE(), INTERVAL 12 MONTH)
-            AND docstatus = 1
-        """, customer_name)[0][0]) if customer_name else 0
-
-        # Total orders
-        total_orders = cint(frappe.db.sql("""
-            SELECT COUNT(*)
-            FROM `tabSales Order`
-            WHERE customer = %s AND docstatus = 1
-        """, customer_name)[0][0]) if customer_name else 0
-
-        # Simple RFM proxy (0-10 scale)
-        rfm_score = self._compute_rfm_score(customer_name, revenue_12m, total_orders, age_days)
-
-        return {
-            "Revenue_12M": revenue_12m,
-            "RFM_score": rfm_score,
-            "Customer_Age_Days": age_days,
-            "Total_Orders": total_orders,
-        }
+        return _row_variables(self._customer_feature_table([customer]), 0)
 
-    def _compute_rfm_score(self, customer_name, revenue_12m, total_orders, age_days):
-        """Compute a simple RFM proxy score (0-10)."""
-        score = 0.0
-
-        # Recency: days since last order
-        last_order = frappe.db.sql("""
-            SELECT MAX(transaction_date)
-            FROM `tabSales Order`
-            WHERE customer = %s AND docstatus = 1
-        """, customer_name)
-        if last_order and last_order[0][0]:
-            recency_days = date_diff(nowdate(), getdate(last_order[0][0]))
-            if recency_days <= 30:
-                score += 3.3
-            elif recency_days <= 90:
-                score += 2.5
-            elif recency_days <= 180:
-                score += 1.5
-            else:
-                score += 0.5
-
-        # Frequency
-        if total_orders >= 20:
-            score += 3.3
-        elif total_orders >= 10:
-            score += 2.5
-        elif total_orders >= 5:
-            score += 1.5
-        elif total_orders >= 1:
-            score += 0.5
-
-        # Monetary
-        if revenue_12m >= 2000000:
-            score += 3.4
-        elif revenue_12m >= 800000:
-            score += 2.5
-        elif revenue_12m >= 200000:
-            score += 1.5
-        elif revenue_12m > 0:
-            score += 0.5
-
-        return round(min(score, 10.0), 1)
+    def _customer_feature_table(self, customers):
+        """Evaluation variables for every customer as columns aligned with ``customers``."""
+        today = nowdate()
+        aggregates = _sales_order_aggregates([cust.get("name") for cust in customers])
+        table = {key: [] for key in VARIABLE_MAP.values()}
+        for cust in customers:
+            row = aggregates.get(cust.get("name")) or {}
+            creation = cust.get("creation")
+            age_days = date_diff(today, getdate(creation)) if creation else 0
+            revenue_12m = flt(row.get("revenue_12m"))
+            total_orders = cint(row.get("total_orders"))
+            last_order_date = row.get("last_order_date")
+            recency_days = date_diff(today, getdate(last_order_date)) if last_order_date else None
+            table["Revenue_12M"].append(revenue_12m)
+            table["RFM_score"].append(_rfm_score(recency_days, total_orders, revenue_12m))
+            table["Customer_Age_Days"].append(age_days)
+            table["Total_Orders"].append(total_orders)
+        return table
 
     def _evaluate_rules(self, variables):
         """Evaluate rules top-down by priority. Return (segment, rule_idx, confidence)."""
+        table = {key: [variables.get(key, 0)] for key in VARIABLE_MAP.values()}
+        segments, rule_indexes = self._assign_segments(table, 1)
+        if rule_indexes[0] is None:
+            return None, None, 0
+        return segments[0], rule_indexes[0], 100
+
+    def _assign_segments(self, table, count):
+        """Evaluate rules top-down over feature columns; the first matching rule wins per row.
+
+        Returns ``(segments, rule_indexes)`` lists of length ``count``.
+        """
+        segments = [None] * count
+        rule_indexes = [None] * count
+        pending = list(range(count))
         active_rules = sorted(
             [r for r in (self.segmentation_rules or []) if r.is_active],
             key=lambda r: cint(r.priority),
         )
 
         for rule in active_rules:
+            if not pending:
+                break
             if rule.is_default:
-                return rule.designated_segment, rule.idx, 100
-
-            try:
-                result = self._eval_structured_rule(rule, variables)
-                if result:
-                    return rule.designated_segment, rule.idx, 100
-            except Exception:
+                hits = pending
+            else:
+                try:
+                    mask = self._rule_mask(rule, table, pending)
+                except Exception:
+                    continue
+                hits = [position for position, hit in zip(pending, mask) if hit]
+            if not hits:
                 continue
+            for position in hits:
+                segments[position] = rule.designated_segment
+                rule_indexes[position] = rule.idx
+            matched = set(hits)
+            pending = [position for position in pending if position not in matched]
 
-        return None, None, 0
-
-    def _eval_structured_rule(self, rule, variables):
-        """Evaluate a structured rule (dropdown-based) against variables."""
-        # Resolve first condition
-        var_key_1 = VARIABLE_MAP.get(rule.variable_1)
-        op_1 = OPERATOR_MAP.get(rule.operator_1)
-        if not var_key_1 or not op_1:
-            return False
+        return segments, rule_indexes
 
-        val_1 = flt(variables.get(var_key_1, 0))
-        threshold_1 = flt(rule.value_1)
-        result_1 = self._compare(val_1, op_1, threshold_1)
+    def _rule_mask(self, rule, table, positions):
+        """Evaluate a structured rule (dropdown-based) for the rows at ``positions``."""
+        result_1 = _condition_mask(rule.variable_1, rule.operator_1, rule.value_1, table, positions)
+        if result_1 is None:
+            return [False] * len(positions)
 
         # Single condition
         if not rule.connector:
             return result_1
 
-        # Resolve second condition
-        var_key_2 = VARIABLE_MAP.get(rule.variable_2)
-        op_2 = OPERATOR_MAP.get(rule.operator_2)
-        if not var_key_2 or not op_2:
+        result_2 = _condition_mask(rule.variable_2, rule.operator_2, rule.value_2, table, positions)
+        if result_2 is None:
             return result_1
 
-        val_2 = flt(variables.get(var_key_2, 0))
-        threshold_2 = flt(rule.value_2)
-        result_2 = self._compare(val_2, op_2, threshold_2)
-
         if rule.connector == "AND":
-            return result_1 and result_2
+            return [first and second for first, second in zip(result_1, result_2)]
         elif rule.connector == "OR":
-            return result_1 or result_2
+            return [first or second for first, second in zip(result_1, result_2)]
 
         return result_1
 
-    @staticmethod
-    def _compare(actual, operator, threshold):
-        """Safe comparison without eval."""
-        if operator == ">=":
-            return actual >= threshold
-        elif operator == ">":
-            return actual > threshold
-        elif operator == "<=":
-            return actual <= threshold
-        elif operator == "<":
-            return actual < threshold
-        elif operator == "==":
-            return actual == threshold
-        elif operator == "!=":
-            return actual != threshold
-        return False
+
+def _condition_mask(variable, operator, value, table, positions):
+    """Per-row results of one rule condition, or ``None`` when it is not configured."""
+    var_key = VARIABLE_MAP.get(variable)
+    compare = COMPARATORS.get(OPERATOR_MAP.get(operator))
+    if not var_key or not compare:
+        return None
+    column = table[var_key]
+    threshold = flt(value)
+    return [compare(flt(column[position]), threshold) for position in positions]
+
+
+def _row_variables(table, position):
+    return {key: column[position] for key, column in table.items()}
+
+
+def _sales_order_aggregates(customers):
+    """12-month revenue, order count and last order date per customer from one GROUP BY."""
+    customers = sorted({customer for customer in customers if customer})
+    if not customers:
+        return {}
+    rows = frappe.db.sql(
+        """
+        SELECT
+            customer,
+            COALESCE(SUM(CASE
+                WHEN transaction_date >= DATE_SUB(CURDATE(), INTERVAL 12 MONTH) THEN grand_total
+                ELSE 0
+            END), 0) AS revenue_12m,
+            COUNT(*) AS total_orders,
+            MAX(transaction_date) AS last_order_date
+        FROM `tabSales Order`
+        WHERE docstatus = 1 AND customer IN %(customers)s
+        GROUP BY customer
+        """,
+        {"customers": tuple(customers)},
+        as_dict=True,
+    )
+    return {row.get("customer"): row for row in rows}
+
+
+def _rfm_score(recency_days, total_orders, revenue_12m):
+    """Compute a simple RFM proxy score (0-10)."""
+    score = 0.0
+
+    # Recency: days since last order
+    if recency_days is not None:
+        if recency_days <= 30:
+            score += 3.3
+        elif recency_days <= 90:
+            score += 2.5
+        elif recency_days <= 180:
+            score += 1.5
+        else:
+            score += 0.5
+
+    # Frequency
+    if total_orders >= 20:
+        score += 3.3
+    elif total_orders >= 10:
+        score += 2.5
+    elif total_orders >= 5:
+        score += 1.5
+    elif total_orders >= 1:
+        score += 0.5
+
+    # Monetary
+    if revenue_12m >= 2000000:
+        score += 3.4
+    elif revenue_12m >= 800000:
+        score += 2.5
+    elif revenue_12m >= 200000:
+        score += 1.5
+    elif revenue_12m > 0:
+        score += 0.5
+
+    return round(min(score, 10.0), 1)
+
+
+def _update_customer_tiers(changes, extra):
+    """One UPDATE setting each customer's tier through a CASE on name."""
+    if not changes:
+        return
+    cases = " ".join(["WHEN %s THEN %s"] * len(changes))
+    assignments = [f"tier = CASE name {cases} END"]
+    values = [value for change in changes for value in change]
+    for fieldname, value in extra.items():
+        assignments.append(f"`{fieldname}` = %s")
+        values.append(value)
+    values.extend(name for name, _tier in changes)
+    frappe.db.sql(
+        f"""
+        UPDATE `tabCustomer`
+        SET {', '.join(assignments)}
+        WHERE name IN ({', '.join(['%s'] * len(changes))})
+        """,
+        tuple(values),
+    )
 
 
 @frappe.whitelist()
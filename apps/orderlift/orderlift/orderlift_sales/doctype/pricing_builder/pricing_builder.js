@@ -38,6 +38,32 @@ const BUILDER_COLUMNS = [
 ];
 
 frappe.ui.form.on("Pricing Builder", {
+    onload(frm) {
+        frappe.realtime.off("pricing_builder_published");
+        frappe.realtime.on("pricing_builder_published", (out) => {
+            if (!out || out.pricing_builder !== frm.doc.name) return;
+            frappe.show_alert(
+                {
+                    message: [
+                        __("Price List: {0}", [out.price_list || frm.doc.selling_price_list_name]),
+                        __("Created: {0}", [out.created || 0]),
+                        __("Updated: {0}", [out.updated || 0]),
+                        __("Skipped: {0}", [out.skipped || 0]),
+                    ].join(" | "),
+                    indicator: (out.errors || []).length ? "orange" : "green",
+                },
+                8
+            );
+            frm.reload_doc();
+        });
+        frappe.realtime.off("pricing_builder_publish_failed");
+        frappe.realtime.on("pricing_builder_publish_failed", (out) => {
+            if (!out || out.pricing_builder !== frm.doc.name) return;
+            frappe.show_alert({ message: __("Publishing prices failed: {0}", [out.error || ""]), indicator: "red" }, 10);
+            frm.reload_doc();
+        });
+    },
+
     refresh(frm) {
         ensureBuilderStyles();
         setupQueries(frm);
@@ -858,6 +884,14 @@ async function publishBuilder(frm, selectedOnly) {
         freeze_message: __("Publishing prices..."),
     });
     const out = response.message || {};
+    if (out.in_progress) {
+        frappe.show_alert({ message: (out.errors || [])[0] || __("A publish of this builder is already running."), indicator: "orange" }, 8);
+        return;
+    }
+    if (out.queued) {
+        frappe.show_alert({ message: __("Publishing {0} prices in the background.", [out.rows || 0]), indicator: "blue" }, 8);
+        return;
+    }
     frappe.show_alert(
         {
             message: [
@@ -2,6 +2,7 @@ import frappe
 from frappe import _
 from frappe.model.document import Document
 from frappe.utils import cint, flt, now_datetime, nowdate
+from frappe.utils.background_jobs import is_job_enqueued
 
 from orderlift.orderlift_sales.doctype.pricing_sheet.pricing_sheet import (
     compute_margin_percent_for_basis,
@@ -12,6 +13,7 @@ from orderlift.orderlift_sales.doctype.pricing_sheet.pricing_sheet import (
 )
 from orderlift.orderlift_sales.utils.item_group import descendant_leaf_item_groups, is_item_group_node
 from orderlift.orderlift_sales.utils.price_list_scope import apply_price_list_company, current_company, validate_price_list_scope
+from orderlift.orderlift_sales.utils.price_list_sharing import sync_shared_item_prices
 from orderlift.orderlift_sales.utils.price_list_usage_guard import MANUAL_CHARGE_ITEM_CODES
 from orderlift.sales.utils.pricing_projection import apply_expenses
 from orderlift.sales.utils.scenario_policy import resolve_scenario_rule
@@ -21,6 +23,13 @@ MAX_WARNING_LINES = 80
 MAX_WARNING_LINE_LENGTH = 240
 MAX_WARNING_TOTAL_LENGTH = 12000
 BUILDER_ITEM_DOCTYPES = ("Pricing Builder Item", "Pricing Builder Manual Item")
+# Publishing writes Item Prices in multi-row chunks; larger publishes run as a job.
+PUBLISH_CHUNK_SIZE = 500
+PUBLISH_BACKGROUND_THRESHOLD = 2000
+PUBLISH_JOB_TIMEOUT_SECONDS = 60 * 60
+ITEM_PRICE_PUBLISH_FIELDS = ("currency", "selling", "buying", "brand", "uom", "item_name", "item_description", "valid_from", "valid_upto")
+# Stamps that differ on every publish and do not make a stored price stale.
+PUBLISH_VOLATILE_FIELDS = ("custom_last_builder_rebuild_on",)
 
 
 class PricingBuilder(Document):
@@ -31,18 +40,65 @@ class PricingBuilder(Document):
             self.target_currency = _resolve_builder_target_currency(self.selling_price_list_name, self.target_currency)
 
     def calculate_items(self):
+        context = self._evaluation_context()
+        items, item_warnings = _load_builder_items(
+            context["active_buying_lists"],
+            manual_items=[],
+            item_group=(getattr(self, "item_group", "") or "").strip(),
+            max_items=cint(self.max_items or 0),
+        )
+        self.set("builder_items", [])
+
+        if not items:
+            self._apply_summary(_empty_summary())
+            self.warnings_html = _warnings_html(item_warnings or [_("No items found for the selected buying price lists.")])
+            return
+
+        result_rows, warnings = self._evaluate_rows(context, items)
+        for row in result_rows:
+            self.append("builder_items", row)
+
+        summary = _build_summary(result_rows)
+        self._apply_summary(summary)
+        self.warnings_html = _warnings_html(_dedupe_warnings(list(item_warnings) + warnings))
+
+    def evaluate_items(self, keys):
+        """Reprice only the given ``(item, buying_list)`` keys without touching ``builder_items``.
+
+        A key with an empty buying list takes the item's highest-priority active list,
+        as a full calculation would; keys a full calculation would not produce are
+        dropped with a warning. Returns ``{"rows": [...], "warnings": [...]}`` with
+        rows shaped like ``builder_items`` rows.
+        """
+        keys = _normalize_item_keys(keys)
+        if not keys:
+            return {"rows": [], "warnings": []}
+        context = self._evaluation_context(item_codes=sorted({item_code for item_code, _buying_list in keys}))
+        items, item_warnings = _load_builder_item_subset(
+            keys,
+            context["active_buying_lists"],
+            item_group=(getattr(self, "item_group", "") or "").strip(),
+            max_items=cint(self.max_items or 0),
+        )
+        if not items:
+            return {"rows": [], "warnings": item_warnings}
+        result_rows, warnings = self._evaluate_rows(context, items)
+        return {
+            "rows": [frappe._dict(row) for row in result_rows],
+            "warnings": _dedupe_warnings(list(item_warnings) + warnings),
+        }
+
+    def _evaluation_context(self, item_codes=None):
+        """Rule, override and currency context shared by full and subset evaluation."""
         rules = _normalize_rules(self.sourcing_rules or [])
         active_buying_lists = _ordered_buying_lists(rules)
         if not active_buying_lists:
             frappe.throw(_("Add at least one active sourcing rule with a Buying Price List."))
-        existing_overrides = _existing_override_map(self.builder_items or [])
-        existing_selected = _existing_selected_map(self.builder_items or [])
         selling_price_list_name = (self.selling_price_list_name or "").strip()
         existing_overrides = _merge_override_maps(
-            _published_item_price_override_map(selling_price_list_name, self.name),
-            existing_overrides,
+            _published_item_price_override_map(selling_price_list_name, self.name, item_codes=item_codes),
+            _existing_override_map(self.builder_items or []),
         )
-        manual_items = []
         target_currency = _resolve_builder_target_currency(selling_price_list_name, getattr(self, "target_currency", ""))
         if _doc_has_field(self, "target_currency"):
             self.target_currency = target_currency
@@ -50,19 +106,23 @@ class PricingBuilder(Document):
         qty = flt(self.default_qty or 1)
         if qty <= 0:
             qty = 1
+        return {
+            "rules": rules,
+            "active_buying_lists": active_buying_lists,
+            "existing_overrides": existing_overrides,
+            "existing_selected": _existing_selected_map(self.builder_items or []),
+            "selling_price_list_name": selling_price_list_name,
+            "target_currency": target_currency,
+            "qty": qty,
+        }
 
-        items, item_warnings = _load_builder_items(
-            active_buying_lists,
-            manual_items=manual_items,
-            item_group=(getattr(self, "item_group", "") or "").strip(),
-            max_items=cint(self.max_items or 0),
-        )
-        self.set("builder_items", [])
-
-        if not items:
-            self._apply_summary(_empty_summary())
-            self.warnings_html = _warnings_html(item_warnings or [_("No items found for the selected buying price lists.")])
-            return
+    def _evaluate_rows(self, context, items):
+        rules = context["rules"]
+        existing_overrides = context["existing_overrides"]
+        existing_selected = context["existing_selected"]
+        selling_price_list_name = context["selling_price_list_name"]
+        target_currency = context["target_currency"]
+        qty = context["qty"]
 
         item_codes = [row.get("item") for row in items if row.get("item")]
         item_details = get_item_details_map(item_codes)
@@ -84,7 +144,7 @@ class PricingBuilder(Document):
         customs_cache = {}
         benchmark_cache = {}
         benchmark_runtime_cache = {}
-        warnings = list(item_warnings)
+        warnings = []
         result_rows = []
 
         for item_row in items:
@@ -292,85 +352,81 @@ class PricingBuilder(Document):
             if storage_calc.get("warning"):
                 warnings.append(_("{0}: {1}").format(item_code, storage_calc.get("warning")))
 
-        for row in result_rows:
-            self.append("builder_items", row)
+        return result_rows, warnings
 
-        summary = _build_summary(result_rows)
-        self._apply_summary(summary)
-        self.warnings_html = _warnings_html(_dedupe_warnings(warnings))
+    def publish_prices(self, selected_only=False, selected_rows=None, progress=None):
+        """Publish the builder rows to the selling list with bulk writes.
 
-    def publish_prices(self, selected_only=False, selected_rows=None):
+        Existing Item Prices and Item UOMs are prefetched once, rows whose stored
+        price and stamps already match are left alone and the rest are written in
+        chunked multi-row updates and inserts. ``progress(done, total)`` is called
+        after every chunk.
+        """
         price_list_name = _ensure_selling_price_list((self.selling_price_list_name or "").strip(), target_currency=getattr(self, "target_currency", ""))
         stamp_price_list_from_builder(price_list_name, self)
         currency = frappe.db.get_value("Price List", price_list_name, "currency") or frappe.defaults.get_global_default("currency")
-        created = 0
-        updated = 0
-        skipped = 0
-        errors = []
-        brand_map = _builder_source_brand_map(self.builder_items or [])
         selected_keys = _selected_publish_keys(selected_rows)
-
-        for row in self.builder_items or []:
-            if selected_keys is not None:
-                if _builder_row_tuple(row) not in selected_keys:
-                    continue
-            elif selected_only and not cint(row.selected):
-                continue
-            item_code = (row.item or "").strip()
-            if not item_code:
-                skipped += 1
-                continue
-            status = _effective_builder_status(row)
-            if status in {"Missing Rule", "Missing Buy Price"}:
-                skipped += 1
-                continue
-            if item_code in MANUAL_CHARGE_ITEM_CODES:
-                skipped += 1
+        candidates, skipped = _publish_candidates(self.builder_items or [], selected_only, selected_keys)
+        brand_map = _builder_source_brand_map([row for row, _item_code, _final_price in candidates])
+        columns = _item_price_publish_columns()
+        existing = _existing_publish_prices(price_list_name, [item_code for _row, item_code, _price in candidates], columns)
+        item_meta = _publish_item_meta([item_code for _row, item_code, _price in candidates if item_code not in existing])
+
+        updates = {}
+        inserts = []
+        pending = []
+        unchanged = 0
+        for row, item_code, final_price in candidates:
+            values = {"price_list_rate": final_price}
+            for fieldname, value in (("currency", currency), ("selling", 1), ("buying", 0)):
+                if fieldname in columns:
+                    values[fieldname] = value
+            values.update(
+                (fieldname, value)
+                for fieldname, value in item_price_stamp_values(self.name, row).items()
+                if fieldname in columns
+            )
+            current = existing.get(item_code)
+            if "brand" in columns:
+                target = frappe._dict(brand=(current or {}).get("brand"))
+                _set_builder_source_brand(target, row, brand_map)
+                values["brand"] = target.brand
+            if current and _publish_values_unchanged(current, values):
+                row.published_price = final_price
+                unchanged += 1
                 continue
-            final_price = flt(row.override_selling_price or 0) or flt(row.projected_price or 0)
-            if final_price <= 0:
-                skipped += 1
+            pending.append((row, item_code, final_price))
+            if current:
+                updates[current["name"]] = {**current, **values}
                 continue
-            try:
-                existing_name = _get_latest_item_price_name(item_code, price_list_name)
-                if existing_name:
-                    doc = frappe.get_doc("Item Price", existing_name)
-                    doc.price_list_rate = final_price
-                    if hasattr(doc, "currency"):
-                        doc.currency = currency
-                    if hasattr(doc, "selling"):
-                        doc.selling = 1
-                    if hasattr(doc, "buying"):
-                        doc.buying = 0
-                    _set_builder_source_brand(doc, row, brand_map)
-                    stamp_item_price_from_builder_row(doc, self.name, row)
-                    _save_item_price_from_builder(doc)
-                    updated += 1
-                else:
-                    doc = frappe.new_doc("Item Price")
-                    doc.price_list = price_list_name
-                    doc.item_code = item_code
-                    doc.price_list_rate = final_price
-                    if hasattr(doc, "currency"):
-                        doc.currency = currency
-                    if hasattr(doc, "selling"):
-                        doc.selling = 1
-                    if hasattr(doc, "buying"):
-                        doc.buying = 0
-                    if hasattr(doc, "uom"):
-                        doc.uom = frappe.db.get_value("Item", item_code, "stock_uom")
-                    if hasattr(doc, "valid_from"):
-                        doc.valid_from = nowdate()
-                    _set_builder_source_brand(doc, row, brand_map)
-                    stamp_item_price_from_builder_row(doc, self.name, row)
-                    _insert_item_price_from_builder(doc)
-                    created += 1
+            meta = item_meta.get(item_code) or {}
+            values.update(price_list=price_list_name, item_code=item_code)
+            for fieldname, value in (
+                ("uom", meta.get("stock_uom")),
+                ("item_name", meta.get("item_name")),
+                ("item_description", meta.get("description")),
+                ("valid_from", nowdate()),
+            ):
+                if fieldname in columns:
+                    values[fieldname] = value
+            inserts.append(values)
+
+        result = _write_published_prices(updates, inserts, progress=progress)
+        for row, item_code, final_price in pending:
+            if item_code not in result["failed_items"]:
                 row.published_price = final_price
-            except Exception:
-                errors.append(_("{0}: publish failed").format(item_code))
-
-        self.warnings_html = _warnings_html(errors)
-        return {"created": created, "updated": updated, "skipped": skipped, "errors": errors, "price_list": price_list_name}
+        # The bulk writes skip Item Price doc events, so mirror shared lists here.
+        sync_shared_item_prices(price_list_name, result["written"])
+
+        self.warnings_html = _warnings_html(result["errors"])
+        return {
+            "created": result["created"],
+            "updated": result["updated"],
+            "unchanged": unchanged,
+            "skipped": skipped,
+            "errors": result["errors"],
+            "price_list": price_list_name,
+        }
 
     def _apply_summary(self, summary):
         self.total_items = cint(summary.get("item_count") or 0)
@@ -415,24 +471,6 @@ def cleanup_pricing_builder_history(doc, method=None):
         )
 
 
-def _save_item_price_from_builder(doc):
-    previous_flag = getattr(frappe.flags, "orderlift_pricing_builder_publish", False)
-    frappe.flags.orderlift_pricing_builder_publish = True
-    try:
-        doc.save(ignore_permissions=True)
-    finally:
-        frappe.flags.orderlift_pricing_builder_publish = previous_flag
-
-
-def _insert_item_price_from_builder(doc):
-    previous_flag = getattr(frappe.flags, "orderlift_pricing_builder_publish", False)
-    frappe.flags.orderlift_pricing_builder_publish = True
-    try:
-        doc.insert(ignore_permissions=True)
-    finally:
-        frappe.flags.orderlift_pricing_builder_publish = previous_flag
-
-
 def cleanup_item_builder_rows(doc, method=None):
     item_code = (doc.get("name") or doc.get("item_code") or "").strip()
     if not item_code:
@@ -451,15 +489,90 @@ def calculate_builder_doc(name):
     return {"name": doc.name}
 
 
+@frappe.whitelist()
+def evaluate_builder_items(name, keys):
+    doc = frappe.get_doc("Pricing Builder", name)
+    doc.check_permission("read")
+    return doc.evaluate_items(keys)
+
+
 @frappe.whitelist()
 def publish_builder_doc(name, selected_only=0, selected_rows=None):
     doc = frappe.get_doc("Pricing Builder", name)
     doc.check_permission("write")
+    candidates, _skipped = _publish_candidates(
+        doc.builder_items or [],
+        cint(selected_only) == 1,
+        _selected_publish_keys(selected_rows),
+    )
+    if len(candidates) > PUBLISH_BACKGROUND_THRESHOLD:
+        job_id = f"pricing-builder-publish-{name}"
+        if is_job_enqueued(job_id):
+            # deduplicate=True would drop this request silently; say so instead.
+            return {
+                "queued": False,
+                "in_progress": True,
+                "rows": len(candidates),
+                "created": 0,
+                "updated": 0,
+                "skipped": 0,
+                "errors": [_("A publish of this builder is already running. Publish again once it finishes.")],
+                "price_list": doc.selling_price_list_name,
+            }
+        frappe.enqueue(
+            "orderlift.orderlift_sales.doctype.pricing_builder.pricing_builder.publish_builder_doc_job",
+            queue="long",
+            timeout=PUBLISH_JOB_TIMEOUT_SECONDS,
+            enqueue_after_commit=True,
+            job_name=f"pricing-builder-publish-{name}",
+            job_id=job_id,
+            deduplicate=True,
+            name=name,
+            selected_only=cint(selected_only),
+            selected_rows=selected_rows,
+            user=frappe.session.user,
+        )
+        return {
+            "queued": True,
+            "rows": len(candidates),
+            "created": 0,
+            "updated": 0,
+            "skipped": 0,
+            "errors": [],
+            "price_list": doc.selling_price_list_name,
+        }
     out = doc.publish_prices(selected_only=cint(selected_only) == 1, selected_rows=selected_rows)
     doc.save(ignore_permissions=True)
     return out
 
 
+def publish_builder_doc_job(name, selected_only=0, selected_rows=None, user=None):
+    """Background publish with progress on the builder form; notifies ``user`` when done or failed."""
+    user = user or frappe.session.user
+
+    def progress(done, total):
+        frappe.publish_progress(
+            done * 100 / total if total else 100,
+            title=_("Publishing prices"),
+            doctype="Pricing Builder",
+            docname=name,
+            description=_("{0} of {1} item prices written").format(done, total),
+        )
+
+    try:
+        doc = frappe.get_doc("Pricing Builder", name)
+        out = doc.publish_prices(selected_only=cint(selected_only) == 1, selected_rows=selected_rows, progress=progress)
+        doc.save(ignore_permissions=True)
+        frappe.db.commit()
+    except Exception as exc:
+        frappe.db.rollback()
+        frappe.log_error(frappe.get_traceback(), f"Pricing Builder publish failed: {name}")
+        frappe.publish_realtime("pricing_builder_publish_failed", {"pricing_builder": name, "error": str(exc)}, user=user)
+        raise
+    frappe.publish_realtime("pricing_builder_published", {"pricing_builder": name, **out}, user=user)
+    return out
+
+
 def _normalize_rules(rows):
     out = []
     for idx, row in enumerate(rows or [], start=1):
@@ -538,15 +651,7 @@ def _load_builder_items(buying_lists, manual_items=None, item_group=None, max_it
     items = []
     if grouped:
         filters = {"name": ["in", list(grouped.keys())], "disabled": 0}
-        if item_group and item_group != "All Item Groups":
-            if is_item_group_node(item_group):
-                descendants = descendant_leaf_item_groups(item_group)
-                if descendants:
-                    filters["item_group"] = ["in", descendants]
-                else:
-                    warnings.append(_("Selected Item Group has no leaf item groups."))
-            else:
-                filters["item_group"] = item_group
+        filters.update(_item_group_filters(item_group, warnings))
         item_rows = frappe.get_all("Item", filters=filters, fields=["name"], order_by="name asc", limit_page_length=max_items if max_items > 0 else 0)
         items = [grouped.get(row.get("name")) for row in item_rows if grouped.get(row.get("name"))]
     elif not manual_items:
@@ -560,6 +665,81 @@ def _load_builder_items(buying_lists, manual_items=None, item_group=None, max_it
     return items, warnings
 
 
+def _item_group_filters(item_group, warnings):
+    if not item_group or item_group == "All Item Groups":
+        return {}
+    if not is_item_group_node(item_group):
+        return {"item_group": item_group}
+    descendants = descendant_leaf_item_groups(item_group)
+    if not descendants:
+        warnings.append(_("Selected Item Group has no leaf item groups."))
+        return {}
+    return {"item_group": ["in", descendants]}
+
+
+def _load_builder_item_subset(keys, buying_lists, item_group=None, max_items=0):
+    """Item rows for explicit ``(item, buying_list)`` keys, filtered like ``_load_builder_items``.
+
+    A key is kept only when a full calculation would produce it: the item is enabled,
+    in the builder's item group and within ``max_items``, and the buying list is the
+    item's highest-priority active list with a price. Other keys are dropped with a
+    warning.
+    """
+    buying_lists = list(buying_lists or [])
+    warnings = []
+    if max_items > 0:
+        # The cap ranks every priced item, so only the full loader knows which items it keeps.
+        full_items, _full_warnings = _load_builder_items(buying_lists, manual_items=[], item_group=item_group, max_items=max_items)
+        winners = {row.get("item"): row for row in full_items}
+        eligible = set(winners)
+    else:
+        item_codes = sorted({item_code for item_code, _buying_list in keys})
+        filters = {"name": ["in", item_codes], "disabled": 0}
+        filters.update(_item_group_filters(item_group, warnings))
+        eligible = set(frappe.get_all("Item", filters=filters, pluck="name", limit_page_length=0))
+        price_by_key = {
+            (row.get("price_list"), row.get("item_code")): flt(row.get("price_list_rate") or 0)
+            for row in _get_latest_buying_list_rows(buying_lists, item_codes=item_codes)
+        }
+        winners = {}
+        for item_code in eligible:
+            winning_list = next((name for name in buying_lists if (name, item_code) in price_by_key), "")
+            if winning_list:
+                winners[item_code] = {"item": item_code, "buying_list": winning_list, "buy_price": price_by_key[(winning_list, item_code)]}
+
+    items = []
+    for item_code, buying_list in keys:
+        winner = winners.get(item_code)
+        if item_code not in eligible:
+            warnings.append(_("Item {0} is disabled or outside this builder's item filters; skipped.").format(item_code))
+        elif not winner:
+            warnings.append(_("{0}: no buying price found in the selected buying price lists.").format(item_code))
+        elif buying_list and buying_list != winner["buying_list"]:
+            warnings.append(
+                _("{0}: this builder prices the item from {1}, not {2}; skipped.").format(item_code, winner["buying_list"], buying_list)
+            )
+        else:
+            items.append(dict(winner))
+    return items, warnings
+
+
+def _normalize_item_keys(keys):
+    if isinstance(keys, str):
+        keys = frappe.parse_json(keys)
+    out = []
+    seen = set()
+    for key in keys or []:
+        if isinstance(key, (list, tuple)):
+            item_code, buying_list = (list(key) + ["", ""])[:2]
+        else:
+            item_code, buying_list = _row_value(key, "item"), _row_value(key, "buying_list")
+        key = ((item_code or "").strip(), (buying_list or "").strip())
+        if key[0] and key not in seen:
+            seen.add(key)
+            out.append(key)
+    return out
+
+
 def _merge_manual_items(items, manual_items, auto_grouped, price_by_key, warnings):
     item_codes = [row.get("item") for row in manual_items if row.get("item")]
     valid_items = set(frappe.get_all("Item", filters={"name": ["in", item_codes], "disabled": 0}, pluck="name", limit_page_length=0)) if item_codes else set()
@@ -586,11 +766,16 @@ def _merge_manual_items(items, manual_items, auto_grouped, price_by_key, warning
     return merged
 
 
-def _get_latest_buying_list_rows(buying_lists):
+def _get_latest_buying_list_rows(buying_lists, item_codes=None):
     if not buying_lists:
         return []
     conditions = ["ip.price_list in %(price_lists)s"]
     params = {"price_lists": tuple(buying_lists), "today": nowdate()}
+    if item_codes is not None:
+        if not item_codes:
+            return []
+        conditions.append("ip.item_code in %(item_codes)s")
+        params["item_codes"] = tuple(item_codes)
     if frappe.db.has_column("Item Price", "enabled"):
         conditions.append("ip.enabled = 1")
     if frappe.db.has_column("Item Price", "buying"):
@@ -725,6 +910,142 @@ def _price_list_type(price_list_name):
     return "Unknown"
 
 
+def _publish_candidates(rows, selected_only, selected_keys):
+    """Rows a publish would write, as ``(row, item_code, final_price)``, and the skipped count."""
+    candidates = []
+    skipped = 0
+    for row in rows or []:
+        if selected_keys is not None:
+            if _builder_row_tuple(row) not in selected_keys:
+                continue
+        elif selected_only and not cint(row.selected):
+            continue
+        item_code = (row.item or "").strip()
+        if not item_code:
+            skipped += 1
+            continue
+        status = _effective_builder_status(row)
+        if status in {"Missing Rule", "Missing Buy Price"}:
+            skipped += 1
+            continue
+        if item_code in MANUAL_CHARGE_ITEM_CODES:
+            skipped += 1
+            continue
+        final_price = flt(row.override_selling_price or 0) or flt(row.projected_price or 0)
+        if final_price <= 0:
+            skipped += 1
+            continue
+        candidates.append((row, item_code, final_price))
+    return candidates, skipped
+
+
+def _item_price_publish_columns():
+    fieldnames = set(ITEM_PRICE_PUBLISH_FIELDS) | set(item_price_stamp_values("", {}))
+    return {fieldname for fieldname in fieldnames if _doctype_has_column("Item Price", fieldname)}
+
+
+def _existing_publish_prices(price_list_name, item_codes, columns):
+    """Latest Item Price per item in the list, with every field a publish writes."""
+    item_codes = sorted(set(item_codes or []))
+    if not item_codes:
+        return {}
+    rows = frappe.get_all(
+        "Item Price",
+        filters={"price_list": price_list_name, "item_code": ["in", item_codes]},
+        fields=["name", "item_code", "price_list_rate", *sorted(columns)],
+        order_by="modified desc",
+        limit_page_length=0,
+    )
+    out = {}
+    for row in rows:
+        out.setdefault(row.item_code, dict(row))
+    return out
+
+
+def _publish_item_meta(item_codes):
+    item_codes = sorted(set(item_codes or []))
+    if not item_codes:
+        return {}
+    rows = frappe.get_all(
+        "Item",
+        filters={"name": ["in", item_codes]},
+        fields=["name", "stock_uom", "item_name", "description"],
+        limit_page_length=0,
+    )
+    return {row.name: row for row in rows}
+
+
+def _publish_values_unchanged(current, values):
+    for fieldname, value in values.items():
+        if fieldname in PUBLISH_VOLATILE_FIELDS:
+            continue
+        stored = current.get(fieldname)
+        if isinstance(value, (int, float)):
+            if abs(flt(stored) - flt(value)) > 1e-9:
+                return False
+        elif (stored or "") != (value or ""):
+            return False
+    return True
+
+
+def _write_published_prices(updates, inserts, progress=None):
+    """Chunked multi-row writes; a failed chunk is reported and the rest still written."""
+    result = {"created": 0, "updated": 0, "written": [], "errors": [], "failed_items": set()}
+    total = len(updates) + len(inserts)
+    done = 0
+    names = list(updates)
+    for start in range(0, len(names), PUBLISH_CHUNK_SIZE):
+        chunk = {name: updates[name] for name in names[start : start + PUBLISH_CHUNK_SIZE]}
+        try:
+            frappe.db.bulk_update(
+                "Item Price",
+                {
+                    name: {fieldname: value for fieldname, value in values.items() if fieldname not in ("name", "item_code")}
+                    for name, values in chunk.items()
+                },
+                chunk_size=PUBLISH_CHUNK_SIZE,
+            )
+        except Exception:
+            _record_publish_failure(result, list(chunk.values()))
+        else:
+            result["updated"] += len(chunk)
+            result["written"].extend(chunk.values())
+        done += len(chunk)
+        if progress:
+            progress(done, total)
+
+    fields = sorted({fieldname for values in inserts for fieldname in values})
+    timestamp = now_datetime()
+    user = frappe.session.user
+    for start in range(0, len(inserts), PUBLISH_CHUNK_SIZE):
+        chunk = inserts[start : start + PUBLISH_CHUNK_SIZE]
+        try:
+            frappe.db.bulk_insert(
+                "Item Price",
+                fields=["name", "creation", "modified", "owner", "modified_by", *fields],
+                values=[
+                    (frappe.generate_hash(length=10), timestamp, timestamp, user, user, *(values.get(fieldname) for fieldname in fields))
+                    for values in chunk
+                ],
+                chunk_size=PUBLISH_CHUNK_SIZE,
+            )
+        except Exception:
+            _record_publish_failure(result, chunk)
+        else:
+            result["created"] += len(chunk)
+            result["written"].extend(chunk)
+        done += len(chunk)
+        if progress:
+            progress(done, total)
+    return result
+
+
+def _record_publish_failure(result, rows):
+    item_codes = [values.get("item_code") for values in rows]
+    result["failed_items"].update(item_codes)
+    result["errors"].extend(_("{0}: publish failed").format(item_code) for item_code in item_codes)
+
+
 def _get_latest_item_price_name(item_code, price_list):
     rows = frappe.get_all("Item Price", filters={"item_code": item_code, "price_list": price_list}, fields=["name"], order_by="modified desc", limit_page_length=1)
     return rows[0].name if rows else ""
@@ -816,7 +1137,7 @@ def _merge_override_maps(base_overrides, preferred_overrides):
     return merged
 
 
-def _published_item_price_override_map(price_list_name, builder_name):
+def _published_item_price_override_map(price_list_name, builder_name, item_codes=None):
     price_list_name = (price_list_name or "").strip()
     builder_name = (builder_name or "").strip()
     required = (
@@ -827,13 +1148,16 @@ def _published_item_price_override_map(price_list_name, builder_name):
     if not price_list_name or not builder_name or not all(_doctype_has_column(dt, field) for dt, field in required):
         return {"exact": {}, "by_item": {}}
 
+    filters = {
+        "price_list": price_list_name,
+        "custom_pricing_builder": builder_name,
+        "custom_builder_price_overridden": 1,
+    }
+    if item_codes is not None:
+        filters["item_code"] = ["in", list(item_codes)]
     rows = frappe.get_all(
         "Item Price",
-        filters={
-            "price_list": price_list_name,
-            "custom_pricing_builder": builder_name,
-            "custom_builder_price_overridden": 1,
-        },
+        filters=filters,
         fields=["item_code", "custom_source_buying_price_list", "price_list_rate"],
         limit_page_length=0,
     )
@@ -1222,6 +1546,13 @@ def stamp_price_list_from_builder(price_list_name, builder_doc):
 
 
 def stamp_item_price_from_builder_row(doc, builder_name, row, rebuild_time=None):
+    for fieldname, value in item_price_stamp_values(builder_name, row, rebuild_time=rebuild_time).items():
+        if _doc_has_field(doc, fieldname):
+            setattr(doc, fieldname, value)
+
+
+def item_price_stamp_values(builder_name, row, rebuild_time=None):
+    """Builder provenance fields an Item Price published from ``row`` carries."""
     override_price = flt(_row_value(row, "override_selling_price") or 0)
     final_margin_pct = flt(_row_value(row, "final_margin_pct") or 0)
     if override_price > 0:
@@ -1237,7 +1568,7 @@ def stamp_item_price_from_builder_row(doc, builder_name, row, rebuild_time=None)
             cost_before_margin or base_buy,
             final_margin_pct,
         )
-    values = {
+    return {
         "custom_pricing_builder": builder_name,
         "custom_source_buying_price_list": _row_value(row, "buying_list"),
         "custom_pricing_scenario": _row_value(row, "pricing_scenario"),
@@ -1257,9 +1588,6 @@ def stamp_item_price_from_builder_row(doc, builder_name, row, rebuild_time=None)
         "custom_builder_customs_amount": flt(_row_value(row, "customs_amount") or 0),
         "custom_builder_margin_basis": (_row_value(row, "margin_basis") or "").strip() or "Base Price",
     }
-    for fieldname, value in values.items():
-        if _doc_has_field(doc, fieldname):
-            setattr(doc, fieldname, value)
 
 
 def backfill_selling_item_price_brands(price_list=None, dry_run=True, limit=0):
@@ -1,5 +1,5 @@
+import copy
 import json
-from functools import lru_cache
 from time import perf_counter
 
 import frappe
@@ -42,6 +42,7 @@ from orderlift.orderlift_sales.utils.tax_inclusive import (
     sync_quotation_item_tax_inclusive_fields,
     sync_pricing_sheet_item_tax_inclusive_fields,
 )
+from orderlift.orderlift_sales.utils.pricing_reference_cache import pricing_reference_cached
 from orderlift.orderlift_sales.utils.price_list_scope import PRICE_LIST_TYPE_FIELD, can_override_quotation_pricing, get_price_list_type, validate_price_list_scope
 from orderlift.orderlift_sales.utils.commercial_presentation import normalize_dimensioning_multiplier
 from orderlift.orderlift_crm.party_propagation import apply_party_context_to_quotation, resolve_party_context
@@ -53,6 +54,9 @@ from orderlift.role_capabilities import CAPABILITY_PRIVILEGED_PRICING, user_has_
 MISSING_BUY_PRICE_MSG = "No buying price in {price_list}"
 RESTRICTED_AGENT_ROLES = RESTRICTED_COMMERCIAL_ROLES
 NO_EXPENSES_SCENARIO = "__NO_EXPENSES_POLICY__"
+PRICING_ENGINE_ROW = "Row"
+PRICING_ENGINE_BATCH = "Batch"
+DEFAULT_PRICING_ENGINE = PRICING_ENGINE_BATCH
 SUPPORTED_PRICING_PARTY_TYPES = {"Customer", "Lead", "Prospect"}
 
 
@@ -128,6 +132,12 @@ class PricingSheet(Document):
             if (getattr(row, "presentation_role", "") or "Include in commercial summary") != "Print separately"
         )
 
+    def _resolve_pricing_engine(self):
+        engine = (getattr(self.flags, "pricing_engine", "") or "").strip().title()
+        if engine in (PRICING_ENGINE_ROW, PRICING_ENGINE_BATCH):
+            return engine
+        return DEFAULT_PRICING_ENGINE
+
     def _sanitize_line_policy_resolution_fields(self):
         for row in self.lines or []:
             if (getattr(row, "resolved_pricing_scenario", "") or "").strip() == NO_EXPENSES_SCENARIO:
@@ -198,19 +208,245 @@ class PricingSheet(Document):
             warnings.append(_("No active customs policy found; customs costs default to zero."))
         scenario_caches = self._build_scenario_caches(scenario_docs, item_codes, benchmark_policy_doc=benchmark_policy_doc)
 
-        total_base = 0.0
         total_expenses = 0.0
         total_final = 0.0
+
+        pricing_run = {
+            "item_codes": item_codes,
+            "item_details": item_details,
+            "item_groups": item_groups,
+            "scenario_caches": scenario_caches,
+            "customs_policy": customs_policy,
+            "customs_policy_cache": customs_policy_cache,
+            "benchmark_policy_doc": benchmark_policy_doc,
+            "benchmark_policy_cache": benchmark_policy_cache,
+            "draft_policy_mode": draft_policy_mode,
+            "buy_price_cache_by_list": {
+                cache.get("buying_price_list"): cache.get("buy_prices") or {}
+                for cache in scenario_caches.values()
+                if cache.get("buying_price_list")
+            },
+        }
+        pricing_engine = self._resolve_pricing_engine()
+        if pricing_engine == PRICING_ENGINE_BATCH:
+            line_snapshots, used_draft_policy_fallback = self._price_lines_batch(lines, pricing_run, warnings)
+        else:
+            line_snapshots, used_draft_policy_fallback = self._price_lines_per_row(lines, pricing_run, warnings)
+        total_base = sum(snap["base_amount"] for snap in line_snapshots)
+
+        scenario_allocation = {}
+        for snap in line_snapshots:
+            key = snap["scenario_name"]
+            bucket = scenario_allocation.setdefault(
+                key,
+                {
+                    "base": 0.0,
+                    "qty": 0.0,
+                    "sheet_fixed_total": flt(snap["sheet_fixed_total"]),
+                },
+            )
+            bucket["base"] += flt(snap["base_amount"])
+            bucket["qty"] += flt(snap["qty"])
+
+        floor_violations = 0
+        customs_total_applied = 0.0
+        row_benchmark_policy = line_snapshots[-1]["benchmark_policy"] if line_snapshots else None
+        can_override_pricing = can_override_quotation_pricing()
+
+        for snap in line_snapshots:
+            row = snap["row"]
+            qty = snap["qty"]
+            base_unit = snap["base_unit"]
+            base_amount = snap["base_amount"]
+            pricing = snap["pricing"]
+            customs_calc = snap.get("customs_calc") or {}
+            transport_calc = snap.get("transport_calc") or {}
+            storage_calc = snap.get("storage_calc") or {}
+            sheet_fixed_total = snap["sheet_fixed_total"]
+            scenario_name = snap["scenario_name"]
+            alloc = scenario_allocation.get(scenario_name) or {
+                "base": base_amount,
+                "qty": qty,
+                "sheet_fixed_total": sheet_fixed_total,
+            }
+            denom = flt(alloc["base"]) if flt(alloc["base"]) > 0 else flt(alloc["qty"])
+            denom = denom or 1
+            share_basis = base_amount if flt(alloc["base"]) > 0 else qty
+            allocated_sheet = (share_basis / denom) * flt(alloc["sheet_fixed_total"])
+            projected_total = flt(pricing["projected_line"]) + flt(allocated_sheet)
+            projected_total += flt(customs_calc.get("applied") or 0)
+            projected_unit = projected_total / qty if qty else 0
+
+            steps = list(pricing["steps"])
+            component_summary = self._summarize_pricing_components(steps, qty, allocated_sheet)
+            if allocated_sheet:
+                steps.append(
+                    {
+                        "label": "Sheet Allocation",
+                        "type": "Fixed",
+                        "value": allocated_sheet,
+                        "applies_to": "Base Price",
+                        "scope": "Per Sheet",
+                        "sequence": 9999,
+                        "basis": projected_total,
+                        "delta_unit": allocated_sheet / qty if qty else 0,
+                        "delta_line": 0,
+                        "delta_sheet": allocated_sheet,
+                        "running_total": projected_unit,
+                    }
+                )
+
+            self._append_customs_step(steps, qty, projected_unit, customs_calc)
+
+            row.expense_unit_price = flt(component_summary.get("policy_expense_unit") or 0)
+            row.expense_total = flt(component_summary.get("policy_expense_total") or 0)
+            row.projected_unit_price = projected_unit
+            row.projected_total_price = projected_total
+            row.customs_unit_amount = flt(customs_calc.get("applied") or 0) / qty if qty else 0
+            row.margin_unit_amount = flt(component_summary.get("margin_unit") or 0)
+            row.margin_total_amount = flt(component_summary.get("margin_total") or 0)
+            row.tier_modifier_amount = flt(component_summary.get("tier_unit") or 0)
+            row.tier_modifier_total = flt(component_summary.get("tier_total") or 0)
+            row.zone_modifier_amount = flt(component_summary.get("zone_unit") or 0)
+            row.zone_modifier_total = flt(component_summary.get("zone_total") or 0)
+            row.total_margin_unit_amount = flt(row.margin_unit_amount) + flt(row.tier_modifier_amount) + flt(row.zone_modifier_amount)
+            row.total_margin_total_amount = flt(row.margin_total_amount) + flt(row.tier_modifier_total) + flt(row.zone_modifier_total)
+            row.margin_basis = snap.get("margin_application_basis") or "Base Price"
+            row.margin_pct = compute_margin_percent_for_basis(
+                row.margin_unit_amount,
+                row.margin_basis,
+                base_unit,
+                snap.get("landed_cost") or base_unit,
+            )
+            row.total_margin_pct = compute_margin_percent_for_basis(
+                row.total_margin_unit_amount,
+                row.margin_basis,
+                base_unit,
+                snap.get("landed_cost") or base_unit,
+            )
+            row.pricing_breakdown_json = json.dumps(steps)
+            row.breakdown_preview = self._build_breakdown_preview(steps)
+            row.has_scenario_override = 1 if cache_has_override_steps(steps, source="sheet") else 0
+            row.has_line_override = 1 if snap.get("has_line_override") or cache_has_override_steps(steps, source="line") else 0
+            br = snap.get("benchmark_result") or {}
+            matched_br = br.get("matched_rule") or {}
+
+            self._apply_line_discount_and_commission(
+                row,
+                qty=qty,
+                benchmark_result=br,
+                fallback_max_discount_percent=flt(getattr(row_benchmark_policy, "fallback_max_discount_percent", 0) or 0),
+                agent_discount_ctx=agent_discount_ctx,
+                steps=steps,
+                can_override_pricing=can_override_pricing,
+            )
+            if row.is_manual_override:
+                manual_margin = flt(row.sell_unit_price) - base_unit - flt(row.expense_unit_price or 0) - flt(row.customs_unit_amount or 0)
+                row.margin_unit_amount = manual_margin
+                row.margin_total_amount = row.margin_unit_amount * qty
+                row.total_margin_unit_amount = flt(row.margin_unit_amount) + flt(row.tier_modifier_amount) + flt(row.zone_modifier_amount)
+                row.total_margin_total_amount = flt(row.margin_total_amount) + flt(row.tier_modifier_total) + flt(row.zone_modifier_total)
+                row.margin_pct = compute_margin_percent_for_basis(
+                    row.margin_unit_amount,
+                    row.margin_basis,
+                    base_unit,
+                    snap.get("landed_cost") or base_unit,
+                )
+                row.total_margin_pct = compute_margin_percent_for_basis(
+                    row.total_margin_unit_amount,
+                    row.margin_basis,
+                    base_unit,
+                    snap.get("landed_cost") or base_unit,
+                )
+            row.resolved_margin_rule = matched_br.get("label") if matched_br else (snap.get("benchmark_rule_label") or "")
+            row.customs_material = customs_calc.get("material") or ""
+            row.customs_tariff_number = customs_calc.get("tariff_number") or ""
+            row.customs_weight_kg = flt(customs_calc.get("weight_kg") or 0)
+            row.customs_value_per_kg = flt(customs_calc.get("value_per_kg") or 0)
+            row.customs_base_value = flt(customs_calc.get("base_value") or 0)
+            row.customs_total_percent = flt(customs_calc.get("total_percent") or 0)
+            row.customs_rate_per_kg = flt(customs_calc.get("rate_per_kg") or 0)
+            row.customs_rate_percent = flt(customs_calc.get("rate_percent") or 0)
+            row.customs_by_kg = flt(customs_calc.get("by_kg") or 0)
+            row.customs_by_percent = flt(customs_calc.get("by_percent") or 0)
+            row.customs_applied = flt(customs_calc.get("applied") or 0)
+            row.packaging_profile_source = customs_calc.get("packaging_source") or ""
+            row.customs_basis = customs_calc.get("basis") or ""
+            row.transport_allocation_mode = transport_calc.get("mode") or ""
+            row.transport_container_type = transport_calc.get("container_type") or ""
+            row.transport_basis_total = flt(transport_calc.get("denominator") or 0)
+            row.transport_numerator = flt(transport_calc.get("numerator") or 0)
+            row.transport_allocated = flt(transport_calc.get("applied") or 0)
+            # Benchmark trace fields
+            row.benchmark_reference = flt(br.get("benchmark_reference") or 0)
+            row.benchmark_source_count = cint(br.get("source_count") or 0)
+            row.benchmark_ratio = flt(br.get("ratio") or 0)
+            row.benchmark_method = br.get("method") or ""
+            row.resolved_benchmark_rule = self._format_benchmark_rule(matched_br) if matched_br else ""
+            row.margin_source = snap.get("margin_source") or ""
+
+            row.price_floor_violation = 1 if flt(row.sell_unit_price) < 0 else 0
+            if row.price_floor_violation:
+                floor_violations += 1
+                warnings.append(_("Row {0}: sell unit price is below zero.").format(row.idx))
+
+            # Benchmark status: prefer new policy reference, fall back to old single-source
+            br_active = br and flt(br.get("benchmark_reference") or 0) > 0
+            if br_active:
+                # Fix 1: use new multi-source benchmark_reference for status
+                row.benchmark_price = flt(br["benchmark_reference"])  # Fix 4: sync fields
+                self._set_benchmark_status_from_reference(
+                    row, flt(br["benchmark_reference"]), flt(row.sell_unit_price),
+                )
+            else:
+                self._set_benchmark_status_from_reference(row, 0, flt(row.sell_unit_price))
+
+            total_expenses += flt(row.expense_total) + flt(row.customs_applied) + flt(row.margin_total_amount) + flt(row.tier_modifier_total) + flt(row.zone_modifier_total)
+            total_final += flt(row.sell_total)
+            customs_total_applied += flt(row.customs_applied)
+
+        if used_draft_policy_fallback:
+            warnings.append(
+                _("Some lines do not have an active Policy Mapping yet. This Pricing Sheet is saved as a draft until you add a fallback mapping or line-level Expenses Policy.")
+            )
+
+        self.total_buy = flt(total_base)
+        self.total_expenses = flt(total_expenses)
+        self.total_selling = flt(total_final)
+        self.customs_total_applied = flt(customs_total_applied)
+        self.projection_warnings = "\n".join(warnings[:25])
+        self.resolved_mode = "Dynamic"
+        self.calculated_on = now_datetime()
+        self.calculated_by = frappe.session.user
+        self.calc_runtime_ms = (perf_counter() - started) * 1000
+
+        logger = frappe.logger("pricing")
+        logger.info(
+            "PricingSheet %s recalculated in %.2fms (lines=%s, floor_violations=%s, engine=%s)",
+            self.name or "NEW",
+            flt(self.calc_runtime_ms),
+            len(lines),
+            floor_violations,
+            pricing_engine,
+        )
+
+    def _price_lines_per_row(self, lines, pricing_run, warnings):
+        """Price each line independently, resolving every lookup per row."""
+        item_codes = pricing_run["item_codes"]
+        item_details = pricing_run["item_details"]
+        item_groups = pricing_run["item_groups"]
+        scenario_caches = pricing_run["scenario_caches"]
+        customs_policy = pricing_run["customs_policy"]
+        customs_policy_cache = pricing_run["customs_policy_cache"]
+        benchmark_policy_doc = pricing_run["benchmark_policy_doc"]
+        benchmark_policy_cache = pricing_run["benchmark_policy_cache"]
+        draft_policy_mode = pricing_run["draft_policy_mode"]
+        buy_price_cache_by_list = pricing_run["buy_price_cache_by_list"]
+
         line_snapshots = []
         used_draft_policy_fallback = False
         emitted_modifier_warnings = set()
 
-        buy_price_cache_by_list = {
-            cache.get("buying_price_list"): cache.get("buy_prices") or {}
-            for cache in scenario_caches.values()
-            if cache.get("buying_price_list")
-        }
-
         for row in lines:
             qty = flt(row.qty)
             if qty <= 0:
@@ -349,201 +585,251 @@ class PricingSheet(Document):
                     "margin_source": margin_source,
                     "landed_cost": landed_cost,
                     "margin_application_basis": modifier_basis,
+                    "benchmark_policy": row_benchmark_policy,
                 }
             )
-            total_base += base_amount
 
-        scenario_allocation = {}
-        for snap in line_snapshots:
-            key = snap["scenario_name"]
-            bucket = scenario_allocation.setdefault(
-                key,
-                {
-                    "base": 0.0,
-                    "qty": 0.0,
-                    "sheet_fixed_total": flt(snap["sheet_fixed_total"]),
-                },
-            )
-            bucket["base"] += flt(snap["base_amount"])
-            bucket["qty"] += flt(snap["qty"])
+        return line_snapshots, used_draft_policy_fallback
 
-        floor_violations = 0
-        customs_total_applied = 0.0
+    def _price_lines_batch(self, lines, pricing_run, warnings):
+        """Columnar counterpart of ``_price_lines_per_row``.
 
-        for snap in line_snapshots:
-            row = snap["row"]
-            qty = snap["qty"]
-            base_unit = snap["base_unit"]
-            base_amount = snap["base_amount"]
-            pricing = snap["pricing"]
-            customs_calc = snap.get("customs_calc") or {}
-            transport_calc = snap.get("transport_calc") or {}
-            storage_calc = snap.get("storage_calc") or {}
-            sheet_fixed_total = snap["sheet_fixed_total"]
-            scenario_name = snap["scenario_name"]
-            alloc = scenario_allocation.get(scenario_name) or {
-                "base": base_amount,
-                "qty": qty,
-                "sheet_fixed_total": sheet_fixed_total,
-            }
-            denom = flt(alloc["base"]) if flt(alloc["base"]) > 0 else flt(alloc["qty"])
-            denom = denom or 1
-            share_basis = base_amount if flt(alloc["base"]) > 0 else qty
-            allocated_sheet = (share_basis / denom) * flt(alloc["sheet_fixed_total"])
-            projected_total = flt(pricing["projected_line"]) + flt(allocated_sheet)
-            projected_total += flt(customs_calc.get("applied") or 0)
-            projected_unit = projected_total / qty if qty else 0
+        Line inputs are gathered into per-stage columns and every sheet-level
+        lookup (rule context, buy prices per list, packaging, customs rules,
+        tier/zone modifiers, benchmark inputs) is resolved once per distinct key.
+        Each stage then runs over the whole sheet. Snapshots and warnings, in
+        order, are identical to the per-row engine.
+        """
+        item_codes = pricing_run["item_codes"]
+        item_details = pricing_run["item_details"]
+        item_groups = pricing_run["item_groups"]
+        scenario_caches = pricing_run["scenario_caches"]
+        customs_policy = pricing_run["customs_policy"]
+        customs_policy_cache = pricing_run["customs_policy_cache"]
+        benchmark_policy_doc = pricing_run["benchmark_policy_doc"]
+        benchmark_policy_cache = pricing_run["benchmark_policy_cache"]
+        draft_policy_mode = pricing_run["draft_policy_mode"]
+        buy_price_cache_by_list = pricing_run["buy_price_cache_by_list"]
+
+        row_warnings = [[] for _row in lines]
+        used_draft_policy_fallback = False
 
-            steps = list(pricing["steps"])
-            component_summary = self._summarize_pricing_components(steps, qty, allocated_sheet)
-            if allocated_sheet:
-                steps.append(
-                    {
-                        "label": "Sheet Allocation",
-                        "type": "Fixed",
-                        "value": allocated_sheet,
-                        "applies_to": "Base Price",
-                        "scope": "Per Sheet",
-                        "sequence": 9999,
-                        "basis": projected_total,
-                        "delta_unit": allocated_sheet / qty if qty else 0,
-                        "delta_line": 0,
-                        "delta_sheet": allocated_sheet,
-                        "running_total": projected_unit,
-                    }
-                )
+        # --- Stage 1: quantities, rule context and scenario per line ---
+        sheet_context = {
+            "geography_territory": self._resolve_geography_context().get("geography_territory"),
+            "source_buying_price_list": self._resolve_source_buying_price_list(),
+        }
+        scenario_memo = {}
+        qtys = []
+        line_contexts = []
+        scenario_names = []
+        scenario_rules = []
+        line_caches = []
+        for row in lines:
+            qty = flt(row.qty)
+            if qty <= 0:
+                frappe.throw(_("Row {0}: Qty must be greater than zero.").format(row.idx))
 
-            self._append_customs_step(steps, qty, projected_unit, customs_calc)
+            self._hydrate_line_from_item(row, item_groups)
+            row.static_list_price = 0
+            row.resolved_selling_price_list = ""
+            line_context = self._build_rule_context(row=row, item_details=item_details, sheet_context=sheet_context)
+            if row.pricing_scenario:
+                resolved = self._resolve_line_scenario(row, line_context=line_context)
+            else:
+                memo_key = tuple(sorted(line_context.items()))
+                if memo_key not in scenario_memo:
+                    scenario_memo[memo_key] = self._resolve_line_scenario(row, line_context=line_context)
+                resolved = scenario_memo[memo_key]
+            scenario_name, source, scenario_rule = resolved
+            if scenario_name == NO_EXPENSES_SCENARIO:
+                used_draft_policy_fallback = True
+            row.resolved_pricing_scenario = "" if scenario_name == NO_EXPENSES_SCENARIO else scenario_name
+            row.scenario_source = source
+            row.resolved_scenario_rule = self._format_scenario_rule(scenario_rule)
 
-            row.expense_unit_price = flt(component_summary.get("policy_expense_unit") or 0)
-            row.expense_total = flt(component_summary.get("policy_expense_total") or 0)
-            row.projected_unit_price = projected_unit
-            row.projected_total_price = projected_total
-            row.customs_unit_amount = flt(customs_calc.get("applied") or 0) / qty if qty else 0
-            row.margin_unit_amount = flt(component_summary.get("margin_unit") or 0)
-            row.margin_total_amount = flt(component_summary.get("margin_total") or 0)
-            row.tier_modifier_amount = flt(component_summary.get("tier_unit") or 0)
-            row.tier_modifier_total = flt(component_summary.get("tier_total") or 0)
-            row.zone_modifier_amount = flt(component_summary.get("zone_unit") or 0)
-            row.zone_modifier_total = flt(component_summary.get("zone_total") or 0)
-            row.total_margin_unit_amount = flt(row.margin_unit_amount) + flt(row.tier_modifier_amount) + flt(row.zone_modifier_amount)
-            row.total_margin_total_amount = flt(row.margin_total_amount) + flt(row.tier_modifier_total) + flt(row.zone_modifier_total)
-            row.margin_basis = snap.get("margin_application_basis") or "Base Price"
-            row.margin_pct = compute_margin_percent_for_basis(
-                row.margin_unit_amount,
-                row.margin_basis,
-                base_unit,
-                snap.get("landed_cost") or base_unit,
-            )
-            row.total_margin_pct = compute_margin_percent_for_basis(
-                row.total_margin_unit_amount,
-                row.margin_basis,
-                base_unit,
-                snap.get("landed_cost") or base_unit,
-            )
-            row.pricing_breakdown_json = json.dumps(steps)
-            row.breakdown_preview = self._build_breakdown_preview(steps)
-            row.has_scenario_override = 1 if cache_has_override_steps(steps, source="sheet") else 0
-            row.has_line_override = 1 if snap.get("has_line_override") or cache_has_override_steps(steps, source="line") else 0
-            br = snap.get("benchmark_result") or {}
-            matched_br = br.get("matched_rule") or {}
+            cache = scenario_caches.get(scenario_name)
+            if not cache:
+                frappe.throw(_("Unable to resolve pricing cache for scenario {0}").format(scenario_name))
 
-            self._apply_line_discount_and_commission(
-                row,
-                qty=qty,
-                benchmark_result=br,
-                fallback_max_discount_percent=flt(getattr(row_benchmark_policy, "fallback_max_discount_percent", 0) or 0),
-                agent_discount_ctx=agent_discount_ctx,
-                steps=steps,
+            qtys.append(qty)
+            line_contexts.append(line_context)
+            scenario_names.append(scenario_name)
+            scenario_rules.append(scenario_rule)
+            line_caches.append(cache)
+
+        # --- Stage 2: buy prices, one lookup for all extra buying lists ---
+        buying_lists = [
+            (getattr(row, "source_buying_price_list", "") or "").strip() or cache["buying_price_list"]
+            for row, cache in zip(lines, line_caches)
+        ]
+        missing_by_list = {}
+        for row, cache, buying_price_list in zip(lines, line_caches, buying_lists):
+            if not row.item or not buying_price_list or buying_price_list == cache["buying_price_list"]:
+                continue
+            if row.item not in (buy_price_cache_by_list.get(buying_price_list) or {}):
+                missing_by_list.setdefault(buying_price_list, set()).add(row.item)
+        if missing_by_list:
+            missing_codes = sorted(set().union(*missing_by_list.values()))
+            fetched_by_list = get_latest_item_prices_by_list(
+                missing_codes,
+                sorted(missing_by_list),
+                buying=True,
+                target_currency=get_pricing_currency(),
             )
-            if row.is_manual_override:
-                manual_margin = flt(row.sell_unit_price) - base_unit - flt(row.expense_unit_price or 0) - flt(row.customs_unit_amount or 0)
-                row.margin_unit_amount = manual_margin
-                row.margin_total_amount = row.margin_unit_amount * qty
-                row.total_margin_unit_amount = flt(row.margin_unit_amount) + flt(row.tier_modifier_amount) + flt(row.zone_modifier_amount)
-                row.total_margin_total_amount = flt(row.margin_total_amount) + flt(row.tier_modifier_total) + flt(row.zone_modifier_total)
-                row.margin_pct = compute_margin_percent_for_basis(
-                    row.margin_unit_amount,
-                    row.margin_basis,
-                    base_unit,
-                    snap.get("landed_cost") or base_unit,
+            for buying_price_list, codes in missing_by_list.items():
+                fetched = fetched_by_list.get(buying_price_list) or {}
+                buy_price_cache_by_list.setdefault(buying_price_list, {}).update(
+                    {code: fetched[code] for code in codes if code in fetched}
                 )
-                row.total_margin_pct = compute_margin_percent_for_basis(
-                    row.total_margin_unit_amount,
-                    row.margin_basis,
-                    base_unit,
-                    snap.get("landed_cost") or base_unit,
-                )
-            row.resolved_margin_rule = matched_br.get("label") if matched_br else (snap.get("benchmark_rule_label") or "")
-            row.customs_material = customs_calc.get("material") or ""
-            row.customs_tariff_number = customs_calc.get("tariff_number") or ""
-            row.customs_weight_kg = flt(customs_calc.get("weight_kg") or 0)
-            row.customs_value_per_kg = flt(customs_calc.get("value_per_kg") or 0)
-            row.customs_base_value = flt(customs_calc.get("base_value") or 0)
-            row.customs_total_percent = flt(customs_calc.get("total_percent") or 0)
-            row.customs_rate_per_kg = flt(customs_calc.get("rate_per_kg") or 0)
-            row.customs_rate_percent = flt(customs_calc.get("rate_percent") or 0)
-            row.customs_by_kg = flt(customs_calc.get("by_kg") or 0)
-            row.customs_by_percent = flt(customs_calc.get("by_percent") or 0)
-            row.customs_applied = flt(customs_calc.get("applied") or 0)
-            row.packaging_profile_source = customs_calc.get("packaging_source") or ""
-            row.customs_basis = customs_calc.get("basis") or ""
-            row.transport_allocation_mode = transport_calc.get("mode") or ""
-            row.transport_container_type = transport_calc.get("container_type") or ""
-            row.transport_basis_total = flt(transport_calc.get("denominator") or 0)
-            row.transport_numerator = flt(transport_calc.get("numerator") or 0)
-            row.transport_allocated = flt(transport_calc.get("applied") or 0)
-            # Benchmark trace fields
-            row.benchmark_reference = flt(br.get("benchmark_reference") or 0)
-            row.benchmark_source_count = cint(br.get("source_count") or 0)
-            row.benchmark_ratio = flt(br.get("ratio") or 0)
-            row.benchmark_method = br.get("method") or ""
-            row.resolved_benchmark_rule = self._format_benchmark_rule(matched_br) if matched_br else ""
-            row.margin_source = snap.get("margin_source") or ""
 
-            row.price_floor_violation = 1 if flt(row.sell_unit_price) < 0 else 0
-            if row.price_floor_violation:
-                floor_violations += 1
-                warnings.append(_("Row {0}: sell unit price is below zero.").format(row.idx))
+        base_units = []
+        base_amounts = []
+        for row, qty, cache, buying_price_list in zip(lines, qtys, line_caches, buying_lists):
+            row.source_buying_price_list = buying_price_list or ""
+            buy_prices = cache["buy_prices"] or {}
+            if buying_price_list and buying_price_list != cache["buying_price_list"]:
+                buy_prices = buy_price_cache_by_list.get(buying_price_list) or {}
+            self._set_buy_price_from_map(row, buying_price_list, buy_prices, force_refresh=True)
+            base_unit = flt(row.buy_price)
+            base_amount = qty * base_unit
+            row.base_amount = base_amount
+            base_units.append(base_unit)
+            base_amounts.append(base_amount)
+
+        # --- Stage 3: customs with shared packaging/rule lookups ---
+        customs_runtime = {}
+        customs_calcs = []
+        for index, row in enumerate(lines):
+            row_customs_policy = self._resolve_row_customs_policy(scenario_rules[index], customs_policy, customs_policy_cache)
+            customs_calc = self._compute_customs_for_row(
+                row, base_amounts[index], item_details, row_customs_policy, runtime=customs_runtime
+            )
+            if customs_calc.get("warning"):
+                row_warnings[index].append(_("Row {0}: {1}").format(row.idx, customs_calc.get("warning")))
+            customs_calcs.append(customs_calc)
+
+        # --- Stage 4: transport and storage allocations ---
+        transport_calcs = []
+        storage_calcs = []
+        line_expenses = []
+        for index, row in enumerate(lines):
+            cache = line_caches[index]
+            transport_calc = self._compute_transport_for_row(
+                row=row,
+                qty=qtys[index],
+                base_amount=base_amounts[index],
+                item_details=item_details,
+                transport_config=cache.get("transport_config") or {},
+            )
+            if transport_calc.get("warning"):
+                row_warnings[index].append(_("Row {0}: {1}").format(row.idx, transport_calc.get("warning")))
+            storage_calc = self._compute_storage_for_row(
+                row=row,
+                qty=qtys[index],
+                item_details=item_details,
+                storage_config=cache.get("storage_config") or {},
+            )
+            if storage_calc.get("warning"):
+                row_warnings[index].append(_("Row {0}: {1}").format(row.idx, storage_calc.get("warning")))
+
+            expenses = self._inject_transport_expense(list(cache["line_expenses"]), transport_calc)
+            expenses = self._inject_storage_expense(expenses, storage_calc)
+            transport_calcs.append(transport_calc)
+            storage_calcs.append(storage_calc)
+            line_expenses.append(expenses)
 
-            # Benchmark status: prefer new policy reference, fall back to old single-source
-            br_active = br and flt(br.get("benchmark_reference") or 0) > 0
-            if br_active:
-                # Fix 1: use new multi-source benchmark_reference for status
-                row.benchmark_price = flt(br["benchmark_reference"])  # Fix 4: sync fields
-                self._set_benchmark_status_from_reference(
-                    row, flt(br["benchmark_reference"]), flt(row.sell_unit_price),
-                )
-            else:
-                self._set_benchmark_status_from_reference(row, 0, flt(row.sell_unit_price))
+        # --- Stage 5: sheet-level tier/zone modifiers, resolved once ---
+        tier_mod, zone_mod, modifier_warning = self._resolve_segmentation_modifiers()
+        if modifier_warning and row_warnings:
+            row_warnings[0].append(modifier_warning)
 
-            total_expenses += flt(row.expense_total) + flt(row.customs_applied) + flt(row.margin_total_amount) + flt(row.tier_modifier_total) + flt(row.zone_modifier_total)
-            total_final += flt(row.sell_total)
-            customs_total_applied += flt(row.customs_applied)
+        # --- Stage 6: benchmark margin, modifiers and projection ---
+        benchmark_inputs = {}
+        line_snapshots = []
+        for index, row in enumerate(lines):
+            qty = qtys[index]
+            base_unit = base_units[index]
+            customs_calc = customs_calcs[index]
+            transport_calc = transport_calcs[index]
+            row_benchmark_policy = self._resolve_row_benchmark_policy(
+                scenario_rules[index], benchmark_policy_doc, benchmark_policy_cache
+            )
+            effective_line_expenses = self._strip_scenario_margin_expenses(line_expenses[index])
 
-        if used_draft_policy_fallback:
-            warnings.append(
-                _("Some lines do not have an active Policy Mapping yet. This Pricing Sheet is saved as a draft until you add a fallback mapping or line-level Expenses Policy.")
+            benchmark_result = None
+            landed_cost = base_unit
+            margin_source = ""
+            if row_benchmark_policy:
+                landed_cost = self._compute_landed_cost(
+                    base_unit, qty, effective_line_expenses, customs_calc, transport_calc
+                )
+                benchmark_runtime = self._get_benchmark_runtime_cache(
+                    row_benchmark_policy,
+                    benchmark_policy_cache,
+                    item_codes,
+                )
+                source_types_map = benchmark_runtime.get("benchmark_source_types") or {}
+                policy_inputs = benchmark_inputs.get(row_benchmark_policy.name)
+                if policy_inputs is None:
+                    policy_inputs = self._benchmark_policy_inputs(row_benchmark_policy, source_types_map)
+                    benchmark_inputs[row_benchmark_policy.name] = policy_inputs
+                benchmark_result = self._resolve_benchmark_for_row(
+                    row, landed_cost, row_benchmark_policy, item_details,
+                    benchmark_runtime.get("benchmark_price_map") or {},
+                    source_types_map,
+                    line_contexts[index],
+                    policy_inputs=policy_inputs,
+                )
+                if benchmark_result:
+                    effective_line_expenses = self._inject_benchmark_margin_expense(
+                        effective_line_expenses,
+                        benchmark_result,
+                        row_benchmark_policy,
+                        base_unit,
+                        landed_cost,
+                    )
+                    margin_source = "Fallback" if benchmark_result.get("is_fallback") else "Benchmark & Rule"
+                for w in (benchmark_result or {}).get("warnings") or []:
+                    row_warnings[index].append(_("Row {0}: {1}").format(row.idx, w))
+            elif not draft_policy_mode:
+                row_warnings[index].append(_("Row {0}: no margin & benchmark policy found; margin is 0.").format(row.idx))
+
+            modifier_basis = (getattr(row_benchmark_policy, "margin_application_basis", "") or "Base Price").strip() or "Base Price"
+            effective_line_expenses, _tier_amount, _zone_amount = self._inject_modifier_expenses(
+                effective_line_expenses,
+                tier_mod,
+                zone_mod,
+                modifier_basis=modifier_basis,
+                base_unit=base_unit,
+                loaded_cost=landed_cost if row_benchmark_policy else base_unit,
             )
 
-        self.total_buy = flt(total_base)
-        self.total_expenses = flt(total_expenses)
-        self.total_selling = flt(total_final)
-        self.customs_total_applied = flt(customs_total_applied)
-        self.projection_warnings = "\n".join(warnings[:25])
-        self.resolved_mode = "Dynamic"
-        self.calculated_on = now_datetime()
-        self.calculated_by = frappe.session.user
-        self.calc_runtime_ms = (perf_counter() - started) * 1000
+            pricing = apply_expenses(base_unit=base_unit, qty=qty, expenses=effective_line_expenses)
+            line_snapshots.append(
+                {
+                    "row": row,
+                    "scenario_name": scenario_names[index],
+                    "qty": qty,
+                    "base_unit": base_unit,
+                    "base_amount": base_amounts[index],
+                    "pricing": pricing,
+                    "sheet_fixed_total": line_caches[index]["sheet_fixed_total"],
+                    "has_line_override": False,
+                    "customs_calc": customs_calc,
+                    "transport_calc": transport_calc,
+                    "storage_calc": storage_calcs[index],
+                    "benchmark_result": benchmark_result,
+                    "margin_source": margin_source,
+                    "landed_cost": landed_cost,
+                    "margin_application_basis": modifier_basis,
+                    "benchmark_policy": row_benchmark_policy,
+                }
+            )
 
-        logger = frappe.logger("pricing")
-        logger.info(
-            "PricingSheet %s recalculated in %.2fms (lines=%s, floor_violations=%s)",
-            self.name or "NEW",
-            flt(self.calc_runtime_ms),
-            len(lines),
-            floor_violations,
-        )
+        for messages in row_warnings:
+            warnings.extend(messages)
+        return line_snapshots, used_draft_policy_fallback
 
     def _recalculate_static(self, static_ctx, started):
         """Price lines from the agent's selling price list instead of the dynamic engine."""
@@ -1142,24 +1428,30 @@ class PricingSheet(Document):
             if not frappe.db.exists("Pricing Scenario", name):
                 missing.append(name)
                 continue
-            docs[name] = frappe.get_doc("Pricing Scenario", name)
+            docs[name] = self._get_pricing_reference_doc("Pricing Scenario", name)
 
         if missing:
             frappe.throw(_("Missing Expenses Policy record(s): {0}").format(", ".join(sorted(missing))))
 
         return docs
 
-    def _build_rule_context(self, row=None, item_details=None):
+    def _build_rule_context(self, row=None, item_details=None, sheet_context=None):
         row = row or frappe._dict()
         item_details = item_details or {}
         item_code = row.item if row else None
         item_meta = item_details.get(item_code) or {}
-        geo = self._resolve_geography_context()
         source_buying_price_list = (getattr(row, "source_buying_price_list", "") or "").strip()
+        if sheet_context is None:
+            geography_territory = self._resolve_geography_context().get("geography_territory")
+            if not source_buying_price_list:
+                source_buying_price_list = self._resolve_source_buying_price_list()
+        else:
+            geography_territory = sheet_context.get("geography_territory")
+            source_buying_price_list = source_buying_price_list or sheet_context.get("source_buying_price_list")
         return {
-            "source_buying_price_list": source_buying_price_list or self._resolve_source_buying_price_list(),
+            "source_buying_price_list": source_buying_price_list,
             "sales_person": self.sales_person,
-            "geography_territory": geo.get("geography_territory"),
+            "geography_territory": geography_territory,
             "customer_type": self.customer_type,
             "business_type": getattr(self, "crm_business_type", "") or "",
             "crm_business_type": getattr(self, "crm_business_type", "") or "",
@@ -1367,6 +1659,36 @@ class PricingSheet(Document):
             return self._get_named_doc("Pricing Benchmark Policy", matched_rule.get("benchmark_policy"), policy_cache)
         return default_policy
 
+    def _pricing_shared_store(self, name):
+        """Return a cache bucket shared across sheets of one batch job, if any.
+
+        The recalculation queue sets ``flags.pricing_shared_cache`` so consecutive
+        sheets reuse policy documents and price lookups instead of reloading them.
+        """
+        shared = getattr(getattr(self, "flags", None), "pricing_shared_cache", None)
+        if not isinstance(shared, dict):
+            return None
+        return shared.setdefault(name, {})
+
+    def _get_pricing_reference_doc(self, doctype, name):
+        store = self._pricing_shared_store("docs")
+        if store is None:
+            return frappe.get_doc(doctype, name)
+        # The batch keeps a snapshot and hands each sheet its own document, so one
+        # sheet mutating a policy doc cannot leak into the rest of the batch.
+        key = (doctype, name)
+        if key not in store:
+            store[key] = frappe.get_doc(doctype, name).as_dict()
+        return frappe.get_doc(copy.deepcopy(store[key]))
+
+    def _get_cached_item_prices(self, item_codes, price_list, buying, target_currency, cache):
+        bucket = cache.setdefault((price_list, buying, target_currency), {"prices": {}, "checked": set()})
+        missing = [item_code for item_code in item_codes if item_code not in bucket["checked"]]
+        if missing:
+            bucket["prices"].update(get_latest_item_prices(missing, price_list, buying=buying, target_currency=target_currency))
+            bucket["checked"].update(missing)
+        return {item_code: bucket["prices"][item_code] for item_code in item_codes if item_code in bucket["prices"]}
+
     def _get_named_doc(self, doctype, name, cache):
         name = (name or "").strip()
         if not name:
@@ -1576,9 +1898,9 @@ class PricingSheet(Document):
         fallback_mapping = self._get_fallback_policy_mapping()
         mapping_policy = (getattr(fallback_mapping, "customs_policy", "") or "").strip() if fallback_mapping else ""
         if mapping_policy and frappe.db.exists("Pricing Customs Policy", mapping_policy):
-            policy_doc = frappe.get_doc("Pricing Customs Policy", mapping_policy)
+            policy_doc = self._get_pricing_reference_doc("Pricing Customs Policy", mapping_policy)
         elif self.customs_policy and frappe.db.exists("Pricing Customs Policy", self.customs_policy):
-            policy_doc = frappe.get_doc("Pricing Customs Policy", self.customs_policy)
+            policy_doc = self._get_pricing_reference_doc("Pricing Customs Policy", self.customs_policy)
         else:
             default_name = frappe.db.get_value(
                 "Pricing Customs Policy",
@@ -1586,14 +1908,19 @@ class PricingSheet(Document):
                 "name",
             )
             if default_name:
-                policy_doc = frappe.get_doc("Pricing Customs Policy", default_name)
+                policy_doc = self._get_pricing_reference_doc("Pricing Customs Policy", default_name)
                 self.customs_policy = default_name
 
         if not policy_doc or cint(policy_doc.is_active) != 1:
             return None
         return policy_doc
 
-    def _compute_customs_for_row(self, row, base_amount, item_details, customs_policy):
+    def _compute_customs_for_row(self, row, base_amount, item_details, customs_policy, runtime=None):
+        """Compute customs for one line.
+
+        ``runtime`` is an optional dict shared across lines of one recalculation;
+        it memoizes packaging resolutions, customs rule tables and rule matches.
+        """
         details = item_details.get(row.item) or {}
         tariff_number = (details.get("customs_tariff_number") or "").strip().upper()
         material = (details.get("custom_customs_material") or details.get("custom_material") or "").strip().upper()
@@ -1601,12 +1928,19 @@ class PricingSheet(Document):
         qty = flt(row.qty)
         packaging_profile = getattr(row, "custom_packaging_profile", None) or None
 
-        resolution = get_packaging_resolution(
-            item_code=row.item,
-            packaging_profile=packaging_profile,
-            qty=qty,
-            uom=None,
-        ) or {}
+        packaging_cache = runtime.setdefault("packaging", {}) if runtime is not None else None
+        packaging_key = (row.item, packaging_profile, qty)
+        if packaging_cache is not None and packaging_key in packaging_cache:
+            resolution = dict(packaging_cache[packaging_key])
+        else:
+            resolution = get_packaging_resolution(
+                item_code=row.item,
+                packaging_profile=packaging_profile,
+                qty=qty,
+                uom=None,
+            ) or {}
+            if packaging_cache is not None:
+                packaging_cache[packaging_key] = dict(resolution)
 
         resolved_weight_kg = flt(resolution.get("weight_kg") or 0)
         if resolved_weight_kg <= 0:
@@ -1655,22 +1989,21 @@ class PricingSheet(Document):
             out["warning"] = _("item Customs Tariff Number is missing; customs set to 0")
             return out
 
-        rule_dicts = [
-            {
-                "tariff_number": getattr(rule, "tariff_number", ""),
-                "material": rule.material,
-                "value_per_kg": flt(getattr(rule, "value_per_kg", 0) or 0),
-                "rate_components": getattr(rule, "rate_components", "") or "",
-                "rate_per_kg": 0,
-                "rate_percent": flt(rule.rate_percent),
-                "sequence": cint(rule.sequence),
-                "priority": cint(rule.priority),
-                "is_active": cint(rule.is_active),
-                "idx": cint(rule.idx),
-            }
-            for rule in (customs_policy.customs_rules or [])
-        ]
-        rule = resolve_customs_rule(rule_dicts, tariff_number=resolved_tariff, material=material)
+        if runtime is None:
+            rule = resolve_customs_rule(
+                self._customs_rule_dicts(customs_policy), tariff_number=resolved_tariff, material=material
+            )
+        else:
+            rule_tables = runtime.setdefault("rule_dicts", {})
+            if id(customs_policy) not in rule_tables:
+                rule_tables[id(customs_policy)] = self._customs_rule_dicts(customs_policy)
+            rule_matches = runtime.setdefault("rule_matches", {})
+            match_key = (id(customs_policy), resolved_tariff, material)
+            if match_key not in rule_matches:
+                rule_matches[match_key] = resolve_customs_rule(
+                    rule_tables[id(customs_policy)], tariff_number=resolved_tariff, material=material
+                )
+            rule = rule_matches[match_key]
         if not rule:
             identifier = resolved_tariff or material or _("missing tariff")
             out["warning"] = _("no customs rule matched tariff/material {0}; customs set to 0").format(identifier)
@@ -1709,14 +2042,31 @@ class PricingSheet(Document):
                 "component_display": amounts.get("component_display") or "",
             }
         )
-        self._apply_customs_value_delta_tax(out, base_amount, customs_policy)
+        self._apply_customs_value_delta_tax(out, base_amount, customs_policy, runtime=runtime)
         if use_buying_amount_fallback:
             out["warning"] = _("item Weight (kg) is missing; customs calculated from buying amount")
         elif resolved_weight_kg <= 0:
             out["warning"] = _("item Weight (kg) is missing; customs set to 0")
         return out
 
-    def _apply_customs_value_delta_tax(self, customs_calc, base_amount, customs_policy):
+    def _customs_rule_dicts(self, customs_policy):
+        return [
+            {
+                "tariff_number": getattr(rule, "tariff_number", ""),
+                "material": rule.material,
+                "value_per_kg": flt(getattr(rule, "value_per_kg", 0) or 0),
+                "rate_components": getattr(rule, "rate_components", "") or "",
+                "rate_per_kg": 0,
+                "rate_percent": flt(rule.rate_percent),
+                "sequence": cint(rule.sequence),
+                "priority": cint(rule.priority),
+                "is_active": cint(rule.is_active),
+                "idx": cint(rule.idx),
+            }
+            for rule in (customs_policy.customs_rules or [])
+        ]
+
+    def _apply_customs_value_delta_tax(self, customs_calc, base_amount, customs_policy, runtime=None):
         if not customs_policy or not cint(getattr(customs_policy, "enable_customs_value_delta_tax", 0) or 0):
             return
         customs_value = flt((customs_calc or {}).get("base_value") or 0)
@@ -1728,10 +2078,15 @@ class PricingSheet(Document):
             customs_calc["customs_value_delta_tax_template"] = ""
             return
 
-        template = (getattr(customs_policy, "customs_value_delta_tax_template", "") or "").strip()
-        if not template:
-            template = company_default_sales_taxes_template(self._resolve_modifier_company())
-        rate = sales_tax_template_total_rate(template)
+        delta_tax_cache = runtime.setdefault("delta_tax", {}) if runtime is not None else {}
+        if id(customs_policy) in delta_tax_cache:
+            template, rate = delta_tax_cache[id(customs_policy)]
+        else:
+            template = (getattr(customs_policy, "customs_value_delta_tax_template", "") or "").strip()
+            if not template:
+                template = company_default_sales_taxes_template(self._resolve_modifier_company())
+            rate = sales_tax_template_total_rate(template)
+            delta_tax_cache[id(customs_policy)] = (template, rate)
         amount = delta * rate / 100.0 if rate else 0.0
         customs_calc["customs_value_delta"] = flt(delta)
         customs_calc["customs_value_delta_tax_rate"] = flt(rate)
@@ -2001,9 +2356,9 @@ class PricingSheet(Document):
         fallback_mapping = self._get_fallback_policy_mapping()
         mapping_policy = (getattr(fallback_mapping, "benchmark_policy", "") or "").strip() if fallback_mapping else ""
         if mapping_policy and frappe.db.exists("Pricing Benchmark Policy", mapping_policy):
-            return frappe.get_doc("Pricing Benchmark Policy", mapping_policy)
+            return self._get_pricing_reference_doc("Pricing Benchmark Policy", mapping_policy)
         if self.benchmark_policy and frappe.db.exists("Pricing Benchmark Policy", self.benchmark_policy):
-            return frappe.get_doc("Pricing Benchmark Policy", self.benchmark_policy)
+            return self._get_pricing_reference_doc("Pricing Benchmark Policy", self.benchmark_policy)
         
         default_name = frappe.db.get_value(
             "Pricing Benchmark Policy",
@@ -2012,7 +2367,7 @@ class PricingSheet(Document):
         )
         if default_name:
             self.benchmark_policy = default_name
-            return frappe.get_doc("Pricing Benchmark Policy", default_name)
+            return self._get_pricing_reference_doc("Pricing Benchmark Policy", default_name)
 
         return None
 
@@ -2020,7 +2375,7 @@ class PricingSheet(Document):
         """Static pricing can still use benchmark-policy tier/territory modifiers."""
         benchmark_policy = (getattr(self, "benchmark_policy", "") or "").strip()
         if benchmark_policy and frappe.db.exists("Pricing Benchmark Policy", benchmark_policy):
-            return frappe.get_doc("Pricing Benchmark Policy", benchmark_policy)
+            return self._get_pricing_reference_doc("Pricing Benchmark Policy", benchmark_policy)
 
         default_name = frappe.db.get_value(
             "Pricing Benchmark Policy",
@@ -2029,7 +2384,7 @@ class PricingSheet(Document):
         )
         if default_name:
             self.benchmark_policy = default_name
-            return frappe.get_doc("Pricing Benchmark Policy", default_name)
+            return self._get_pricing_reference_doc("Pricing Benchmark Policy", default_name)
 
         return None
 
@@ -2047,8 +2402,27 @@ class PricingSheet(Document):
             landed += flt(customs_calc["applied"]) / qty if qty else 0
         return landed
 
-    def _resolve_benchmark_for_row(self, row, landed_cost, benchmark_policy_doc, item_details, price_map, source_types_map, line_context):
-        """Resolve benchmark margin for a single pricing line."""
+    def _resolve_benchmark_for_row(self, row, landed_cost, benchmark_policy_doc, item_details, price_map, source_types_map, line_context, policy_inputs=None):
+        """Resolve benchmark margin for a single pricing line.
+
+        ``policy_inputs`` is the ``(sources, rules)`` pair from
+        ``_benchmark_policy_inputs``; pass it to reuse one policy across lines.
+        """
+        sources, rules = policy_inputs or self._benchmark_policy_inputs(benchmark_policy_doc, source_types_map)
+        return resolve_benchmark_margin(
+            item_code=row.item,
+            landed_cost=landed_cost,
+            benchmark_sources=sources,
+            benchmark_rules=rules,
+            method=benchmark_policy_doc.method or "Median",
+            benchmark_basis=benchmark_policy_doc.benchmark_basis or "Selling Market",
+            min_sources=cint(benchmark_policy_doc.min_sources_required or 2),
+            fallback_margin=flt(benchmark_policy_doc.fallback_margin_percent or 10),
+            price_map=price_map,
+            context=line_context,
+        )
+
+    def _benchmark_policy_inputs(self, benchmark_policy_doc, source_types_map):
         sources = [
             {
                 "price_list": src.price_list,
@@ -2077,19 +2451,7 @@ class PricingSheet(Document):
             }
             for r in benchmark_policy_doc.benchmark_rules or []
         ]
-
-        return resolve_benchmark_margin(
-            item_code=row.item,
-            landed_cost=landed_cost,
-            benchmark_sources=sources,
-            benchmark_rules=rules,
-            method=benchmark_policy_doc.method or "Median",
-            benchmark_basis=benchmark_policy_doc.benchmark_basis or "Selling Market",
-            min_sources=cint(benchmark_policy_doc.min_sources_required or 2),
-            fallback_margin=flt(benchmark_policy_doc.fallback_margin_percent or 10),
-            price_map=price_map,
-            context=line_context,
-        )
+        return sources, rules
 
     def _inject_benchmark_margin_expense(self, expenses, benchmark_result, benchmark_policy_doc, base_unit, landed_cost):
         """Inject margin expense from benchmark result."""
@@ -2138,7 +2500,7 @@ class PricingSheet(Document):
             "commission_rate": flt(rate),
         }
 
-    def _apply_line_discount_and_commission(self, row, qty, benchmark_result, fallback_max_discount_percent, agent_discount_ctx, steps):
+    def _apply_line_discount_and_commission(self, row, qty, benchmark_result, fallback_max_discount_percent, agent_discount_ctx, steps, can_override_pricing=None):
         matched_rule = (benchmark_result or {}).get("matched_rule") or {}
         policy_max_discount = resolve_max_discount_cap(
             rule_max_discount_percent=flt(matched_rule.get("max_discount_percent") or 0),
@@ -2146,7 +2508,8 @@ class PricingSheet(Document):
             agent_max_discount_percent=flt(agent_discount_ctx.get("max_discount_percent") or 0),
             is_fallback=bool((benchmark_result or {}).get("is_fallback")),
         )
-        can_override_pricing = can_override_quotation_pricing()
+        if can_override_pricing is None:
+            can_override_pricing = can_override_quotation_pricing()
         reference_unit_price = flt(
             getattr(row, "static_list_price", 0) or getattr(row, "projected_unit_price", 0)
         )
@@ -2385,6 +2748,9 @@ class PricingSheet(Document):
 
     def _build_scenario_caches(self, scenario_docs, item_codes, benchmark_policy_doc=None, target_currency=None):
         pricing_currency = (target_currency or "").strip() or get_pricing_currency()
+        price_cache = self._pricing_shared_store("item_prices")
+        if price_cache is None:
+            price_cache = {}
         # Pre-fetch benchmark prices from all sources in the benchmark policy
         benchmark_price_map = {}
         benchmark_source_types = {}
@@ -2396,8 +2762,8 @@ class PricingSheet(Document):
                 if pl and pl not in benchmark_source_types:
                     benchmark_source_types[pl] = get_price_list_type(pl)
                 if pl and pl not in benchmark_price_map:
-                    benchmark_price_map[pl] = get_latest_item_prices(
-                        item_codes, pl, buying=None, target_currency=pricing_currency
+                    benchmark_price_map[pl] = self._get_cached_item_prices(
+                        item_codes, pl, None, pricing_currency, price_cache
                     )
 
         caches = {}
@@ -2416,7 +2782,7 @@ class PricingSheet(Document):
 
             caches[name] = {
                 "buying_price_list": default_buying_price_list,
-                "buy_prices": get_latest_item_prices(item_codes, default_buying_price_list, buying=True, target_currency=pricing_currency)
+                "buy_prices": self._get_cached_item_prices(item_codes, default_buying_price_list, True, pricing_currency, price_cache)
                 if default_buying_price_list
                 else {},
                 "benchmark_price_map": benchmark_price_map,
@@ -2430,7 +2796,7 @@ class PricingSheet(Document):
         if getattr(self, "allow_empty_expenses_policy", 0) and NO_EXPENSES_SCENARIO not in caches:
             caches[NO_EXPENSES_SCENARIO] = {
                 "buying_price_list": default_buying_price_list,
-                "buy_prices": get_latest_item_prices(item_codes, default_buying_price_list, buying=True, target_currency=pricing_currency)
+                "buy_prices": self._get_cached_item_prices(item_codes, default_buying_price_list, True, pricing_currency, price_cache)
                 if default_buying_price_list
                 else {},
                 "benchmark_price_map": benchmark_price_map,
@@ -2519,7 +2885,7 @@ class PricingSheet(Document):
             scenario_name = (self.pricing_scenario or "").strip()
         if not scenario_name:
             frappe.throw(_("Please configure a fallback Policy Mapping row with an Expenses Policy."))
-        return frappe.get_doc("Pricing Scenario", scenario_name)
+        return self._get_pricing_reference_doc("Pricing Scenario", scenario_name)
 
     def _hydrate_line_from_item(self, row, item_groups):
         if not row.item:
@@ -3166,24 +3532,23 @@ def get_latest_item_price(item_code, price_list, buying, target_currency=None):
     return get_latest_item_prices([item_code], price_list, buying, target_currency=target_currency).get(item_code)
 
 
-@lru_cache(maxsize=128)
+@pricing_reference_cached("pricing_currency")
 def get_pricing_currency():
     return frappe.defaults.get_global_default("currency")
 
 
-@lru_cache(maxsize=256)
+@pricing_reference_cached("price_list_currency")
 def get_price_list_currency(price_list):
     if not price_list:
         return get_pricing_currency()
     return frappe.db.get_value("Price List", price_list, "currency") or get_pricing_currency()
 
 
-@lru_cache(maxsize=256)
 def get_exchange_rate_for_pair(from_currency, to_currency, rate_date=None):
     return flt(get_exchange_rate_info_for_pair(from_currency, to_currency, rate_date).get("exchange_rate") or 0)
 
 
-@lru_cache(maxsize=256)
+@pricing_reference_cached("exchange_rate_info")
 def get_exchange_rate_info_for_pair(from_currency, to_currency, rate_date=None):
     from_currency = (from_currency or "").strip().upper()
     to_currency = (to_currency or "").strip().upper()
@@ -3335,76 +3700,39 @@ def get_latest_item_price_records(item_codes, price_list, buying, target_currenc
             for item_code, rate in get_latest_item_prices(item_codes, price_list, buying, target_currency=target_currency).items()
         }
 
-    price_list_currency = get_price_list_currency(price_list)
-    target_currency = (target_currency or "").strip() or price_list_currency
-
-    params = {
-        "item_codes": tuple(item_codes),
-        "price_list": price_list,
-        "today": nowdate(),
-    }
-    if buying is not None:
-        params["buying"] = 1 if buying else 0
-
-    conditions = [
-        "ip.item_code in %(item_codes)s",
-        "ip.price_list = %(price_list)s",
-    ]
-
-    has_enabled = frappe.db.has_column("Item Price", "enabled")
-    has_buying = frappe.db.has_column("Item Price", "buying")
-    has_valid_from = frappe.db.has_column("Item Price", "valid_from")
-    has_valid_upto = frappe.db.has_column("Item Price", "valid_upto")
+    return _fetch_latest_item_price_records(
+        item_codes,
+        [price_list],
+        buying,
+        target_currency=target_currency,
+        include_stamp_fields=True,
+    ).get(price_list, {})
 
-    if has_enabled:
-        conditions.append("ip.enabled = 1")
-    if has_buying and buying is not None:
-        conditions.append("ip.buying = %(buying)s")
-    if has_valid_from:
-        conditions.append("(ip.valid_from IS NULL OR ip.valid_from <= %(today)s)")
-    if has_valid_upto:
-        conditions.append("(ip.valid_upto IS NULL OR ip.valid_upto >= %(today)s)")
 
-    order_by = "ip.item_code ASC, ip.modified DESC"
-    if has_valid_from:
-        order_by = "ip.item_code ASC, ip.valid_from DESC, ip.modified DESC"
-
-    extra_fields = [fieldname for fieldname in ITEM_PRICE_STATIC_STAMP_FIELDS if frappe.db.has_column("Item Price", fieldname)]
-    extra_select = "" if not extra_fields else ", " + ", ".join(f"ip.`{fieldname}`" for fieldname in extra_fields)
-    rows = frappe.db.sql(
-        f"""
-        SELECT ip.name, ip.item_code, ip.price_list_rate, ip.modified{extra_select}
-        FROM `tabItem Price` ip
-        WHERE {' AND '.join(conditions)}
-        ORDER BY {order_by}
-        """,
-        params,
-        as_dict=True,
+def get_latest_item_price_records_by_list(item_codes, price_lists, buying, target_currency=None):
+    price_lists = _unique_price_lists(price_lists)
+    if not item_codes or not price_lists:
+        return {}
+    if not hasattr(frappe.db, "sql"):
+        return {
+            price_list: get_latest_item_price_records(item_codes, price_list, buying, target_currency=target_currency)
+            for price_list in price_lists
+        }
+    return _fetch_latest_item_price_records(
+        item_codes,
+        price_lists,
+        buying,
+        target_currency=target_currency,
+        include_stamp_fields=True,
     )
 
-    out = {}
-    for row in rows:
-        if row.item_code in out:
-            continue
-        record = dict(row)
-        record["price_list_rate"] = convert_price_to_target_currency(
-            row.price_list_rate,
-            price_list_currency,
-            target_currency,
-        )
-        out[row.item_code] = record
-    return out
-
 
 def get_latest_item_price_records_from_lists(item_codes, price_lists, buying, target_currency=None):
+    records_by_list = get_latest_item_price_records_by_list(item_codes, price_lists, buying, target_currency=target_currency)
     out = {}
     duplicate_map = {}
-    for price_list in price_lists or []:
-        price_list = (price_list or "").strip()
-        if not price_list:
-            continue
-        records = get_latest_item_price_records(item_codes, price_list, buying, target_currency=target_currency)
-        for item_code, record in records.items():
+    for price_list in _unique_price_lists(price_lists):
+        for item_code, record in (records_by_list.get(price_list) or {}).items():
             copied = dict(record)
             copied["price_list"] = price_list
             if item_code in out:
@@ -3441,13 +3769,27 @@ def get_latest_item_price_records_from_lists(item_codes, price_lists, buying, ta
 def get_latest_item_prices(item_codes, price_list, buying, target_currency=None):
     if not item_codes or not price_list:
         return {}
+    return get_latest_item_prices_by_list(item_codes, [price_list], buying, target_currency=target_currency).get(price_list, {})
+
+
+def get_latest_item_prices_by_list(item_codes, price_lists, buying, target_currency=None):
+    """Return {price_list: {item_code: rate}} for the winning Item Price of every list."""
+    records_by_list = _fetch_latest_item_price_records(item_codes, price_lists, buying, target_currency=target_currency)
+    return {
+        price_list: {item_code: record["price_list_rate"] for item_code, record in records.items()}
+        for price_list, records in records_by_list.items()
+    }
 
-    price_list_currency = get_price_list_currency(price_list)
-    target_currency = (target_currency or "").strip() or price_list_currency
 
+def _fetch_latest_item_price_records(item_codes, price_lists, buying, target_currency=None, include_stamp_fields=False):
+    price_lists = _unique_price_lists(price_lists)
+    if not item_codes or not price_lists:
+        return {}
+
+    schema = _get_item_price_schema()
     params = {
         "item_codes": tuple(item_codes),
-        "price_list": price_list,
+        "price_lists": tuple(price_lists),
         "today": nowdate(),
     }
     if buying is not None:
@@ -3455,63 +3797,114 @@ def get_latest_item_prices(item_codes, price_list, buying, target_currency=None)
 
     conditions = [
         "ip.item_code in %(item_codes)s",
-        "ip.price_list = %(price_list)s",
+        "ip.price_list in %(price_lists)s",
     ]
-
-    has_enabled = frappe.db.has_column("Item Price", "enabled")
-    has_buying = frappe.db.has_column("Item Price", "buying")
-    has_valid_from = frappe.db.has_column("Item Price", "valid_from")
-    has_valid_upto = frappe.db.has_column("Item Price", "valid_upto")
-
-    if has_enabled:
+    if schema["enabled"]:
         conditions.append("ip.enabled = 1")
-    if has_buying and buying is not None:
+    if schema["buying"] and buying is not None:
         conditions.append("ip.buying = %(buying)s")
-    if has_valid_from:
+    if schema["valid_from"]:
         conditions.append("(ip.valid_from IS NULL OR ip.valid_from <= %(today)s)")
-    if has_valid_upto:
+    if schema["valid_upto"]:
         conditions.append("(ip.valid_upto IS NULL OR ip.valid_upto >= %(today)s)")
 
-    order_by = "ip.item_code ASC, ip.modified DESC"
-    if has_valid_from:
-        order_by = "ip.item_code ASC, ip.valid_from DESC, ip.modified DESC"
-
+    rank_order = "ip.valid_from DESC, ip.modified DESC" if schema["valid_from"] else "ip.modified DESC"
+    extra_fields = schema["stamp_fields"] if include_stamp_fields else ()
+    extra_select = "".join(f", ip.`{fieldname}`" for fieldname in extra_fields)
     rows = frappe.db.sql(
         f"""
-        SELECT ip.item_code, ip.price_list_rate
-        FROM `tabItem Price` ip
-        WHERE {' AND '.join(conditions)}
-        ORDER BY {order_by}
+        SELECT ranked.*
+        FROM (
+            SELECT
+                ip.name, ip.item_code, ip.price_list, ip.price_list_rate, ip.modified{extra_select},
+                ROW_NUMBER() OVER (PARTITION BY ip.price_list, ip.item_code ORDER BY {rank_order}) AS price_rank
+            FROM `tabItem Price` ip
+            WHERE {' AND '.join(conditions)}
+        ) ranked
+        WHERE ranked.price_rank = 1
         """,
         params,
         as_dict=True,
     )
 
-    out = {}
+    requested_currency = (target_currency or "").strip()
+    out = {price_list: {} for price_list in price_lists}
+    currencies = {}
     for row in rows:
-        if row.item_code not in out:
-            out[row.item_code] = convert_price_to_target_currency(
-                row.price_list_rate,
-                price_list_currency,
-                target_currency,
-            )
+        if row.price_list not in out:
+            continue
+        if row.price_list not in currencies:
+            currencies[row.price_list] = get_price_list_currency(row.price_list)
+        price_list_currency = currencies[row.price_list]
+        record = dict(row)
+        record.pop("price_rank", None)
+        record["price_list_rate"] = convert_price_to_target_currency(
+            row.price_list_rate,
+            price_list_currency,
+            requested_currency or price_list_currency,
+        )
+        out[row.price_list][row.item_code] = record
+    return out
+
+
+def _unique_price_lists(price_lists):
+    out = []
+    for price_list in price_lists or []:
+        price_list = (price_list or "").strip()
+        if price_list and price_list not in out:
+            out.append(price_list)
     return out
 
 
+# Item Price columns only change on migrate (after which workers restart), so the
+# has_column probes are resolved once per site and process.
+_ITEM_PRICE_SCHEMA_CACHE = {}
+
+
+def _get_item_price_schema():
+    site = getattr(getattr(frappe, "local", None), "site", None) or ""
+    schema = _ITEM_PRICE_SCHEMA_CACHE.get(site)
+    if schema is None:
+        schema = {
+            "enabled": bool(frappe.db.has_column("Item Price", "enabled")),
+            "buying": bool(frappe.db.has_column("Item Price", "buying")),
+            "valid_from": bool(frappe.db.has_column("Item Price", "valid_from")),
+            "valid_upto": bool(frappe.db.has_column("Item Price", "valid_upto")),
+            "stamp_fields": tuple(
+                fieldname for fieldname in ITEM_PRICE_STATIC_STAMP_FIELDS if frappe.db.has_column("Item Price", fieldname)
+            ),
+        }
+        _ITEM_PRICE_SCHEMA_CACHE[site] = schema
+    return schema
+
+
 def recalculate_pricing_sheet_job(pricing_sheet_name, user=None):
-    user_to_set = user or "Administrator"
+    run_pricing_sheet_recalculation(pricing_sheet_name, user=user)
+
+
+def run_pricing_sheet_recalculation(pricing_sheet_name, user=None, shared_cache=None):
+    """Recalculate and save one sheet; ``shared_cache`` is reused across a batch job.
+
+    The sheet is priced as its ``calculated_by`` user (or owner), so agent restrictions
+    and override rights match an interactive save; ``user`` who requested the run is
+    only notified. ``before_save`` recalculates the sheet.
+    """
+    sheet_users = frappe.db.get_value("Pricing Sheet", pricing_sheet_name, ["calculated_by", "owner"], as_dict=True) or {}
+    run_as = sheet_users.get("calculated_by") or sheet_users.get("owner") or "Administrator"
     previous_user = frappe.session.user
-    frappe.set_user(user_to_set)
+    frappe.set_user(run_as)
     try:
         doc = frappe.get_doc("Pricing Sheet", pricing_sheet_name)
-        doc.recalculate()
+        if shared_cache is not None:
+            doc.flags.pricing_shared_cache = shared_cache
         doc.save(ignore_permissions=True)
+        frappe.db.commit()
     finally:
         frappe.set_user(previous_user)
     frappe.publish_realtime(
         "pricing_sheet_recalculated",
         {"pricing_sheet": pricing_sheet_name},
-        user=user_to_set,
+        user=user or run_as,
     )
 
 
@@ -134,6 +134,7 @@
         STATE.sourcingRulesOpen = readSourcingRulesOpen();
         STATE.autoRecalculate = readAutoRecalculate();
         applyHeader(page);
+        bindPublishEvents(page);
         load(page, currentName());
     };
 
@@ -153,6 +154,31 @@
         stopAutoRecalculateLoop();
     };
 
+    function bindPublishEvents(page) {
+        // Background publishes report back over realtime; only the open builder reacts.
+        const isOpenBuilder = (out) => out && STATE.doc && out.pricing_builder === STATE.doc.name;
+        frappe.realtime.off("pricing_builder_published");
+        frappe.realtime.on("pricing_builder_published", (out) => {
+            if (!isOpenBuilder(out)) return;
+            frappe.show_alert({
+                message: [
+                    __("Price List: {0}", [out.price_list || STATE.doc.selling_price_list_name]),
+                    __("Created: {0}", [out.created || 0]),
+                    __("Updated: {0}", [out.updated || 0]),
+                    __("Skipped: {0}", [out.skipped || 0]),
+                ].join(" | "),
+                indicator: (out.errors || []).length ? "orange" : "green",
+            }, 8);
+            load(page, STATE.doc.name);
+        });
+        frappe.realtime.off("pricing_builder_publish_failed");
+        frappe.realtime.on("pricing_builder_publish_failed", (out) => {
+            if (!isOpenBuilder(out)) return;
+            frappe.show_alert({ message: __("Publishing prices failed: {0}", [out.error || ""]), indicator: "red" }, 10);
+            load(page, STATE.doc.name);
+        });
+    }
+
     function currentName() {
         const route = frappe.get_route() || [];
         return route[1] || "new";
@@ -392,15 +418,21 @@
         const out = (response.message || {}).publish || {};
         STATE.doc = normalizeDoc((response.message || {}).doc || STATE.doc || {});
         STATE.history = (response.message || {}).history || STATE.history || [];
-        frappe.show_alert({
-            message: [
-                __("Price List: {0}", [out.price_list || doc.selling_price_list_name]),
-                __("Created: {0}", [out.created || 0]),
-                __("Updated: {0}", [out.updated || 0]),
-                __("Skipped: {0}", [out.skipped || 0]),
-            ].join(" | "),
-            indicator: (out.errors || []).length ? "orange" : "green",
-        }, 8);
+        if (out.in_progress) {
+            frappe.show_alert({ message: (out.errors || [])[0] || __("A publish of this builder is already running."), indicator: "orange" }, 8);
+        } else if (out.queued) {
+            frappe.show_alert({ message: __("Publishing {0} prices in the background.", [out.rows || 0]), indicator: "blue" }, 8);
+        } else {
+            frappe.show_alert({
+                message: [
+                    __("Price List: {0}", [out.price_list || doc.selling_price_list_name]),
+                    __("Created: {0}", [out.created || 0]),
+                    __("Updated: {0}", [out.updated || 0]),
+                    __("Skipped: {0}", [out.skipped || 0]),
+                ].join(" | "),
+                indicator: (out.errors || []).length ? "orange" : "green",
+            }, 8);
+        }
         ensureBreakdownSelection();
         render(page);
     }
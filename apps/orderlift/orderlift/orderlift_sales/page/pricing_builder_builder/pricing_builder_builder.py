@@ -141,7 +141,8 @@ def compare_recalculated_builder_page_doc(name):
 def publish_builder_page_doc(name, selected_only=1, selected_rows=None):
     out = publish_builder_doc(name, selected_only=selected_only, selected_rows=selected_rows)
     doc = frappe.get_doc("Pricing Builder", name)
-    _create_history(doc, _("Published"))
+    if not out.get("in_progress"):
+        _create_history(doc, _("Publish queued") if out.get("queued") else _("Published"))
     return {"publish": out, "doc": _serialize_doc(doc), "history": _get_history(doc.name)}
 
 
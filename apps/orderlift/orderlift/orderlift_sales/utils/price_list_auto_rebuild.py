@@ -1,10 +1,16 @@
+import json
+from collections import defaultdict
+
 import frappe
+from frappe import _
 from frappe.utils import cint, flt, now_datetime
 
 from orderlift.orderlift_sales.doctype.pricing_builder.pricing_builder import (
     final_selling_price_for_builder_row,
-    stamp_item_price_from_builder_row,
+    item_price_stamp_values,
 )
+from orderlift.orderlift_sales.utils.price_list_sharing import sync_shared_item_prices
+from orderlift.utils.transaction import run_after_commit, run_after_rollback
 
 
 RELEVANT_ITEM_PRICE_FIELDS = (
@@ -18,6 +24,21 @@ RELEVANT_ITEM_PRICE_FIELDS = (
     "valid_upto",
 )
 
+# Rebuild journal for selling lists that follow their source buying prices.
+#
+# A buying Item Price save records its (item, buying list) pair in a Redis set
+# instead of rebuilding inline, so a bulk import journals each pair once. Pairs are
+# journaled and the worker scheduled only after the saving transaction commits, so
+# the worker never drains a pair before the new buying price is visible. One
+# worker job drains the journal, groups the selling targets by Pricing Builder,
+# reprices only the affected builder rows and bulk-writes the selling Item Prices.
+JOURNAL_KEY = "orderlift:price_list_auto_rebuild:journal"
+SCHEDULED_KEY = "orderlift:price_list_auto_rebuild:scheduled"
+SCHEDULED_TTL_SECONDS = 15 * 60
+MAX_PAIRS_PER_JOB = 5000
+JOB_TIMEOUT_SECONDS = 60 * 60
+UPDATE_CHUNK_SIZE = 500
+
 
 def on_item_price_change(doc, method=None):
     if getattr(frappe.flags, "orderlift_auto_rebuild_item_price", False):
@@ -27,81 +48,186 @@ def on_item_price_change(doc, method=None):
     if not _has_relevant_change(doc, method):
         return
 
-    summary = rebuild_from_buying_item_price(doc)
-    for price_list, status in (summary.get("price_lists") or {}).items():
-        _set_price_list_rebuild_status(price_list, status)
+    pair = _rebuild_pair(getattr(doc, "item_code", ""), getattr(doc, "price_list", ""))
+    if not pair:
+        return
+    pending = getattr(frappe.local, "orderlift_auto_rebuild_pairs", None)
+    if pending is None:
+        pending = frappe.local.orderlift_auto_rebuild_pairs = set()
+        run_after_rollback(_discard_pending_pairs)
+    pending.add(pair)
+    run_after_commit(_journal_committed_pairs)
+
+
+def _discard_pending_pairs():
+    # Pairs from a rolled-back write must not ride along with the next commit.
+    frappe.local.orderlift_auto_rebuild_pairs = None
+
+
+def _journal_committed_pairs():
+    pairs = sorted(getattr(frappe.local, "orderlift_auto_rebuild_pairs", None) or ())
+    frappe.local.orderlift_auto_rebuild_pairs = None
+    if not pairs:
+        return
+    if _record_pairs(pairs):
+        # The transaction has committed, so the job can be enqueued right away.
+        _schedule_rebuild_worker(after_commit=False)
+        return
+
+    # Without Redis there is no journal or queue: rebuild inline in a transaction of its own.
+    _set_price_list_statuses(rebuild_from_buying_pairs(pairs))
+    frappe.db.commit()
 
 
 def rebuild_from_buying_item_price(doc):
-    item_code = (getattr(doc, "item_code", "") or "").strip()
-    source_buying_price_list = (getattr(doc, "price_list", "") or "").strip()
-    if not item_code or not source_buying_price_list:
-        return {"updated": 0, "skipped": 0, "errors": [], "price_lists": {}}
+    return rebuild_from_buying_pairs([(getattr(doc, "item_code", ""), getattr(doc, "price_list", ""))])
+
 
-    targets = _get_target_selling_prices(item_code, source_buying_price_list)
+def rebuild_from_buying_pairs(pairs):
+    """Reprice the selling Item Prices built from the given (item, buying list) pairs."""
     summary = {"updated": 0, "skipped": 0, "errors": [], "price_lists": {}}
-    builder_cache = {}
-    calculated_builder_cache = {}
-    rebuild_time = now_datetime()
+    pairs = _clean_pairs(pairs)
+    if not pairs:
+        return summary
+
+    outcomes = defaultdict(lambda: {"updated": 0, "skipped": 0, "failed": 0, "last": ""})
 
-    for target in targets:
+    def record(target, outcome, message):
         price_list = target.get("price_list")
+        if outcome == "failed":
+            summary["errors"].append("{0}: {1}".format(price_list or "-", message))
+        else:
+            summary[outcome] += 1
+        outcomes[price_list][outcome] += 1
+        outcomes[price_list]["last"] = message
+
+    targets_by_builder = defaultdict(list)
+    for target in _get_target_selling_prices(pairs):
+        item_code = target.get("item_code")
         if cint(target.get("custom_builder_price_overridden") or 0):
-            summary["skipped"] += 1
-            summary["price_lists"][price_list] = "Skipped {0}: builder override is protected".format(item_code)
+            record(target, "skipped", "Skipped {0}: builder override is protected".format(item_code))
             continue
-
         builder_name = (target.get("custom_pricing_builder") or target.get("price_list_builder") or "").strip()
         if not builder_name:
-            summary["skipped"] += 1
-            summary["price_lists"][price_list] = "Skipped {0}: no builder link".format(item_code)
+            record(target, "skipped", "Skipped {0}: no builder link".format(item_code))
             continue
+        targets_by_builder[builder_name].append(target)
 
+    rebuild_time = now_datetime()
+    writes = []
+    for builder_name, targets in targets_by_builder.items():
         try:
-            builder = _get_calculated_builder(builder_name, builder_cache, calculated_builder_cache)
-            row = _find_builder_row(builder, item_code, source_buying_price_list)
+            rows = _evaluated_builder_rows(
+                builder_name,
+                {(target.get("item_code"), target.get("custom_source_buying_price_list")) for target in targets},
+            )
+        except Exception as exc:
+            for target in targets:
+                record(target, "failed", "Failed {0}: {1}".format(target.get("item_code"), exc))
+            continue
+
+        for target in targets:
+            item_code = target.get("item_code")
+            source_buying_price_list = target.get("custom_source_buying_price_list")
+            row = rows.get((item_code, source_buying_price_list))
             if not row:
-                summary["skipped"] += 1
-                summary["price_lists"][price_list] = "Skipped {0}: no matching builder row".format(item_code)
+                record(target, "skipped", "Skipped {0}: no matching builder row".format(item_code))
                 continue
             if flt(row.override_selling_price or 0) > 0:
-                summary["skipped"] += 1
-                summary["price_lists"][price_list] = "Skipped {0}: builder override is protected".format(item_code)
+                record(target, "skipped", "Skipped {0}: builder override is protected".format(item_code))
                 continue
             if (row.status or "").strip() in {"Missing Rule", "Missing Buy Price"}:
-                summary["skipped"] += 1
-                summary["price_lists"][price_list] = "Skipped {0}: {1}".format(item_code, row.status or "not ready")
+                record(target, "skipped", "Skipped {0}: {1}".format(item_code, row.status or "not ready"))
                 continue
-
             final_price = final_selling_price_for_builder_row(row)
             if final_price <= 0:
-                summary["skipped"] += 1
-                summary["price_lists"][price_list] = "Skipped {0}: calculated price is zero".format(item_code)
+                record(target, "skipped", "Skipped {0}: calculated price is zero".format(item_code))
                 continue
 
-            selling_doc = frappe.get_doc("Item Price", target.name)
-            selling_doc.price_list_rate = final_price
-            stamp_item_price_from_builder_row(selling_doc, builder.name, row, rebuild_time=rebuild_time)
-            previous_flag = getattr(frappe.flags, "orderlift_auto_rebuild_item_price", False)
-            frappe.flags.orderlift_auto_rebuild_item_price = True
-            try:
-                selling_doc.save(ignore_permissions=True)
-            finally:
-                frappe.flags.orderlift_auto_rebuild_item_price = previous_flag
-            summary["updated"] += 1
-            summary["price_lists"][price_list] = "Updated {0} from {1}: {2}".format(
-                item_code,
-                source_buying_price_list,
-                final_price,
+            values = {"price_list_rate": final_price}
+            values.update(
+                (fieldname, value)
+                for fieldname, value in item_price_stamp_values(builder_name, row, rebuild_time=rebuild_time).items()
+                if _has_column("Item Price", fieldname)
+            )
+            writes.append((target, values))
+            record(
+                target,
+                "updated",
+                "Updated {0} from {1}: {2}".format(item_code, source_buying_price_list, final_price),
             )
-        except Exception as exc:
-            summary["errors"].append("{0}: {1}".format(price_list or "-", exc))
-            summary["price_lists"][price_list] = "Failed {0}: {1}".format(item_code, exc)
 
+    _write_selling_prices(writes)
+    summary["price_lists"] = {price_list: _price_list_status(counts) for price_list, counts in outcomes.items()}
     return summary
 
 
-def _get_target_selling_prices(item_code, source_buying_price_list):
+def process_rebuild_journal():
+    """Background job: rebuild the selling prices of the journaled buying price changes."""
+    cache = frappe.cache()
+    # Release the schedule slot first so pairs journaled while this job runs
+    # schedule a follow-up job instead of waiting for the next change.
+    cache.delete(cache.make_key(SCHEDULED_KEY))
+
+    pairs, remaining = _drain_journal(cache)
+    if not pairs:
+        return {"pairs": 0, "updated": 0, "skipped": 0, "errors": []}
+    try:
+        summary = rebuild_from_buying_pairs(pairs)
+    except Exception:
+        frappe.db.rollback()
+        _record_pairs(pairs)
+        frappe.log_error(title=_("Price list auto-rebuild failed"))
+        raise
+
+    _set_price_list_statuses(summary)
+    if remaining:
+        _schedule_rebuild_worker()
+    return {
+        "pairs": len(pairs),
+        "updated": summary["updated"],
+        "skipped": summary["skipped"],
+        "errors": summary["errors"],
+    }
+
+
+def _write_selling_prices(writes):
+    if not writes:
+        return
+    frappe.db.bulk_update(
+        "Item Price",
+        {target.name: values for target, values in writes},
+        chunk_size=UPDATE_CHUNK_SIZE,
+    )
+
+    # The bulk write skips doc events, so mirror shared lists here.
+    by_price_list = defaultdict(list)
+    for target, values in writes:
+        by_price_list[target.price_list].append(
+            {
+                "item_code": target.item_code,
+                "price_list_rate": values["price_list_rate"],
+                "currency": target.get("currency"),
+                "uom": target.get("uom"),
+                "valid_from": target.get("valid_from"),
+                "valid_upto": target.get("valid_upto"),
+            }
+        )
+    for price_list, item_prices in by_price_list.items():
+        sync_shared_item_prices(price_list, item_prices)
+
+
+def _evaluated_builder_rows(builder_name, keys):
+    """Reprice only the builder rows behind the given (item, buying list) keys."""
+    builder = frappe.get_doc("Pricing Builder", builder_name)
+    rows = {}
+    for row in builder.evaluate_items(sorted(keys)).get("rows") or []:
+        key = ((row.item or "").strip(), (row.buying_list or "").strip())
+        rows.setdefault(key, row)
+    return rows
+
+
+def _get_target_selling_prices(pairs):
     required = [
         ("Price List", "custom_auto_rebuild_from_source_buying_prices"),
         ("Price List", "custom_pricing_builder"),
@@ -131,46 +257,54 @@ def _get_target_selling_prices(item_code, source_buying_price_list):
 
     builder_by_price_list = {row.name: row.custom_pricing_builder for row in price_lists}
     filters = {
-        "item_code": item_code,
+        "item_code": ["in", sorted({item_code for item_code, _source in pairs})],
         "price_list": ["in", list(builder_by_price_list)],
-        "custom_source_buying_price_list": source_buying_price_list,
+        "custom_source_buying_price_list": ["in", sorted({source for _item_code, source in pairs})],
     }
     if _has_column("Item Price", "selling"):
         filters["selling"] = 1
     if _has_column("Item Price", "buying"):
         filters["buying"] = 0
 
-    fields = ["name", "price_list", "custom_pricing_builder"]
+    fields = [
+        "name",
+        "item_code",
+        "price_list",
+        "custom_pricing_builder",
+        "custom_source_buying_price_list",
+        "currency",
+        "uom",
+        "valid_from",
+        "valid_upto",
+    ]
     if _has_column("Item Price", "custom_builder_price_overridden"):
         fields.append("custom_builder_price_overridden")
     rows = frappe.get_all("Item Price", filters=filters, fields=fields, limit_page_length=0)
     out = []
     for row in rows:
+        # The IN filters cross every item with every source list; keep the journaled pairs.
+        if (row.item_code, row.custom_source_buying_price_list) not in pairs:
+            continue
         data = dict(row)
         data["price_list_builder"] = builder_by_price_list.get(row.price_list) or ""
         out.append(frappe._dict(data))
     return out
 
 
-def _get_calculated_builder(builder_name, builder_cache, calculated_builder_cache):
-    if builder_name in calculated_builder_cache:
-        return calculated_builder_cache[builder_name]
-    if builder_name not in builder_cache:
-        builder_cache[builder_name] = frappe.get_doc("Pricing Builder", builder_name)
-    builder = builder_cache[builder_name]
-    builder.calculate_items()
-    calculated_builder_cache[builder_name] = builder
-    return builder
+def _price_list_status(counts):
+    if counts["updated"] + counts["skipped"] + counts["failed"] == 1:
+        return counts["last"]
+    return "Updated {0}, skipped {1}, failed {2}. Last: {3}".format(
+        counts["updated"],
+        counts["skipped"],
+        counts["failed"],
+        counts["last"],
+    )
 
 
-def _find_builder_row(builder, item_code, source_buying_price_list):
-    for row in builder.builder_items or []:
-        if (row.item or "").strip() != item_code:
-            continue
-        if (row.buying_list or "").strip() != source_buying_price_list:
-            continue
-        return row
-    return None
+def _set_price_list_statuses(summary):
+    for price_list, status in (summary.get("price_lists") or {}).items():
+        _set_price_list_rebuild_status(price_list, status)
 
 
 def _set_price_list_rebuild_status(price_list, status):
@@ -182,6 +316,63 @@ def _set_price_list_rebuild_status(price_list, status):
     frappe.db.set_value("Price List", price_list, values, update_modified=False)
 
 
+def _record_pairs(pairs):
+    members = [json.dumps(list(pair)) for pair in pairs]
+    if not members:
+        return True
+    try:
+        frappe.cache().sadd(JOURNAL_KEY, *members)
+    except Exception:
+        return False
+    return True
+
+
+def _drain_journal(cache):
+    """Pop up to MAX_PAIRS_PER_JOB journaled pairs; also report whether more are left."""
+    members = sorted(cache.smembers(JOURNAL_KEY) or [])
+    batch = members[:MAX_PAIRS_PER_JOB]
+    if batch:
+        # Remove only what was read so pairs journaled during the run stay queued.
+        cache.srem(JOURNAL_KEY, *batch)
+    pairs = []
+    for member in batch:
+        try:
+            item_code, price_list = json.loads(member.decode() if isinstance(member, bytes) else member)
+        except (TypeError, ValueError):
+            continue
+        pairs.append((item_code, price_list))
+    return pairs, len(members) > len(batch)
+
+
+def _schedule_rebuild_worker(after_commit=True):
+    try:
+        cache = frappe.cache()
+        acquired = cache.set(cache.make_key(SCHEDULED_KEY), 1, nx=True, ex=SCHEDULED_TTL_SECONDS)
+    except Exception:
+        acquired = True
+    if not acquired:
+        return
+    frappe.enqueue(
+        "orderlift.orderlift_sales.utils.price_list_auto_rebuild.process_rebuild_journal",
+        queue="long",
+        timeout=JOB_TIMEOUT_SECONDS,
+        enqueue_after_commit=after_commit,
+        job_name="price-list-auto-rebuild",
+    )
+
+
+def _rebuild_pair(item_code, price_list):
+    item_code = (item_code or "").strip()
+    price_list = (price_list or "").strip()
+    if not item_code or not price_list:
+        return None
+    return (item_code, price_list)
+
+
+def _clean_pairs(pairs):
+    return {pair for pair in (_rebuild_pair(*pair) for pair in pairs or []) if pair}
+
+
 def _is_source_buying_price(doc):
     price_list = (getattr(doc, "price_list", "") or "").strip()
     if not price_list:
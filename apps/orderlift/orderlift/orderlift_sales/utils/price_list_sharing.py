@@ -265,6 +265,82 @@ def sync_shared_item_price(doc, method=None):
             update_modified=False,
         )
 
+
+def sync_shared_item_prices(source_price_list, item_prices):
+    """Batch form of ``sync_shared_item_price`` for Item Prices written without doc events.
+
+    ``item_prices`` are mappings with ``item_code``, ``price_list_rate``, ``currency``,
+    ``uom``, ``valid_from`` and ``valid_upto``.
+    """
+    source_price_list = (source_price_list or "").strip()
+    item_prices = [row for row in item_prices or [] if (row.get("item_code") or "").strip()]
+    if not source_price_list or not item_prices:
+        return
+    if not _has_column("Price List", SHARING_TABLE_FIELD):
+        return
+
+    sharing_rows = frappe.get_all(
+        "Price List Sharing",
+        filters={
+            "parent": source_price_list,
+            "is_active": 1,
+            "shared_price_list": ["is", "set"],
+        },
+        fields=["name", "shared_price_list", "company"],
+        limit_page_length=0,
+    )
+    if not sharing_rows:
+        return
+
+    item_codes = sorted({row.get("item_code").strip() for row in item_prices})
+    default_currency = None
+    for share_row in sharing_rows:
+        shared_list = share_row["shared_price_list"]
+        existing_names = {
+            row["item_code"]: row["name"]
+            for row in frappe.get_all(
+                "Item Price",
+                filters={"price_list": shared_list, "item_code": ["in", item_codes]},
+                fields=["name", "item_code"],
+                limit_page_length=0,
+            )
+        }
+        updates = {}
+        for row in item_prices:
+            item_code = row.get("item_code").strip()
+            currency = row.get("currency")
+            if not currency:
+                default_currency = default_currency or frappe.defaults.get_global_default("currency")
+                currency = default_currency
+            values = {
+                "price_list_rate": flt(row.get("price_list_rate")),
+                "currency": currency,
+                "uom": row.get("uom"),
+                "valid_from": row.get("valid_from"),
+                "valid_upto": row.get("valid_upto"),
+            }
+            if item_code in existing_names:
+                updates[existing_names[item_code]] = values
+                continue
+            new_ip = frappe.new_doc("Item Price")
+            new_ip.price_list = shared_list
+            new_ip.item_code = item_code
+            for fieldname, value in values.items():
+                setattr(new_ip, fieldname, value)
+            new_ip.buying = 1
+            new_ip.selling = 0
+            new_ip.insert(ignore_permissions=True)
+        if updates:
+            frappe.db.bulk_update("Item Price", updates)
+
+    frappe.db.set_value(
+        "Price List Sharing",
+        {"parent": source_price_list, "shared_price_list": ["is", "set"]},
+        {"last_synced_on": now_datetime()},
+        update_modified=False,
+    )
+
+
 def sync_shared_item_price_on_trash(doc, method=None):
     source_price_list = (getattr(doc, "price_list", "") or "").strip()
     item_code = (getattr(doc, "item_code", "") or "").strip()
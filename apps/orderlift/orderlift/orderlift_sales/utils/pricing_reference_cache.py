@@ -0,0 +1,168 @@
+import functools
+import time
+
+import frappe
+
+from orderlift.utils.transaction import run_after_commit
+
+
+# Pricing reference data (default currency, price list currency, exchange rates)
+# is read on every pricing line. It is cached per site in Redis with a short-lived
+# in-process tier in front of it. Writes to Currency Exchange or Price List bump a
+# per-site generation in Redis; other workers pick it up within the local TTL.
+CACHE_KEY_PREFIX = "orderlift:pricing_reference"
+GENERATION_KEY = f"{CACHE_KEY_PREFIX}:generation"
+DEFAULT_REDIS_TTL_SECONDS = 600
+DEFAULT_LOCAL_TTL_SECONDS = 30
+LOCAL_MAX_ENTRIES = 4096
+
+_MISSING = object()
+_local_entries = {}
+_local_generations = {}
+_stats = {}
+
+
+def pricing_reference_cached(namespace, redis_ttl=DEFAULT_REDIS_TTL_SECONDS, local_ttl=DEFAULT_LOCAL_TTL_SECONDS):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args):
+            return _get_or_compute(namespace, args, lambda: fn(*args), redis_ttl, local_ttl)
+
+        wrapper.cache_clear = lambda: clear_pricing_reference_cache(namespace)
+        wrapper.cache_info = lambda: get_pricing_reference_cache_stats().get(namespace, _empty_stats())
+        wrapper.uncached = fn
+        return wrapper
+
+    return decorator
+
+
+def _get_or_compute(namespace, args, compute, redis_ttl, local_ttl):
+    site = _current_site()
+    generation = _current_generation(site)
+    local_key = (site, namespace, args)
+    stats = _stats.setdefault(namespace, _empty_stats())
+    now = time.monotonic()
+
+    entry = _local_entries.get(local_key)
+    if entry and entry[0] == generation and entry[1] > now:
+        stats["local_hits"] += 1
+        return _copy_value(entry[2])
+
+    redis_key = _redis_key(namespace, generation, args)
+    value = _redis_get(redis_key)
+    if value is not _MISSING:
+        stats["redis_hits"] += 1
+    else:
+        stats["misses"] += 1
+        value = compute()
+        _redis_set(redis_key, value, redis_ttl)
+
+    if len(_local_entries) >= LOCAL_MAX_ENTRIES:
+        _local_entries.clear()
+    _local_entries[local_key] = (generation, now + local_ttl, value)
+    return _copy_value(value)
+
+
+def invalidate_pricing_reference_cache(doc=None, method=None):
+    """Doc event hook for Currency Exchange and Price List writes.
+
+    The generation is bumped once the write commits (or rolls back), so a
+    concurrent reader cannot store pre-commit rows under the new generation.
+    """
+    run_after_commit(_bump_generation, on_rollback=True)
+
+
+def _bump_generation():
+    site = _current_site()
+    generation = _redis_bump_generation()
+    if generation is None:
+        generation = _local_generations.get(site, (0, 0))[0] + 1
+    _local_generations[site] = (generation, time.monotonic() + DEFAULT_LOCAL_TTL_SECONDS)
+    _clear_local_entries(site=site)
+
+
+def clear_pricing_reference_cache(namespace=None):
+    _clear_local_entries(namespace=namespace)
+    if namespace is None:
+        _stats.clear()
+    else:
+        _stats.pop(namespace, None)
+
+
+def get_pricing_reference_cache_stats():
+    return {namespace: dict(values) for namespace, values in _stats.items()}
+
+
+def _clear_local_entries(site=None, namespace=None):
+    for key in list(_local_entries):
+        if site is not None and key[0] != site:
+            continue
+        if namespace is not None and key[1] != namespace:
+            continue
+        _local_entries.pop(key, None)
+
+
+def _current_generation(site):
+    # The generation is itself cached locally for the local TTL so a hot loop does
+    # not turn every lookup into a Redis round trip.
+    now = time.monotonic()
+    cached = _local_generations.get(site)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    generation = _redis_generation()
+    if generation is None:
+        generation = cached[0] if cached else 0
+    _local_generations[site] = (generation, now + DEFAULT_LOCAL_TTL_SECONDS)
+    return generation
+
+
+def _current_site():
+    local = getattr(frappe, "local", None)
+    return getattr(local, "site", None) or ""
+
+
+def _redis_key(namespace, generation, args):
+    return f"{CACHE_KEY_PREFIX}:{namespace}:{generation}:" + "|".join("" if arg is None else str(arg) for arg in args)
+
+
+def _redis_get(key):
+    try:
+        value = frappe.cache().get_value(key)
+    except Exception:
+        return _MISSING
+    return _MISSING if value is None else value
+
+
+def _redis_set(key, value, ttl_seconds):
+    if value is None:
+        return
+    try:
+        frappe.cache().set_value(key, value, expires_in_sec=ttl_seconds)
+    except Exception:
+        pass
+
+
+def _redis_generation():
+    try:
+        cache = frappe.cache()
+        value = cache.get(cache.make_key(GENERATION_KEY))
+    except Exception:
+        return None
+    return int(value or 0)
+
+
+def _redis_bump_generation():
+    try:
+        cache = frappe.cache()
+        return int(cache.incrby(cache.make_key(GENERATION_KEY), 1))
+    except Exception:
+        return None
+
+
+def _copy_value(value):
+    return dict(value) if isinstance(value, dict) else value
+
+
+def _empty_stats():
+    return {"local_hits": 0, "redis_hits": 0, "misses": 0}
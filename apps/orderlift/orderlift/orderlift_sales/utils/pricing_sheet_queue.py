@@ -0,0 +1,348 @@
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import cint
+
+from orderlift.utils.transaction import run_after_commit
+
+
+# Coalescing recalculation queue for Pricing Sheets.
+#
+# Requests are stored per site in a Redis hash keyed by sheet name, so a burst of
+# changes touching the same sheet collapses into one pending entry. One worker job
+# per lane drains the hash in batches and recalculates the sheets with a shared
+# cache for policy documents and Item Price lookups. Sheets a user has open are
+# moved to the priority lane, which runs on the short queue without debounce.
+# Debounced lanes are not slept on inside a worker: the minutely dispatcher
+# enqueues their worker once the oldest change has settled.
+LANE_PRIORITY = "priority"
+LANE_NORMAL = "normal"
+LANES = (LANE_PRIORITY, LANE_NORMAL)
+LANE_QUEUES = {LANE_PRIORITY: "short", LANE_NORMAL: "long"}
+LANE_DEBOUNCE_SECONDS = {LANE_PRIORITY: 0, LANE_NORMAL: 10}
+
+PENDING_KEY = "orderlift:pricing_sheet_queue:pending:{lane}"
+SCHEDULED_KEY = "orderlift:pricing_sheet_queue:scheduled:{lane}"
+STATS_KEY = "orderlift:pricing_sheet_queue:stats"
+SCHEDULED_TTL_SECONDS = 15 * 60
+BATCH_SIZE = 50
+MAX_SHEETS_PER_JOB = 500
+JOB_TIMEOUT_SECONDS = 60 * 60
+
+# Sheet fields and child tables that read each pricing policy doctype.
+POLICY_REFERENCE_FIELDS = {
+    "Pricing Scenario": "pricing_scenario",
+    "Pricing Customs Policy": "customs_policy",
+    "Pricing Benchmark Policy": "benchmark_policy",
+}
+POLICY_REFERENCE_TABLES = {
+    "pricing_scenario": ("Pricing Sheet Item", "Pricing Sheet Scenario Mapping", "Pricing Sheet Bundle Scenario"),
+    "customs_policy": ("Pricing Sheet Scenario Mapping",),
+    "benchmark_policy": ("Pricing Sheet Scenario Mapping",),
+}
+
+
+def queue_pricing_sheet_recalculation(pricing_sheets, priority=False, user=None) -> dict:
+    """Request a background recalculation; repeated requests for a sheet coalesce."""
+    names = _unique_names(pricing_sheets)
+    if not names:
+        return {"queued": 0, "lane": None}
+
+    lane = LANE_PRIORITY if priority else LANE_NORMAL
+    user = user or frappe.session.user
+    now = time.time()
+    try:
+        cache = frappe.cache()
+        for name in names:
+            previous = _pending_entry(cache, lane, name)
+            if lane == LANE_PRIORITY:
+                previous = previous or _pending_entry(cache, LANE_NORMAL, name)
+                cache.hdel(_pending_key(LANE_NORMAL), name)
+            cache.hset(_pending_key(lane), name, _merge_entry(previous, name, user, now))
+    except Exception:
+        # Without Redis, fall back to one deduplicated job per sheet.
+        for name in names:
+            _enqueue_single_sheet(name, user, priority)
+        return {"queued": len(names), "lane": lane, "coalesced": False}
+
+    if not LANE_DEBOUNCE_SECONDS[lane]:
+        _schedule_lane_worker(lane)
+    return {"queued": len(names), "lane": lane, "coalesced": True}
+
+
+@frappe.whitelist()
+def request_pricing_sheet_recalculation(pricing_sheet) -> dict:
+    """Queue the sheet a user is working on in the priority lane."""
+    frappe.has_permission("Pricing Sheet", "write", doc=pricing_sheet, throw=True)
+    return queue_pricing_sheet_recalculation([pricing_sheet], priority=True)
+
+
+def queue_pricing_sheets_for_buying_price_lists(price_lists, user=None) -> dict:
+    """Queue every sheet whose lines or policy mappings read from the given buying lists."""
+    price_lists = _unique_names(price_lists)
+    if not price_lists:
+        return {"queued": 0, "lane": None}
+
+    names = set()
+    for child_doctype in ("Pricing Sheet Item", "Pricing Sheet Scenario Mapping"):
+        names.update(
+            frappe.get_all(
+                child_doctype,
+                filters={"parenttype": "Pricing Sheet", "source_buying_price_list": ["in", price_lists]},
+                pluck="parent",
+                distinct=True,
+                limit_page_length=0,
+            )
+        )
+    return queue_pricing_sheet_recalculation(sorted(names), user=user)
+
+
+def queue_pricing_sheets_for_policy(doctype, policy_name, user=None) -> dict:
+    """Queue every sheet whose header, lines or policy mappings use the given policy."""
+    fieldname = POLICY_REFERENCE_FIELDS.get(doctype)
+    if not fieldname or not policy_name:
+        return {"queued": 0, "lane": None}
+
+    names = set(frappe.get_all("Pricing Sheet", filters={fieldname: policy_name}, pluck="name", limit_page_length=0))
+    for child_doctype in POLICY_REFERENCE_TABLES[fieldname]:
+        names.update(
+            frappe.get_all(
+                child_doctype,
+                filters={"parenttype": "Pricing Sheet", fieldname: policy_name},
+                pluck="parent",
+                distinct=True,
+                limit_page_length=0,
+            )
+        )
+    return queue_pricing_sheet_recalculation(sorted(names), user=user)
+
+
+def on_buying_item_price_change(doc, method=None) -> None:
+    """Item Price hook: requeue sheets reading a changed buying price once committed."""
+    if cint(getattr(doc, "buying", 0)) and getattr(doc, "price_list", None):
+        _defer_source_change("buying_price_lists", doc.price_list)
+
+
+def on_buying_price_list_change(doc, method=None) -> None:
+    """Price List hook: a buying list's currency or status changes every sheet reading it."""
+    if cint(getattr(doc, "buying", 0)) and getattr(doc, "name", None):
+        _defer_source_change("buying_price_lists", doc.name)
+
+
+def on_pricing_policy_change(doc, method=None) -> None:
+    """Pricing Scenario / Customs / Benchmark Policy hook: requeue sheets using the policy."""
+    if getattr(doc, "doctype", None) in POLICY_REFERENCE_FIELDS and getattr(doc, "name", None):
+        _defer_source_change("policies", (doc.doctype, doc.name))
+
+
+def dispatch_pricing_sheet_queue() -> None:
+    """Scheduler job: enqueue a lane worker once its debounced entries are due."""
+    try:
+        cache = frappe.cache()
+        for lane in LANES:
+            if _has_due_entries(cache, lane):
+                _schedule_lane_worker(lane)
+    except Exception:
+        frappe.log_error(title=_("Pricing Sheet queue dispatch failed"))
+
+
+def promote_open_pricing_sheet(doc, method=None) -> None:
+    """Pricing Sheet ``onload`` hook: move a pending sheet to the priority lane."""
+    name = getattr(doc, "name", None)
+    if not name:
+        return
+    try:
+        cache = frappe.cache()
+        entry = _pending_entry(cache, LANE_NORMAL, name)
+        if not entry:
+            return
+        cache.hdel(_pending_key(LANE_NORMAL), name)
+        cache.hset(_pending_key(LANE_PRIORITY), name, entry)
+    except Exception:
+        return
+    _schedule_lane_worker(LANE_PRIORITY)
+
+
+def process_pricing_sheet_queue(lane=LANE_NORMAL) -> dict:
+    """Background job: drain one lane in batches with a shared pricing cache."""
+    lane = lane if lane in LANES else LANE_NORMAL
+    cache = frappe.cache()
+    # Release the schedule slot first so requests arriving while this job runs
+    # schedule a follow-up job instead of being dropped.
+    cache.delete(cache.make_key(_scheduled_key(lane)))
+
+    from orderlift.orderlift_sales.doctype.pricing_sheet.pricing_sheet import run_pricing_sheet_recalculation
+
+    shared_cache = {}
+    summary = {"lane": lane, "processed": 0, "failed": 0, "max_latency_seconds": 0.0, "total_latency_seconds": 0.0}
+    while summary["processed"] + summary["failed"] < MAX_SHEETS_PER_JOB:
+        batch = _next_batch(cache, lane)
+        if not batch:
+            break
+        for entry in batch:
+            if not _claim(cache, lane, entry):
+                continue
+            try:
+                run_pricing_sheet_recalculation(entry["name"], user=entry.get("user"), shared_cache=shared_cache)
+                summary["processed"] += 1
+            except Exception:
+                summary["failed"] += 1
+                frappe.db.rollback()
+                frappe.log_error(title=_("Pricing Sheet recalculation failed: {0}").format(entry["name"]))
+            latency = max(time.time() - float(entry.get("queued_at") or time.time()), 0.0)
+            summary["total_latency_seconds"] += latency
+            summary["max_latency_seconds"] = max(summary["max_latency_seconds"], latency)
+
+    _record_stats(cache, summary)
+    # Entries still inside their debounce window are left to the dispatcher.
+    if _has_due_entries(cache, lane):
+        _schedule_lane_worker(lane)
+    return summary
+
+
+@frappe.whitelist()
+def get_pricing_sheet_queue_status() -> dict:
+    frappe.has_permission("Pricing Sheet", "write", throw=True)
+    cache = frappe.cache()
+    now = time.time()
+    lanes = {}
+    for lane in LANES:
+        entries = _pending_entries(cache, lane)
+        oldest = min((float(entry.get("queued_at") or now) for entry in entries), default=now)
+        lanes[lane] = {
+            "depth": len(entries),
+            "oldest_wait_seconds": round(max(now - oldest, 0.0), 3),
+            "scheduled": bool(cache.get(cache.make_key(_scheduled_key(lane)))),
+        }
+    stats = cache.get_value(STATS_KEY) or {}
+    return {"lanes": lanes, "stats": stats}
+
+
+def _next_batch(cache, lane) -> list[dict]:
+    """Return up to BATCH_SIZE entries whose lane debounce has elapsed."""
+    due = _due_entries(cache, lane)
+    due.sort(key=lambda entry: float(entry.get("queued_at") or 0))
+    return due[:BATCH_SIZE]
+
+
+def _due_entries(cache, lane) -> list[dict]:
+    cutoff = time.time() - LANE_DEBOUNCE_SECONDS[lane]
+    return [entry for entry in _pending_entries(cache, lane) if float(entry.get("changed_at") or 0) <= cutoff]
+
+
+def _has_due_entries(cache, lane) -> bool:
+    return bool(_due_entries(cache, lane))
+
+
+def _claim(cache, lane, entry) -> bool:
+    # Only remove the entry we read; a newer request for the same sheet stays queued.
+    current = _pending_entry(cache, lane, entry["name"])
+    if not current or current.get("changed_at") != entry.get("changed_at"):
+        return False
+    cache.hdel(_pending_key(lane), entry["name"])
+    return True
+
+
+def _schedule_lane_worker(lane) -> None:
+    try:
+        cache = frappe.cache()
+        acquired = cache.set(cache.make_key(_scheduled_key(lane)), 1, nx=True, ex=SCHEDULED_TTL_SECONDS)
+    except Exception:
+        acquired = True
+    if not acquired:
+        return
+    frappe.enqueue(
+        "orderlift.orderlift_sales.utils.pricing_sheet_queue.process_pricing_sheet_queue",
+        queue=LANE_QUEUES[lane],
+        timeout=JOB_TIMEOUT_SECONDS,
+        enqueue_after_commit=True,
+        job_name=f"pricing-sheet-queue-{lane}",
+        lane=lane,
+    )
+
+
+def _defer_source_change(kind, value) -> None:
+    # Collect changes for the whole transaction; sheets are resolved and queued once after commit.
+    changes = getattr(frappe.local, "orderlift_pricing_sheet_sources", None)
+    if changes is None:
+        changes = frappe.local.orderlift_pricing_sheet_sources = {"buying_price_lists": set(), "policies": set()}
+    changes[kind].add(value)
+    run_after_commit(_flush_source_changes)
+
+
+def _flush_source_changes() -> None:
+    changes = getattr(frappe.local, "orderlift_pricing_sheet_sources", None)
+    frappe.local.orderlift_pricing_sheet_sources = None
+    if not changes:
+        return
+    if changes["buying_price_lists"]:
+        queue_pricing_sheets_for_buying_price_lists(sorted(changes["buying_price_lists"]))
+    for doctype, name in sorted(changes["policies"]):
+        queue_pricing_sheets_for_policy(doctype, name)
+
+
+def _enqueue_single_sheet(name, user, priority) -> None:
+    frappe.enqueue(
+        "orderlift.orderlift_sales.doctype.pricing_sheet.pricing_sheet.recalculate_pricing_sheet_job",
+        queue=LANE_QUEUES[LANE_PRIORITY if priority else LANE_NORMAL],
+        enqueue_after_commit=True,
+        job_name=f"pricing-sheet-recalc-{name}",
+        pricing_sheet_name=name,
+        user=user,
+    )
+
+
+def _record_stats(cache, summary) -> None:
+    try:
+        stats = cache.get_value(STATS_KEY) or {}
+        lane_stats = stats.setdefault(summary["lane"], {"processed": 0, "failed": 0, "jobs": 0})
+        lane_stats["processed"] += summary["processed"]
+        lane_stats["failed"] += summary["failed"]
+        lane_stats["jobs"] += 1
+        handled = summary["processed"] + summary["failed"]
+        lane_stats["last_run_at"] = time.time()
+        lane_stats["last_batch_size"] = handled
+        lane_stats["last_max_latency_seconds"] = round(summary["max_latency_seconds"], 3)
+        lane_stats["last_avg_latency_seconds"] = round(summary["total_latency_seconds"] / handled, 3) if handled else 0.0
+        cache.set_value(STATS_KEY, stats)
+    except Exception:
+        pass
+
+
+def _merge_entry(previous, name, user, now) -> dict:
+    previous = previous or {}
+    return {
+        "name": name,
+        "user": user or previous.get("user"),
+        "queued_at": previous.get("queued_at") or now,
+        "changed_at": now,
+        "requests": int(previous.get("requests") or 0) + 1,
+    }
+
+
+def _pending_entry(cache, lane, name):
+    return cache.hget(_pending_key(lane), name)
+
+
+def _pending_entries(cache, lane) -> list[dict]:
+    return [entry for entry in (cache.hgetall(_pending_key(lane)) or {}).values() if entry]
+
+
+def _pending_key(lane) -> str:
+    return PENDING_KEY.format(lane=lane)
+
+
+def _scheduled_key(lane) -> str:
+    return SCHEDULED_KEY.format(lane=lane)
+
+
+def _unique_names(values) -> list[str]:
+    if isinstance(values, str):
+        values = [values]
+    out = []
+    for value in values or []:
+        value = (value or "").strip()
+        if value and value not in out:
+            out.append(value)
+    return out
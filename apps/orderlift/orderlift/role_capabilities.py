@@ -3,6 +3,7 @@ from __future__ import annotations
 import frappe
 
 from orderlift.startup_roles import CANONICAL_BUSINESS_ROLES
+from orderlift.utils.transaction import in_write_transaction, run_after_commit
 
 
 ROLE_CAPABILITY_FIELD = "custom_orderlift_capabilities"
@@ -144,6 +145,17 @@ DEFAULT_CAPABILITY_UPGRADES = {
 
 HARDCODED_CAPABILITY_ROLES = {"System Manager"}
 
+# One bit per capability; a user's capabilities are the OR of their roles' masks.
+CAPABILITY_BITS = {capability: 1 << index for index, capability in enumerate(ROLE_CAPABILITIES)}
+ALL_CAPABILITIES_MASK = (1 << len(CAPABILITY_BITS)) - 1
+
+# Role -> capabilities is read in one query and cached per site in Redis until a Role
+# write commits; it is never cached from inside a write transaction. User masks are
+# memoised per request, so repeated checks in list views and permission hooks cost a
+# dict lookup.
+ROLE_CAPABILITY_CACHE_KEY = "orderlift:role_capabilities"
+ROLE_CAPABILITY_CACHE_TTL_SECONDS = 6 * 60 * 60
+
 
 def capability_options() -> list[dict[str, str]]:
     rows = []
@@ -207,6 +219,7 @@ def migrate_legacy_pipeline_assignment_capabilities() -> None:
             serialize_capabilities(values),
             update_modified=False,
         )
+    clear_role_capability_cache()
 
 
 def normalize_role_capabilities(doc, method=None) -> None:
@@ -265,26 +278,91 @@ def _sync_purchase_agent_rule_permissions(role: str) -> None:
 
 def get_role_capabilities(role: str) -> list[str]:
     role = (role or "").strip()
-    if not role or not _has_role_capability_field():
-        return []
-    try:
-        value = frappe.db.get_value("Role", role, ROLE_CAPABILITY_FIELD)
-    except Exception:
+    if not role:
         return []
-    return normalize_capabilities(value)
+    return list(_role_capability_table().get(role) or [])
 
 
 def user_has_capability(capability: str, user: str | None = None, roles: set[str] | None = None) -> bool:
-    capability = (capability or "").strip()
-    if capability not in ROLE_CAPABILITIES:
+    bit = CAPABILITY_BITS.get((capability or "").strip())
+    if not bit:
         return False
+    return bool(user_capability_mask(user=user, roles=roles) & bit)
+
+
+def user_capability_mask(user: str | None = None, roles: set[str] | None = None) -> int:
     user = user or getattr(getattr(frappe, "session", None), "user", "")
     if user == "Administrator":
-        return True
-    roles = set(roles if roles is not None else (frappe.get_roles(user) or []))
+        return ALL_CAPABILITIES_MASK
+    if roles is not None:
+        return capability_mask_for_roles(roles)
+
+    memo = _request_mask_memo()
+    if memo is not None and user in memo:
+        return memo[user]
+    mask = capability_mask_for_roles(frappe.get_roles(user) or [])
+    if memo is not None:
+        memo[user] = mask
+    return mask
+
+
+def capability_mask_for_roles(roles) -> int:
+    roles = set(roles or [])
     if roles & HARDCODED_CAPABILITY_ROLES:
-        return True
-    return any(capability in get_role_capabilities(role) for role in roles)
+        return ALL_CAPABILITIES_MASK
+    mask = 0
+    for role in roles:
+        for capability in get_role_capabilities(role):
+            mask |= CAPABILITY_BITS.get(capability, 0)
+    return mask
+
+
+def capabilities_from_mask(mask: int) -> list[str]:
+    return [capability for capability, bit in CAPABILITY_BITS.items() if mask & bit]
+
+
+def capabilities_for_users(users) -> dict[str, list[str]]:
+    """Capabilities of many users with a single Has Role query."""
+    users = list(dict.fromkeys(user for user in users or [] if user))
+    if not users:
+        return {}
+    roles_by_user = {user: set() for user in users}
+    for row in frappe.get_all(
+        "Has Role",
+        filters={"parenttype": "User", "parent": ["in", users]},
+        fields=["parent", "role"],
+        limit_page_length=0,
+    ):
+        roles_by_user[row.parent].add(row.role)
+    return {
+        user: capabilities_from_mask(user_capability_mask(user=user, roles=roles_by_user[user]))
+        for user in users
+    }
+
+
+def clear_role_capability_cache(doc=None, method=None) -> None:
+    """Doc event / clear_cache hook: drop cached role capabilities after Role writes.
+
+    The shared table is deleted once the write commits or rolls back, so no other
+    worker can reload the old capabilities and cache them for the TTL.
+    """
+    _clear_local_role_capabilities()
+    run_after_commit(_drop_role_capability_cache, on_rollback=True)
+
+
+def _drop_role_capability_cache() -> None:
+    try:
+        frappe.cache().delete_value(ROLE_CAPABILITY_CACHE_KEY)
+    except Exception:
+        pass
+    _clear_local_role_capabilities()
+
+
+def _clear_local_role_capabilities() -> None:
+    local = getattr(frappe, "local", None)
+    for attr in ("orderlift_role_capabilities", "orderlift_capability_masks"):
+        if local is not None and hasattr(local, attr):
+            delattr(local, attr)
 
 
 def role_capability_decision(
@@ -315,6 +393,7 @@ def seed_default_role_capabilities() -> None:
             serialize_capabilities(capabilities),
             update_modified=False,
         )
+    clear_role_capability_cache()
 
 
 def upgrade_canonical_role_capabilities() -> None:
@@ -329,7 +408,7 @@ def upgrade_canonical_role_capabilities() -> None:
     for role in CANONICAL_BUSINESS_ROLES:
         if not frappe.db.exists("Role", role):
             continue
-        current = set(get_role_capabilities(role))
+        current = set(normalize_capabilities(frappe.db.get_value("Role", role, ROLE_CAPABILITY_FIELD)))
         desired_defaults = set(DEFAULT_ROLE_CAPABILITIES.get(role, []))
         current.difference_update(pipeline_capabilities - desired_defaults)
         current.update(desired_defaults)
@@ -337,6 +416,7 @@ def upgrade_canonical_role_capabilities() -> None:
         value = serialize_capabilities(current)
         if value != (frappe.db.get_value("Role", role, ROLE_CAPABILITY_FIELD) or ""):
             frappe.db.set_value("Role", role, ROLE_CAPABILITY_FIELD, value, update_modified=False)
+    clear_role_capability_cache()
 
 
 @frappe.whitelist()
@@ -364,6 +444,69 @@ def normalize_managed_role_capabilities(dry_run: int = 1) -> dict:
     return result
 
 
+def _role_capability_table() -> dict[str, list[str]]:
+    local = getattr(frappe, "local", None)
+    table = getattr(local, "orderlift_role_capabilities", None) if local is not None else None
+    if isinstance(table, dict):
+        return table
+
+    # Inside a write transaction Redis may still hold the table a pending Role
+    # write replaces, so read the rows this transaction sees and cache nothing.
+    writing = in_write_transaction()
+    table = None
+    if not writing:
+        try:
+            table = frappe.cache().get_value(ROLE_CAPABILITY_CACHE_KEY)
+        except Exception:
+            pass
+    if not isinstance(table, dict):
+        table = _load_role_capability_table()
+        if not writing:
+            try:
+                frappe.cache().set_value(ROLE_CAPABILITY_CACHE_KEY, table, expires_in_sec=ROLE_CAPABILITY_CACHE_TTL_SECONDS)
+            except Exception:
+                pass
+    if local is not None:
+        try:
+            local.orderlift_role_capabilities = table
+        except Exception:
+            pass
+    return table
+
+
+def _load_role_capability_table() -> dict[str, list[str]]:
+    if not _has_role_capability_field():
+        return {}
+    try:
+        rows = frappe.get_all(
+            "Role",
+            filters={ROLE_CAPABILITY_FIELD: ["is", "set"]},
+            fields=["name", ROLE_CAPABILITY_FIELD],
+            limit_page_length=0,
+        )
+    except Exception:
+        return {}
+    table = {}
+    for row in rows:
+        capabilities = normalize_capabilities(row.get(ROLE_CAPABILITY_FIELD))
+        if capabilities:
+            table[row.name] = capabilities
+    return table
+
+
+def _request_mask_memo() -> dict | None:
+    local = getattr(frappe, "local", None)
+    if local is None:
+        return None
+    memo = getattr(local, "orderlift_capability_masks", None)
+    if memo is None:
+        try:
+            memo = local.orderlift_capability_masks = {}
+        except Exception:
+            return None
+    return memo
+
+
 def _has_role_capability_field() -> bool:
     try:
         return bool(frappe.get_meta("Role").get_field(ROLE_CAPABILITY_FIELD))
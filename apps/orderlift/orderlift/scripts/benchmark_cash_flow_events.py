@@ -0,0 +1,273 @@
+"""Compare the columnar cash-flow event passes with the list scans they replaced.
+
+bench --site <site> execute orderlift.scripts.benchmark_cash_flow_events.run --kwargs "{'events': 200000, 'contexts': 2000}"
+
+Builds a synthetic portfolio in memory (no database access) and times the
+portfolio horizon rows, the consolidated funding position and the lifetime
+buckets with both implementations. The legacy per-context scans are quadratic,
+so they run on ``legacy_sample`` contexts and their time is extrapolated to the
+whole portfolio. ``max_difference`` is the largest absolute gap between the two
+implementations' amounts on the sampled contexts.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from datetime import date, timedelta
+
+from frappe.utils import flt
+
+from orderlift.orderlift_finance import cash_flow
+from orderlift.orderlift_finance.cash_flow import (
+    _add_months,
+    _as_date,
+    _event_context_key,
+    _event_sort_key,
+    _funding_event_sort_key,
+)
+
+EVENT_KINDS = (
+    ("actual", "inflow", "customer"),
+    ("actual", "outflow", "supplier"),
+    ("committed", "inflow", ""),
+    ("committed", "outflow", ""),
+    ("forecast", "outflow", ""),
+)
+COMPARED_FIELDS = (
+    "net_cash",
+    "collected",
+    "supplier_paid",
+    "committed_inflow",
+    "committed_outflow",
+    "forecast_outflow",
+    "forecast_net",
+    "minimum_position",
+    "funding_gap",
+    "ordered",
+)
+
+
+def run(events: int = 200_000, contexts: int = 2000, legacy_sample: int = 100, seed: int = 7) -> dict:
+    portfolio = synthetic_portfolio(int(events), int(contexts), seed=int(seed))
+    sample = list(portfolio["contexts"].values())[: max(int(legacy_sample), 1)]
+    bounds = cash_flow._horizon_bounds("13_weeks", None, None, portfolio["events"])
+    lifetime = cash_flow._horizon_bounds("lifetime", None, None, portfolio["events"])
+
+    started = time.perf_counter()
+    table = cash_flow._EventTable(portfolio["events"])
+    accruals = cash_flow._accruals_by_context(portfolio["accruals"])
+    rows = [cash_flow._context_for_horizon(row, table, bounds, accruals) for row in portfolio["contexts"].values()]
+    columnar_rows = time.perf_counter() - started
+
+    started = time.perf_counter()
+    columnar_position = cash_flow.chronological_funding_position(table, bounds)
+    columnar_buckets = cash_flow._bucket_events(table, lifetime)
+    columnar_portfolio = time.perf_counter() - started
+
+    started = time.perf_counter()
+    legacy_rows = [
+        legacy_context_for_horizon(row, portfolio["events"], bounds, portfolio["accruals"]) for row in sample
+    ]
+    legacy_rows_time = (time.perf_counter() - started) * len(portfolio["contexts"]) / len(sample)
+
+    started = time.perf_counter()
+    legacy_position = legacy_funding_position(portfolio["events"], bounds)
+    legacy_buckets = legacy_bucket_events(portfolio["events"], lifetime)
+    legacy_portfolio = time.perf_counter() - started
+
+    by_key = {(row["context_type"], row["context_name"]): row for row in rows}
+    differences = [
+        abs(flt(legacy[field]) - flt(by_key[(legacy["context_type"], legacy["context_name"])][field]))
+        for legacy in legacy_rows
+        for field in COMPARED_FIELDS
+    ]
+    differences.extend(abs(legacy_position[field] - columnar_position[field]) for field in legacy_position)
+    differences.extend(
+        abs(legacy[field] - columnar[field])
+        for legacy, columnar in zip(legacy_buckets, columnar_buckets)
+        for field in ("opening_position", "closing_position", "funding_gap", "committed_inflow", "actual_outflow")
+    )
+    return {
+        "events": len(portfolio["events"]),
+        "contexts": len(portfolio["contexts"]),
+        "legacy_sample": len(sample),
+        "columnar_seconds": {
+            "horizon_rows": round(columnar_rows, 3),
+            "funding_and_buckets": round(columnar_portfolio, 3),
+        },
+        "legacy_seconds": {
+            "horizon_rows_extrapolated": round(legacy_rows_time, 3),
+            "funding_and_buckets": round(legacy_portfolio, 3),
+        },
+        "buckets_match": len(legacy_buckets) == len(columnar_buckets),
+        "max_difference": max(differences, default=0.0),
+    }
+
+
+def synthetic_portfolio(events: int, contexts: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    today = date.today()
+    keys = [("Project" if index % 3 else "Sales Order", f"CTX-{index:05d}") for index in range(contexts)]
+    context_rows = {
+        key: cash_flow._context_row(
+            key[0], key[1], title=key[1], customer=f"Customer {index % 97}", company="Demo",
+            workflow_status="Open", project_type="",
+        )
+        for index, key in enumerate(keys)
+    }
+    for row in context_rows.values():
+        row["company_currency"] = "MAD"
+    rows = []
+    for index in range(events):
+        key = keys[rng.randrange(contexts)]
+        layer, direction, flow_group = EVENT_KINDS[rng.randrange(len(EVENT_KINDS))]
+        event_date = today + timedelta(days=rng.randint(-400, 400))
+        rows.append(
+            cash_flow._event(
+                key,
+                layer=layer,
+                direction=direction,
+                event_type=f"{layer.title()} {direction.title()}",
+                event_date=event_date,
+                amount=round(rng.uniform(10, 5000), 2),
+                company_currency="MAD",
+                source_amount=0,
+                source_currency="MAD",
+                reference_doctype="Payment Entry",
+                reference_name=f"DOC-{index:07d}",
+                confidence="High",
+                flow_group=flow_group,
+            )
+        )
+    accruals = [
+        cash_flow._accrual(key, "ordered", rng.uniform(1000, 9000), today - timedelta(days=rng.randint(0, 300)), "Sales Order", key[1])
+        for key in keys
+    ]
+    return {"contexts": context_rows, "events": rows, "accruals": accruals}
+
+
+# Reference implementations as they were before the columnar event table, trimmed
+# to the amounts compared above.
+
+
+def legacy_funding_position(events: list[dict], bounds: dict) -> dict:
+    start = _as_date(bounds["from_date"])
+    end = _as_date(bounds["to_date"])
+    opening = sum(
+        flt(event["signed_amount"])
+        for event in events
+        if event["layer"] == "actual" and _as_date(event.get("date"), start) <= start
+    )
+    path_events = [
+        event
+        for event in events
+        if (event["layer"] != "actual" and _as_date(event.get("date"), start) <= end)
+        or (event["layer"] == "actual" and start < _as_date(event.get("date"), start) <= end)
+    ]
+    position = opening
+    minimum = opening
+    for event in sorted(path_events, key=_funding_event_sort_key):
+        position += flt(event["signed_amount"])
+        minimum = min(minimum, position)
+    return {
+        "opening_position": opening,
+        "forecast_net": position,
+        "minimum_position": minimum,
+        "funding_gap": max(-minimum, 0.0),
+    }
+
+
+def legacy_context_for_horizon(context: dict, events: list[dict], bounds: dict, accruals: list[dict]) -> dict:
+    row = dict(context)
+    key = (row["context_type"], row["context_name"])
+    start = _as_date(bounds["from_date"])
+    end = _as_date(bounds["to_date"])
+    context_events = [event for event in events if _event_context_key(event) == key]
+    forward_events = [
+        event for event in context_events if event["layer"] != "actual" and _as_date(event.get("date"), start) <= end
+    ]
+    actual_events = [
+        event for event in context_events if event["layer"] == "actual" and _as_date(event.get("date"), start) <= end
+    ]
+    context_accruals = [
+        item
+        for item in accruals
+        if (item.get("context_type"), item.get("context_name")) == key and _as_date(item.get("date"), start) <= end
+    ]
+    for field in ("ordered", "invoiced", "actual_cost"):
+        row[field] = sum(flt(item["amount"]) for item in context_accruals if item.get("field") == field)
+    row["net_cash"] = sum(flt(event["signed_amount"]) for event in actual_events)
+    row["collected"] = sum(
+        flt(event["signed_amount"]) for event in actual_events if event.get("flow_group") == "customer"
+    )
+    row["supplier_paid"] = -sum(
+        flt(event["signed_amount"]) for event in actual_events if event.get("flow_group") == "supplier"
+    )
+    for field, layer, direction in (
+        ("committed_inflow", "committed", "inflow"),
+        ("committed_outflow", "committed", "outflow"),
+        ("forecast_outflow", "forecast", "outflow"),
+    ):
+        row[field] = sum(
+            flt(event["amount"])
+            for event in forward_events
+            if event["layer"] == layer and event["direction"] == direction
+        )
+    row.update(legacy_funding_position(context_events, bounds))
+    upcoming = [event for event in forward_events if _as_date(event.get("date"), start) >= start]
+    row["next_cash_event"] = min(upcoming, key=_event_sort_key) if upcoming else None
+    return row
+
+
+def legacy_bucket_events(events: list[dict], bounds: dict) -> list[dict]:
+    start = _as_date(bounds["from_date"])
+    end = _as_date(bounds["to_date"])
+    interval = bounds["interval"]
+    actual_net = sum(
+        flt(event["signed_amount"])
+        for event in events
+        if event["layer"] == "actual" and _as_date(event.get("date"), start) <= start
+    )
+    overdue = [
+        event for event in events if event["layer"] != "actual" and _as_date(event.get("date"), start) < start
+    ]
+    periods = []
+    cursor = start
+    while cursor <= end:
+        period_end = min(
+            cursor + timedelta(days=6) if interval == "week" else _add_months(cursor.replace(day=1), 1) - timedelta(days=1),
+            end,
+        )
+        periods.append((cursor, period_end))
+        cursor = period_end + timedelta(days=1)
+    position = actual_net
+    output = []
+    for index, (period_start, period_end) in enumerate(periods):
+        bucket_events = [
+            event
+            for event in events
+            if period_start <= _as_date(event.get("date"), period_start) <= period_end
+            and not (event["layer"] == "actual" and _as_date(event.get("date"), period_start) <= start)
+        ]
+        if index == 0:
+            bucket_events = overdue + bucket_events
+        row = {
+            "opening_position": position,
+            "actual_inflow": 0.0,
+            "actual_outflow": 0.0,
+            "committed_inflow": 0.0,
+            "committed_outflow": 0.0,
+            "forecast_outflow": 0.0,
+        }
+        minimum_position = position
+        for event in sorted(bucket_events, key=_funding_event_sort_key):
+            field = f"{event['layer']}_{event['direction']}"
+            if field in row:
+                row[field] += flt(event["amount"])
+            position += flt(event["signed_amount"])
+            minimum_position = min(minimum_position, position)
+        row["closing_position"] = position
+        row["funding_gap"] = max(-minimum_position, 0.0)
+        output.append(row)
+    return output
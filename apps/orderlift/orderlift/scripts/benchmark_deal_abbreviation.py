@@ -0,0 +1,51 @@
+"""Measure the per-save overhead of the deal abbreviation "*" doc_events.
+
+bench --site <site> execute orderlift.scripts.benchmark_deal_abbreviation.run --kwargs "{'iterations': 2000}"
+
+Runs the before_validate and on_update handlers against an unsaved ToDo (the
+reject path every unrelated save takes) and against the latest document of each
+participating doctype, cold (empty request cache) and warm. Everything runs
+inside a rolled back transaction.
+"""
+
+from __future__ import annotations
+
+import time
+
+import frappe
+
+from orderlift.orderlift_crm import deal_abbreviation
+
+
+def run(iterations: int = 1000) -> dict:
+    iterations = max(int(iterations or 1), 1)
+    result = {"iterations": iterations, "reject": {}, "documents": {}}
+    try:
+        result["reject"]["ToDo"] = _time_handlers(frappe.new_doc("ToDo"), iterations)
+        for doctype in sorted(deal_abbreviation.participating_doctypes()):
+            names = frappe.get_all(doctype, pluck="name", order_by="modified desc", limit_page_length=1)
+            if not names:
+                continue
+            doc = frappe.get_doc(doctype, names[0])
+            _reset_request_cache()
+            cold = _time_handlers(doc, 1)
+            warm = _time_handlers(doc, iterations)
+            result["documents"][doctype] = {"name": doc.name, "cold_us": cold, "warm_us": warm}
+    finally:
+        frappe.db.rollback()
+        _reset_request_cache()
+    return result
+
+
+def _time_handlers(doc, iterations: int) -> float:
+    """Average microseconds for one save's worth of deal abbreviation hooks."""
+    started = time.perf_counter()
+    for _index in range(iterations):
+        deal_abbreviation.sync_deal_abbreviation(doc)
+        deal_abbreviation.propagate_opportunity_deal_abbreviation(doc)
+    return round((time.perf_counter() - started) * 1_000_000 / iterations, 2)
+
+
+def _reset_request_cache() -> None:
+    if hasattr(frappe.local, "orderlift_deal_reference_cache"):
+        del frappe.local.orderlift_deal_reference_cache
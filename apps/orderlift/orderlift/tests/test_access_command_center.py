@@ -418,6 +418,157 @@ class TestAccessCommandCenterHelpers(unittest.TestCase):
         finally:
             role_capabilities.get_role_capabilities = original_get_role_capabilities
 
+    def test_capability_masks_read_roles_once_per_request_and_batch_users(self):
+        reads = []
+
+        def get_all(doctype, **kwargs):
+            reads.append(doctype)
+            if doctype == "Role":
+                return [
+                    Row(name="Purchase User", custom_orderlift_capabilities="purchasing_access"),
+                    Row(name="Sales Manager", custom_orderlift_capabilities="quotation_override\nunknown"),
+                ]
+            return [
+                Row(parent="buyer@example.com", role="Purchase User"),
+                Row(parent="lead@example.com", role="Sales Manager"),
+                Row(parent="lead@example.com", role="Purchase User"),
+            ]
+
+        originals = {name: getattr(frappe_stub, name, None) for name in ("get_all", "get_meta", "local")}
+        frappe_stub.get_all = get_all
+        frappe_stub.get_meta = lambda doctype: types.SimpleNamespace(get_field=lambda fieldname: True)
+        frappe_stub.local = types.SimpleNamespace()
+        frappe_stub.get_roles = lambda user=None: ["Purchase User"]
+        try:
+            self.assertTrue(role_capabilities.user_has_capability(role_capabilities.CAPABILITY_PURCHASING_ACCESS, user="buyer@example.com"))
+            self.assertFalse(role_capabilities.user_has_capability(role_capabilities.CAPABILITY_QUOTATION_OVERRIDE, user="buyer@example.com"))
+            self.assertEqual(reads, ["Role"])
+
+            capabilities = role_capabilities.capabilities_for_users(["buyer@example.com", "lead@example.com", "new@example.com"])
+            self.assertEqual(capabilities["buyer@example.com"], [role_capabilities.CAPABILITY_PURCHASING_ACCESS])
+            self.assertEqual(
+                set(capabilities["lead@example.com"]),
+                {role_capabilities.CAPABILITY_PURCHASING_ACCESS, role_capabilities.CAPABILITY_QUOTATION_OVERRIDE},
+            )
+            self.assertEqual(capabilities["new@example.com"], [])
+            self.assertEqual(reads, ["Role", "Has Role"])
+
+            role_capabilities.clear_role_capability_cache()
+            role_capabilities.user_has_capability(role_capabilities.CAPABILITY_PURCHASING_ACCESS, user="buyer@example.com")
+            self.assertEqual(reads.count("Role"), 2)
+        finally:
+            for name, value in originals.items():
+                if value is None:
+                    delattr(frappe_stub, name)
+                else:
+                    setattr(frappe_stub, name, value)
+
+    def test_role_capability_cache_is_not_written_or_dropped_before_commit(self):
+        from orderlift.utils import transaction
+
+        class Callbacks(list):
+            def add(self, fn):
+                self.append(fn)
+
+        class Cache:
+            def __init__(self):
+                self.values = {role_capabilities.ROLE_CAPABILITY_CACHE_KEY: {"Purchase User": ["purchasing_access"]}}
+
+            def get_value(self, key, **kwargs):
+                return self.values.get(key)
+
+            def set_value(self, key, value, **kwargs):
+                self.values[key] = value
+
+            def delete_value(self, key):
+                self.values.pop(key, None)
+
+        after_commit, after_rollback = Callbacks(), Callbacks()
+        cache = Cache()
+        originals = {name: getattr(frappe_stub, name, None) for name in ("db", "cache", "get_all", "get_meta", "local")}
+        frappe_stub.db = types.SimpleNamespace(after_commit=after_commit, after_rollback=after_rollback, transaction_writes=1)
+        frappe_stub.cache = lambda: cache
+        frappe_stub.get_all = lambda doctype, **kwargs: [Row(name="Purchase User", custom_orderlift_capabilities="")]
+        frappe_stub.get_meta = lambda doctype: types.SimpleNamespace(get_field=lambda fieldname: True)
+        frappe_stub.local = types.SimpleNamespace()
+        self.addCleanup(setattr, transaction, "frappe", transaction.frappe)
+        transaction.frappe = frappe_stub
+        try:
+            role_capabilities.clear_role_capability_cache()
+            self.assertIn(role_capabilities.ROLE_CAPABILITY_CACHE_KEY, cache.values)
+            self.assertEqual((len(after_commit), len(after_rollback)), (1, 1))
+
+            cache.values.clear()
+            self.assertEqual(role_capabilities.get_role_capabilities("Purchase User"), [])
+            self.assertEqual(cache.values, {})
+
+            cache.values[role_capabilities.ROLE_CAPABILITY_CACHE_KEY] = {"Purchase User": ["purchasing_access"]}
+            after_rollback[0]()
+            self.assertNotIn(role_capabilities.ROLE_CAPABILITY_CACHE_KEY, cache.values)
+            self.assertFalse(hasattr(frappe_stub.local, "orderlift_role_capabilities"))
+        finally:
+            for name, value in originals.items():
+                if value is None:
+                    delattr(frappe_stub, name)
+                else:
+                    setattr(frappe_stub, name, value)
+
+    def test_role_save_syncs_purchase_agent_rule_permission_from_uncommitted_capabilities(self):
+        from orderlift.utils import transaction
+
+        class Callbacks(list):
+            def add(self, fn):
+                self.append(fn)
+
+        class Cache:
+            def __init__(self):
+                self.values = {role_capabilities.ROLE_CAPABILITY_CACHE_KEY: {}}
+
+            def get_value(self, key, **kwargs):
+                return self.values.get(key)
+
+            def set_value(self, key, value, **kwargs):
+                self.values[key] = value
+
+            def delete_value(self, key):
+                self.values.pop(key, None)
+
+        inserted = []
+        cache = Cache()
+        originals = {
+            name: getattr(frappe_stub, name, None) for name in ("db", "cache", "get_all", "get_meta", "local", "new_doc")
+        }
+        frappe_stub.db = types.SimpleNamespace(
+            after_commit=Callbacks(),
+            after_rollback=Callbacks(),
+            transaction_writes=1,
+            exists=lambda doctype, *args, **kwargs: doctype in ("Role", "DocType"),
+        )
+        frappe_stub.cache = lambda: cache
+        frappe_stub.get_all = lambda doctype, **kwargs: [
+            Row(name="Purchase Lead", custom_orderlift_capabilities="purchase_agent_rules_management")
+        ]
+        frappe_stub.get_meta = lambda doctype: types.SimpleNamespace(get_field=lambda fieldname: True)
+        frappe_stub.local = types.SimpleNamespace(orderlift_role_capabilities={})
+        frappe_stub.new_doc = lambda doctype: types.SimpleNamespace(
+            set=lambda *args: None, insert=lambda ignore_permissions=False: inserted.append(doctype)
+        )
+        self.addCleanup(setattr, transaction, "frappe", transaction.frappe)
+        transaction.frappe = frappe_stub
+        role = types.SimpleNamespace(name="Purchase Lead")
+        try:
+            role_capabilities.clear_role_capability_cache(role, "on_update")
+            role_capabilities.sync_purchase_agent_rule_permissions_for_role(role, "on_update")
+
+            self.assertEqual(inserted, ["Custom DocPerm"])
+            self.assertEqual(cache.values[role_capabilities.ROLE_CAPABILITY_CACHE_KEY], {})
+        finally:
+            for name, value in originals.items():
+                if value is None:
+                    delattr(frappe_stub, name)
+                else:
+                    setattr(frappe_stub, name, value)
+
     def test_role_payload_includes_capabilities(self):
         payload = access_command_center._role_payload(
             "Pricing Configuration",
@@ -0,0 +1,145 @@
+import importlib.util
+import random
+import sys
+import time
+import types
+import unittest
+from pathlib import Path
+
+
+APP_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _load_real_modules():
+    # Other test files replace capacity_math in sys.modules with a stub, so load
+    # the real files under their own names and restore whatever was there.
+    modules = {}
+    previous = {}
+    for name, relative_path in (
+        ("orderlift.orderlift_logistics.services.capacity_math", "orderlift_logistics/services/capacity_math.py"),
+        ("orderlift.orderlift_logistics.services.bin_packing", "orderlift_logistics/services/bin_packing.py"),
+    ):
+        spec = importlib.util.spec_from_file_location(name, APP_ROOT / relative_path)
+        module = importlib.util.module_from_spec(spec)
+        previous[name] = sys.modules.get(name)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+        modules[name.rsplit(".", 1)[-1]] = module
+    for name, module in previous.items():
+        if module is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = module
+    return modules
+
+
+bin_packing = _load_real_modules()["bin_packing"]
+
+
+def _container(name, max_weight_kg, max_volume_m3):
+    return types.SimpleNamespace(name=name, max_weight_kg=max_weight_kg, max_volume_m3=max_volume_m3)
+
+
+def _shipment(name, weight, volume):
+    return {"delivery_note": name, "total_weight_kg": weight, "total_volume_m3": volume}
+
+
+def _names(packed):
+    return sorted(shipment["delivery_note"] for shipment in packed["shipments"])
+
+
+class TestPackShipments(unittest.TestCase):
+    def test_decreasing_order_needs_fewer_containers_than_first_fit(self):
+        # In arrival order, first-fit opens four containers; sorted, two are enough.
+        shipments = [
+            _shipment("DN-1", 30, 1),
+            _shipment("DN-2", 30, 1),
+            _shipment("DN-3", 70, 1),
+            _shipment("DN-4", 70, 1),
+        ]
+
+        result = bin_packing.pack_shipments(shipments, [_container("40FT", 100, 10)])
+
+        self.assertEqual(len(result["bins"]), 2)
+        self.assertEqual([_names(packed) for packed in result["bins"]], [["DN-1", "DN-3"], ["DN-2", "DN-4"]])
+        self.assertEqual(result["unplaced"], [])
+
+    def test_balances_weight_and_volume(self):
+        shipments = [_shipment("HEAVY-%s" % i, 60, 2) for i in range(2)] + [
+            _shipment("BULKY-%s" % i, 20, 8) for i in range(2)
+        ]
+
+        result = bin_packing.pack_shipments(shipments, [_container("40FT", 100, 10)])
+
+        self.assertEqual(len(result["bins"]), 2)
+        for packed in result["bins"]:
+            self.assertEqual(packed["total_weight_kg"], 80)
+            self.assertEqual(packed["total_volume_m3"], 10)
+            self.assertEqual(packed["limiting_factor"], "volume")
+
+    def test_has_no_container_cap_and_reports_oversized_shipments(self):
+        shipments = [_shipment("DN-%s" % i, 90, 1) for i in range(12)] + [_shipment("HUGE", 500, 1)]
+
+        result = bin_packing.pack_shipments(shipments, [_container("40FT", 100, 10)])
+
+        self.assertEqual(len(result["bins"]), 12)
+        self.assertEqual([shipment["delivery_note"] for shipment in result["unplaced"]], ["HUGE"])
+
+    def test_prefers_cheaper_profile_when_it_needs_no_more_containers(self):
+        containers = [_container("20FT", 50, 5), _container("40FT", 100, 10)]
+
+        small_load = bin_packing.pack_shipments([_shipment("DN-1", 20, 2), _shipment("DN-2", 25, 2)], containers)
+        large_load = bin_packing.pack_shipments([_shipment("DN-1", 45, 4), _shipment("DN-2", 45, 4)], containers)
+
+        self.assertEqual([packed["container"].name for packed in small_load["bins"]], ["20FT"])
+        self.assertEqual([packed["container"].name for packed in large_load["bins"]], ["40FT"])
+
+    def test_local_search_empties_the_least_filled_container(self):
+        bins = []
+        profile = bin_packing._Profile(0, None, 100, 10)
+        for weights in ((60,), (30,), (10,)):
+            packed = bin_packing._Bin(profile)
+            for weight in weights:
+                packed.add(bin_packing._Item(len(bins), None, weight, 1))
+            bins.append(packed)
+
+        self.assertTrue(bin_packing._eliminate_bins(bins, time.monotonic() + 1))
+        self.assertEqual(len(bins), 1)
+
+    def test_packs_thousands_of_shipments_within_a_second(self):
+        rng = random.Random(7)
+        shipments = [_shipment("DN-%s" % i, rng.uniform(50, 2500), rng.uniform(0.1, 6)) for i in range(3000)]
+        containers = [_container("20FT", 21000, 28), _container("40FT", 26000, 58), _container("40HC", 26500, 68)]
+
+        started = time.monotonic()
+        result = bin_packing.pack_shipments(shipments, containers)
+        elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(sum(len(packed["shipments"]) for packed in result["bins"]), len(shipments))
+        for packed in result["bins"]:
+            self.assertLessEqual(packed["total_weight_kg"], packed["container"].max_weight_kg + 1e-6)
+            self.assertLessEqual(packed["total_volume_m3"], packed["container"].max_volume_m3 + 1e-6)
+
+
+class TestSelectShipments(unittest.TestCase):
+    def test_fills_capacity_better_than_the_top_scores(self):
+        # The single best-balanced shipment blocks the two that fill the container exactly.
+        candidates = [_shipment("DN-1", 60, 6), _shipment("DN-2", 50, 4), _shipment("DN-3", 50, 6)]
+
+        result = bin_packing.select_shipments(candidates, 100, 10)
+
+        self.assertEqual(sorted(row["delivery_note"] for row in result["selected"]), ["DN-2", "DN-3"])
+        self.assertEqual([row["delivery_note"] for row in result["rejected"]], ["DN-1"])
+        self.assertAlmostEqual(result["remaining_weight_kg"], 0)
+        self.assertAlmostEqual(result["remaining_volume_m3"], 0)
+
+    def test_empty_capacity_rejects_everything(self):
+        result = bin_packing.select_shipments([_shipment("DN-1", 1, 1)], 0, 10)
+
+        self.assertEqual(result["selected"], [])
+        self.assertEqual(len(result["rejected"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -53,6 +53,7 @@ sys.modules["frappe.utils"] = utils_stub
 
 
 from orderlift import company_access, company_scope, menu_access
+from orderlift.utils import transaction
 
 
 class TestBusinessTypeAccessHelpers(unittest.TestCase):
@@ -236,6 +237,125 @@ class TestCompanyQueryCombination(unittest.TestCase):
         )
 
 
+class TestCompiledCompanyQueryCache(unittest.TestCase):
+    def setUp(self):
+        self.calls = {"allowed": 0, "business_types": 0}
+        self.active_company = "Orderlift"
+        self._orig = {
+            "allowed_co": company_access.get_allowed_companies,
+            "active_co": company_access._active_company_for_query,
+            "interactive": company_access.has_interactive_company_session,
+            "all_bt": company_access.user_can_access_all_business_types,
+            "allowed_bt": company_access.get_allowed_business_types,
+            "has_field": company_access._has_company_field,
+        }
+
+        def get_allowed_companies(user=None):
+            self.calls["allowed"] += 1
+            return ["Orderlift", "Orderlift Turkey"]
+
+        def get_allowed_business_types(user=None):
+            self.calls["business_types"] += 1
+            return ["Distribution"]
+
+        company_access.get_allowed_companies = get_allowed_companies
+        company_access._active_company_for_query = lambda user=None, allowed_companies=None: self.active_company
+        company_access.has_interactive_company_session = lambda user=None: True
+        company_access.user_can_access_all_business_types = lambda user=None: False
+        company_access.get_allowed_business_types = get_allowed_business_types
+        company_access._has_company_field = lambda doctype, field="company": field != "custom_owned_documents_only"
+        frappe_stub.local = types.SimpleNamespace(site="site-a.local")
+        company_access.clear_company_query_cache()
+
+    def tearDown(self):
+        company_access.clear_company_query_cache()
+        for name, attr in (
+            ("allowed_co", "get_allowed_companies"),
+            ("active_co", "_active_company_for_query"),
+            ("interactive", "has_interactive_company_session"),
+            ("all_bt", "user_can_access_all_business_types"),
+            ("allowed_bt", "get_allowed_business_types"),
+            ("has_field", "_has_company_field"),
+        ):
+            setattr(company_access, attr, self._orig[name])
+        del frappe_stub.local
+
+    def test_clause_is_compiled_once_and_follows_active_company(self):
+        stats_before = company_access.get_company_query_cache_stats()
+        first = company_access._company_query("Opportunity", "demo@example.com")
+        second = company_access._company_query("Opportunity", "demo@example.com")
+        self.active_company = "Orderlift Turkey"
+        switched = company_access._company_query("Opportunity", "demo@example.com")
+        stats_after = company_access.get_company_query_cache_stats()
+
+        self.assertEqual(first, second)
+        self.assertIn("'Orderlift Turkey'", switched)
+        self.assertIn("custom_crm_business_type in ('Distribution')", switched)
+        self.assertEqual(self.calls, {"allowed": 1, "business_types": 1})
+        self.assertEqual(stats_after["compiled"] - stats_before["compiled"], 1)
+        self.assertEqual(stats_after["reused"] - stats_before["reused"], 2)
+
+    def test_user_permission_change_recompiles_only_that_user(self):
+        company_access._company_query("Opportunity", "demo@example.com")
+        company_access._company_query("Opportunity", "other@example.com")
+
+        company_access.invalidate_company_query_cache(AttrDict(doctype="User Permission", user="demo@example.com"))
+        company_access._company_query("Opportunity", "demo@example.com")
+        company_access._company_query("Opportunity", "other@example.com")
+
+        self.assertEqual(self.calls["allowed"], 3)
+
+    def test_generation_bumped_elsewhere_recompiles_after_commit(self):
+        class FakeRedis:
+            def __init__(self):
+                self.values = {}
+
+            def make_key(self, key):
+                return f"site-a.local|{key}"
+
+            def get(self, key):
+                return self.values.get(key)
+
+            def incrby(self, key, amount):
+                self.values[key] = int(self.values.get(key) or 0) + amount
+                return self.values[key]
+
+        class Callbacks(list):
+            def add(self, fn):
+                self.append(fn)
+
+        redis = FakeRedis()
+        frappe_stub.cache = lambda: redis
+        self.addCleanup(delattr, frappe_stub, "cache")
+        company_access._company_query("Opportunity", "demo@example.com")
+
+        # Another worker's commit only reaches this one through Redis.
+        redis.incrby(redis.make_key(company_access._company_query_generation_key("demo@example.com")), 1)
+        company_access._company_query("Opportunity", "demo@example.com")
+        self.assertEqual(self.calls["allowed"], 2)
+
+        after_commit = Callbacks()
+        db = types.SimpleNamespace(transaction_writes=1, after_commit=after_commit, after_rollback=Callbacks())
+        self.addCleanup(setattr, transaction, "frappe", transaction.frappe)
+        transaction.frappe = types.SimpleNamespace(db=db, local=types.SimpleNamespace())
+        company_access.invalidate_company_query_cache(AttrDict(doctype="User Permission", user="demo@example.com"))
+        company_access._company_query("Opportunity", "demo@example.com")
+        self.assertEqual(self.calls["allowed"], 2)
+
+        for callback in after_commit:
+            callback()
+        company_access._company_query("Opportunity", "demo@example.com")
+        self.assertEqual(self.calls["allowed"], 3)
+
+    def test_without_site_nothing_is_cached(self):
+        del frappe_stub.local
+        company_access._company_query("Opportunity", "demo@example.com")
+        company_access._company_query("Opportunity", "demo@example.com")
+        frappe_stub.local = types.SimpleNamespace(site="site-a.local")
+
+        self.assertEqual(self.calls["allowed"], 2)
+
+
 class TestOwnedOnlyAssignmentClause(unittest.TestCase):
     def setUp(self):
         self._orig = {
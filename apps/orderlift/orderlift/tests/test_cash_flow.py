@@ -728,6 +728,74 @@ class TestCashFlow(unittest.TestCase):
             self.assertFalse(cash_flow._can_read("Purchase Invoice", permission_quality))
         self.assertEqual(permission_quality[0]["code"], "unavailable_source")
 
+    def test_source_loader_reads_every_row_in_keyset_pages(self):
+        rows = [
+            {"name": f"SINV-{index:03d}", "modified": f"2026-01-{index % 4 + 1:02d}", "company": "Demo Company"}
+            for index in range(23)
+        ]
+        calls = []
+
+        def matches(row, condition):
+            field, operator, value = condition
+            return {
+                "=": lambda: row.get(field) == value,
+                ">": lambda: row.get(field) > value,
+                ">=": lambda: row.get(field) >= value,
+                "in": lambda: row.get(field) in value,
+            }[operator]()
+
+        def get_list(doctype, filters=None, or_filters=None, fields=None, order_by=None, limit_page_length=None,
+                     **kwargs):
+            calls.append((filters, limit_page_length))
+            selected = [
+                row for row in rows
+                if all(matches(row, condition) for condition in filters)
+                and (not or_filters or any(matches(row, condition) for condition in or_filters))
+            ]
+            selected.sort(key=lambda row: (row["modified"], row["name"]))
+            return [dict(row) for row in selected[:limit_page_length]]
+
+        quality = []
+        with patch.object(cash_flow, "SOURCE_PAGE_SIZE", 5), patch.object(
+            cash_flow, "_can_read", return_value=True
+        ), patch.object(cash_flow, "_available_fields", side_effect=lambda doctype, fields: fields), patch.object(
+            cash_flow.frappe, "get_list", side_effect=get_list, create=True
+        ):
+            result = cash_flow._get_list(
+                "Sales Invoice", filters={"company": "Demo Company"}, fields=["name"], quality=quality
+            )
+
+        self.assertEqual(sorted(row["name"] for row in result), [row["name"] for row in rows])
+        self.assertEqual(quality, [])
+        self.assertEqual(len(calls), 5)
+        self.assertTrue(all(limit == 5 for _filters, limit in calls))
+
+        children = [
+            {"name": f"ROW-{index:03d}", "parent": f"SINV-{index % 12:03d}", "idx": index // 12 + 1,
+             "modified": "2026-01-01"}
+            for index in range(24)
+        ]
+        rows[:] = children
+        calls.clear()
+        exists = types.SimpleNamespace(exists=lambda doctype, name=None: True)
+        with patch.object(cash_flow, "SOURCE_PAGE_SIZE", 5), patch.object(
+            cash_flow, "_can_read", return_value=True
+        ), patch.object(cash_flow, "_available_fields", side_effect=lambda doctype, fields: fields), patch.object(
+            cash_flow.frappe, "get_list", side_effect=get_list, create=True
+        ), patch.object(cash_flow.frappe, "db", exists, create=True):
+            result = cash_flow._children(
+                "Sales Invoice Item",
+                {f"SINV-{index:03d}" for index in range(12)},
+                ["parent", "name", "idx"],
+                parent_doctype="Sales Invoice",
+                quality=quality,
+            )
+
+        self.assertEqual(len(result), 24)
+        self.assertEqual([row["parent"] for row in result[:2]], ["SINV-000", "SINV-000"])
+        self.assertEqual([row["idx"] for row in result[:2]], [1, 2])
+        self.assertLessEqual(max(len(filters[0][2]) for filters, _limit in calls), 5)
+
     def test_source_access_does_not_swallow_arbitrary_errors(self):
         class BrokenDB:
             @staticmethod
@@ -0,0 +1,125 @@
+import random
+import sys
+import types
+import unittest
+from datetime import date, timedelta
+
+
+STUBBED_MODULES = (
+    "frappe",
+    "frappe.utils",
+    "orderlift.orderlift_finance.cash_flow",
+    "orderlift.orderlift_finance.cash_flow_snapshot",
+    "orderlift.scripts.benchmark_cash_flow_events",
+)
+_previous_modules = {name: sys.modules.get(name) for name in STUBBED_MODULES}
+for _name in STUBBED_MODULES[2:]:
+    sys.modules.pop(_name, None)
+
+frappe_stub = types.ModuleType("frappe")
+frappe_stub._ = lambda value, *args, **kwargs: value
+frappe_stub.whitelist = lambda *args, **kwargs: (lambda fn: fn) if not args else args[0]
+frappe_stub.throw = lambda message, *args, **kwargs: (_ for _ in ()).throw(Exception(message))
+frappe_stub.PermissionError = PermissionError
+sys.modules["frappe"] = frappe_stub
+utils_stub = types.ModuleType("frappe.utils")
+utils_stub.flt = lambda value, precision=None: float(value or 0)
+utils_stub.cint = lambda value: int(value or 0)
+sys.modules["frappe.utils"] = utils_stub
+
+from orderlift.orderlift_finance import cash_flow
+from orderlift.scripts import benchmark_cash_flow_events as reference
+
+# Other test files build their own frappe stubs; do not leak this one into them,
+# nor the modules bound to it (``from package import module`` reads the attribute).
+for _name, _module in _previous_modules.items():
+    if _module is None:
+        sys.modules.pop(_name, None)
+    else:
+        sys.modules[_name] = _module
+    _package, _, _attribute = _name.rpartition(".")
+    if _package.startswith("orderlift") and _package in sys.modules:
+        if _module is None:
+            vars(sys.modules[_package]).pop(_attribute, None)
+        else:
+            setattr(sys.modules[_package], _attribute, _module)
+
+
+def portfolio():
+    data = reference.synthetic_portfolio(3000, 40, seed=11)
+    rng = random.Random(5)
+    # Undated events and accruals fall back to the horizon start in every pass.
+    for event in rng.sample(data["events"], 150):
+        event["date"] = ""
+    data["accruals"][0]["date"] = ""
+    return data
+
+
+class TestCashFlowEventTable(unittest.TestCase):
+    def setUp(self):
+        self.data = portfolio()
+        self.table = cash_flow._EventTable(self.data["events"])
+
+    def assertRowsAlmostEqual(self, expected, actual, fields):
+        for field in fields:
+            self.assertAlmostEqual(expected[field], actual[field], places=6, msg=field)
+
+    def test_horizon_rows_match_the_per_context_scans(self):
+        accruals = cash_flow._accruals_by_context(self.data["accruals"])
+        for horizon in ("13_weeks", "monthly", "lifetime"):
+            bounds = cash_flow._horizon_bounds(horizon, None, None, self.data["events"])
+            for context in self.data["contexts"].values():
+                expected = reference.legacy_context_for_horizon(
+                    context, self.data["events"], bounds, self.data["accruals"]
+                )
+                actual = cash_flow._context_for_horizon(context, self.table, bounds, accruals)
+                self.assertRowsAlmostEqual(expected, actual, reference.COMPARED_FIELDS)
+                self.assertEqual(
+                    (expected["next_cash_event"] or {}).get("date"), (actual["next_cash_event"] or {}).get("date")
+                )
+
+    def test_portfolio_funding_position_and_buckets_match(self):
+        for horizon in ("13_weeks", "lifetime"):
+            bounds = cash_flow._horizon_bounds(horizon, None, None, self.data["events"])
+            self.assertRowsAlmostEqual(
+                reference.legacy_funding_position(self.data["events"], bounds),
+                cash_flow.chronological_funding_position(self.table, bounds),
+                ("opening_position", "forecast_net", "minimum_position", "funding_gap"),
+            )
+            expected = reference.legacy_bucket_events(self.data["events"], bounds)
+            actual = cash_flow._bucket_events(self.table, bounds)
+            self.assertEqual(len(expected), len(actual))
+            for legacy, bucket in zip(expected, actual):
+                self.assertRowsAlmostEqual(
+                    legacy,
+                    bucket,
+                    ("opening_position", "closing_position", "funding_gap", "actual_inflow", "committed_outflow"),
+                )
+
+    def test_plain_event_lists_are_still_accepted(self):
+        bounds = cash_flow._horizon_bounds("13_weeks", None, None, [])
+        today = date.today()
+        key = ("Sales Order", "SO-1")
+        events = [
+            cash_flow._event(
+                key, layer="committed", direction="outflow", event_type="Supplier", event_date=today + timedelta(days=3),
+                amount=100, company_currency="MAD", source_amount=100, source_currency="MAD",
+                reference_doctype="Purchase Order", reference_name="PO-1", confidence="High",
+            ),
+            cash_flow._event(
+                key, layer="committed", direction="inflow", event_type="Customer", event_date=today + timedelta(days=9),
+                amount=60, company_currency="MAD", source_amount=60, source_currency="MAD",
+                reference_doctype="Sales Order", reference_name="SO-1", confidence="High",
+            ),
+        ]
+
+        position = cash_flow.chronological_funding_position(events, bounds)
+
+        self.assertEqual(position["minimum_position"], -100)
+        self.assertEqual(position["funding_gap"], 100)
+        self.assertEqual(position["forecast_net"], -40)
+        self.assertEqual(cash_flow._bucket_events(events, bounds)[0]["company_currency"], "MAD")
+
+
+if __name__ == "__main__":
+    unittest.main()
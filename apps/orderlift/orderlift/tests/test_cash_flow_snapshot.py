@@ -0,0 +1,270 @@
+import copy
+import sys
+import types
+import unittest
+from unittest.mock import patch
+
+
+class AttrDict(dict):
+    __getattr__ = dict.get
+
+
+STUBBED_MODULES = ("frappe", "frappe.utils")
+_previous_modules = {name: sys.modules.get(name) for name in STUBBED_MODULES}
+
+frappe_stub = types.ModuleType("frappe")
+frappe_stub._ = lambda value, *args, **kwargs: value
+frappe_stub.whitelist = lambda *args, **kwargs: (lambda fn: fn) if not args else args[0]
+frappe_stub.throw = lambda message, *args, **kwargs: (_ for _ in ()).throw(Exception(message))
+frappe_stub.PermissionError = PermissionError
+sys.modules["frappe"] = frappe_stub
+utils_stub = types.ModuleType("frappe.utils")
+utils_stub.flt = lambda value, precision=None: float(value or 0)
+utils_stub.cint = lambda value: int(value or 0)
+sys.modules["frappe.utils"] = utils_stub
+
+from orderlift.orderlift_finance import cash_flow, cash_flow_snapshot
+
+# Other test files build their own frappe stubs; do not leak this one into them.
+for _name, _module in _previous_modules.items():
+    if _module is None:
+        sys.modules.pop(_name, None)
+    else:
+        sys.modules[_name] = _module
+
+
+class FakeCache:
+    def __init__(self):
+        self.values = {}
+        self.hashes = {}
+
+    def get_value(self, key):
+        return copy.deepcopy(self.values.get(key))
+
+    def set_value(self, key, value, expires_in_sec=None):
+        self.values[key] = copy.deepcopy(value)
+
+    def hset(self, name, key, value):
+        self.hashes.setdefault(name, {})[key] = value
+
+    def hgetall(self, name):
+        return {key.encode(): value for key, value in self.hashes.get(name, {}).items()}
+
+    def hdel(self, name, keys, shared=False, pipeline=None):
+        for key in keys:
+            self.hashes.get(name, {}).pop(key, None)
+
+
+def company_data():
+    return {
+        "company_currency": "MAD",
+        "projects": [
+            {"name": "PROJ-1", "project_name": "Tower", "customer": "Customer A", "company": "Demo Company"},
+        ],
+        "sales_orders": [
+            {
+                "name": "SO-1", "customer": "Customer A", "company": "Demo Company", "project": "PROJ-1",
+                "base_grand_total": 1000, "base_net_total": 800, "transaction_date": "2026-01-01",
+                "delivery_date": "2026-10-01",
+            },
+            {
+                "name": "SO-2", "customer": "Customer B", "company": "Demo Company", "project": "",
+                "base_grand_total": 500, "base_net_total": 400, "transaction_date": "2026-02-01",
+                "delivery_date": "2026-11-01",
+            },
+        ],
+        "sales_order_items": [
+            {"parent": "SO-1", "qty": 10, "source_landed_cost": 20},
+            {"parent": "SO-2", "qty": 1, "source_landed_cost": 100},
+        ],
+        "sales_invoices": [
+            {
+                "name": "SI-1", "project": "PROJ-1", "base_grand_total": 600, "base_net_total": 500,
+                "base_outstanding_amount": 600, "posting_date": "2026-03-01", "due_date": "2026-04-01",
+            },
+            {
+                "name": "SI-LOOSE", "base_grand_total": 70, "base_net_total": 60,
+                "base_outstanding_amount": 70, "posting_date": "2026-03-05", "due_date": "2026-04-05",
+            },
+        ],
+        "sales_invoice_items": [
+            {"parent": "SI-1", "sales_order": "SO-1", "project": "PROJ-1", "base_net_amount": 600},
+            {"parent": "SI-LOOSE", "base_net_amount": 70},
+        ],
+    }
+
+
+class TestCashFlowSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.cache = FakeCache()
+        self.enqueued = []
+        self.source = company_data()
+        self.loads = []
+        stub = types.SimpleNamespace(
+            _=frappe_stub._,
+            throw=frappe_stub.throw,
+            PermissionError=PermissionError,
+            session=types.SimpleNamespace(user="finance@example.com"),
+            get_roles=lambda user=None: ["Finance User"],
+            cache=lambda: self.cache,
+            enqueue=lambda method, **kwargs: self.enqueued.append((method.rsplit(".", 1)[-1], kwargs)),
+        )
+        self.patches = [
+            patch.object(cash_flow, "frappe", stub),
+            patch.object(cash_flow_snapshot, "frappe", stub),
+            patch.object(cash_flow, "_authorize", return_value=("finance@example.com", "Demo Company")),
+            patch.object(cash_flow, "_load_data", side_effect=self._load_data),
+        ]
+        for active in self.patches:
+            active.start()
+
+    def tearDown(self):
+        for active in reversed(self.patches):
+            active.stop()
+
+    def _load_data(self, company, filters):
+        self.loads.append(dict(filters))
+        data = copy.deepcopy(self.source)
+        data["data_quality"] = []
+        keys = set(map(tuple, filters.get("context_keys") or []))
+        if filters.get("context_name"):
+            keys.add((filters.get("context_type"), filters["context_name"]))
+        if keys:
+            # Mirror the context-scoped query: only the contexts' rows and the invoices feeding them.
+            projects = {name for context_type, name in keys if context_type == "Project"}
+            orders = {name for context_type, name in keys if context_type == "Sales Order"}
+            data["projects"] = [row for row in data["projects"] if row["name"] in projects]
+            data["sales_orders"] = [
+                row
+                for row in data["sales_orders"]
+                if row["project"] in projects or (row["name"] in orders and not row["project"])
+            ]
+            data["sales_invoices"] = [row for row in data["sales_invoices"] if row["name"] != "SI-LOOSE"]
+        return data
+
+    def test_dashboard_calls_share_one_company_load(self):
+        portfolio = cash_flow.get_portfolio_data({"horizon": "lifetime"})
+        customers = cash_flow.get_customer_performance({"horizon": "lifetime"})
+        monthly = cash_flow.get_monthly_performance({"horizon": "lifetime"})
+        quality = cash_flow.get_data_quality({})
+
+        self.assertEqual(self.loads, [{}])
+        self.assertEqual(customers, portfolio["customer_rows"])
+        self.assertEqual(monthly, portfolio["monthly_rows"])
+        self.assertIn("unassigned_invoice", {row["code"] for row in quality})
+
+    def test_filters_apply_to_the_snapshot_like_a_filtered_load(self):
+        cash_flow.get_portfolio_data({})
+        filtered = cash_flow.get_portfolio_data({"customer": "Customer B"})
+
+        self.assertEqual(self.loads, [{}])
+        self.assertEqual([row["context_name"] for row in filtered["profitability_rows"]], ["SO-2"])
+        self.assertNotIn("unassigned_invoice", {row["code"] for row in filtered["data_quality_rows"]})
+
+    def test_logged_change_rebuilds_only_that_context(self):
+        before = cash_flow.get_portfolio_data({})
+        self.source["sales_orders"][1]["base_grand_total"] = 900
+        self.source["sales_orders"][1]["base_net_total"] = 750
+
+        cash_flow_snapshot.record_changes("Demo Company", [("Sales Order", "SO-2")])
+        after = cash_flow.get_portfolio_data({})
+
+        self.assertEqual(self.loads, [{}, {"context_keys": [("Sales Order", "SO-2")]}])
+        rows = {row["context_name"]: row for row in after["profitability_rows"]}
+        previous = {row["context_name"]: row for row in before["profitability_rows"]}
+        self.assertEqual(rows["SO-2"]["ordered_revenue_ttc"], 900)
+        self.assertEqual(rows["PROJ-1"], previous["PROJ-1"])
+        self.assertIn("unassigned_invoice", {row["code"] for row in after["data_quality_rows"]})
+
+        with patch.object(cash_flow_snapshot, "CLOCK_SKEW_SECONDS", 0):
+            cash_flow.get_portfolio_data({})
+        self.assertEqual(len(self.loads), 2)
+
+    def test_several_logged_changes_share_one_context_load(self):
+        cash_flow.get_portfolio_data({})
+        self.source["sales_orders"][0]["base_grand_total"] = 1200
+        self.source["sales_orders"][1]["base_grand_total"] = 900
+
+        cash_flow_snapshot.record_changes("Demo Company", [("Project", "PROJ-1"), ("Sales Order", "SO-2")])
+        after = cash_flow.get_portfolio_data({})
+
+        self.assertEqual(self.loads, [{}, {"context_keys": [("Project", "PROJ-1"), ("Sales Order", "SO-2")]}])
+        rows = {row["context_name"]: row for row in after["profitability_rows"]}
+        self.assertEqual(rows["PROJ-1"]["ordered_revenue_ttc"], 1200)
+        self.assertEqual(rows["SO-2"]["ordered_revenue_ttc"], 900)
+        self.assertIn("unassigned_invoice", {row["code"] for row in after["data_quality_rows"]})
+
+    def test_expired_change_entries_are_deleted_with_a_key_list(self):
+        name = cash_flow_snapshot._changes_key("Demo Company")
+        self.cache.hset(name, "stale", 1.0)
+        deleted = []
+        self.cache.hdel = lambda hash_name, keys, shared=False, pipeline=None: deleted.append((hash_name, keys))
+
+        cash_flow_snapshot.record_changes("Demo Company", [("Project", "PROJ-1")])
+
+        self.assertEqual(deleted, [(name, ["stale"])])
+
+    def test_detail_reads_the_snapshot_and_falls_back_for_new_contexts(self):
+        cash_flow.get_portfolio_data({})
+        detail = cash_flow.get_cash_flow_detail("Project", "PROJ-1", horizon="lifetime")
+        self.assertEqual(self.loads, [{}])
+        self.assertEqual(detail["identity"]["ordered"], 1000)
+        self.assertNotIn("unassigned_invoice", {row["code"] for row in detail["data_quality"]})
+
+        self.source["sales_orders"].append(
+            {"name": "SO-3", "customer": "Customer C", "project": "", "base_grand_total": 10,
+             "transaction_date": "2026-03-01"}
+        )
+        cash_flow.get_cash_flow_detail("Sales Order", "SO-3")
+        self.assertEqual(self.loads[-1], {"context_type": "Sales Order", "context_name": "SO-3"})
+
+    def test_unattributed_invoice_requests_a_full_rebuild(self):
+        cash_flow.get_portfolio_data({})
+        cash_flow_snapshot.record_changes("Demo Company", full=True)
+
+        cash_flow.get_portfolio_data({})
+
+        self.assertEqual(self.loads, [{}, {}])
+
+    def test_hook_resolves_payment_entry_references_to_contexts_after_commit(self):
+        rows = {
+            ("Sales Invoice", "SI-1"): [AttrDict(project="", custom_advance_sales_order="")],
+            ("Sales Invoice Item", "SI-1"): [AttrDict(project="", sales_order="SO-1")],
+            ("Purchase Order", "PO-1"): [AttrDict(project="PROJ-2")],
+        }
+
+        def get_all(doctype, filters=None, fields=None, **kwargs):
+            if doctype == "Sales Order":
+                projects = {"SO-1": "PROJ-1", "SO-2": ""}
+                return [AttrDict(name=name, project=projects[name]) for name in filters["name"][1]]
+            name = (filters.get("parent") or filters.get("name"))[1][0]
+            return rows.get((doctype, name), [])
+
+        meta = types.SimpleNamespace(has_field=lambda fieldname: True)
+        cash_flow_snapshot.frappe.get_all = get_all
+        cash_flow_snapshot.frappe.get_meta = lambda doctype: meta
+        payment = AttrDict(
+            doctype="Payment Entry",
+            name="PE-1",
+            company="Demo Company",
+            references=[
+                AttrDict(reference_doctype="Sales Invoice", reference_name="SI-1"),
+                AttrDict(reference_doctype="Sales Order", reference_name="SO-2"),
+                AttrDict(reference_doctype="Purchase Order", reference_name="PO-1"),
+                AttrDict(reference_doctype="Journal Entry", reference_name="JV-1"),
+            ],
+        )
+
+        cash_flow_snapshot.queue_snapshot_update(payment)
+
+        method, kwargs = self.enqueued[0]
+        self.assertEqual(method, "record_changes")
+        self.assertTrue(kwargs["enqueue_after_commit"])
+        self.assertEqual(
+            kwargs["context_keys"], [("Project", "PROJ-1"), ("Project", "PROJ-2"), ("Sales Order", "SO-2")]
+        )
+        self.assertFalse(kwargs["full"])
+
+
+if __name__ == "__main__":
+    unittest.main()
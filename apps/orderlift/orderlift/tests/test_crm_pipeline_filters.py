@@ -1,3 +1,4 @@
+import re
 import sys
 import types
 import unittest
@@ -11,6 +12,10 @@ class _Row(types.SimpleNamespace):
         return hasattr(self, key)
 
 
+class _Doc(dict):
+    __getattr__ = dict.get
+
+
 frappe_stub = types.ModuleType("frappe")
 frappe_stub._ = lambda value, *args, **kwargs: value
 frappe_stub.whitelist = lambda *args, **kwargs: (lambda fn: fn)
@@ -22,7 +27,12 @@ frappe_stub.throw = lambda message: (_ for _ in ()).throw(Exception(message))
 frappe_stub.ValidationError = Exception
 frappe_stub.get_meta = lambda doctype: types.SimpleNamespace(get_field=lambda fieldname: True)
 frappe_stub.session = types.SimpleNamespace(user="demo@example.com")
-frappe_stub.db = types.SimpleNamespace(sql=lambda *args, **kwargs: [], exists=lambda *args, **kwargs: False, get_value=lambda *args, **kwargs: None)
+frappe_stub.db = types.SimpleNamespace(
+    sql=lambda *args, **kwargs: [],
+    exists=lambda *args, **kwargs: False,
+    get_value=lambda *args, **kwargs: None,
+    has_column=lambda *args, **kwargs: False,
+)
 sys.modules["frappe"] = frappe_stub
 
 frappe_utils_stub = types.ModuleType("frappe.utils")
@@ -68,151 +78,171 @@ class TestCrmPipelineFilters(unittest.TestCase):
         self.assertEqual(project["custom_project_owner"], "manager@example.com")
         self.assertEqual([row.user for row in project["users"]], ["manager@example.com"])
 
-    def test_opportunity_pipeline_filters_by_crm_segment_field(self):
-        calls = []
-
-        def get_list(doctype, **kwargs):
-            calls.append((doctype, kwargs))
-            return []
-
-        original_get_list = pipeline.frappe.get_list
-        original_has_field = pipeline._has_field
+    def _board_query(self, document_type, filters, statuses=None, owned_only=False):
+        original = (pipeline._has_field, pipeline._board_match_conditions, pipeline._owned_pipeline_visibility_enabled)
         try:
-            pipeline.frappe.get_list = get_list
+            pipeline.frappe.has_permission = lambda *args, **kwargs: True
             pipeline._has_field = lambda doctype, fieldname: True
+            pipeline._board_match_conditions = lambda doctype: ""
+            pipeline._owned_pipeline_visibility_enabled = lambda: owned_only
+            return pipeline._board_query(document_type, statuses or [], filters)
+        finally:
+            pipeline._has_field, pipeline._board_match_conditions, pipeline._owned_pipeline_visibility_enabled = original
 
-            pipeline._opportunity_cards(
-                business_type="Distribution",
-                segment="Grossiste",
-                statuses=[],
-            )
+    def test_opportunity_pipeline_filters_by_crm_segment_field(self):
+        query = self._board_query("Opportunity", {"business_type": "Distribution", "segment": "Grossiste"})
 
-            self.assertEqual(calls[0][0], "Opportunity")
-            self.assertNotIn("opportunity_owner", calls[0][1]["filters"])
-            self.assertEqual(calls[0][1]["filters"]["custom_crm_business_type"], "Distribution")
-            self.assertEqual(calls[0][1]["filters"]["custom_crm_segment"], "Grossiste")
-        finally:
-            pipeline.frappe.get_list = original_get_list
-            pipeline._has_field = original_has_field
+        self.assertIn("`tabOpportunity`.`custom_crm_business_type` = %(filter_business_type)s", query["where"])
+        self.assertIn("`tabOpportunity`.`custom_crm_segment` = %(filter_segment)s", query["where"])
+        self.assertEqual(query["values"]["filter_business_type"], "Distribution")
+        self.assertEqual(query["values"]["filter_segment"], "Grossiste")
+        self.assertNotIn("opportunity_owner", query["where"])
 
     def test_opportunity_pipeline_passes_owner_filter_directly(self):
-        calls = []
-
-        def get_list(doctype, **kwargs):
-            calls.append((doctype, kwargs))
-            return []
+        query = self._board_query("Opportunity", {"owner": "sales@example.com"}, owned_only=True)
+
+        self.assertIn("`tabOpportunity`.`opportunity_owner` = %(filter_owner)s", query["where"])
+        self.assertEqual(query["values"]["filter_owner"], "sales@example.com")
+        self.assertNotIn("tabToDo", query["where"])
+
+    def test_owned_only_user_sees_owned_or_assigned_documents(self):
+        owner_expressions = {
+            "Opportunity": "COALESCE(NULLIF(`tabOpportunity`.`opportunity_owner`, ''), '')",
+            "Project": "COALESCE(NULLIF(`tabProject`.`custom_project_owner`, ''), NULLIF(`tabProject`.`owner`, ''), '')",
+            "Sales Order": "COALESCE(NULLIF(`tabSales Order`.`owner`, ''), '')",
+        }
+        for document_type, owner_expression in owner_expressions.items():
+            with self.subTest(document_type=document_type):
+                query = self._board_query(document_type, {"owner": "All"}, owned_only=True)
+
+                self.assertIn(f"({owner_expression} = %(session_user)s OR EXISTS (", query["where"])
+                self.assertIn("todo.allocated_to = %(session_user)s", query["where"])
+                self.assertEqual(query["values"]["session_user"], "demo@example.com")
+                self.assertEqual(query["values"]["document_type"], document_type)
+                self.assertEqual(query["values"]["assignment_marker"], f"%{pipeline.PIPELINE_ASSIGNMENT_MARKER}%")
 
-        original_get_list = pipeline.frappe.get_list
+    def test_sales_order_pipeline_excludes_project_linked_orders_in_permission_query(self):
+        original = pipeline._board_match_conditions
         try:
-            pipeline.frappe.get_list = get_list
-
-            pipeline._opportunity_cards(owner="sales@example.com", statuses=[])
+            pipeline.frappe.has_permission = lambda *args, **kwargs: True
+            pipeline._board_match_conditions = lambda doctype: "`tabSales Order`.company in ('Demo')"
 
-            self.assertEqual(calls[0][1]["filters"]["opportunity_owner"], "sales@example.com")
+            query = pipeline._board_query("Sales Order", [], {"delivery_progress": "Partially delivered"})
         finally:
-            pipeline.frappe.get_list = original_get_list
-
-    def test_owned_only_user_sees_owned_or_assigned_opportunities(self):
-        original_get_list = pipeline.frappe.get_list
-        original_opportunity_card = pipeline._opportunity_card
-        original_owned_flag = pipeline._owned_pipeline_visibility_enabled
-        try:
-            pipeline.frappe.get_list = lambda doctype, **kwargs: [
-                _Row(name="OPP-OWNED", opportunity_owner="demo@example.com"),
-                _Row(name="OPP-ASSIGNED", opportunity_owner="other@example.com"),
-                _Row(name="OPP-HIDDEN", opportunity_owner="other2@example.com"),
-            ]
-            pipeline._owned_pipeline_visibility_enabled = lambda: True
-
-            def card_for_row(row, statuses):
-                if row.name == "OPP-OWNED":
-                    return {"name": row.name, "owner": "demo@example.com", "assigned_user": ""}
-                if row.name == "OPP-ASSIGNED":
-                    return {"name": row.name, "owner": "other@example.com", "assigned_user": "demo@example.com"}
-                return {"name": row.name, "owner": "other2@example.com", "assigned_user": "other2@example.com"}
-
-            pipeline._opportunity_card = card_for_row
+            pipeline._board_match_conditions = original
+
+        self.assertIn("`tabSales Order`.docstatus < 2", query["where"])
+        self.assertIn("ifnull(`tabSales Order`.project, '') = ''", query["where"])
+        self.assertIn("`tabSales Order`.company in ('Demo')", query["where"])
+        self.assertIn(
+            "ifnull(`tabSales Order`.`per_delivered`, 0) > 0 AND ifnull(`tabSales Order`.`per_delivered`, 0) < 100",
+            query["where"],
+        )
+
+    def test_board_search_and_stage_filter_run_in_sql(self):
+        statuses = [{"name": "Design", "is_active": 1}, {"name": "Archived", "is_active": 0}]
+
+        query = self._board_query("Project", {"search": " tower ", "status": "Design"}, statuses=statuses)
+
+        self.assertEqual(query["values"]["search"], "%tower%")
+        self.assertIn("`tabProject`.`project_name` LIKE %(search)s", query["where"])
+        self.assertIn("`tabProject`.`customer` LIKE %(search)s", query["where"])
+        self.assertEqual(
+            query["stage"],
+            "CASE WHEN `tabProject`.`custom_project_status` IN %(active_stages)s THEN `tabProject`.`custom_project_status`"
+            " WHEN `tabProject`.`status` IN %(active_stages)s THEN `tabProject`.`status`"
+            " ELSE %(unassigned_stage)s END",
+        )
+        self.assertEqual(query["values"]["active_stages"], ("Design",))
+        self.assertIn(f"({query['stage']}) = %(filter_status)s", query["where"])
+
+    def test_column_page_continues_after_the_cursor(self):
+        calls = []
+        rows = [_Doc(name=f"SO-{index}", modified=f"2026-04-0{index} 10:00:00") for index in (3, 2, 1)]
 
-            cards = pipeline._opportunity_cards(statuses=[])
+        def sql(query, values=None, as_dict=False):
+            calls.append((query, values))
+            return rows
 
-            self.assertEqual([card["name"] for card in cards], ["OPP-OWNED", "OPP-ASSIGNED"])
-        finally:
-            pipeline.frappe.get_list = original_get_list
-            pipeline._opportunity_card = original_opportunity_card
-            pipeline._owned_pipeline_visibility_enabled = original_owned_flag
-
-    def test_owned_only_user_sees_owned_or_assigned_projects(self):
-        original_get_list = pipeline.frappe.get_list
-        original_project_card = pipeline._project_card
-        original_owned_flag = pipeline._owned_pipeline_visibility_enabled
+        original_db = pipeline.frappe.db
         try:
-            pipeline.frappe.get_list = lambda doctype, **kwargs: [
-                _Row(name="PROJ-OWNED", custom_project_owner="demo@example.com"),
-                _Row(name="PROJ-ASSIGNED", custom_project_owner="other@example.com"),
-                _Row(name="PROJ-HIDDEN", custom_project_owner="other2@example.com"),
-            ]
-            pipeline._owned_pipeline_visibility_enabled = lambda: True
-
-            def card_for_row(row, statuses):
-                if row.name == "PROJ-OWNED":
-                    return {"name": row.name, "owner": "demo@example.com", "assigned_user": ""}
-                if row.name == "PROJ-ASSIGNED":
-                    return {"name": row.name, "owner": "other@example.com", "assigned_user": "demo@example.com"}
-                return {"name": row.name, "owner": "other2@example.com", "assigned_user": "other2@example.com"}
+            pipeline.frappe.db = types.SimpleNamespace(sql=sql)
+            query = {"table": "`tabSales Order`", "stage": "'Open'", "where": "1 = 1", "values": {}, "fields": ["name"]}
 
-            pipeline._project_card = card_for_row
-
-            cards = pipeline._project_cards(statuses=[])
-
-            self.assertEqual([card["name"] for card in cards], ["PROJ-OWNED", "PROJ-ASSIGNED"])
+            page, cursor = pipeline._board_column_rows(query, "Open", page_length=2)
+            _last_page, last_cursor = pipeline._board_column_rows(query, "Open", cursor=cursor, page_length=5)
         finally:
-            pipeline.frappe.get_list = original_get_list
-            pipeline._project_card = original_project_card
-            pipeline._owned_pipeline_visibility_enabled = original_owned_flag
-
-    def test_owned_only_user_sees_owned_or_assigned_sales_orders(self):
-        original_get_list = pipeline.frappe.get_list
-        original_sales_order_card = pipeline._sales_order_card
-        original_owned_flag = pipeline._owned_pipeline_visibility_enabled
-        try:
-            pipeline.frappe.get_list = lambda doctype, **kwargs: [
-                _Row(name="SO-OWNED", owner="demo@example.com"),
-                _Row(name="SO-ASSIGNED", owner="other@example.com"),
-                _Row(name="SO-HIDDEN", owner="other2@example.com"),
-            ]
-            pipeline._owned_pipeline_visibility_enabled = lambda: True
-
-            def card_for_row(row, statuses):
-                if row.name == "SO-OWNED":
-                    return {"name": row.name, "owner": "demo@example.com", "assigned_user": ""}
-                if row.name == "SO-ASSIGNED":
-                    return {"name": row.name, "owner": "other@example.com", "assigned_user": "demo@example.com"}
-                return {"name": row.name, "owner": "other2@example.com", "assigned_user": "other2@example.com"}
-
-            pipeline._sales_order_card = card_for_row
-
-            cards = pipeline._sales_order_cards(statuses=[])
+            pipeline.frappe.db = original_db
 
-            self.assertEqual([card["name"] for card in cards], ["SO-OWNED", "SO-ASSIGNED"])
-        finally:
-            pipeline.frappe.get_list = original_get_list
-            pipeline._sales_order_card = original_sales_order_card
-            pipeline._owned_pipeline_visibility_enabled = original_owned_flag
+        self.assertEqual([row.name for row in page], ["SO-3", "SO-2"])
+        self.assertEqual(calls[0][1]["page_length"], 3)
+        self.assertEqual(pipeline._decode_board_cursor(cursor), ("2026-04-02 10:00:00", "SO-2"))
+        self.assertNotIn("cursor_modified", calls[0][1])
+        self.assertIn("`tabSales Order`.name < %(cursor_name)s", calls[1][0])
+        self.assertEqual((calls[1][1]["cursor_modified"], calls[1][1]["cursor_name"]), ("2026-04-02 10:00:00", "SO-2"))
+        self.assertIsNone(last_cursor)
+
+    def test_opportunity_board_counts_every_match_but_loads_one_page_per_column(self):
+        statuses = [
+            {"name": "Qualification", "label": "Qualification", "color": "Blue", "is_default": 1},
+            {"name": "Proposal", "label": "Proposal", "color": "Green"},
+        ]
+        stage_rows = {
+            "Qualification": [
+                _Doc(name=f"OPP-{index:03d}", sales_stage="Qualification", opportunity_amount=10, modified=f"2026-04-01 {index:06d}")
+                for index in range(45, 0, -1)
+            ],
+        }
+        queries = []
+
+        def sql(query, values=None, as_dict=False):
+            queries.append(query)
+            if "GROUP BY board_stage" in query:
+                return [_Doc(board_stage="Qualification", count=45, amount=450, quoted=7)]
+            if "ORDER BY `tabOpportunity`.modified DESC" in query:
+                return stage_rows.get(values["column_stage"], [])[: values["page_length"]]
+            if "`custom_source_channel`\n" in query and "GROUP BY" in query:
+                return [("Referral",), ("Website",)]
+            return []
 
-    def test_sales_order_pipeline_excludes_project_linked_orders_in_permission_query(self):
-        calls = []
-        original_get_list = pipeline.frappe.get_list
+        names = (
+            "_resolve_pipeline_company",
+            "list_editable_statuses",
+            "get_company_pipeline_quick_actions",
+            "_allowed_pipeline_companies",
+            "_board_match_conditions",
+            "_has_field",
+        )
+        original = {name: getattr(pipeline, name) for name in names}
+        original_db = pipeline.frappe.db
         try:
-            pipeline.frappe.get_list = lambda doctype, **kwargs: calls.append((doctype, kwargs)) or []
-
-            pipeline._sales_order_cards(statuses=[])
+            pipeline.frappe.has_permission = lambda *args, **kwargs: True
+            pipeline.frappe.db = types.SimpleNamespace(sql=sql, has_column=lambda *args: False, get_value=lambda *args, **kwargs: None)
+            pipeline._resolve_pipeline_company = lambda company=None: "Demo"
+            pipeline.list_editable_statuses = lambda *args, **kwargs: statuses
+            pipeline.get_company_pipeline_quick_actions = lambda *args, **kwargs: []
+            pipeline._allowed_pipeline_companies = lambda: ["Demo"]
+            pipeline._board_match_conditions = lambda doctype: ""
+            pipeline._has_field = lambda doctype, fieldname: True
 
-            self.assertEqual(calls[0][0], "Sales Order")
-            self.assertEqual(calls[0][1]["filters"]["docstatus"], ["<", 2])
-            self.assertEqual(calls[0][1]["filters"]["project"], ["is", "not set"])
-            self.assertEqual(calls[0][1]["limit_page_length"], 200)
+            data = pipeline.get_opportunity_pipeline_data(search="acme", page_length=20)
         finally:
-            pipeline.frappe.get_list = original_get_list
+            for name, value in original.items():
+                setattr(pipeline, name, value)
+            pipeline.frappe.db = original_db
+
+        columns = {column["name"]: column for column in data["columns"]}
+        self.assertEqual(list(columns), ["Qualification", "Proposal"])
+        self.assertEqual(columns["Qualification"]["count"], 45)
+        self.assertEqual(len(columns["Qualification"]["cards"]), 20)
+        self.assertEqual(pipeline._decode_board_cursor(columns["Qualification"]["next_cursor"])[1], "OPP-026")
+        self.assertEqual((columns["Proposal"]["count"], columns["Proposal"]["cards"], columns["Proposal"]["next_cursor"]), (0, [], None))
+        self.assertEqual(data["kpis"]["primary_value"], 45)
+        self.assertEqual(data["kpis"]["secondary_value"], "450")
+        self.assertEqual(data["kpis"]["tertiary_value"], 7)
+        self.assertEqual(data["filters"]["sources"], ["Referral", "Website"])
+        # Empty columns are never queried for cards.
+        self.assertEqual(sum("ORDER BY `tabOpportunity`.modified DESC" in query for query in queries), 1)
 
     def test_project_pipeline_derives_crm_segment_from_source_opportunity(self):
         original_has_field = pipeline._has_field
@@ -375,6 +405,167 @@ class TestCrmPipelineFilters(unittest.TestCase):
             pipeline._has_field = original_has_field
             pipeline.frappe.db = original_db
 
+    def _board_stubs(self, queries):
+        records = {
+            "Quotation": [_Doc(name="QTN-1", status="Open", opportunity="OPP-1")],
+            "Sales Order": [_Doc(name="SO-DIRECT", status="To Deliver", project="", opportunity="OPP-2")],
+            "Project": [
+                _Doc(name="PROJ-1", status="Open", custom_project_status="Execution", custom_source_opportunity=""),
+                _Doc(name="PROJ-2", status="Open", custom_project_status="", custom_source_opportunity="OPP-1"),
+            ],
+            "ToDo": [
+                _Doc(name="TODO-2", allocated_to="other@example.com", description="Call back", reference_name="OPP-1"),
+                _Doc(
+                    name="TODO-1",
+                    allocated_to="sales@example.com",
+                    description=f"{pipeline.PIPELINE_ASSIGNMENT_MARKER} Stage",
+                    reference_name="OPP-1",
+                ),
+            ],
+            "User": [_Doc(name="sales@example.com", full_name="Sales User")],
+        }
+
+        def get_all(doctype, filters=None, fields=None, **kwargs):
+            queries.append(doctype)
+            rows = records.get(doctype, [])
+            for field, condition in (filters or {}).items():
+                if isinstance(condition, list) and condition[0] == "in":
+                    rows = [row for row in rows if row.get(field) in condition[1]]
+            return [_Doc(row) for row in rows]
+
+        def sql(query, params=(), as_dict=False):
+            queries.append("sql")
+            if "prevdoc_docname IN" in query and "QTN-1" in params:
+                return [_Doc(name="SO-1", status="To Bill", project="PROJ-1", link_key="OPP-1")]
+            ranked = re.search(r"FROM `tab([^`]+)`\s+WHERE `(\w+)` IN", query)
+            if ranked and "ROW_NUMBER() OVER" in query:
+                doctype, link_field = ranked.groups()
+                keys, limit = params[:-1], params[-1]
+                return [_Doc(row) for row in records.get(doctype, []) if row.get(link_field) in keys][:limit]
+            return []
+
+        pipeline.frappe.get_all = get_all
+        pipeline.frappe.db = types.SimpleNamespace(
+            sql=sql,
+            has_column=lambda doctype, fieldname: True,
+            get_value=lambda doctype, *args, **kwargs: queries.append(f"get_value {doctype}"),
+        )
+        pipeline._has_field = lambda doctype, fieldname: True
+
+    def test_opportunity_board_loads_related_documents_in_grouped_queries(self):
+        original = (pipeline.frappe.get_all, pipeline.frappe.db, pipeline._has_field)
+        try:
+            queries = []
+            self._board_stubs(queries)
+            statuses = [{"name": "Qualification", "is_default": 1}]
+
+            def board(size):
+                rows = [_Row(name=f"OPP-{index}", sales_stage="Qualification") for index in range(1, size + 1)]
+                queries.clear()
+                cards = pipeline._board_cards("Opportunity", rows, statuses)
+                return cards, list(queries)
+
+            cards, small_queries = board(2)
+            _large_cards, large_queries = board(40)
+        finally:
+            pipeline.frappe.get_all, pipeline.frappe.db, pipeline._has_field = original
+
+        self.assertEqual(small_queries, large_queries)
+        by_name = {card["name"]: card for card in cards}
+        self.assertEqual(
+            [(doc["doctype"], doc["name"], doc["status"]) for doc in by_name["OPP-1"]["docs"]],
+            [
+                ("Quotation", "QTN-1", "Open"),
+                ("Sales Order", "SO-1", "To Bill"),
+                ("Project", "PROJ-1", "Execution"),
+                ("Project", "PROJ-2", "Open"),
+            ],
+        )
+        self.assertEqual(by_name["OPP-1"]["assigned_user"], "sales@example.com")
+        self.assertEqual(by_name["OPP-1"]["assigned_user_label"], "Sales User")
+        self.assertEqual([doc["name"] for doc in by_name["OPP-2"]["docs"]], ["SO-DIRECT"])
+        self.assertEqual(by_name["OPP-2"]["assigned_user"], "")
+
+    def test_single_card_related_docs_match_the_board_resolver(self):
+        original = (pipeline.frappe.get_all, pipeline.frappe.db, pipeline._has_field)
+        try:
+            queries = []
+            self._board_stubs(queries)
+            single = pipeline._opportunity_related_docs("OPP-1")
+            board = pipeline._board_related("Opportunity", [_Row(name="OPP-1"), _Row(name="OPP-2")])
+        finally:
+            pipeline.frappe.get_all, pipeline.frappe.db, pipeline._has_field = original
+
+        self.assertEqual(single, board["docs"]["OPP-1"])
+        self.assertEqual(board["todos"]["OPP-1"].name, "TODO-1")
+
+    def test_project_board_groups_header_and_item_links_per_project(self):
+        original = (pipeline.frappe.get_all, pipeline.frappe.db, pipeline._has_field)
+        try:
+            queries = []
+            self._board_stubs(queries)
+            purchase_orders = [
+                _Doc(name="PO-2", status="To Receive", link_key="PROJ-B"),
+                _Doc(name="PO-2", status="To Receive", link_key="PROJ-A"),
+                _Doc(name="PO-1", status="Completed", link_key="PROJ-A"),
+            ]
+            sql_calls = []
+
+            def sql(query, params=(), as_dict=False):
+                sql_calls.append((query, params))
+                return purchase_orders if "`tabPurchase Order`" in query else []
+
+            pipeline.frappe.db.sql = sql
+            related = pipeline._board_related(
+                "Project",
+                [_Row(name="PROJ-A", custom_source_opportunity="OPP-1"), _Row(name="PROJ-B", custom_source_opportunity="")],
+            )
+        finally:
+            pipeline.frappe.get_all, pipeline.frappe.db, pipeline._has_field = original
+
+        self.assertEqual(
+            [(doc["doctype"], doc["name"]) for doc in related["docs"]["PROJ-A"]],
+            [("Purchase Order", "PO-2"), ("Purchase Order", "PO-1"), ("Quotation", "QTN-1")],
+        )
+        self.assertEqual([doc["name"] for doc in related["docs"]["PROJ-B"]], ["PO-2"])
+        purchase_order_query, purchase_order_params = next(call for call in sql_calls if "`tabPurchase Order`" in call[0])
+        self.assertIn("UNION", purchase_order_query)
+        self.assertIn("ROW_NUMBER() OVER (PARTITION BY linked.link_key", purchase_order_query)
+        self.assertIn("WHERE ranked.link_rank <= %s", purchase_order_query)
+        self.assertEqual(purchase_order_params, ("PROJ-A", "PROJ-B", "PROJ-A", "PROJ-B", 3))
+
+    def test_board_related_queries_cap_and_deduplicate_per_card(self):
+        original = (pipeline.frappe.get_all, pipeline.frappe.db, pipeline._has_field)
+        try:
+            queries = []
+            self._board_stubs(queries)
+            sql_calls = []
+            stub_sql = pipeline.frappe.db.sql
+
+            def sql(query, params=(), as_dict=False):
+                sql_calls.append((" ".join(query.split()), params))
+                return stub_sql(query, params, as_dict=as_dict)
+
+            pipeline.frappe.db.sql = sql
+            pipeline._board_related("Opportunity", [_Row(name="OPP-1"), _Row(name="OPP-2")])
+            pipeline._board_related("Sales Order", [_Row(name="SO-1", project=""), _Row(name="SO-2", project="")])
+        finally:
+            pipeline.frappe.get_all, pipeline.frappe.db, pipeline._has_field = original
+
+        for query, params in sql_calls:
+            self.assertIn("ROW_NUMBER() OVER (PARTITION BY", query)
+            self.assertIn("WHERE ranked.link_rank <= %s", query)
+        limits = {query.split("FROM `tab", 1)[1].split("`", 1)[0]: params[-1] for query, params in sql_calls}
+        self.assertEqual(limits["Quotation"], 5)
+        self.assertEqual(limits["Sales Order Item"], 5)
+        self.assertEqual(limits["Material Request"], 3)
+        quoted = next(query for query, _params in sql_calls if "prevdoc_docname IN" in query)
+        self.assertIn("SELECT DISTINCT so.name", quoted)
+        self.assertIn("PARTITION BY linked.link_key", quoted)
+        downstream = next(query for query, _params in sql_calls if "`tabDelivery Note Item`" in query)
+        self.assertIn("SELECT DISTINCT parent.name", downstream)
+        self.assertIn("item.against_sales_order AS link_key", downstream)
+
 
 if __name__ == "__main__":
     unittest.main()
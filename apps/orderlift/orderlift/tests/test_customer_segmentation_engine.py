@@ -190,6 +190,113 @@ class TestCustomerSegmentationEngine(unittest.TestCase):
         self.assertEqual(zone_mod["amount"], 25)
         self.assertEqual(warning, "")
 
+    def _engine_with_rules(self, rules):
+        engine = CustomerSegmentationEngine()
+        engine.is_active = 1
+        engine.engine_name = "Customer Segmentation - Test"
+        engine.segmentation_rules = [types.SimpleNamespace(**rule) for rule in rules]
+        return engine
+
+    def test_calculate_segments_uses_one_grouped_sales_order_query(self):
+        class DbStub:
+            def __init__(self):
+                self.queries = []
+
+            def sql(self, query, values=None, as_dict=False):
+                self.queries.append(query)
+                return [
+                    {"customer": "CUST-001", "revenue_12m": 900000, "total_orders": 12, "last_order_date": None},
+                    {"customer": "CUST-002", "revenue_12m": 1000, "total_orders": 1, "last_order_date": None},
+                ]
+
+        rule = {"is_active": 1, "is_default": 0, "priority": 10, "connector": "AND", "idx": 1}
+        engine = self._engine_with_rules(
+            [
+                {
+                    **rule,
+                    "designated_segment": "Gold",
+                    "variable_1": "Revenue (12 months)",
+                    "operator_1": "≥ (greater or equal)",
+                    "value_1": 800000,
+                    "variable_2": "Total Orders",
+                    "operator_2": "≥ (greater or equal)",
+                    "value_2": 10,
+                },
+                {"is_active": 1, "is_default": 1, "priority": 100, "idx": 2, "designated_segment": "Bronze"},
+            ]
+        )
+        customers = [{"name": "CUST-001", "customer_name": "One"}, {"name": "CUST-002"}, {"name": "CUST-003"}]
+        engine._get_target_customers = lambda: customers
+        db_stub = DbStub()
+        old_db = getattr(cse_module.frappe, "db", None)
+        cse_module.frappe.db = db_stub
+        try:
+            results = engine.calculate_segments()
+        finally:
+            if old_db is None:
+                delattr(cse_module.frappe, "db")
+            else:
+                cse_module.frappe.db = old_db
+
+        self.assertEqual(len(db_stub.queries), 1)
+        self.assertIn("GROUP BY customer", db_stub.queries[0])
+        self.assertEqual([r["assigned_segment"] for r in results], ["Gold", "Bronze", "Bronze"])
+        self.assertEqual([r["matched_rule"] for r in results], [1, 2, 2])
+        self.assertEqual(results[0]["variables"]["RFM_score"], 5.0)
+        self.assertEqual(results[2]["variables"]["Total_Orders"], 0)
+
+    def test_apply_segments_updates_only_changed_dynamic_customers_in_one_statement(self):
+        class Row(dict):
+            __getattr__ = dict.get
+
+        class DbStub:
+            def __init__(self):
+                self.updates = []
+
+            def has_column(self, doctype, fieldname):
+                return fieldname in {"tier", "enable_dynamic_segmentation", "tier_source"}
+
+            def sql(self, query, values=None, as_dict=False):
+                self.updates.append((query, values))
+
+            def commit(self):
+                pass
+
+        engine = self._engine_with_rules([])
+        engine.calculate_segments = lambda: [
+            {"customer": "CUST-001", "assigned_segment": "Gold"},
+            {"customer": "CUST-002", "assigned_segment": "Gold"},
+            {"customer": "CUST-003", "assigned_segment": "Silver"},
+            {"customer": "CUST-004", "assigned_segment": "Silver"},
+        ]
+        current = [
+            Row(name="CUST-001", tier="Silver", enable_dynamic_segmentation=1),
+            Row(name="CUST-002", tier="Gold", enable_dynamic_segmentation=1),
+            Row(name="CUST-003", tier="", enable_dynamic_segmentation=0),
+            Row(name="CUST-004", tier="", enable_dynamic_segmentation=1),
+        ]
+        db_stub = DbStub()
+        saved = {name: getattr(cse_module.frappe, name, None) for name in ("db", "get_all", "msgprint")}
+        cse_module.frappe.db = db_stub
+        cse_module.frappe.get_all = lambda *args, **kwargs: current
+        cse_module.frappe.msgprint = lambda message: None
+        try:
+            engine.apply_segments()
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    delattr(cse_module.frappe, name)
+                else:
+                    setattr(cse_module.frappe, name, value)
+
+        self.assertEqual(len(db_stub.updates), 1)
+        query, values = db_stub.updates[0]
+        self.assertIn("CASE name", query)
+        self.assertEqual(
+            values,
+            ("CUST-001", "Gold", "CUST-004", "Silver", "Customer Segmentation - Test", "CUST-001", "CUST-004"),
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,215 @@
+import sys
+import types
+import unittest
+
+
+class AttrDict(dict):
+    __getattr__ = dict.get
+
+    def __setattr__(self, key, value):
+        self[key] = value
+
+
+STUBBED_MODULES = (
+    "frappe",
+    "frappe.custom",
+    "frappe.custom.doctype",
+    "frappe.custom.doctype.custom_field",
+    "frappe.custom.doctype.custom_field.custom_field",
+    "frappe.model",
+    "frappe.model.naming",
+    "frappe.utils",
+    "orderlift.orderlift_crm.deal_abbreviation",
+)
+_previous_modules = {name: sys.modules.get(name) for name in STUBBED_MODULES}
+
+frappe_stub = types.ModuleType("frappe")
+frappe_stub._ = lambda value, *args, **kwargs: value
+frappe_stub._dict = AttrDict
+frappe_stub.local = types.SimpleNamespace(site="orderlift.test")
+frappe_stub.parse_json = __import__("json").loads
+frappe_stub.throw = lambda message, *args, **kwargs: (_ for _ in ()).throw(ValueError(message))
+sys.modules["frappe"] = frappe_stub
+
+for name in ("frappe.custom", "frappe.custom.doctype", "frappe.custom.doctype.custom_field", "frappe.model"):
+    sys.modules[name] = types.ModuleType(name)
+custom_field_stub = types.ModuleType("frappe.custom.doctype.custom_field.custom_field")
+custom_field_stub.create_custom_fields = lambda *args, **kwargs: None
+sys.modules["frappe.custom.doctype.custom_field.custom_field"] = custom_field_stub
+naming_stub = types.ModuleType("frappe.model.naming")
+naming_stub.set_new_name = lambda doc: None
+naming_stub.validate_name = lambda doctype, name: name
+sys.modules["frappe.model.naming"] = naming_stub
+utils_stub = types.ModuleType("frappe.utils")
+utils_stub.cint = lambda value=0: int(value or 0)
+sys.modules["frappe.utils"] = utils_stub
+sys.modules.pop("orderlift.orderlift_crm.deal_abbreviation", None)
+
+from orderlift.orderlift_crm import deal_abbreviation
+
+# Other test files build their own frappe stubs; do not leak this one into them.
+for _name, _module in _previous_modules.items():
+    if _module is None:
+        sys.modules.pop(_name, None)
+    else:
+        sys.modules[_name] = _module
+
+DEAL = deal_abbreviation.DEAL_ABBREVIATION_FIELD
+SOURCE = deal_abbreviation.DEAL_SOURCE_FIELD
+
+# Header fields and child tables per doctype: {"fields": (...), "tables": {table_field: (child, fields)}}.
+SCHEMA = {
+    "Opportunity": {"fields": (DEAL,), "tables": {}},
+    "Quotation": {"fields": ("opportunity", DEAL, SOURCE), "tables": {}},
+    "Sales Order": {"fields": ("project", DEAL, SOURCE), "tables": {"items": ("Sales Order Item", ("prevdoc_docname",))}},
+    "Delivery Note": {
+        "fields": ("project", DEAL, SOURCE),
+        "tables": {"items": ("Delivery Note Item", ("against_sales_order",))},
+    },
+    "Sales Invoice": {
+        "fields": ("project", DEAL, SOURCE),
+        "tables": {"items": ("Sales Invoice Item", ("sales_order", "delivery_note"))},
+    },
+}
+CHILD_FIELDS = {child: fields for spec in SCHEMA.values() for child, fields in spec["tables"].values()}
+
+
+class FakeMeta:
+    def __init__(self, doctype):
+        self.doctype = doctype
+
+    def get_field(self, fieldname):
+        if self.doctype in CHILD_FIELDS:
+            return types.SimpleNamespace(fieldtype="Data") if fieldname in CHILD_FIELDS[self.doctype] else None
+        spec = SCHEMA.get(self.doctype, {"fields": (), "tables": {}})
+        if fieldname in spec["tables"]:
+            return types.SimpleNamespace(fieldtype="Table", options=spec["tables"][fieldname][0])
+        return types.SimpleNamespace(fieldtype="Data") if fieldname in spec["fields"] else None
+
+
+class TestDealAbbreviationFastPath(unittest.TestCase):
+    def setUp(self):
+        self.queries = []
+        self.meta_calls = []
+        self.records = {
+            "Opportunity": [AttrDict(name="OPP-1", **{DEAL: "ACME"}), AttrDict(name="OPP-2", **{DEAL: "ACME"})],
+            "Quotation": [AttrDict(name="QTN-1", opportunity="OPP-1")],
+            "Sales Order": [
+                AttrDict(name="SO-1", project=""),
+                AttrDict(name="SO-2", project="", **{SOURCE: '["OPP-2"]'}),
+            ],
+            "Sales Order Item": [
+                AttrDict(parent="SO-1", parenttype="Sales Order", parentfield="items", prevdoc_docname="QTN-1"),
+            ],
+            "Delivery Note": [AttrDict(name="DN-1", project="")],
+            "Delivery Note Item": [
+                AttrDict(parent="DN-1", parenttype="Delivery Note", parentfield="items", against_sales_order="SO-1"),
+            ],
+        }
+        self._orig = {"frappe": deal_abbreviation.frappe}
+        deal_abbreviation.frappe = frappe_stub
+        frappe_stub.local = types.SimpleNamespace(site="orderlift.test")
+        frappe_stub.get_meta = self._get_meta
+        frappe_stub.get_all = self._get_all
+        frappe_stub.get_doc = lambda *args, **kwargs: self.fail("references must not be loaded one by one")
+        frappe_stub.db = types.SimpleNamespace(
+            exists=lambda doctype, name=None: doctype == "DocType" and name in SCHEMA,
+            get_value=lambda doctype, name, fieldname: self.queries.append(("get_value", doctype, name)) or "",
+        )
+        deal_abbreviation._participating_doctypes.clear()
+
+    def tearDown(self):
+        deal_abbreviation.frappe = self._orig["frappe"]
+        deal_abbreviation._participating_doctypes.clear()
+
+    def _get_meta(self, doctype):
+        self.meta_calls.append(doctype)
+        return FakeMeta(doctype)
+
+    def _get_all(self, doctype, filters=None, fields=None, pluck=None, **kwargs):
+        self.queries.append(("get_all", doctype))
+        rows = self.records.get(doctype, [])
+        for key, condition in (filters or {}).items():
+            values = set(condition[1]) if isinstance(condition, list) else {condition}
+            rows = [row for row in rows if row.get(key) in values]
+        if pluck:
+            return [row[pluck] for row in rows]
+        return [AttrDict({field: row.get(field) for field in fields}) for row in rows]
+
+    def _document(self, doctype, name="SINV-NEW", **values):
+        doc = AttrDict(doctype=doctype, name=name, **values)
+        doc.is_new = lambda: True
+        doc.set = doc.__setitem__
+        return doc
+
+    def test_unrelated_doctypes_are_rejected_without_meta_or_queries(self):
+        frappe_stub.get_meta = lambda doctype: self.fail("meta must not be read for ToDo")
+
+        for handler in (
+            deal_abbreviation.prepare_deal_abbreviation_name,
+            deal_abbreviation.sync_deal_abbreviation,
+            deal_abbreviation.sync_submitted_deal_abbreviation,
+            deal_abbreviation.propagate_opportunity_deal_abbreviation,
+        ):
+            handler(self._document("ToDo", name="TODO-1"))
+
+        self.assertEqual(self.queries, [])
+
+    def test_participating_doctypes_are_built_once_per_site_and_cleared_by_custom_fields(self):
+        first = deal_abbreviation.participating_doctypes()
+        calls = len(self.meta_calls)
+        second = deal_abbreviation.participating_doctypes()
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.meta_calls), calls)
+        self.assertEqual(first, frozenset(SCHEMA))
+
+        deal_abbreviation.clear_participating_doctypes(AttrDict(fieldname="custom_other"))
+        deal_abbreviation.participating_doctypes()
+        self.assertEqual(len(self.meta_calls), calls)
+
+        deal_abbreviation.clear_participating_doctypes(AttrDict(fieldname=DEAL))
+        deal_abbreviation.participating_doctypes()
+        self.assertGreater(len(self.meta_calls), calls)
+
+    def test_resolution_loads_references_in_batches_and_reuses_the_request_cache(self):
+        invoice = self._document(
+            "Sales Invoice",
+            items=[AttrDict(sales_order="SO-1", delivery_note="DN-1"), AttrDict(sales_order="SO-2")],
+        )
+
+        opportunities = deal_abbreviation.resolve_source_opportunities(invoice)
+
+        self.assertEqual(opportunities, {"OPP-1", "OPP-2"})
+        loads = [query[1] for query in self.queries]
+        # One query per doctype and child table per level, then one Opportunity check.
+        self.assertEqual(
+            loads,
+            ["Sales Order", "Sales Order Item", "Delivery Note", "Delivery Note Item", "Quotation", "Opportunity"],
+        )
+
+        self.queries.clear()
+        self.assertEqual(deal_abbreviation.resolve_source_opportunities(invoice), {"OPP-1", "OPP-2"})
+        self.assertEqual(self.queries, [])
+
+    def test_saved_documents_are_dropped_from_the_request_cache(self):
+        order = self._document("Sales Order", name="SO-9", items=[AttrDict(prevdoc_docname="QTN-1")])
+        deal_abbreviation.resolve_source_opportunities(order)
+        cache = frappe_stub.local.orderlift_deal_reference_cache
+        self.assertIn(("Quotation", "QTN-1"), cache["references"])
+
+        deal_abbreviation.propagate_opportunity_deal_abbreviation(AttrDict(doctype="Quotation", name="QTN-1"))
+
+        self.assertNotIn(("Quotation", "QTN-1"), cache["references"])
+
+    def test_sync_sets_abbreviation_and_marker(self):
+        invoice = self._document("Sales Invoice", items=[AttrDict(delivery_note="DN-1")])
+
+        deal_abbreviation.sync_deal_abbreviation(invoice)
+
+        self.assertEqual(invoice[DEAL], "ACME")
+        self.assertEqual(invoice[SOURCE], '["OPP-1"]')
+
+
+if __name__ == "__main__":
+    unittest.main()
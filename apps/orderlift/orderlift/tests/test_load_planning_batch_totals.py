@@ -0,0 +1,248 @@
+import importlib.util
+import sys
+import types
+import unittest
+from pathlib import Path
+
+
+APP_ROOT = Path(__file__).resolve().parents[1]
+
+
+class AttrDict(dict):
+    __getattr__ = dict.get
+
+
+frappe_stub = types.ModuleType("frappe")
+frappe_stub._ = lambda value, *args, **kwargs: value
+frappe_stub.whitelist = lambda *args, **kwargs: (lambda fn: fn)
+frappe_stub._dict = lambda value=None, **kwargs: AttrDict(value or {}, **kwargs)
+frappe_stub.throw = lambda message, *args, **kwargs: (_ for _ in ()).throw(ValueError(message))
+sys.modules["frappe"] = frappe_stub
+
+utils_stub = types.ModuleType("frappe.utils")
+utils_stub.cint = lambda value=0: int(value or 0)
+utils_stub.flt = lambda value=0, precision=None: round(float(value or 0), precision) if precision is not None else float(value or 0)
+utils_stub.getdate = lambda value=None: value or "2026-10-18"
+utils_stub.today = lambda: "2026-10-18"
+sys.modules["frappe.utils"] = utils_stub
+frappe_stub.utils = utils_stub
+
+
+def _load_real_modules():
+    # Other test files replace these modules in sys.modules with stubs, so load
+    # the real files under their own names and restore whatever was there.
+    modules = {}
+    previous = {}
+    for name, relative_path in (
+        ("orderlift.orderlift_logistics.services.capacity_math", "orderlift_logistics/services/capacity_math.py"),
+        ("orderlift.orderlift_logistics.utils.packaging_resolver", "orderlift_logistics/utils/packaging_resolver.py"),
+        ("orderlift.orderlift_logistics.services.load_planning", "orderlift_logistics/services/load_planning.py"),
+    ):
+        spec = importlib.util.spec_from_file_location(name, APP_ROOT / relative_path)
+        module = importlib.util.module_from_spec(spec)
+        previous[name] = sys.modules.get(name)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+        modules[name.rsplit(".", 1)[-1]] = module
+    for name, module in previous.items():
+        if module is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = module
+    return modules
+
+
+_modules = _load_real_modules()
+load_planning = _modules["load_planning"]
+packaging_resolver = _modules["packaging_resolver"]
+
+
+def _profile(name, uom, units_per_package, weight_kg, dims, is_default=1):
+    length_cm, width_cm, height_cm = dims
+    return types.SimpleNamespace(
+        name=name,
+        uom=uom,
+        units_per_package=units_per_package,
+        weight_kg=weight_kg,
+        length_cm=length_cm,
+        width_cm=width_cm,
+        height_cm=height_cm,
+        volume_m3=0,
+        packaging_type="Carton",
+        is_active=1,
+        is_default=is_default,
+        customs_tariff_number_override="",
+        parentfield="custom_packaging_profiles",
+        idx=1,
+    )
+
+
+ITEMS = {
+    "RAIL": types.SimpleNamespace(
+        stock_uom="Nos",
+        custom_packaging_profiles=[_profile("PKG-RAIL", "Nos", 4, 12.5, (200, 30, 20))],
+        uoms=[types.SimpleNamespace(uom="Box", conversion_factor=6)],
+        customs_tariff_number="",
+    ),
+    "BOLT": types.SimpleNamespace(
+        stock_uom="Nos",
+        custom_packaging_profiles=[_profile("PKG-BOLT", "Nos", 100, 3.2, (30, 20, 10))],
+        uoms=[],
+        customs_tariff_number="",
+    ),
+    "LOOSE": types.SimpleNamespace(stock_uom="Nos", custom_packaging_profiles=[], uoms=[], customs_tariff_number=""),
+}
+
+DELIVERY_NOTES = {
+    "DN-1": {
+        "customer": "CUST-A",
+        "custom_destination_zone": " Casablanca ",
+        "items": [
+            {"item_code": "RAIL", "qty": 10, "uom": "Nos"},
+            {"item_code": "BOLT", "qty": 250, "uom": "Nos"},
+        ],
+    },
+    "DN-2": {
+        "customer": "CUST-B",
+        "custom_destination_zone": "Tanger",
+        "items": [
+            {"item_code": "RAIL", "qty": 3, "uom": "Box"},
+            {"item_code": "RAIL", "qty": 7, "uom": "Nos"},
+        ],
+    },
+    "DN-3": {
+        "customer": "CUST-A",
+        "custom_destination_zone": "",
+        "items": [
+            {"item_code": "LOOSE", "qty": 5, "uom": "Nos"},
+            {"item_code": "BOLT", "qty": 1, "uom": "Nos"},
+        ],
+    },
+}
+
+
+class TestDeliveryNoteBatchTotals(unittest.TestCase):
+    def setUp(self):
+        self.queries = []
+        self.resolutions = []
+        self.original_frappe = (load_planning.frappe, packaging_resolver.frappe)
+        self.original_resolver = load_planning.get_packaging_resolution
+        load_planning.frappe = frappe_stub
+        packaging_resolver.frappe = frappe_stub
+        frappe_stub.get_cached_doc = lambda doctype, name: ITEMS[name]
+        frappe_stub.get_doc = self._get_doc
+        frappe_stub.get_all = self._get_all
+        frappe_stub.db = types.SimpleNamespace(has_column=lambda *args, **kwargs: False)
+
+        def counting_resolution(**kwargs):
+            self.resolutions.append(kwargs)
+            return packaging_resolver.get_packaging_resolution(**kwargs)
+
+        load_planning.get_packaging_resolution = counting_resolution
+
+    def tearDown(self):
+        load_planning.frappe, packaging_resolver.frappe = self.original_frappe
+        load_planning.get_packaging_resolution = self.original_resolver
+
+    def _get_doc(self, doctype, name):
+        self.queries.append(("get_doc", name))
+        data = DELIVERY_NOTES[name]
+        return types.SimpleNamespace(
+            name=name,
+            customer=data["customer"],
+            get=lambda key, default=None: data.get(key, default),
+            items=[types.SimpleNamespace(**row) for row in data["items"]],
+        )
+
+    def _get_all(self, doctype, filters=None, fields=None, **kwargs):
+        self.queries.append(("get_all", doctype))
+        names = filters["name" if doctype == "Delivery Note" else "parent"][1]
+        if doctype == "Delivery Note":
+            return [AttrDict(name=name, **{k: v for k, v in DELIVERY_NOTES[name].items() if k != "items"}) for name in names if name in DELIVERY_NOTES]
+        return [
+            AttrDict(parent=name, **row)
+            for name in sorted(names)
+            if name in DELIVERY_NOTES
+            for row in DELIVERY_NOTES[name]["items"]
+        ]
+
+    def test_batch_matches_per_document_totals(self):
+        expected = {name: load_planning.compute_delivery_note_totals(name) for name in DELIVERY_NOTES}
+
+        self.assertEqual(load_planning.compute_delivery_note_totals_batch(list(DELIVERY_NOTES)), expected)
+        self.assertEqual(expected["DN-2"]["items"][0]["package_count"], 5.0)
+        self.assertEqual(expected["DN-3"]["missing_data_items"], ["LOOSE"])
+
+    def test_batch_uses_two_queries_and_one_resolution_per_combination(self):
+        self.queries.clear()
+
+        totals = load_planning.compute_delivery_note_totals_batch(["DN-1", "DN-2", "DN-3", "DN-1", "DN-404"])
+
+        self.assertEqual(list(totals), ["DN-1", "DN-2", "DN-3"])
+        self.assertEqual(self.queries, [("get_all", "Delivery Note"), ("get_all", "Delivery Note Item")])
+        resolved = {(call["item_code"], call["uom"]) for call in self.resolutions}
+        self.assertEqual(len(self.resolutions), len(resolved))
+        self.assertEqual(resolved, {("RAIL", "Nos"), ("RAIL", "Box"), ("BOLT", "Nos"), ("LOOSE", "Nos")})
+
+    def test_consolidation_preview_computes_totals_in_one_batch(self):
+        for name in ("pending_delivery_notes", "get_active_containers"):
+            self.addCleanup(setattr, load_planning, name, getattr(load_planning, name))
+        load_planning.pending_delivery_notes = lambda company=None, flow_scope=None: [
+            AttrDict(name=name, custom_destination_zone=data["custom_destination_zone"]) for name, data in DELIVERY_NOTES.items()
+        ]
+        load_planning.get_active_containers = lambda destination_zone=None, departure_date=None: []
+
+        zones = load_planning.consolidation_preview()
+
+        self.assertNotIn("get_doc", {query[0] for query in self.queries})
+        self.assertEqual([zone["zone"] for zone in zones], ["Casablanca", "Tanger", "(no zone)"])
+        self.assertEqual(zones[0]["pending_dn_count"], 1)
+
+    def test_suggestions_report_shipments_left_out_for_a_better_mix_as_displaced(self):
+        totals = {
+            "DN-1": (60, 6),
+            "DN-2": (50, 4),
+            "DN-3": (50, 6),
+            "DN-4": (200, 1),
+        }
+        for name in ("get_planning_candidates", "_delivery_note_assigned_elsewhere", "compute_delivery_note_totals_batch", "select_shipments"):
+            self.addCleanup(setattr, load_planning, name, getattr(load_planning, name))
+        load_planning.get_planning_candidates = lambda **kwargs: [AttrDict(name=name, customer="CUST-A") for name in totals]
+        load_planning._delivery_note_assigned_elsewhere = lambda load_plan_name, delivery_note: False
+        load_planning.compute_delivery_note_totals_batch = lambda names: {
+            name: {"total_weight_kg": totals[name][0], "total_volume_m3": totals[name][1], "missing_data_items": []}
+            for name in names
+        }
+
+        def select_shipments(candidates, remaining_weight, remaining_volume):
+            chosen = {"DN-2", "DN-3"}
+            return {
+                "selected": [row for row in candidates if row["delivery_note"] in chosen],
+                "rejected": [row for row in candidates if row["delivery_note"] not in chosen],
+                "remaining_weight_kg": 0,
+                "remaining_volume_m3": 0,
+            }
+
+        load_planning.select_shipments = select_shipments
+        frappe_stub.get_doc = lambda doctype, name: types.SimpleNamespace(max_weight_kg=100, max_volume_m3=10)
+        load_plan = AttrDict(
+            name="CLP-1",
+            container_profile="20FT",
+            shipments=[],
+            total_weight_kg=0,
+            total_volume_m3=0,
+            destination_zone="Casablanca",
+            company="Orderlift",
+            group_by_customer=0,
+        )
+
+        result = load_planning.suggest_shipments_for_load_plan(load_plan)
+
+        self.assertEqual(
+            result["rejected"],
+            [{"delivery_note": "DN-1", "reason": "displaced"}, {"delivery_note": "DN-4", "reason": "weight"}],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -629,6 +629,125 @@ class TestMenuAccessHelpers(unittest.TestCase):
             else:
                 menu_access.frappe.has_permission = originals["has_permission"]
 
+    def test_compiled_menu_policy_is_cached_until_invalidated(self):
+        class Row(dict):
+            __getattr__ = dict.get
+
+        class Cache:
+            def __init__(self):
+                self.values = {}
+
+            def get_value(self, key, **kwargs):
+                return self.values.get(key)
+
+            def set_value(self, key, value, **kwargs):
+                self.values[key] = value
+
+            def delete_value(self, key):
+                self.values.pop(key, None)
+
+        reads = []
+
+        def get_all(doctype, **kwargs):
+            reads.append(doctype)
+            if doctype == menu_access.MENU_ACCESS_DOCTYPE:
+                return [
+                    Row(
+                        name="crm.campaign_manager",
+                        menu_key="crm.campaign_manager",
+                        enabled=1,
+                        allowed_roles_json=json.dumps(["Sales User"]),
+                        denied_roles_json=json.dumps(["Blocked User"]),
+                    )
+                ]
+            return []
+
+        originals = {
+            name: getattr(menu_access.frappe, name, None)
+            for name in ("db", "get_all", "cache", "get_roles", "has_permission")
+        }
+        cache = Cache()
+        menu_access.frappe.db = types.SimpleNamespace(exists=lambda *args, **kwargs: True, has_column=lambda *args: False)
+        menu_access.frappe.get_all = get_all
+        menu_access.frappe.cache = cache
+        menu_access.frappe.get_roles = lambda user=None: ["Sales User"]
+        menu_access.frappe.has_permission = lambda doctype, ptype=None, user=None: True
+        try:
+            first = menu_access.get_boot_menu_access("sales@example.com")["visible_menu_keys"]
+            second = menu_access.get_boot_menu_access("sales@example.com")["visible_menu_keys"]
+            self.assertIn("crm.campaign_manager", first)
+            self.assertEqual(first, second)
+            self.assertEqual(reads.count(menu_access.MENU_ACCESS_DOCTYPE), 1)
+
+            menu_access.frappe.get_roles = lambda user=None: ["Sales User", "Blocked User"]
+            self.assertNotIn(
+                "crm.campaign_manager", menu_access.get_boot_menu_access("sales@example.com")["visible_menu_keys"]
+            )
+            self.assertEqual(reads.count(menu_access.MENU_ACCESS_DOCTYPE), 1)
+
+            menu_access.clear_menu_access_cache()
+            menu_access.get_boot_menu_access("sales@example.com")
+            self.assertEqual(reads.count(menu_access.MENU_ACCESS_DOCTYPE), 2)
+        finally:
+            for name, value in originals.items():
+                if value is None:
+                    delattr(menu_access.frappe, name)
+                else:
+                    setattr(menu_access.frappe, name, value)
+
+    def test_menu_policy_is_not_cached_or_dropped_before_commit(self):
+        from orderlift.utils import transaction
+
+        class Callbacks(list):
+            def add(self, fn):
+                self.append(fn)
+
+        class Cache:
+            def __init__(self):
+                self.values = {menu_access.MENU_POLICY_CACHE_KEY: {"version": "old"}}
+
+            def get_value(self, key, **kwargs):
+                return self.values.get(key)
+
+            def set_value(self, key, value, **kwargs):
+                self.values[key] = value
+
+            def delete_value(self, key):
+                self.values.pop(key, None)
+
+        after_commit, after_rollback = Callbacks(), Callbacks()
+        originals = {name: getattr(menu_access.frappe, name, None) for name in ("db", "get_all", "cache")}
+        cache = Cache()
+        menu_access.frappe.db = types.SimpleNamespace(
+            after_commit=after_commit,
+            after_rollback=after_rollback,
+            transaction_writes=1,
+            exists=lambda *args, **kwargs: True,
+            has_column=lambda *args: False,
+        )
+        menu_access.frappe.get_all = lambda doctype, **kwargs: []
+        menu_access.frappe.cache = cache
+        self.addCleanup(setattr, transaction, "frappe", transaction.frappe)
+        transaction.frappe = menu_access.frappe
+        try:
+            menu_access.clear_menu_access_cache()
+            self.assertEqual(cache.values[menu_access.MENU_POLICY_CACHE_KEY], {"version": "old"})
+            self.assertEqual((len(after_commit), len(after_rollback)), (1, 1))
+
+            cache.values.clear()
+            menu_access._menu_policy()
+            self.assertEqual(cache.values, {})
+
+            cache.values[menu_access.MENU_POLICY_CACHE_KEY] = {"version": "old"}
+            after_commit[0]()
+            self.assertNotIn(menu_access.MENU_POLICY_CACHE_KEY, cache.values)
+        finally:
+            for name, value in originals.items():
+                if value is None:
+                    delattr(menu_access.frappe, name)
+                else:
+                    setattr(menu_access.frappe, name, value)
+
     def test_boot_menu_access_filters_page_by_backing_doctype_permission(self):
         class Rule(dict):
             def get(self, key, default=None):
@@ -44,7 +44,7 @@ class TestNativeProjectLifecycle(unittest.TestCase):
         self.assertNotIn("custom_installation_project", linkage)
         self.assertNotIn("custom_project_type_ol", dashboard)
         self.assertNotIn("custom_project_type_ol", map_api)
-        self.assertIn('"project": ["is", "not set"]', pipeline)
+        self.assertIn("ifnull(`tabSales Order`.project, '') = ''", pipeline)
         self.assertNotIn('or "Installation"', pipeline)
         self.assertNotIn('return "Distribution"', pipeline)
 
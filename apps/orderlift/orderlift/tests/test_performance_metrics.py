@@ -5,6 +5,7 @@ from __future__ import annotations
 import sys
 import types
 import unittest
+from unittest.mock import patch
 
 
 frappe_stub = types.ModuleType("frappe")
@@ -118,5 +119,181 @@ class TestRegistryLoading(unittest.TestCase):
         self.assertIn("generic.doc_query", REGISTRY)
 
 
+class _Row(dict):
+    __getattr__ = dict.get
+
+
+class _QueryLog:
+    """Records get_all calls and answers them from ``answers[doctype]``."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = []
+
+    def get_all(self, doctype, *args, **kwargs):
+        self.calls.append((doctype, kwargs))
+        answer = self.answers.get(doctype, [])
+        rows = answer(kwargs) if callable(answer) else answer
+        if kwargs.get("pluck"):
+            return [row[kwargs["pluck"]] for row in rows]
+        return [_Row(row) for row in rows]
+
+    def doctypes(self):
+        return [doctype for doctype, _kwargs in self.calls]
+
+
+def _patched_get_all(log, *modules):
+    """Patch get_all on every frappe module the metric code may have bound."""
+    from contextlib import ExitStack
+
+    from orderlift.orderlift_hr.metrics import base
+
+    stack = ExitStack()
+    for module in {id(m): m for m in (base.frappe, *modules)}.values():
+        stack.enter_context(patch.object(module, "get_all", log.get_all))
+    return stack
+
+
+class TestBatchMetrics(unittest.TestCase):
+    def test_batch_metric_groups_every_employee_into_one_query(self):
+        from orderlift.orderlift_hr.metrics import BATCH_REGISTRY
+
+        log = _QueryLog(
+            {
+                "Employee": [{"name": "EMP-1", "user_id": "a@example.com"}, {"name": "EMP-3", "user_id": "c@example.com"}],
+                "Sales Order": [{"owner": "a@example.com", "row_count": 4}],
+            }
+        )
+        with _patched_get_all(log):
+            results = BATCH_REGISTRY["sales.so_count"](["EMP-1", "EMP-2", "EMP-3"], "2026-01-01", "2026-03-31", {})
+
+        self.assertEqual(log.doctypes(), ["Employee", "Sales Order"])
+        query = log.calls[1][1]
+        self.assertEqual(query["group_by"], "owner")
+        self.assertEqual(query["filters"]["owner"], ["in", ["a@example.com", "c@example.com"]])
+        self.assertEqual(results["EMP-1"].value, 4.0)
+        self.assertEqual(results["EMP-2"].status, "No Data")
+        self.assertEqual(results["EMP-3"].value, 0.0)
+
+    def test_single_employee_form_shares_the_batch_query(self):
+        from orderlift.orderlift_hr.metrics import REGISTRY
+
+        log = _QueryLog(
+            {
+                "Employee": [{"name": "EMP-1", "user_id": "a@example.com"}],
+                "Quotation": [
+                    {"owner": "a@example.com", "status": "Ordered", "quotations": 3},
+                    {"owner": "a@example.com", "status": "Open", "quotations": 1},
+                ],
+            }
+        )
+        with _patched_get_all(log):
+            result = REGISTRY["sales.conversion_rate"]("EMP-1", "2026-01-01", "2026-03-31", {})
+
+        self.assertAlmostEqual(result.value, 75.0)
+        self.assertEqual(result.details, {"ordered": 3, "total": 4})
+        self.assertEqual(log.calls[1][1]["group_by"], "owner, status")
+
+    def test_doc_query_treats_missing_values_as_zero(self):
+        from orderlift.orderlift_hr.metrics import BATCH_REGISTRY
+
+        log = _QueryLog(
+            {
+                "Employee": [{"name": "EMP-1", "user_id": "a@example.com"}],
+                "Task": [{"owner": "a@example.com", "row_count": 3, "valued_count": 2, "total": 9.0, "extreme": 4.0}],
+            }
+        )
+        params = {"source_doctype": "Task", "aggregate": "min", "value_field": "expected_time"}
+        with _patched_get_all(log):
+            results = BATCH_REGISTRY["generic.doc_query"](["EMP-1", "EMP-2"], "2026-01-01", "2026-03-31", params)
+
+        self.assertEqual(results["EMP-1"].value, 0.0)
+        self.assertEqual(results["EMP-2"].value, 0.0)
+        self.assertEqual(log.doctypes(), ["Employee", "Task"])
+        self.assertIn({"MIN": "expected_time", "as": "extreme"}, log.calls[1][1]["fields"])
+
+    def test_doc_query_rejects_expressions_in_value_field(self):
+        from orderlift.orderlift_hr.metrics import BATCH_REGISTRY
+
+        log = _QueryLog({"Employee": [{"name": "EMP-1", "user_id": "a@example.com"}]})
+        params = {"source_doctype": "Task", "aggregate": "sum", "value_field": "expected_time) from tabUser --"}
+        with _patched_get_all(log):
+            results = BATCH_REGISTRY["generic.doc_query"](["EMP-1"], "2026-01-01", "2026-03-31", params)
+
+        self.assertEqual(results["EMP-1"].status, "Error")
+        self.assertEqual(log.doctypes(), ["Employee"])
+
+
+class TestRecomputeCycle(unittest.TestCase):
+    def _recompute(self, employee_count, existing_count):
+        performance = _import_performance()
+        employees = [f"EMP-{idx}" for idx in range(employee_count)]
+        answers = {
+            "Appraisee": [{"employee": employee} for employee in employees],
+            "Employee": lambda kwargs: [
+                {"name": employee, "department": "Sales", "designation": None, "user_id": f"{employee}@example.com"}
+                for employee in employees
+            ],
+            "Performance Profile": [{"name": "Sales", "target_department": "Sales", "target_designation": None}],
+            "Performance Metric": [
+                {"name": "sales.so_count", "metric_code": "sales.so_count", "source_type": "Builtin", "default_target": 10},
+            ],
+            "Sales Order": [{"owner": f"{employee}@example.com", "row_count": 5} for employee in employees],
+            "Performance Metric Snapshot": [
+                {"name": f"PMS-{idx}", "employee": employee, "metric": "sales.so_count"}
+                for idx, employee in enumerate(employees[:existing_count])
+            ],
+            "User": lambda kwargs: [{"name": user} for user in kwargs["filters"]["name"][1]],
+        }
+        log = _QueryLog(answers)
+        profile_doc = types.SimpleNamespace(as_dict=lambda: {"name": "Sales", "metrics": [{"metric": "sales.so_count"}]})
+        db = types.SimpleNamespace(
+            get_value=lambda *a, **kw: _Row(start_date="2026-01-01", end_date="2026-03-31"),
+            bulk_update=lambda doctype, updates: writes.setdefault("updates", []).append(updates),
+            bulk_insert=lambda doctype, fields, values: writes.setdefault("inserts", []).append((fields, values)),
+        )
+        writes = {}
+        names = iter(f"PMS-NEW-{idx}" for idx in range(employee_count))
+        naming = types.ModuleType("frappe.model.naming")
+        naming.make_autoname = lambda *a, **kw: next(names)
+        with _patched_get_all(log, performance.frappe), patch.object(performance.frappe, "db", db), patch.object(
+            performance.frappe, "get_doc", lambda *a, **kw: profile_doc, create=True
+        ), patch.dict(sys.modules, {"frappe.model": types.ModuleType("frappe.model"), "frappe.model.naming": naming}):
+            result = performance.recompute_cycle("CYCLE-1")
+        return result, log, writes
+
+    def test_query_count_does_not_grow_with_appraisees(self):
+        small, small_log, _ = self._recompute(2, 1)
+        large, large_log, writes = self._recompute(40, 25)
+
+        self.assertEqual(small_log.doctypes(), large_log.doctypes())
+        self.assertEqual(large["count"], 40)
+        self.assertEqual(len(writes["updates"]), 1)
+        self.assertEqual(len(writes["updates"][0]), 25)
+        self.assertEqual(len(writes["inserts"]), 1)
+        self.assertEqual(len(writes["inserts"][0][1]), 15)
+        self.assertEqual(large["items"][0]["snapshots"][0]["snapshot"], "PMS-0")
+        self.assertEqual(large["items"][39]["snapshots"][0]["snapshot"], "PMS-NEW-14")
+        self.assertEqual(large["items"][0]["snapshots"][0]["score"], 50.0)
+
+
+def _import_performance():
+    assignment = types.ModuleType("orderlift.orderlift_hr.api.assignment")
+    assignment.is_hr_admin = lambda user=None: True
+    stubs = {"frappe": frappe_stub, "frappe.utils": utils_stub, "orderlift.orderlift_hr.api.assignment": assignment}
+    saved = {name: sys.modules.get(name) for name in stubs}
+    sys.modules.update(stubs)
+    sys.modules.pop("orderlift.orderlift_hr.api.performance", None)
+    try:
+        from orderlift.orderlift_hr.api import performance
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+    return performance
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -20,6 +20,7 @@ frappe_stub.whitelist = lambda *args, **kwargs: (lambda fn: fn)
 frappe_stub.validate_and_sanitize_search_inputs = lambda fn: fn
 frappe_stub.session = types.SimpleNamespace(user="Administrator")
 frappe_stub.flags = types.SimpleNamespace()
+frappe_stub.local = types.SimpleNamespace()
 frappe_stub._dict = lambda value=None, **kwargs: AttrDict(value or {}, **kwargs)
 frappe_stub.throw = lambda message, *args, **kwargs: (_ for _ in ()).throw(ValueError(message))
 frappe_stub.logger = lambda *args, **kwargs: types.SimpleNamespace(info=lambda *a, **kw: None)
@@ -44,6 +45,9 @@ utils_stub.getdate = lambda value=None: value or "2026-06-01"
 utils_stub.date_diff = lambda end, start: 0
 utils_stub.get_datetime = lambda value=None: datetime.fromisoformat(str(value).replace("Z", "+00:00"))
 sys.modules["frappe.utils"] = utils_stub
+background_jobs_stub = types.ModuleType("frappe.utils.background_jobs")
+background_jobs_stub.is_job_enqueued = lambda job_id: False
+sys.modules["frappe.utils.background_jobs"] = background_jobs_stub
 
 document_module = types.ModuleType("frappe.model.document")
 document_module.Document = type("Document", (), {"get": lambda self, fieldname, default=None: getattr(self, fieldname, default)})
@@ -71,6 +75,7 @@ _stub_module("orderlift.sales.utils.dimensioning", coerce_dimensioning_value=lam
 from orderlift.orderlift_sales.doctype.pricing_builder import pricing_builder
 from orderlift.orderlift_sales.page.pricing_builder_builder import pricing_builder_builder
 from orderlift.orderlift_sales.utils import item_price_tools, price_list_auto_rebuild, price_list_scope
+from orderlift.utils import transaction
 from orderlift.orderlift_logistics import effective_demand
 from orderlift.orderlift_logistics.utils import item_sequence
 from orderlift.scripts import backfill_pricing_builder_selling_list_stamps
@@ -227,24 +232,290 @@ class TestPricingBuilderMetadata(unittest.TestCase):
         self.assertEqual(doc.custom_builder_price_overridden, 1)
 
     def test_auto_rebuild_updates_existing_stamped_selling_price(self):
-        selling_doc = _FakeItemPriceDoc()
-        statuses = {}
+        bulk_updates = []
 
         frappe_stub.get_all = lambda doctype, **kwargs: _fake_get_all_for_rebuild(doctype)
-        frappe_stub.get_doc = lambda doctype, name: _FakeBuilder() if doctype == "Pricing Builder" else selling_doc
-        frappe_stub.db.set_value = lambda doctype, name, values, **kwargs: statuses.update({name: values})
+        frappe_stub.get_doc = lambda doctype, name: _FakeBuilder()
+        frappe_stub.db.bulk_update = lambda doctype, updates, **kwargs: bulk_updates.append((doctype, updates))
 
         summary = price_list_auto_rebuild.rebuild_from_buying_item_price(
             types.SimpleNamespace(item_code="ITEM-001", price_list="Buy USD", buying=1)
         )
 
         self.assertEqual(summary["updated"], 1)
-        self.assertEqual(selling_doc.price_list_rate, 150)
-        self.assertEqual(selling_doc.custom_source_buying_price_list, "Buy USD")
-        self.assertEqual(selling_doc.custom_benchmark_rule_max_discount_percent, 6)
-        self.assertEqual(selling_doc.save_count, 1)
+        self.assertEqual(len(bulk_updates), 1)
+        doctype, updates = bulk_updates[0]
+        self.assertEqual(doctype, "Item Price")
+        self.assertEqual(updates["IP-SELL"]["price_list_rate"], 150)
+        self.assertEqual(updates["IP-SELL"]["custom_source_buying_price_list"], "Buy USD")
+        self.assertEqual(updates["IP-SELL"]["custom_benchmark_rule_max_discount_percent"], 6)
         self.assertIn("Retail", summary["price_lists"])
 
+    def test_auto_rebuild_journals_pairs_and_reprices_only_affected_rows(self):
+        cache = _FakeJournalCache()
+        enqueued = []
+        builders = []
+        bulk_updates = []
+
+        def get_doc(doctype, name):
+            builders.append(_FakeBuilder(items=("ITEM-001", "ITEM-002", "ITEM-003")))
+            return builders[-1]
+
+        self.addCleanup(lambda: [delattr(frappe_stub, name) for name in ("cache", "enqueue")])
+        frappe_stub.cache = lambda: cache
+        frappe_stub.enqueue = lambda method, **kwargs: enqueued.append(method)
+        frappe_stub.get_all = lambda doctype, **kwargs: _fake_get_all_for_rebuild(doctype, items=("ITEM-001", "ITEM-002"))
+        frappe_stub.get_doc = get_doc
+        frappe_stub.db.bulk_update = lambda doctype, updates, **kwargs: bulk_updates.append(updates)
+        for item_code in ("ITEM-001", "ITEM-002", "ITEM-001"):
+            price = types.SimpleNamespace(item_code=item_code, price_list="Buy USD", buying=1)
+            price_list_auto_rebuild.on_item_price_change(price, "after_insert")
+
+        self.assertEqual(len(cache.sets[price_list_auto_rebuild.JOURNAL_KEY]), 2)
+        self.assertEqual(len(enqueued), 1)
+        self.assertEqual(builders, [])
+
+        result = price_list_auto_rebuild.process_rebuild_journal()
+
+        self.assertEqual(len(builders), 1)
+        self.assertEqual(builders[0].evaluated_keys, [[("ITEM-001", "Buy USD"), ("ITEM-002", "Buy USD")]])
+        self.assertEqual((result["pairs"], result["updated"], result["skipped"]), (2, 2, 0))
+        self.assertEqual(len(bulk_updates), 1)
+        self.assertEqual(set(bulk_updates[0]), {"IP-SELL-ITEM-001", "IP-SELL-ITEM-002"})
+        self.assertEqual(cache.sets[price_list_auto_rebuild.JOURNAL_KEY], set())
+
+    def test_auto_rebuild_journals_pairs_only_after_commit(self):
+        class Callbacks(list):
+            def add(self, fn):
+                self.append(fn)
+
+        cache = _FakeJournalCache()
+        enqueued = []
+        after_commit = Callbacks()
+        self.addCleanup(lambda: [delattr(frappe_stub, name) for name in ("cache", "enqueue")])
+        self.addCleanup(setattr, transaction, "frappe", transaction.frappe)
+        transaction.frappe = types.SimpleNamespace(
+            db=types.SimpleNamespace(after_commit=after_commit, after_rollback=Callbacks()),
+            local=types.SimpleNamespace(),
+        )
+        frappe_stub.cache = lambda: cache
+        frappe_stub.enqueue = lambda method, **kwargs: enqueued.append(kwargs)
+        for item_code in ("ITEM-001", "ITEM-002", "ITEM-001"):
+            price = types.SimpleNamespace(item_code=item_code, price_list="Buy USD", buying=1)
+            price_list_auto_rebuild.on_item_price_change(price, "on_update")
+
+        self.assertEqual(cache.sets, {})
+        self.assertEqual(cache.values, {})
+        self.assertEqual(len(after_commit), 1)
+
+        after_commit[0]()
+
+        self.assertEqual(len(cache.sets[price_list_auto_rebuild.JOURNAL_KEY]), 2)
+        self.assertEqual(len(enqueued), 1)
+        self.assertFalse(enqueued[0]["enqueue_after_commit"])
+
+    def test_auto_rebuild_discards_pairs_from_a_rolled_back_write(self):
+        class Callbacks(list):
+            def add(self, fn):
+                self.append(fn)
+
+            def run(self):
+                callbacks = list(self)
+                self.clear()
+                for callback in callbacks:
+                    callback()
+
+        cache = _FakeJournalCache()
+        after_commit, after_rollback = Callbacks(), Callbacks()
+        self.addCleanup(lambda: [delattr(frappe_stub, name) for name in ("cache", "enqueue")])
+        self.addCleanup(setattr, transaction, "frappe", transaction.frappe)
+        transaction.frappe = types.SimpleNamespace(
+            db=types.SimpleNamespace(after_commit=after_commit, after_rollback=after_rollback),
+            local=types.SimpleNamespace(),
+        )
+        frappe_stub.cache = lambda: cache
+        frappe_stub.enqueue = lambda method, **kwargs: None
+        price_list_auto_rebuild.on_item_price_change(
+            types.SimpleNamespace(item_code="ITEM-001", price_list="Buy USD", buying=1), "on_update"
+        )
+        after_commit.clear()
+        after_rollback.run()
+
+        price_list_auto_rebuild.on_item_price_change(
+            types.SimpleNamespace(item_code="ITEM-002", price_list="Buy USD", buying=1), "on_update"
+        )
+        after_rollback.clear()
+        after_commit.run()
+
+        self.assertEqual(cache.sets[price_list_auto_rebuild.JOURNAL_KEY], {json.dumps(["ITEM-002", "Buy USD"])})
+
+    def test_subset_loader_prices_only_requested_keys(self):
+        queries = []
+
+        def sql(query, params=None, as_dict=False):
+            queries.append(params)
+            return [
+                AttrDict(price_list="Buy EUR", item_code="ITEM-001", price_list_rate=90),
+                AttrDict(price_list="Buy USD", item_code="ITEM-001", price_list_rate=100),
+                AttrDict(price_list="Buy USD", item_code="ITEM-002", price_list_rate=40),
+            ]
+
+        frappe_stub.db.sql = sql
+        frappe_stub.get_all = lambda doctype, **kwargs: ["ITEM-001", "ITEM-002"]
+        keys = pricing_builder._normalize_item_keys(
+            [["ITEM-001", ""], {"item": "ITEM-002", "buying_list": "Buy USD"}, ("ITEM-003", "Buy USD"), ["ITEM-001", ""]]
+        )
+
+        items, warnings = pricing_builder._load_builder_item_subset(keys, ["Buy USD", "Buy EUR"])
+
+        self.assertEqual(queries[0]["item_codes"], ("ITEM-001", "ITEM-002", "ITEM-003"))
+        self.assertEqual(
+            items,
+            [
+                {"item": "ITEM-001", "buying_list": "Buy USD", "buy_price": 100},
+                {"item": "ITEM-002", "buying_list": "Buy USD", "buy_price": 40},
+            ],
+        )
+        self.assertEqual(len(warnings), 1)
+        self.assertIn("ITEM-003", warnings[0])
+
+    def test_subset_loader_drops_keys_a_full_calculation_would_not_produce(self):
+        frappe_stub.db.sql = lambda query, params=None, as_dict=False: [
+            AttrDict(price_list="Buy EUR", item_code="ITEM-001", price_list_rate=90),
+            AttrDict(price_list="Buy USD", item_code="ITEM-001", price_list_rate=100),
+            AttrDict(price_list="Buy USD", item_code="ITEM-002", price_list_rate=40),
+            AttrDict(price_list="Buy USD", item_code="ITEM-003", price_list_rate=70),
+        ]
+        item_filters = []
+
+        def get_all(doctype, filters=None, fields=None, pluck=None, **kwargs):
+            item_filters.append(filters)
+            names = [name for name in ("ITEM-001", "ITEM-002") if name in filters["name"][1]]
+            return names if pluck else [AttrDict(name=name) for name in names[: kwargs.get("limit_page_length") or None]]
+
+        frappe_stub.get_all = get_all
+        keys = [("ITEM-001", "Buy EUR"), ("ITEM-002", "Buy GBP"), ("ITEM-003", ""), ("ITEM-002", "Buy USD")]
+
+        self.addCleanup(setattr, pricing_builder, "is_item_group_node", pricing_builder.is_item_group_node)
+        pricing_builder.is_item_group_node = lambda item_group: False
+
+        items, warnings = pricing_builder._load_builder_item_subset(keys, ["Buy USD", "Buy EUR"], item_group="Cabins")
+
+        self.assertEqual(item_filters[0]["item_group"], "Cabins")
+        self.assertEqual(items, [{"item": "ITEM-002", "buying_list": "Buy USD", "buy_price": 40}])
+        self.assertEqual(len(warnings), 3)
+        self.assertIn("Buy EUR", warnings[0])
+        self.assertIn("Buy GBP", warnings[1])
+        self.assertIn("ITEM-003", warnings[2])
+
+        items, warnings = pricing_builder._load_builder_item_subset([("ITEM-002", "Buy USD")], ["Buy USD", "Buy EUR"], max_items=1)
+
+        self.assertEqual(items, [])
+        self.assertIn("ITEM-002", warnings[0])
+
+    def test_background_publish_is_deduplicated_per_builder(self):
+        enqueued = []
+        doc = types.SimpleNamespace(builder_items=[], selling_price_list_name="Retail", check_permission=lambda ptype: None)
+        self.addCleanup(setattr, pricing_builder, "_publish_candidates", pricing_builder._publish_candidates)
+        self.addCleanup(lambda: delattr(frappe_stub, "enqueue"))
+        pricing_builder._publish_candidates = lambda *args: ([{}] * (pricing_builder.PUBLISH_BACKGROUND_THRESHOLD + 1), [])
+        frappe_stub.get_doc = lambda doctype, name: doc
+        frappe_stub.enqueue = lambda method, **kwargs: enqueued.append(kwargs)
+
+        out = pricing_builder.publish_builder_doc("PB-0001")
+
+        self.assertTrue(out["queued"])
+        self.assertEqual(enqueued[0]["job_id"], "pricing-builder-publish-PB-0001")
+        self.assertTrue(enqueued[0]["deduplicate"])
+
+        self.addCleanup(setattr, pricing_builder, "is_job_enqueued", pricing_builder.is_job_enqueued)
+        pricing_builder.is_job_enqueued = lambda job_id: job_id == "pricing-builder-publish-PB-0001"
+        out = pricing_builder.publish_builder_doc("PB-0001", selected_only=1, selected_rows=[{"item": "ITEM-001"}])
+
+        self.assertFalse(out["queued"])
+        self.assertTrue(out["in_progress"])
+        self.assertEqual(len(out["errors"]), 1)
+        self.assertEqual(len(enqueued), 1)
+
+    def test_builder_page_reports_background_publish_results(self):
+        app_root = Path(__file__).resolve().parents[2]
+        page_js = (app_root / "orderlift/orderlift_sales/page/pricing_builder_builder/pricing_builder_builder.js").read_text()
+
+        self.assertIn('frappe.realtime.on("pricing_builder_published"', page_js)
+        self.assertIn('frappe.realtime.on("pricing_builder_publish_failed"', page_js)
+        self.assertIn("out.in_progress", page_js)
+
+    def test_background_publish_failure_is_logged_and_published(self):
+        events, errors, rollbacks = [], [], []
+
+        def publish_prices(**kwargs):
+            raise RuntimeError("lock wait timeout")
+
+        for name in ("publish_realtime", "log_error", "get_traceback"):
+            self.addCleanup(delattr, frappe_stub, name)
+        for name in ("commit", "rollback"):
+            self.addCleanup(delattr, frappe_stub.db, name)
+        frappe_stub.get_doc = lambda doctype, name: types.SimpleNamespace(publish_prices=publish_prices)
+        frappe_stub.publish_realtime = lambda event, message, user=None: events.append((event, message, user))
+        frappe_stub.log_error = lambda message, title: errors.append(title)
+        frappe_stub.get_traceback = lambda: "traceback"
+        frappe_stub.db.commit = lambda: None
+        frappe_stub.db.rollback = lambda: rollbacks.append(True)
+
+        with self.assertRaises(RuntimeError):
+            pricing_builder.publish_builder_doc_job("PB-0001", user="pricing@example.com")
+
+        self.assertEqual(rollbacks, [True])
+        self.assertIn("PB-0001", errors[0])
+        self.assertEqual(
+            events,
+            [("pricing_builder_publish_failed", {"pricing_builder": "PB-0001", "error": "lock wait timeout"}, "pricing@example.com")],
+        )
+
+    def test_publish_skips_unchanged_prices_and_writes_the_rest_in_bulk(self):
+        rows = [
+            AttrDict(item="ITEM-001", buying_list="Buy USD", status="Ready", base_buy_price=50, projected_price=100, selected=1),
+            AttrDict(item="ITEM-002", buying_list="Buy USD", status="Ready", base_buy_price=50, projected_price=120, selected=1),
+            AttrDict(item="ITEM-003", buying_list="Buy USD", status="Ready", base_buy_price=50, projected_price=80, selected=1),
+            AttrDict(item="ITEM-004", buying_list="Buy USD", status="Missing Rule", base_buy_price=50, projected_price=80, selected=1),
+        ]
+        candidates, skipped = pricing_builder._publish_candidates(rows, True, None)
+        self.assertEqual([item_code for _row, item_code, _price in candidates], ["ITEM-001", "ITEM-002", "ITEM-003"])
+        self.assertEqual(skipped, 1)
+
+        current = {"name": "IP-1", "item_code": "ITEM-001", "price_list_rate": 100.0, "brand": None, "custom_last_builder_rebuild_on": "old"}
+        self.assertTrue(
+            pricing_builder._publish_values_unchanged(current, {"price_list_rate": 100, "brand": "", "custom_last_builder_rebuild_on": "new"})
+        )
+        self.assertFalse(pricing_builder._publish_values_unchanged(current, {"price_list_rate": 120}))
+
+        bulk_updates, bulk_inserts, progress = [], [], []
+        self.addCleanup(lambda: [delattr(frappe_stub, name) for name in ("generate_hash",)])
+        frappe_stub.generate_hash = lambda length=10: "HASH"
+        frappe_stub.db.bulk_update = lambda doctype, updates, **kwargs: bulk_updates.append(updates)
+
+        def bulk_insert(doctype, fields, values, **kwargs):
+            bulk_inserts.append((fields, values))
+
+        frappe_stub.db.bulk_insert = bulk_insert
+        result = pricing_builder._write_published_prices(
+            {"IP-2": {"name": "IP-2", "item_code": "ITEM-002", "price_list_rate": 120}},
+            [{"item_code": "ITEM-003", "price_list": "Retail", "price_list_rate": 80}],
+            progress=lambda done, total: progress.append((done, total)),
+        )
+
+        self.assertEqual((result["updated"], result["created"], result["errors"]), (1, 1, []))
+        self.assertEqual(bulk_updates, [{"IP-2": {"price_list_rate": 120}}])
+        fields, values = bulk_inserts[0]
+        self.assertEqual(fields[:5], ["name", "creation", "modified", "owner", "modified_by"])
+        self.assertEqual(dict(zip(fields, values[0]))["item_code"], "ITEM-003")
+        self.assertEqual(progress, [(1, 2), (2, 2)])
+
+        frappe_stub.db.bulk_insert = lambda *args, **kwargs: (_ for _ in ()).throw(RuntimeError("boom"))
+        failed = pricing_builder._write_published_prices({}, [{"item_code": "ITEM-003", "price_list_rate": 80}])
+        self.assertEqual(failed["failed_items"], {"ITEM-003"})
+        self.assertEqual(len(failed["errors"]), 1)
+
     def test_direct_selling_item_price_edit_marks_override_and_syncs_builder(self):
         set_values = []
         doc = _FakeItemPriceDoc(price_list_rate=175)
@@ -2148,10 +2419,19 @@ class _FakeBuilder:
     selling_price_list_name = "Retail"
     sourcing_rules = [AttrDict(buying_price_list="Buy USD", is_active=1)]
 
+    def __init__(self, items=("ITEM-001",)):
+        self.items = items
+        self.evaluated_keys = []
+
+    def evaluate_items(self, keys):
+        self.evaluated_keys.append(list(keys))
+        self.calculate_items()
+        return {"rows": [row for row in self.builder_items if (row.item, row.buying_list) in set(keys)], "warnings": []}
+
     def calculate_items(self):
         self.builder_items = [
             AttrDict(
-                item="ITEM-001",
+                item=item_code,
                 buying_list="Buy USD",
                 status="Ready",
                 projected_price=150,
@@ -2168,24 +2448,55 @@ class _FakeBuilder:
                 final_margin_pct=14,
                 base_buy_price=100,
             )
+            for item_code in self.items
         ]
 
 
-def _fake_get_all_for_rebuild(doctype):
+def _fake_get_all_for_rebuild(doctype, items=("ITEM-001",)):
     if doctype == "Price List":
         return [AttrDict(name="Retail", custom_pricing_builder="PBU-00001")]
     if doctype == "Item Price":
         return [
             AttrDict(
-                name="IP-SELL",
+                name="IP-SELL" if len(items) == 1 else "IP-SELL-" + item_code,
+                item_code=item_code,
                 price_list="Retail",
                 custom_pricing_builder="PBU-00001",
+                custom_source_buying_price_list="Buy USD",
                 custom_builder_price_overridden=0,
             )
+            for item_code in items
         ]
     return []
 
 
+class _FakeJournalCache:
+    def __init__(self):
+        self.sets = {}
+        self.values = {}
+
+    def make_key(self, key):
+        return key
+
+    def sadd(self, key, *values):
+        self.sets.setdefault(key, set()).update(values)
+
+    def smembers(self, key):
+        return {value.encode() for value in self.sets.get(key, set())}
+
+    def srem(self, key, *values):
+        self.sets.get(key, set()).difference_update(value.decode() for value in values)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
 def _fake_get_all_for_backfill(doctype):
     if doctype == "Item Price":
         return [AttrDict(name="IP-SELL")]
@@ -0,0 +1,130 @@
+import sys
+import types
+import unittest
+
+
+frappe_stub = types.ModuleType("frappe")
+frappe_stub.local = types.SimpleNamespace(site="site-a.local")
+sys.modules["frappe"] = frappe_stub
+
+from orderlift.orderlift_sales.utils import pricing_reference_cache
+from orderlift.utils import transaction
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def make_key(self, key):
+        return f"{frappe_stub.local.site}|{key}"
+
+    def get_value(self, key):
+        return self.values.get(self.make_key(key))
+
+    def set_value(self, key, value, expires_in_sec=None):
+        self.values[self.make_key(key)] = value
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def incrby(self, key, amount):
+        self.values[key] = int(self.values.get(key) or 0) + amount
+        return self.values[key]
+
+
+class TestPricingReferenceCache(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.calls = []
+        self.rates = {"site-a.local": 10.0, "site-b.local": 11.0}
+        self.original_frappe = pricing_reference_cache.frappe
+        pricing_reference_cache.frappe = frappe_stub
+        frappe_stub.cache = lambda: self.redis
+        frappe_stub.local.site = "site-a.local"
+        pricing_reference_cache._local_generations.clear()
+        pricing_reference_cache.clear_pricing_reference_cache()
+
+        @pricing_reference_cache.pricing_reference_cached("test_rate")
+        def get_rate(from_currency, to_currency):
+            self.calls.append((frappe_stub.local.site, from_currency, to_currency))
+            return {"exchange_rate": self.rates[frappe_stub.local.site]}
+
+        self.get_rate = get_rate
+
+    def tearDown(self):
+        pricing_reference_cache.frappe = self.original_frappe
+        pricing_reference_cache._local_generations.clear()
+        pricing_reference_cache.clear_pricing_reference_cache()
+
+    def test_repeated_lookups_hit_local_tier_and_return_copies(self):
+        first = self.get_rate("USD", "MAD")
+        first["exchange_rate"] = 0
+        second = self.get_rate("USD", "MAD")
+
+        self.assertEqual(second["exchange_rate"], 10.0)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.get_rate.cache_info(), {"local_hits": 1, "redis_hits": 0, "misses": 1})
+
+    def test_entries_are_scoped_by_site(self):
+        self.assertEqual(self.get_rate("USD", "MAD")["exchange_rate"], 10.0)
+        frappe_stub.local.site = "site-b.local"
+        self.assertEqual(self.get_rate("USD", "MAD")["exchange_rate"], 11.0)
+        self.assertEqual([call[0] for call in self.calls], ["site-a.local", "site-b.local"])
+
+    def test_redis_tier_serves_other_workers(self):
+        self.get_rate("USD", "MAD")
+        pricing_reference_cache._clear_local_entries()
+
+        self.assertEqual(self.get_rate("USD", "MAD")["exchange_rate"], 10.0)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.get_rate.cache_info()["redis_hits"], 1)
+
+    def test_invalidation_bumps_generation_and_recomputes(self):
+        self.get_rate("USD", "MAD")
+        self.rates["site-a.local"] = 12.5
+        pricing_reference_cache.invalidate_pricing_reference_cache(types.SimpleNamespace(doctype="Currency Exchange"), "on_update")
+
+        self.assertEqual(self.get_rate("USD", "MAD")["exchange_rate"], 12.5)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_invalidation_waits_for_commit(self):
+        class Callbacks(list):
+            def add(self, fn):
+                self.append(fn)
+
+        after_commit, after_rollback = Callbacks(), Callbacks()
+        frappe_stub.db = types.SimpleNamespace(after_commit=after_commit, after_rollback=after_rollback)
+        self.addCleanup(lambda: delattr(frappe_stub, "db"))
+        self.addCleanup(setattr, transaction, "frappe", transaction.frappe)
+        transaction.frappe = frappe_stub
+        self.get_rate("USD", "MAD")
+        self.rates["site-a.local"] = 12.5
+
+        pricing_reference_cache.invalidate_pricing_reference_cache()
+        pricing_reference_cache.invalidate_pricing_reference_cache()
+        self.assertEqual(self.get_rate("USD", "MAD")["exchange_rate"], 10.0)
+        self.assertEqual(len(after_commit), 1)
+
+        for callback in after_commit:
+            callback()
+        self.assertEqual(self.get_rate("USD", "MAD")["exchange_rate"], 12.5)
+
+    def test_invalidation_without_redis_still_drops_local_entries(self):
+        frappe_stub.cache = lambda: (_ for _ in ()).throw(ConnectionError("redis down"))
+        self.get_rate("USD", "MAD")
+        self.rates["site-a.local"] = 9.0
+        pricing_reference_cache.invalidate_pricing_reference_cache()
+
+        self.assertEqual(self.get_rate("USD", "MAD")["exchange_rate"], 9.0)
+
+    def test_invalidation_hooks_are_registered(self):
+        from orderlift import hooks
+
+        hook = "orderlift.orderlift_sales.utils.pricing_reference_cache.invalidate_pricing_reference_cache"
+        for doctype in ("Currency Exchange", "Price List"):
+            on_update = hooks.doc_events[doctype]["on_update"]
+            self.assertIn(hook, on_update if isinstance(on_update, list) else [on_update])
+
+
+if __name__ == "__main__":
+    unittest.main()
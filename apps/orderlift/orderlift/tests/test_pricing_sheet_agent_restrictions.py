@@ -128,6 +128,38 @@ class TestPricingSheetAgentRestrictions(unittest.TestCase):
 
         self.assertFalse(sheet._is_restricted_agent_user())
 
+    def test_background_recalculation_runs_as_the_sheet_user_and_prices_once(self):
+        calls = []
+
+        class Sheet:
+            flags = types.SimpleNamespace()
+
+            def recalculate(self):
+                calls.append(("recalculate", frappe_stub.session.user))
+
+            def save(self, ignore_permissions=False):
+                calls.append(("save", frappe_stub.session.user))
+
+        def set_user(user):
+            frappe_stub.session = types.SimpleNamespace(user=user)
+
+        for name in ("set_user", "get_doc", "publish_realtime"):
+            self.addCleanup(lambda name=name: delattr(frappe_stub, name) if hasattr(frappe_stub, name) else None)
+        frappe_stub.set_user = set_user
+        frappe_stub.get_doc = lambda doctype, name: Sheet()
+        frappe_stub.publish_realtime = lambda event, message, user=None: calls.append((event, user))
+        frappe_stub.db.get_value = lambda doctype, name, fields, as_dict=False: {"calculated_by": "", "owner": "agent@example.com"}
+        frappe_stub.db.commit = lambda: None
+        frappe_stub.session = types.SimpleNamespace(user="manager@example.com")
+
+        pricing_sheet.run_pricing_sheet_recalculation("PS-0001", user="manager@example.com")
+
+        self.assertEqual(
+            calls,
+            [("save", "agent@example.com"), ("pricing_sheet_recalculated", "manager@example.com")],
+        )
+        self.assertEqual(frappe_stub.session.user, "manager@example.com")
+
     def test_restricted_static_agent_defaults_to_first_allocated_selling_list(self):
         sheet = pricing_sheet.PricingSheet()
         sheet.sales_person = "SP-BILAL"
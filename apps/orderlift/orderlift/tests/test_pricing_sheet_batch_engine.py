@@ -0,0 +1,271 @@
+import importlib.util
+import sys
+import types
+import unittest
+from pathlib import Path
+
+
+APP_ROOT = Path(__file__).resolve().parents[1]
+
+
+class AttrDict(dict):
+    __getattr__ = dict.get
+
+
+frappe_stub = types.ModuleType("frappe")
+frappe_stub._ = lambda value: value
+frappe_stub.whitelist = lambda *args, **kwargs: (lambda fn: fn)
+frappe_stub.validate_and_sanitize_search_inputs = lambda fn: fn
+frappe_stub.session = types.SimpleNamespace(user="Administrator")
+frappe_stub._dict = lambda value=None, **kwargs: AttrDict(value or {}, **kwargs)
+frappe_stub.get_roles = lambda user=None: []
+frappe_stub.throw = lambda message, *args, **kwargs: (_ for _ in ()).throw(ValueError(message))
+frappe_stub.log_error = lambda *args, **kwargs: None
+frappe_stub.logger = lambda *args, **kwargs: types.SimpleNamespace(info=lambda *a, **kw: None)
+frappe_stub.db = types.SimpleNamespace(
+    exists=lambda *args, **kwargs: False,
+    get_value=lambda *args, **kwargs: None,
+    has_column=lambda *args, **kwargs: False,
+)
+sys.modules["frappe"] = frappe_stub
+
+utils_stub = types.ModuleType("frappe.utils")
+utils_stub.cint = lambda value=0: int(value or 0)
+utils_stub.cstr = lambda value="": str(value or "")
+utils_stub.flt = lambda value=0, precision=None: round(float(value or 0), precision) if precision is not None else float(value or 0)
+utils_stub.now_datetime = lambda: "2026-06-01 12:00:00"
+utils_stub.nowdate = lambda: "2026-06-01"
+utils_stub.getdate = lambda value=None: value or "2026-06-01"
+utils_stub.date_diff = lambda end, start: 0
+sys.modules["frappe.utils"] = utils_stub
+
+document_module = types.ModuleType("frappe.model.document")
+document_module.Document = type("Document", (), {"get": lambda self, fieldname, default=None: getattr(self, fieldname, default)})
+sys.modules["frappe.model"] = types.ModuleType("frappe.model")
+sys.modules["frappe.model.document"] = document_module
+
+
+def _stub_module(name, **attrs):
+    module = types.ModuleType(name)
+    for key, value in attrs.items():
+        setattr(module, key, value)
+    sys.modules[name] = module
+
+
+def _load_real_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, APP_ROOT / relative_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+_stub_module(
+    "orderlift.sales.utils.customs_policy",
+    compute_customs_amount=lambda *args, **kwargs: {},
+    resolve_customs_rule=lambda *args, **kwargs: {},
+)
+_stub_module("orderlift.orderlift_logistics.utils.packaging_resolver", get_packaging_resolution=lambda *args, **kwargs: {})
+_stub_module("orderlift.sales.utils.dimensioning", coerce_dimensioning_value=lambda field_type, value: value)
+
+sys.modules.pop("orderlift.orderlift_sales.doctype.pricing_sheet.pricing_sheet", None)
+pricing_sheet_package = sys.modules.get("orderlift.orderlift_sales.doctype.pricing_sheet")
+if pricing_sheet_package and hasattr(pricing_sheet_package, "pricing_sheet"):
+    delattr(pricing_sheet_package, "pricing_sheet")
+
+from orderlift.orderlift_sales.doctype.pricing_sheet import pricing_sheet
+
+customs_policy_module = _load_real_module("_real_customs_policy", "sales/utils/customs_policy.py")
+
+
+class _ExpenseRow(AttrDict):
+    def as_dict(self):
+        return dict(self)
+
+
+BUY_PRICES = {
+    "Buy USD": {"ITEM-A": 100.0, "ITEM-B": 40.0, "ITEM-C": 12.5},
+    "Buy EUR": {"ITEM-A": 95.0, "ITEM-C": 11.0},
+}
+BENCHMARK_PRICES = {"ITEM-A": 190.0, "ITEM-B": 61.0}
+ITEM_DETAILS = {
+    "ITEM-A": {"item_group": "Rails", "custom_weight_kg": 4, "custom_volume_m3": 0.02, "customs_tariff_number": "842810"},
+    "ITEM-B": {"item_group": "Doors", "custom_weight_kg": 0, "custom_volume_m3": 0, "custom_material": "steel"},
+    "ITEM-C": {"item_group": "Rails", "custom_weight_kg": 1.5, "custom_volume_m3": 0.001, "customs_tariff_number": "842810"},
+}
+
+
+class TestPricingSheetBatchEngine(unittest.TestCase):
+    def setUp(self):
+        self.originals = {
+            name: getattr(pricing_sheet, name)
+            for name in (
+                "build_static_context",
+                "get_item_details_map",
+                "get_latest_item_prices",
+                "get_latest_item_prices_by_list",
+                "get_pricing_currency",
+                "get_price_list_type",
+                "get_packaging_resolution",
+                "resolve_customs_rule",
+                "compute_customs_amount",
+                "can_override_quotation_pricing",
+            )
+        }
+        self.packaging_calls = []
+
+        def get_latest_item_prices(item_codes, price_list, buying=None, target_currency=None):
+            source = BENCHMARK_PRICES if price_list == "Market" else BUY_PRICES.get(price_list, {})
+            return {code: source[code] for code in item_codes if code in source}
+
+        def get_packaging_resolution(item_code=None, packaging_profile=None, qty=0, uom=None):
+            self.packaging_calls.append((item_code, packaging_profile, qty))
+            if packaging_profile == "BOX-10":
+                return {"weight_kg": 30, "units_per_package": 10, "stock_qty": qty, "package_count": 1, "resolved_source": "selected"}
+            return {}
+
+        pricing_sheet.build_static_context = lambda **kwargs: {}
+        pricing_sheet.get_item_details_map = lambda item_codes: {code: dict(ITEM_DETAILS[code]) for code in item_codes}
+        pricing_sheet.get_latest_item_prices = get_latest_item_prices
+        pricing_sheet.get_latest_item_prices_by_list = lambda item_codes, price_lists, buying=None, target_currency=None: {
+            price_list: get_latest_item_prices(item_codes, price_list, buying=buying, target_currency=target_currency)
+            for price_list in price_lists
+        }
+        pricing_sheet.get_pricing_currency = lambda: "USD"
+        pricing_sheet.get_price_list_type = lambda price_list: "Selling"
+        pricing_sheet.get_packaging_resolution = get_packaging_resolution
+        pricing_sheet.resolve_customs_rule = customs_policy_module.resolve_customs_rule
+        pricing_sheet.compute_customs_amount = customs_policy_module.compute_customs_amount
+        pricing_sheet.can_override_quotation_pricing = lambda: True
+
+    def tearDown(self):
+        for name, value in self.originals.items():
+            setattr(pricing_sheet, name, value)
+
+    def _build_sheet(self):
+        scenario = AttrDict(
+            name="Import",
+            expenses=[
+                _ExpenseRow(label="Freight", type="Percentage", value=8, applies_to="Base Price", scope="Per Unit", sequence=10, idx=1, is_active=1),
+                _ExpenseRow(label="Handling", type="Fixed", value=3, applies_to="Base Price", scope="Per Unit", sequence=20, idx=2, is_active=1),
+                _ExpenseRow(label="Dossier", type="Fixed", value=250, applies_to="Base Price", scope="Per Sheet", sequence=30, idx=3, is_active=1),
+            ],
+            transport_is_active=1,
+            transport_allocation_mode="By Kg",
+            transport_container_price=1200,
+            transport_total_weight_kg=2000,
+            storage_is_active=1,
+            storage_cost_per_m3_per_month=30,
+            storage_duration_months=2,
+        )
+        customs_policy = AttrDict(
+            name="Customs",
+            is_active=1,
+            customs_rules=[
+                AttrDict(tariff_number="842810", material="", value_per_kg=12, rate_components="", rate_percent=25, sequence=1, priority=1, is_active=1, idx=1),
+                AttrDict(tariff_number="", material="STEEL", value_per_kg=0, rate_components="", rate_percent=10, sequence=2, priority=1, is_active=1, idx=2),
+            ],
+        )
+        benchmark_policy = AttrDict(
+            name="Margin",
+            method="Median",
+            benchmark_basis="Selling Market",
+            min_sources_required=1,
+            fallback_margin_percent=12,
+            fallback_max_discount_percent=5,
+            margin_application_basis="Base Price",
+            benchmark_sources=[AttrDict(price_list="Market", label="Market", source_kind="", weight=1, is_active=1)],
+            benchmark_rules=[
+                AttrDict(ratio_min=0, ratio_max=0, target_margin_percent=18, max_discount_percent=6, item_group="", material="", source_bundle="", geography_territory="", priority=10, sequence=90, is_active=1, idx=1),
+            ],
+        )
+
+        sheet = pricing_sheet.PricingSheet()
+        sheet.name = "PS-0001"
+        sheet.flags = types.SimpleNamespace()
+        sheet.sales_person = ""
+        sheet.customer = ""
+        sheet.customer_type = ""
+        sheet.tier = "Gold"
+        sheet.crm_business_type = ""
+        sheet.crm_segment = ""
+        sheet.scenario_mappings = [
+            AttrDict(pricing_scenario="Import", source_buying_price_list="", customs_policy="", benchmark_policy="", business_type="", crm_segment="", priority=10, idx=1, is_active=1),
+        ]
+        sheet.lines = [
+            types.SimpleNamespace(idx=1, item="ITEM-A", qty=4, pricing_scenario="", source_buying_price_list="", custom_packaging_profile="", display_group="", source_bundle="", buy_price=0, sell_unit_price=None),
+            types.SimpleNamespace(idx=2, item="ITEM-B", qty=10, pricing_scenario="Import", source_buying_price_list="", custom_packaging_profile="", display_group="", source_bundle="", buy_price=0, sell_unit_price=None),
+            types.SimpleNamespace(idx=3, item="ITEM-C", qty=20, pricing_scenario="", source_buying_price_list="Buy EUR", custom_packaging_profile="BOX-10", display_group="", source_bundle="", buy_price=0, sell_unit_price=None),
+            types.SimpleNamespace(idx=4, item="ITEM-A", qty=4, pricing_scenario="", source_buying_price_list="Buy EUR", custom_packaging_profile="", display_group="", source_bundle="", buy_price=0, sell_unit_price=None),
+            types.SimpleNamespace(idx=5, item="ITEM-C", qty=20, pricing_scenario="", source_buying_price_list="", custom_packaging_profile="BOX-10", display_group="", source_bundle="", buy_price=0, sell_unit_price=90),
+        ]
+
+        modifier_calls = []
+
+        def resolve_segmentation_modifiers():
+            modifier_calls.append(1)
+            return {"amount": 2, "type": "Percentage", "label": "Gold"}, {"amount": 1.5, "type": "Fixed", "label": "North"}, "Zone modifier is provisional."
+
+        sheet.modifier_calls = modifier_calls
+        sheet._sync_customer_context = lambda: None
+        sheet._validate_dynamic_line_items_in_allowed_buying_lists = lambda item_codes: None
+        sheet._resolve_agent_discount_context = lambda: {"max_discount_percent": 0.0, "commission_rate": 10.0}
+        sheet._set_default_sales_person = lambda: None
+        sheet._allow_policy_draft_mode = lambda: False
+        sheet._apply_agent_dynamic_defaults = lambda: None
+        sheet._collect_scenarios_or_throw = lambda lines: {"Import": scenario}
+        sheet._resolve_customs_policy = lambda: customs_policy
+        sheet._resolve_benchmark_policy = lambda: benchmark_policy
+        sheet._should_skip_policy_defaults = lambda: False
+        sheet._has_active_mapping_policy = lambda fieldname: False
+        sheet._get_dynamic_tier_staleness_warning = lambda: ""
+        sheet._resolve_source_buying_price_list = lambda: "Buy USD"
+        sheet._resolve_geography_context = lambda: {"geography_territory": "North"}
+        sheet._resolve_segmentation_modifiers = resolve_segmentation_modifiers
+        return sheet
+
+    def _recalculate(self, engine):
+        sheet = self._build_sheet()
+        sheet.flags.pricing_engine = engine
+        sheet.recalculate()
+        return sheet
+
+    def test_batch_engine_matches_per_row_engine(self):
+        row_sheet = self._recalculate(pricing_sheet.PRICING_ENGINE_ROW)
+        batch_sheet = self._recalculate(pricing_sheet.PRICING_ENGINE_BATCH)
+
+        for fieldname in ("total_buy", "total_expenses", "total_selling", "customs_total_applied", "projection_warnings"):
+            self.assertEqual(getattr(batch_sheet, fieldname), getattr(row_sheet, fieldname), fieldname)
+        self.assertGreater(row_sheet.total_selling, row_sheet.total_buy)
+        self.assertIn("Zone modifier is provisional.", batch_sheet.projection_warnings)
+
+        for row_line, batch_line in zip(row_sheet.lines, batch_sheet.lines):
+            self.assertEqual(vars(batch_line), vars(row_line), f"row {row_line.idx}")
+        self.assertEqual(batch_sheet.lines[2].buy_price, 11.0)
+        self.assertEqual(batch_sheet.lines[3].source_buying_price_list, "Buy EUR")
+        self.assertEqual(batch_sheet.lines[4].is_manual_override, 1)
+
+    def test_batch_engine_resolves_sheet_level_lookups_once(self):
+        row_sheet = self._recalculate(pricing_sheet.PRICING_ENGINE_ROW)
+        row_packaging_calls = list(self.packaging_calls)
+        self.packaging_calls.clear()
+        batch_sheet = self._recalculate(pricing_sheet.PRICING_ENGINE_BATCH)
+
+        self.assertEqual(len(row_sheet.modifier_calls), len(row_sheet.lines))
+        self.assertEqual(len(batch_sheet.modifier_calls), 1)
+        self.assertEqual(len(row_packaging_calls), 5)
+        self.assertEqual(sorted(self.packaging_calls), sorted(set(row_packaging_calls)))
+
+    def test_engine_switch_defaults_to_batch(self):
+        sheet = pricing_sheet.PricingSheet()
+        sheet.flags = types.SimpleNamespace()
+        self.assertEqual(sheet._resolve_pricing_engine(), pricing_sheet.PRICING_ENGINE_BATCH)
+
+        sheet.flags.pricing_engine = "row"
+        self.assertEqual(sheet._resolve_pricing_engine(), pricing_sheet.PRICING_ENGINE_ROW)
+
+        sheet.flags.pricing_engine = "unknown"
+        self.assertEqual(sheet._resolve_pricing_engine(), pricing_sheet.DEFAULT_PRICING_ENGINE)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import sys
+import types
+import unittest
+
+
+class AttrDict(dict):
+    __getattr__ = dict.get
+
+
+frappe_stub = types.ModuleType("frappe")
+frappe_stub._ = lambda value: value
+frappe_stub.whitelist = lambda *args, **kwargs: (lambda fn: fn)
+frappe_stub.validate_and_sanitize_search_inputs = lambda fn: fn
+frappe_stub.session = types.SimpleNamespace(user="Administrator")
+frappe_stub.local = types.SimpleNamespace(site="site-a.local")
+frappe_stub.db = types.SimpleNamespace(has_column=lambda *args, **kwargs: False)
+sys.modules["frappe"] = frappe_stub
+
+utils_stub = types.ModuleType("frappe.utils")
+utils_stub.cint = lambda value=0: int(value or 0)
+utils_stub.cstr = lambda value="": str(value or "")
+utils_stub.flt = lambda value=0, precision=None: round(float(value or 0), precision) if precision is not None else float(value or 0)
+utils_stub.now_datetime = lambda: "2026-06-01 12:00:00"
+utils_stub.nowdate = lambda: "2026-06-01"
+utils_stub.getdate = lambda value=None: value or "2026-06-01"
+utils_stub.date_diff = lambda end, start: 0
+sys.modules["frappe.utils"] = utils_stub
+
+document_module = types.ModuleType("frappe.model.document")
+document_module.Document = type("Document", (), {})
+sys.modules["frappe.model"] = types.ModuleType("frappe.model")
+sys.modules["frappe.model.document"] = document_module
+
+sys.modules.pop("orderlift.orderlift_sales.doctype.pricing_sheet.pricing_sheet", None)
+pricing_sheet_package = sys.modules.get("orderlift.orderlift_sales.doctype.pricing_sheet")
+if pricing_sheet_package and hasattr(pricing_sheet_package, "pricing_sheet"):
+    delattr(pricing_sheet_package, "pricing_sheet")
+
+from orderlift.orderlift_sales.doctype.pricing_sheet import pricing_sheet
+
+
+class TestItemPriceResolver(unittest.TestCase):
+    def setUp(self):
+        self.sql_calls = []
+        self.column_probes = []
+        self.rows = [
+            AttrDict(name="IP-1", item_code="ITEM-A", price_list="Retail", price_list_rate=100, modified="2026-05-01", custom_pricing_builder="PBU-1", price_rank=1),
+            AttrDict(name="IP-2", item_code="ITEM-B", price_list="Retail", price_list_rate=50, modified="2026-05-01", custom_pricing_builder="", price_rank=1),
+            AttrDict(name="IP-3", item_code="ITEM-A", price_list="Export EUR", price_list_rate=90, modified="2026-05-02", custom_pricing_builder="PBU-2", price_rank=1),
+        ]
+
+        def sql(query, params=None, as_dict=False):
+            self.sql_calls.append((query, params))
+            return [row for row in self.rows if row.price_list in params["price_lists"]]
+
+        def has_column(doctype, fieldname):
+            self.column_probes.append((doctype, fieldname))
+            return doctype == "Item Price" and fieldname in {"enabled", "valid_from", "custom_pricing_builder"}
+
+        self.original_db = pricing_sheet.frappe.db
+        self.original_local = getattr(pricing_sheet.frappe, "local", None)
+        self.original_currency = pricing_sheet.get_price_list_currency
+        self.original_rate = pricing_sheet.get_exchange_rate_for_pair
+        pricing_sheet.frappe.db = types.SimpleNamespace(sql=sql, has_column=has_column)
+        pricing_sheet.frappe.local = types.SimpleNamespace(site="site-a.local")
+        pricing_sheet.get_price_list_currency = lambda price_list: "EUR" if price_list == "Export EUR" else "MAD"
+        pricing_sheet.get_exchange_rate_for_pair = lambda from_currency, to_currency, rate_date=None: 11.0 if from_currency != to_currency else 1.0
+        pricing_sheet._ITEM_PRICE_SCHEMA_CACHE.clear()
+
+    def tearDown(self):
+        pricing_sheet.frappe.db = self.original_db
+        pricing_sheet.frappe.local = self.original_local
+        pricing_sheet.get_price_list_currency = self.original_currency
+        pricing_sheet.get_exchange_rate_for_pair = self.original_rate
+        pricing_sheet._ITEM_PRICE_SCHEMA_CACHE.clear()
+
+    def test_multiple_lists_are_resolved_in_one_ranked_query(self):
+        prices = pricing_sheet.get_latest_item_prices_by_list(
+            ["ITEM-A", "ITEM-B"], ["Retail", "Export EUR", "Retail", "Empty"], buying=False, target_currency="MAD"
+        )
+
+        self.assertEqual(len(self.sql_calls), 1)
+        query, params = self.sql_calls[0]
+        self.assertIn("ROW_NUMBER() OVER (PARTITION BY ip.price_list, ip.item_code ORDER BY ip.valid_from DESC, ip.modified DESC)", query)
+        self.assertNotIn("ip.buying", query)
+        self.assertEqual(params["price_lists"], ("Retail", "Export EUR", "Empty"))
+        self.assertEqual(prices, {"Retail": {"ITEM-A": 100.0, "ITEM-B": 50.0}, "Export EUR": {"ITEM-A": 990.0}, "Empty": {}})
+
+    def test_schema_probes_are_memoized_per_site(self):
+        pricing_sheet.get_latest_item_prices(["ITEM-A"], "Retail", buying=False)
+        probes_after_first_call = len(self.column_probes)
+        pricing_sheet.get_latest_item_price_records(["ITEM-A"], "Retail", buying=False)
+        self.assertEqual(len(self.column_probes), probes_after_first_call)
+
+        pricing_sheet.frappe.local.site = "site-b.local"
+        pricing_sheet.get_latest_item_prices(["ITEM-A"], "Retail", buying=False)
+        self.assertEqual(len(self.column_probes), probes_after_first_call * 2)
+
+    def test_static_lists_keep_first_configured_winner_and_warn_on_duplicates(self):
+        records, warnings = pricing_sheet.get_latest_item_price_records_from_lists(
+            ["ITEM-A", "ITEM-B"], ["Export EUR", "Retail"], buying=False, target_currency="MAD"
+        )
+
+        self.assertEqual(len(self.sql_calls), 1)
+        self.assertIn("ip.`custom_pricing_builder`", self.sql_calls[0][0])
+        self.assertEqual(records["ITEM-A"]["price_list"], "Export EUR")
+        self.assertEqual(records["ITEM-A"]["custom_pricing_builder"], "PBU-2")
+        self.assertNotIn("price_rank", records["ITEM-A"])
+        self.assertEqual(records["ITEM-B"]["price_list"], "Retail")
+        self.assertEqual(len(warnings), 1)
+        self.assertIn("configured list Export EUR was used", warnings[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,212 @@
+import sys
+import types
+import unittest
+
+
+frappe_stub = types.ModuleType("frappe")
+frappe_stub._ = lambda value: value
+frappe_stub.whitelist = lambda *args, **kwargs: (lambda fn: fn)
+frappe_stub.session = types.SimpleNamespace(user="agent@example.com")
+sys.modules["frappe"] = frappe_stub
+utils_stub = types.ModuleType("frappe.utils")
+utils_stub.cint = lambda value=0: int(value or 0)
+sys.modules["frappe.utils"] = utils_stub
+
+from orderlift.orderlift_sales.utils import pricing_sheet_queue
+from orderlift.utils import transaction
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+        self.values = {}
+
+    def make_key(self, key):
+        return f"site|{key}"
+
+    def hset(self, name, key, value):
+        self.hashes.setdefault(name, {})[key] = dict(value)
+
+    def hget(self, name, key):
+        value = self.hashes.get(name, {}).get(key)
+        return dict(value) if value else None
+
+    def hgetall(self, name):
+        return {key: dict(value) for key, value in self.hashes.get(name, {}).items()}
+
+    def hdel(self, name, key):
+        self.hashes.get(name, {}).pop(key, None)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+    def get_value(self, key):
+        return self.values.get(key)
+
+    def set_value(self, key, value):
+        self.values[key] = value
+
+
+class TestPricingSheetQueue(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.enqueued = []
+        self.recalculated = []
+        self.clock = [1000.0]
+        self.original_frappe = pricing_sheet_queue.frappe
+        self.original_time = pricing_sheet_queue.time
+        pricing_sheet_queue.frappe = frappe_stub
+        pricing_sheet_queue.time = types.SimpleNamespace(time=lambda: self.clock[0])
+        frappe_stub.cache = lambda: self.redis
+        frappe_stub.enqueue = lambda method, **kwargs: self.enqueued.append((method, kwargs))
+        frappe_stub.log_error = lambda *args, **kwargs: None
+        frappe_stub.db = types.SimpleNamespace(rollback=lambda: None)
+
+        pricing_sheet_module = types.ModuleType("orderlift.orderlift_sales.doctype.pricing_sheet.pricing_sheet")
+        pricing_sheet_module.run_pricing_sheet_recalculation = (
+            lambda name, user=None, shared_cache=None: self.recalculated.append((name, user, id(shared_cache)))
+        )
+        self.original_pricing_sheet = sys.modules.get(pricing_sheet_module.__name__)
+        sys.modules[pricing_sheet_module.__name__] = pricing_sheet_module
+
+    def tearDown(self):
+        pricing_sheet_queue.frappe = self.original_frappe
+        pricing_sheet_queue.time = self.original_time
+        if self.original_pricing_sheet is None:
+            sys.modules.pop("orderlift.orderlift_sales.doctype.pricing_sheet.pricing_sheet", None)
+        else:
+            sys.modules["orderlift.orderlift_sales.doctype.pricing_sheet.pricing_sheet"] = self.original_pricing_sheet
+
+    def test_repeated_requests_coalesce_into_one_entry_and_one_job(self):
+        pricing_sheet_queue.queue_pricing_sheet_recalculation(["PS-1", "PS-2"])
+        self.clock[0] += 3
+        pricing_sheet_queue.queue_pricing_sheet_recalculation(["PS-1", "PS-1"])
+
+        pending = self.redis.hgetall(pricing_sheet_queue._pending_key(pricing_sheet_queue.LANE_NORMAL))
+        self.assertEqual(sorted(pending), ["PS-1", "PS-2"])
+        self.assertEqual(pending["PS-1"]["requests"], 2)
+        self.assertEqual(pending["PS-1"]["queued_at"], 1000.0)
+        self.assertEqual(pending["PS-1"]["changed_at"], 1003.0)
+        self.assertEqual(self.enqueued, [])
+
+        pricing_sheet_queue.dispatch_pricing_sheet_queue()
+        self.assertEqual(self.enqueued, [])
+        self.clock[0] += pricing_sheet_queue.LANE_DEBOUNCE_SECONDS["normal"]
+        pricing_sheet_queue.dispatch_pricing_sheet_queue()
+        pricing_sheet_queue.dispatch_pricing_sheet_queue()
+        self.assertEqual(len(self.enqueued), 1)
+        self.assertEqual(self.enqueued[0][1]["queue"], "long")
+
+    def test_worker_drains_lane_with_one_shared_cache_and_records_latency(self):
+        pricing_sheet_queue.queue_pricing_sheet_recalculation(["PS-1", "PS-2", "PS-3"])
+        self.clock[0] += pricing_sheet_queue.LANE_DEBOUNCE_SECONDS["normal"]
+
+        summary = pricing_sheet_queue.process_pricing_sheet_queue(pricing_sheet_queue.LANE_NORMAL)
+
+        self.assertEqual([row[0] for row in self.recalculated], ["PS-1", "PS-2", "PS-3"])
+        self.assertEqual({row[1] for row in self.recalculated}, {"agent@example.com"})
+        self.assertEqual(len({row[2] for row in self.recalculated}), 1)
+        self.assertEqual(summary["processed"], 3)
+        self.assertGreaterEqual(summary["max_latency_seconds"], pricing_sheet_queue.LANE_DEBOUNCE_SECONDS["normal"])
+
+        frappe_stub.has_permission = lambda *args, **kwargs: True
+        status = pricing_sheet_queue.get_pricing_sheet_queue_status()
+        self.assertEqual(status["lanes"]["normal"]["depth"], 0)
+        self.assertEqual(status["stats"]["normal"]["processed"], 3)
+
+    def test_worker_leaves_entries_inside_debounce_window_without_waiting(self):
+        pricing_sheet_queue.queue_pricing_sheet_recalculation(["PS-1"])
+        self.clock[0] += pricing_sheet_queue.LANE_DEBOUNCE_SECONDS["normal"]
+        pricing_sheet_queue.queue_pricing_sheet_recalculation(["PS-2"])
+
+        summary = pricing_sheet_queue.process_pricing_sheet_queue(pricing_sheet_queue.LANE_NORMAL)
+
+        self.assertEqual(summary["processed"], 1)
+        self.assertEqual([row[0] for row in self.recalculated], ["PS-1"])
+        self.assertEqual(self.clock[0], 1010.0)
+        self.assertEqual(self.enqueued, [])
+        pending = self.redis.hgetall(pricing_sheet_queue._pending_key(pricing_sheet_queue.LANE_NORMAL))
+        self.assertEqual(sorted(pending), ["PS-2"])
+
+    def test_opening_a_pending_sheet_moves_it_to_priority_lane(self):
+        pricing_sheet_queue.queue_pricing_sheet_recalculation(["PS-1", "PS-2"])
+
+        pricing_sheet_queue.promote_open_pricing_sheet(types.SimpleNamespace(name="PS-2"))
+
+        normal = self.redis.hgetall(pricing_sheet_queue._pending_key(pricing_sheet_queue.LANE_NORMAL))
+        priority = self.redis.hgetall(pricing_sheet_queue._pending_key(pricing_sheet_queue.LANE_PRIORITY))
+        self.assertEqual(sorted(normal), ["PS-1"])
+        self.assertEqual(sorted(priority), ["PS-2"])
+        self.assertEqual([kwargs["queue"] for _, kwargs in self.enqueued], ["short"])
+
+        pricing_sheet_queue.process_pricing_sheet_queue(pricing_sheet_queue.LANE_PRIORITY)
+        self.assertEqual([row[0] for row in self.recalculated], ["PS-2"])
+        self.assertEqual(self.clock[0], 1000.0)
+
+    def test_without_redis_falls_back_to_one_job_per_sheet(self):
+        frappe_stub.cache = lambda: (_ for _ in ()).throw(ConnectionError("redis down"))
+
+        result = pricing_sheet_queue.queue_pricing_sheet_recalculation(["PS-1", "PS-2"], priority=True)
+
+        self.assertFalse(result["coalesced"])
+        self.assertEqual([kwargs["pricing_sheet_name"] for _, kwargs in self.enqueued], ["PS-1", "PS-2"])
+
+    def test_source_changes_queue_affected_sheets_once_after_commit(self):
+        class Callbacks(list):
+            def add(self, fn):
+                self.append(fn)
+
+        after_commit = Callbacks()
+        frappe_stub.db = types.SimpleNamespace(rollback=lambda: None, after_commit=after_commit, after_rollback=Callbacks())
+        frappe_stub.local = types.SimpleNamespace()
+        self.addCleanup(setattr, transaction, "frappe", transaction.frappe)
+        transaction.frappe = frappe_stub
+        queries = []
+
+        def get_all(doctype, filters=None, **kwargs):
+            queries.append((doctype, filters))
+            if doctype == "Pricing Sheet Item" and "source_buying_price_list" in filters:
+                return ["PS-1"]
+            if doctype == "Pricing Sheet" and filters.get("customs_policy") == "CUSTOMS-EU":
+                return ["PS-2"]
+            return []
+
+        frappe_stub.get_all = get_all
+        for price_list in ("Supplier A", "Supplier A"):
+            pricing_sheet_queue.on_buying_item_price_change(types.SimpleNamespace(buying=1, price_list=price_list))
+        pricing_sheet_queue.on_buying_item_price_change(types.SimpleNamespace(buying=0, price_list="Retail"))
+        pricing_sheet_queue.on_pricing_policy_change(types.SimpleNamespace(doctype="Pricing Customs Policy", name="CUSTOMS-EU"))
+
+        self.assertEqual(queries, [])
+        self.assertEqual(len(after_commit), 1)
+        after_commit[0]()
+
+        buying_filters = [filters for doctype, filters in queries if "source_buying_price_list" in filters]
+        self.assertEqual({str(filters["source_buying_price_list"]) for filters in buying_filters}, {"['in', ['Supplier A']]"})
+        pending = self.redis.hgetall(pricing_sheet_queue._pending_key(pricing_sheet_queue.LANE_NORMAL))
+        self.assertEqual(sorted(pending), ["PS-1", "PS-2"])
+
+    def test_hooks_are_registered(self):
+        from orderlift import hooks
+
+        module = "orderlift.orderlift_sales.utils.pricing_sheet_queue"
+        self.assertIn(f"{module}.promote_open_pricing_sheet", hooks.doc_events["Pricing Sheet"]["onload"])
+        for event in ("after_insert", "on_update", "on_trash"):
+            self.assertIn(f"{module}.on_buying_item_price_change", hooks.doc_events["Item Price"][event])
+        self.assertIn(f"{module}.on_buying_price_list_change", hooks.doc_events["Price List"]["on_update"])
+        for doctype in ("Pricing Scenario", "Pricing Customs Policy", "Pricing Benchmark Policy"):
+            self.assertEqual(hooks.doc_events[doctype]["on_update"], f"{module}.on_pricing_policy_change")
+        self.assertIn(f"{module}.dispatch_pricing_sheet_queue", hooks.scheduler_events["cron"]["* * * * *"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -73,21 +73,32 @@ class TestWeeklyEfficiencyDigest(unittest.TestCase):
 
 
 class StockDB:
-    def __init__(self, *, total_qty=0, last_movement=None, zero_stock_since=None, reorder_qty=0):
+    def __init__(self, *, total_qty=0, last_movement=None, zero_stock_since=None, reorder_qty=0, item_code=None):
         self.total_qty = total_qty
         self.last_movement = last_movement
         self.zero_stock_since = zero_stock_since
         self.reorder_qty = reorder_qty
+        self.item_code = item_code
+        self.queries = []
 
-    def sql(self, query, *_args, **_kwargs):
+    def sql(self, query, values=None, **_kwargs):
+        self.queries.append((query, values))
+        item_code = self.item_code or ((values or {}).get("item_codes") or ("ITEM-001",))[0]
         if "tabBin" in query:
-            return [Row(qty=self.total_qty)]
+            return [Row(item_code=item_code, warehouse="Stores", qty=self.total_qty)]
         if "MAX(posting_date)" in query:
-            return [Row(last_date=self.last_movement)]
-        if "MIN(posting_date)" in query:
-            return [Row(earliest_zero_date=self.zero_stock_since)]
+            return [
+                Row(
+                    item_code=item_code,
+                    warehouse="Stores",
+                    last_movement=self.last_movement,
+                    last_outflow=self.zero_stock_since,
+                )
+            ]
         if "tabItem Reorder" in query:
-            return [Row(max_reorder_qty=self.reorder_qty)]
+            return [Row(item_code=item_code, warehouse="Stores", reorder_qty=self.reorder_qty)]
+        if query.strip().startswith("UPDATE"):
+            return []
         raise AssertionError(f"Unexpected query: {query}")
 
 
@@ -137,6 +148,36 @@ class TestStockAnalyzer(unittest.TestCase):
             {"slow_moving": False, "overstock": True, "dormant": False},
         )
 
+    def test_full_run_classifies_every_item_with_grouped_queries(self):
+        db = StockDB(total_qty=0, last_movement=date(2026, 1, 1), zero_stock_since=date(2026, 1, 1), item_code="ITEM-001")
+        module = self._load(db)
+        module.frappe.get_all = lambda doctype, **_kwargs: [Row(name=f"ITEM-{idx:03d}", item_name="") for idx in range(1, 51)]
+        module.frappe.clear_cache = lambda: None
+        logged = []
+        module._log_analysis_results = logged.append
+
+        module.flag_slow_moving_items()
+
+        selects = [query for query, _values in db.queries if "SELECT" in query]
+        self.assertEqual(len(selects), 3)
+        self.assertTrue(all("GROUP BY" in query for query in selects))
+        self.assertEqual(logged[0]["dormant"], ["ITEM-001"])
+        # ITEM-001 is dormant; the 49 items without any movement are slow moving.
+        updates = [values for query, values in db.queries if "SET custom_inventory_flag = %(flag)s" in query]
+        self.assertEqual([(values["flag"], len(values["item_codes"])) for values in updates], [("Dormant", 1), ("Slow Moving", 49)])
+
+    def test_thresholds_are_configurable_and_warehouses_are_broken_down(self):
+        module = self._load(StockDB(total_qty=25, last_movement="2026-05-01", reorder_qty=10))
+
+        summary = module.analyze_inventory(
+            ["ITEM-003"], thresholds={"slow_moving_days": 60, "overstock_multiplier": 2}
+        )["ITEM-003"]
+
+        self.assertTrue(summary["slow_moving"])
+        self.assertTrue(summary["overstock"])
+        self.assertEqual(summary["warehouses"]["Stores"]["qty"], 25.0)
+        self.assertTrue(summary["warehouses"]["Stores"]["overstock"])
+
     def test_stock_report_resolves_role_users_to_valid_email_addresses(self):
         db = StockDB()
         db.get_value = lambda doctype, name, fieldname: {
@@ -0,0 +1,369 @@
+import importlib
+import sys
+import types
+import unittest
+from datetime import date, datetime, timedelta
+
+
+class AttrDict(dict):
+    __getattr__ = dict.get
+
+
+class FakePlan(AttrDict):
+    def __init__(self, **values):
+        super().__init__(values)
+        self.setdefault("allocations", [])
+        self.flags = types.SimpleNamespace()
+        self.saves = 0
+
+    def __setattr__(self, key, value):
+        if key in ("flags", "saves"):
+            object.__setattr__(self, key, value)
+        else:
+            self[key] = value
+
+    def set(self, key, value):
+        self[key] = value
+
+    def append(self, key, row):
+        self[key].append(AttrDict(row))
+
+    def save(self, **kwargs):
+        self.saves += 1
+
+
+class FakeCache:
+    # Like frappe's RedisWrapper: raw get/set/delete/incrby/eval take prefixed keys,
+    # while the set helpers and exists() prefix the key themselves.
+    def __init__(self, fail=False):
+        self.sets = {}
+        self.values = {}
+        self.fail = fail
+
+    def _check(self):
+        if self.fail:
+            raise ConnectionError("redis down")
+
+    def make_key(self, key):
+        return f"site.local|{key}"
+
+    def sadd(self, key, *values):
+        self._check()
+        self.sets.setdefault(self.make_key(key), set()).update(values)
+
+    def smembers(self, key):
+        self._check()
+        return {value.encode() for value in self.sets.get(self.make_key(key), set())}
+
+    def srem(self, key, *values):
+        self.sets.get(self.make_key(key), set()).difference_update(value.decode() for value in values)
+
+    def get(self, key):
+        self._check()
+        return self.values.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        self._check()
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    def exists(self, key):
+        self._check()
+        return int(self.make_key(key) in self.values)
+
+    def delete(self, key):
+        self._check()
+        return int(self.values.pop(key, None) is not None)
+
+    def incrby(self, key, amount):
+        self._check()
+        self.values[key] = int(self.values.get(key) or 0) + amount
+        return self.values[key]
+
+    def decrby(self, key, amount):
+        return self.incrby(key, -amount)
+
+    def eval(self, script, numkeys, key, token):
+        # Mirrors RELEASE_LOCK_SCRIPT: delete only while the key holds the token.
+        self._check()
+        if self.values.get(key) != token:
+            return 0
+        return self.delete(key)
+
+
+class TestIncrementalStockPlanning(unittest.TestCase):
+    MODULE_NAMES = (
+        "frappe",
+        "frappe.utils",
+        "orderlift.orderlift_logistics.doctype.stock_planning_settings.stock_planning_settings",
+        "orderlift.orderlift_logistics.stock_planning",
+    )
+
+    def setUp(self):
+        self.original_modules = {name: sys.modules.get(name) for name in self.MODULE_NAMES}
+        self.cache = FakeCache()
+        self.enqueued = []
+        frappe_stub = types.ModuleType("frappe")
+        frappe_stub._ = lambda message, *args, **kwargs: message
+        frappe_stub.whitelist = lambda *args, **kwargs: (lambda fn: fn) if not args else args[0]
+        frappe_stub.get_cached_value = lambda doctype, name, field: "Orderlift" if doctype == "Warehouse" else None
+        frappe_stub.cache = lambda: self.cache
+        frappe_stub.enqueue = lambda method, **kwargs: self.enqueued.append((method.rsplit(".", 1)[-1], kwargs))
+        frappe_stub.db = types.SimpleNamespace(commit=lambda: None, rollback=lambda: None)
+        sys.modules["frappe"] = frappe_stub
+
+        utils_stub = types.ModuleType("frappe.utils")
+        utils_stub.add_days = lambda value, days: self._getdate(value) + timedelta(days=int(days))
+        utils_stub.cint = lambda value=0: int(value or 0)
+        utils_stub.flt = lambda value=0: float(value or 0)
+        utils_stub.getdate = self._getdate
+        utils_stub.now_datetime = datetime.now
+        utils_stub.nowdate = lambda: "2026-08-09"
+        sys.modules["frappe.utils"] = utils_stub
+
+        settings_stub = types.ModuleType(
+            "orderlift.orderlift_logistics.doctype.stock_planning_settings.stock_planning_settings"
+        )
+        settings_stub.get_company_settings = lambda *args, **kwargs: None
+        sys.modules[
+            "orderlift.orderlift_logistics.doctype.stock_planning_settings.stock_planning_settings"
+        ] = settings_stub
+        sys.modules.pop("orderlift.orderlift_logistics.stock_planning", None)
+        self.module = importlib.import_module("orderlift.orderlift_logistics.stock_planning")
+
+    def tearDown(self):
+        for name, original in self.original_modules.items():
+            if original is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = original
+
+    @staticmethod
+    def _getdate(value=None):
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        if value:
+            return datetime.strptime(str(value), "%Y-%m-%d").date()
+        return date.today()
+
+    def _stub_engine(self):
+        self.plans = {
+            "ITEM-A": [self._plan("SDP-1", "ITEM-A", "SOI-1")],
+            "ITEM-B": [self._plan("SDP-2", "ITEM-B", "SOI-2")],
+        }
+        self.calls = {"sync": 0, "items": []}
+        self.module.get_company_settings = lambda company: types.SimpleNamespace(
+            enabled=1,
+            reservation_mode="Manual Alert Only",
+            partial_pick_list=1,
+            rely_on_incoming_stock=1,
+            incoming_safety_days=15,
+            procurement_safety_days=7,
+            default_procurement_delay_days=0,
+            auto_create_material_request=0,
+        )
+
+        def sync(company, settings, sales_orders=None):
+            self.calls["sync"] += 1
+            return []
+
+        def open_plans(company, *, item_codes=None):
+            self.calls["items"].append(item_codes)
+            codes = item_codes if item_codes is not None else list(self.plans)
+            return [plan for code in codes for plan in self.plans.get(code, [])]
+
+        self.module._sync_effective_demand_plans = sync
+        self.module._open_plan_docs = open_plans
+        self.module._effective_source_rows = lambda plans: {
+            "SOI:" + plan.sales_order_item: {
+                "docstatus": 1,
+                "item_code": plan.item_code,
+                "stock_qty": 10,
+                "demand_source_key": "SOI:" + plan.sales_order_item,
+                "delivery_date": date(2026, 10, 15),
+                "warehouse": "Main",
+                "stock_uom": "Nos",
+            }
+            for plan in plans
+        }
+        self.module._pick_list_coverage = lambda source_rows: {}
+        self.module._forecast_plan_dates = lambda company: {}
+        self.module._incoming_supply = lambda company, logistics_dates, *, item_codes=None: {}
+        self.module._physical_stock = lambda company, settings, *, warehouses=None, item_codes=None: {
+            "ITEM-A": {"available_qty": 20, "reserved_qty": 0},
+        }
+        self.module._notify_actionable_status = lambda plan: None
+
+    @staticmethod
+    def _plan(name, item_code, sales_order_item):
+        return FakePlan(
+            name=name,
+            company="Orderlift",
+            item_code=item_code,
+            sales_order="SO-1",
+            sales_order_item=sales_order_item,
+            demand_source_key="SOI:" + sales_order_item,
+            delivery_date=date(2026, 10, 15),
+            creation="2026-08-01 10:00:00",
+        )
+
+    def _dirty_items(self):
+        return self.cache.sets[self.cache.make_key(self.module.DIRTY_ITEMS_KEY.format(company="Orderlift"))]
+
+    def test_supply_hooks_mark_items_dirty_and_schedule_one_item_run(self):
+        doc = AttrDict(company="Orderlift", items=[AttrDict(item_code="ITEM-A"), AttrDict(item_code=" ITEM-B ")])
+
+        self.module.queue_supply_recalculation(doc)
+        self.module.queue_bin_recalculation(AttrDict(item_code="ITEM-C", warehouse="Main - OL"))
+
+        self.assertEqual(
+            self._dirty_items(),
+            {"ITEM-A", "ITEM-B", "ITEM-C"},
+        )
+        self.assertEqual(self.enqueued, [])
+
+        self.module.DEBOUNCE_SECONDS = 0
+        self.module.dispatch_planning_runs()
+        self.assertEqual([method for method, _kwargs in self.enqueued], ["recalculate_dirty_items"])
+
+    def test_stock_issue_documents_queue_their_items(self):
+        from orderlift import hooks
+
+        self.module.queue_stock_update_recalculation(AttrDict(company="Orderlift", update_stock=0, items=[AttrDict(item_code="ITEM-A")]))
+        self.module.queue_stock_update_recalculation(AttrDict(company="Orderlift", update_stock=1, items=[AttrDict(item_code="ITEM-B")]))
+
+        self.assertEqual(self._dirty_items(), {"ITEM-B"})
+        hook_paths = {
+            "Delivery Note": "orderlift.orderlift_logistics.stock_planning.queue_supply_recalculation",
+            "Stock Entry": "orderlift.orderlift_logistics.stock_planning.queue_supply_recalculation",
+            "Stock Reconciliation": "orderlift.orderlift_logistics.stock_planning.queue_supply_recalculation",
+            "Sales Invoice": "orderlift.orderlift_logistics.stock_planning.queue_stock_update_recalculation",
+            "Purchase Invoice": "orderlift.orderlift_logistics.stock_planning.queue_stock_update_recalculation",
+        }
+        for doctype, path in hook_paths.items():
+            for event in ("on_submit", "on_cancel"):
+                handlers = hooks.doc_events[doctype][event]
+                self.assertIn(path, handlers if isinstance(handlers, list) else [handlers], (doctype, event))
+
+    def test_hooks_fall_back_to_a_full_run_without_redis(self):
+        self.cache.fail = True
+
+        self.module.queue_supply_recalculation(AttrDict(company="Orderlift", items=[AttrDict(item_code="ITEM-A")]))
+
+        self.assertEqual([method for method, _kwargs in self.enqueued], ["recalculate_company"])
+
+    def test_dirty_run_replans_only_dirty_items_and_skips_unchanged_saves(self):
+        self._stub_engine()
+        self.module._mark_items_dirty("Orderlift", ["ITEM-A"])
+
+        first = self.module.recalculate_dirty_items("Orderlift")
+        second = self.module.recalculate_company("Orderlift", item_codes=["ITEM-A"])
+
+        self.assertEqual(self.calls["sync"], 0)
+        self.assertEqual(self.calls["items"], [["ITEM-A"], ["ITEM-A"]])
+        self.assertEqual((first["plans"], first["saved"]), (1, 1))
+        self.assertEqual((second["plans"], second["saved"]), (1, 0))
+        self.assertEqual(self.plans["ITEM-A"][0].saves, 1)
+        self.assertEqual(self.plans["ITEM-B"][0].saves, 0)
+        self.assertEqual(self.plans["ITEM-A"][0].planning_status, self.module.STATUS_PHYSICAL)
+        self.assertEqual(self._dirty_items(), set())
+
+    def test_scheduled_run_adds_date_due_items_and_daily_run_is_full(self):
+        self._stub_engine()
+        frappe = sys.modules["frappe"]
+        frappe.get_all = lambda doctype, **kwargs: ["Orderlift"] if doctype == "Stock Planning Settings" else ["ITEM-B"]
+        self.module._mark_items_dirty("Orderlift", ["ITEM-A"])
+
+        hourly = self.module.run_scheduled_planning()
+        daily = self.module.run_full_scheduled_planning()
+
+        self.assertEqual(self.calls["items"], [["ITEM-A", "ITEM-B"], None])
+        self.assertEqual(self.calls["sync"], 1)
+        self.assertEqual(hourly["Orderlift"]["plans"], 2)
+        self.assertEqual(daily["Orderlift"]["saved"], 0)
+
+    def test_failed_run_puts_items_back(self):
+        self._stub_engine()
+        self.module._mark_items_dirty("Orderlift", ["ITEM-A"])
+
+        def boom(*args, **kwargs):
+            raise RuntimeError("lock wait timeout")
+
+        self.module._pick_list_coverage = boom
+        with self.assertRaises(RuntimeError):
+            self.module.recalculate_dirty_items("Orderlift")
+
+        self.assertEqual(self._dirty_items(), {"ITEM-A"})
+
+    def test_trigger_burst_is_coalesced_into_one_debounced_run(self):
+        self._stub_engine()
+        self.module.DEBOUNCE_SECONDS = 0
+        for item_code in ("ITEM-A", "ITEM-B", "ITEM-A"):
+            self.module.queue_supply_recalculation(
+                AttrDict(company="Orderlift", items=[AttrDict(item_code=item_code)])
+            )
+        self.module.dispatch_planning_runs()
+        self.module.dispatch_planning_runs()
+
+        self.assertEqual([method for method, _kwargs in self.enqueued], ["recalculate_dirty_items"])
+        result = self.module.recalculate_dirty_items("Orderlift")
+
+        self.assertEqual(result["merged_triggers"], 3)
+        self.assertEqual(self.calls["items"], [["ITEM-A", "ITEM-B"]])
+        self.assertNotIn(self.cache.make_key(self.module.RUN_LOCK_KEY.format(company="Orderlift")), self.cache.values)
+
+        # The dispatch slot was freed, so the next trigger schedules a new job.
+        self.module.queue_bin_recalculation(AttrDict(item_code="ITEM-B", warehouse="Main - OL"))
+        self.module.dispatch_planning_runs()
+        self.assertEqual(len(self.enqueued), 2)
+
+    def test_dispatcher_waits_for_quiet_triggers_up_to_the_deadline(self):
+        clock = [1000.0]
+        self.module.time = types.SimpleNamespace(time=lambda: clock[0])
+        self.module.queue_bin_recalculation(AttrDict(item_code="ITEM-A", warehouse="Main - OL"))
+
+        # A steady trickle never goes quiet; the first trigger's deadline still dispatches it.
+        while not self.enqueued and clock[0] < 1200:
+            clock[0] += self.module.DEBOUNCE_SECONDS - 1
+            self.module.queue_bin_recalculation(AttrDict(item_code="ITEM-A", warehouse="Main - OL"))
+            self.module.dispatch_planning_runs()
+
+        self.assertEqual([method for method, _kwargs in self.enqueued], ["recalculate_dirty_items"])
+        self.assertGreaterEqual(clock[0] - 1000, self.module.MAX_DEBOUNCE_SECONDS)
+        self.assertLess(clock[0] - 1000, self.module.MAX_DEBOUNCE_SECONDS + self.module.DEBOUNCE_SECONDS)
+
+    def test_locked_company_keeps_triggers_for_the_running_job(self):
+        self._stub_engine()
+        self.module.DEBOUNCE_SECONDS = 0
+        self.module._enqueue_company_recalculation("Orderlift")
+        self.module.dispatch_planning_runs()
+        lock_key = self.cache.make_key(self.module.RUN_LOCK_KEY.format(company="Orderlift"))
+        self.cache.values[lock_key] = "running-job"
+
+        locked = self.module.recalculate_dirty_items("Orderlift")
+
+        self.assertTrue(locked["locked"])
+        self.assertEqual(self.calls["items"], [])
+        self.assertEqual(len(self.enqueued), 1)
+
+        # A run whose lock expired cannot release the lock another run holds now.
+        self.module._release_run_lock("Orderlift", "expired-job", redispatch=False)
+        self.assertEqual(self.cache.values[lock_key], "running-job")
+
+        # Releasing the lock re-dispatches the queued full run.
+        self.module._release_run_lock("Orderlift", "running-job")
+        self.assertNotIn(lock_key, self.cache.values)
+        self.assertEqual(len(self.enqueued), 2)
+        result = self.module.recalculate_dirty_items("Orderlift")
+
+        self.assertEqual(result["merged_triggers"], 1)
+        self.assertEqual(self.calls["items"], [None])
+        self.assertEqual(self.calls["sync"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,6 +4,7 @@ import datetime
 import sys
 import types
 import unittest
+from unittest.mock import patch
 
 
 frappe_stub = sys.modules.get("frappe") or types.ModuleType("frappe")
@@ -123,5 +124,141 @@ class TestScoringWeights(unittest.TestCase):
         self.assertGreater(leaderboard.WEIGHT_QUIZ, leaderboard.WEIGHT_RECENCY)
 
 
+class _Row(dict):
+    __getattr__ = dict.get
+
+
+class _FakeCache:
+    def __init__(self):
+        self.values = {}
+
+    def make_key(self, key):
+        return key
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def incrby(self, key, amount):
+        self.values[key] = int(self.values.get(key) or 0) + amount
+        return self.values[key]
+
+    def get_value(self, key):
+        return self.values.get(key)
+
+    def set_value(self, key, value, expires_in_sec=None):
+        self.values[key] = value
+
+
+class _FakeFrappe:
+    """Answers the bulk scoring queries and counts them."""
+
+    def __init__(self):
+        self.queries = []
+        self.utils = utils_stub
+        self.cache_store = _FakeCache()
+        self.db = types.SimpleNamespace(sql=self.sql)
+
+    def cache(self):
+        return self.cache_store
+
+    def get_all(self, doctype, **kwargs):
+        self.queries.append(doctype)
+        if doctype == "Employee":
+            return [
+                _Row(name="EMP-1", employee_name="Alice", department="Sales", designation=None),
+                _Row(name="EMP-2", employee_name="Bob", department="Sales", designation=None),
+            ]
+        if doctype == "Training Module":
+            return [
+                _Row(name="M1", program="P1", linked_quiz="Q1", requires_quiz_pass=1),
+                _Row(name="M2", program="P2", linked_quiz=None, requires_quiz_pass=0),
+            ]
+        if doctype == "Employee Training Progress":
+            return [_Row(employee=e, module=m) for e, m in (("EMP-1", "M1"), ("EMP-2", "M1"), ("EMP-2", "M2"))]
+        return []
+
+    def sql(self, query, values=None):
+        self.queries.append("sql")
+        if "passed = 1" in query:
+            return [("EMP-2", "Q1")]
+        if "row_number()" in query:
+            return [("EMP-1", 80.0)]
+        if "max(last_activity)" in query:
+            return [("EMP-2", _FIXED_NOW)]
+        return []
+
+
+_PROGRAMS = {"EMP-1": ["P1"], "EMP-2": ["P1", "P2"]}
+
+
+class TestBulkScoring(unittest.TestCase):
+    def setUp(self):
+        _reset_leaderboard_stubs()
+        self.fake = _FakeFrappe()
+        self.patches = [
+            patch.object(leaderboard, "frappe", self.fake),
+            patch.object(leaderboard, "resolve_assigned_programs_by_employee", lambda employees: _PROGRAMS),
+        ]
+        for patcher in self.patches:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in self.patches:
+            patcher.stop()
+
+    def test_scores_every_employee_from_grouped_queries(self):
+        scores = leaderboard._compute_scores(["EMP-1", "EMP-2"])
+
+        self.assertEqual(self.fake.queries, ["Training Module", "Employee Training Progress", "sql", "sql", "sql"])
+        # EMP-1 studied M1 but never passed its required quiz.
+        self.assertEqual((scores["EMP-1"]["modules_completed"], scores["EMP-1"]["modules_total"]), (0, 1))
+        self.assertEqual(scores["EMP-1"]["quiz_average_pct"], 80.0)
+        self.assertAlmostEqual(scores["EMP-1"]["total_score"], 24.0)
+        self.assertEqual((scores["EMP-2"]["modules_completed"], scores["EMP-2"]["modules_total"]), (2, 2))
+        self.assertEqual(scores["EMP-2"]["recent_activity_score"], 100.0)
+        self.assertAlmostEqual(scores["EMP-2"]["total_score"], 70.0)
+
+    def test_ranked_rows_are_cached_until_training_activity(self):
+        first = leaderboard._ranked_rows({})
+        queries = len(self.fake.queries)
+        second = leaderboard._ranked_rows({})
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.fake.queries), queries)
+        self.assertEqual([row["employee"] for row in first], ["EMP-2", "EMP-1"])
+
+        leaderboard.invalidate_leaderboard_cache()
+        leaderboard._ranked_rows({})
+        self.assertGreater(len(self.fake.queries), queries)
+
+
+    def test_invalidation_waits_for_commit_and_covers_assignment_sources(self):
+        from orderlift import hooks
+        from orderlift.utils import transaction
+
+        class Callbacks(list):
+            def add(self, fn):
+                self.append(fn)
+
+        after_commit, after_rollback = Callbacks(), Callbacks()
+        stub = types.SimpleNamespace(db=types.SimpleNamespace(after_commit=after_commit, after_rollback=after_rollback))
+        with patch.object(transaction, "frappe", stub):
+            first = leaderboard._ranked_rows({})
+            leaderboard.invalidate_leaderboard_cache()
+            queries = len(self.fake.queries)
+
+            self.assertEqual(leaderboard._ranked_rows({}), first)
+            self.assertEqual(len(self.fake.queries), queries)
+            self.assertEqual((len(after_commit), len(after_rollback)), (1, 1))
+
+            after_commit[0]()
+            leaderboard._ranked_rows({})
+            self.assertGreater(len(self.fake.queries), queries)
+
+        hook = "orderlift.orderlift_hr.api.leaderboard.invalidate_leaderboard_cache"
+        for doctype in ("Employee", "Training Module", "Training Program", "Training Program Assignment"):
+            self.assertEqual(hooks.doc_events[doctype]["on_update"], hook)
+            self.assertEqual(hooks.doc_events[doctype]["on_trash"], hook)
+
 if __name__ == "__main__":
     unittest.main()
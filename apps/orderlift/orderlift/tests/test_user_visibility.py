@@ -0,0 +1,172 @@
+import sys
+import types
+import unittest
+
+
+def _escape(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+frappe_stub = types.ModuleType("frappe")
+frappe_stub._ = lambda value, *args, **kwargs: value
+frappe_stub.whitelist = lambda *args, **kwargs: (lambda fn: fn)
+frappe_stub.session = types.SimpleNamespace(user="demo@example.com")
+frappe_stub.db = types.SimpleNamespace(escape=_escape)
+sys.modules["frappe"] = frappe_stub
+
+utils_stub = types.ModuleType("frappe.utils")
+utils_stub.cint = lambda value=0: int(value or 0)
+sys.modules["frappe.utils"] = utils_stub
+
+from orderlift import company_access, user_visibility
+
+
+class TestUserVisibilityIndex(unittest.TestCase):
+    def setUp(self):
+        # Source documents: Opportunity OPP-1 -> Quotation QTN-1 -> Sales Order SO-1 -> Sales Invoice SI-1,
+        # and Customer CUST-1 is the Opportunity's party.
+        self.direct = {
+            "Opportunity": {("owner@example.com", "OPP-1")},
+            "Quotation": {("clerk@example.com", "QTN-1")},
+            "Sales Order": set(),
+            "Sales Invoice": set(),
+            "Customer": {("sales@example.com", "CUST-1")},
+        }
+        self.links = {
+            "Quotation": {("QTN-1", "OPP-1")},
+            "Sales Order": {("SO-1", "OPP-1")},
+            "Sales Invoice": {("SI-1", "SO-1")},
+            "Customer": {("CUST-1", "OPP-1")},
+        }
+        self.stored = {}
+        self.ready = {"value": 0}
+        self.logged = []
+
+        self._orig = {
+            "frappe": user_visibility.frappe,
+            "owned_flag": company_access._user_owned_documents_only,
+            "company_db": company_access.frappe.db,
+            "get_meta": getattr(company_access.frappe, "get_meta", None),
+        }
+        self._orig.update(
+            {
+                name: getattr(user_visibility, name)
+                for name in ("_direct_pairs", "_parent_links", "_stored_pairs", "_insert_pairs", "_delete_pairs")
+            }
+        )
+        user_visibility.frappe = frappe_stub
+        frappe_stub.defaults = types.SimpleNamespace(
+            get_global_default=lambda key: self.ready["value"],
+            set_global_default=lambda key, value: self.ready.update(value=value),
+        )
+        frappe_stub.db = types.SimpleNamespace(
+            escape=_escape,
+            sql=lambda query, values=None: self.stored.clear(),
+            commit=lambda: None,
+        )
+        frappe_stub.only_for = lambda roles: None
+        frappe_stub.as_json = lambda value, indent=None: str(value)
+        frappe_stub.log_error = lambda title=None, message=None: self.logged.append(title)
+        user_visibility._direct_pairs = lambda doctype, names=None: self._filter(self.direct.get(doctype, set()), names, 1)
+        user_visibility._parent_links = self._parent_links
+        user_visibility._stored_pairs = lambda doctype, names=None: self._filter(self.stored.get(doctype, set()), names, 1)
+        user_visibility._insert_pairs = lambda doctype, pairs: self.stored.setdefault(doctype, set()).update(pairs)
+        user_visibility._delete_pairs = lambda doctype, pairs: self.stored.setdefault(doctype, set()).difference_update(pairs)
+
+    def tearDown(self):
+        user_visibility.frappe = self._orig["frappe"]
+        for name in ("_direct_pairs", "_parent_links", "_stored_pairs", "_insert_pairs", "_delete_pairs"):
+            setattr(user_visibility, name, self._orig[name])
+        company_access._user_owned_documents_only = self._orig["owned_flag"]
+        company_access.frappe.db = self._orig["company_db"]
+        if self._orig["get_meta"] is None:
+            if hasattr(company_access.frappe, "get_meta"):
+                delattr(company_access.frappe, "get_meta")
+        else:
+            company_access.frappe.get_meta = self._orig["get_meta"]
+
+    def _filter(self, pairs, names, position):
+        if names is None:
+            return set(pairs)
+        return {pair for pair in pairs if pair[position] in set(names)}
+
+    def _parent_links(self, doctype, names=None, parents=None):
+        links = self._filter(self.links.get(doctype, set()), names, 0)
+        return links if parents is None else self._filter(links, parents, 1)
+
+    def _users(self, doctype, name):
+        return sorted(user for user, reference in self.stored.get(doctype, set()) if reference == name)
+
+    def test_rebuild_inherits_users_down_the_sales_chain(self):
+        result = user_visibility.rebuild_user_visibility()
+
+        self.assertEqual(self.ready["value"], 1)
+        self.assertEqual(self._users("Quotation", "QTN-1"), ["clerk@example.com", "owner@example.com"])
+        # Sales Orders inherit the Opportunity users, not the Quotation owner.
+        self.assertEqual(self._users("Sales Order", "SO-1"), ["owner@example.com"])
+        self.assertEqual(self._users("Sales Invoice", "SI-1"), ["owner@example.com"])
+        self.assertEqual(self._users("Customer", "CUST-1"), ["owner@example.com", "sales@example.com"])
+        self.assertEqual(result["rows"]["Sales Invoice"], 1)
+
+    def test_new_opportunity_assignment_cascades_to_downstream_documents(self):
+        user_visibility.rebuild_user_visibility()
+        self.direct["Opportunity"].add(("agent@example.com", "OPP-1"))
+
+        user_visibility.sync_todo_visibility(
+            types.SimpleNamespace(
+                get=lambda key: {"reference_type": "Opportunity", "reference_name": "OPP-1"}.get(key),
+                get_doc_before_save=lambda: None,
+            )
+        )
+
+        for doctype, name in (("Quotation", "QTN-1"), ("Sales Order", "SO-1"), ("Sales Invoice", "SI-1"), ("Customer", "CUST-1")):
+            self.assertIn("agent@example.com", self._users(doctype, name))
+        self.assertTrue(user_visibility._check_user_visibility()["consistent"])
+
+    def test_maintenance_is_skipped_until_the_index_is_built(self):
+        self.assertEqual(user_visibility.refresh_user_visibility("Opportunity", ["OPP-1"]), 0)
+        self.assertEqual(self.stored, {})
+        self.assertIsNone(user_visibility.user_visibility_clause("Sales Order", "`tabSales Order`", "demo@example.com"))
+
+    def test_consistency_check_reports_and_repairs_drift(self):
+        user_visibility.rebuild_user_visibility()
+        self.stored["Sales Order"].add(("stale@example.com", "SO-1"))
+        self.stored["Quotation"].discard(("clerk@example.com", "QTN-1"))
+
+        report = user_visibility.check_user_visibility()
+        self.assertFalse(report["consistent"])
+        self.assertEqual(report["doctypes"]["Sales Order"]["extra_sample"], [("stale@example.com", "SO-1")])
+        self.assertEqual(report["doctypes"]["Quotation"]["missing"], 1)
+        self.assertIn(("stale@example.com", "SO-1"), self.stored["Sales Order"])
+
+        user_visibility.run_scheduled_consistency_check()
+        self.assertEqual(len(self.logged), 1)
+        self.assertTrue(user_visibility.check_user_visibility()["consistent"])
+
+    def test_owned_only_clauses_use_the_index_once_built(self):
+        user_visibility.rebuild_user_visibility()
+        company_access._user_owned_documents_only = lambda user=None: True
+        company_access.frappe.get_meta = lambda doctype: types.SimpleNamespace(get_field=lambda field: None)
+        company_access.frappe.db = types.SimpleNamespace(escape=_escape, has_column=lambda doctype, field: field in ("owner", "sales_order"))
+
+        clause = company_access._owned_only_clause("Purchase Receipt", "demo@example.com")
+
+        self.assertIn("_pr_so.name in (select _visibility.reference_name from `tabOrderlift User Visibility`", clause)
+        self.assertIn("_visibility.reference_doctype = 'Sales Order'", clause)
+        self.assertNotIn("_opp_todo", clause)
+        self.assertNotIn("_so_item", clause)
+
+    def test_visibility_hooks_are_registered(self):
+        from orderlift import hooks
+
+        for doctype in user_visibility.VISIBILITY_PARENTS:
+            on_update = hooks.doc_events[doctype]["on_update"]
+            self.assertIn(
+                "orderlift.user_visibility.sync_document_visibility",
+                on_update if isinstance(on_update, list) else [on_update],
+            )
+        self.assertIn("orderlift.user_visibility.sync_todo_visibility", hooks.doc_events["ToDo"]["on_update"])
+
+
+if __name__ == "__main__":
+    unittest.main()
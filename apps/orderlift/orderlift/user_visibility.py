@@ -0,0 +1,423 @@
+from __future__ import annotations
+
+import frappe
+from frappe.utils import cint
+
+
+# Materialized owned-only visibility.
+#
+# Each row says that ``user`` may see ``reference_doctype``/``reference_name``
+# under the owned-only restriction: the user owns the document, holds an open
+# ToDo on it, is on the customer's sales team, or inherits it from a linked
+# parent document. Permission query conditions look rows up by user instead of
+# nesting correlated ToDo subqueries through Opportunity and Sales Order.
+VISIBILITY_DOCTYPE = "Orderlift User Visibility"
+VISIBILITY_TABLE = "`tabOrderlift User Visibility`"
+READY_DEFAULT_KEY = "orderlift_user_visibility_ready"
+UNIQUE_INDEX_NAME = "user_reference_unique"
+REFERENCE_INDEX_NAME = "reference_doctype_name_index"
+INSERT_CHUNK_SIZE = 5000
+CHECK_SAMPLE_SIZE = 20
+
+# Indexed doctypes and the parent doctype whose users they inherit, parents first.
+VISIBILITY_PARENTS = {
+    "Opportunity": None,
+    "Quotation": "Opportunity",
+    "Sales Order": "Opportunity",
+    "Sales Invoice": "Sales Order",
+    "Delivery Note": "Sales Order",
+    "Customer": "Opportunity",
+    "Lead": "Opportunity",
+    "Prospect": "Opportunity",
+}
+
+# (query, child name column, parent name column) returning (child, parent) pairs.
+PARENT_LINK_QUERIES = {
+    "Quotation": (
+        "select _quote.name, _quote.opportunity from `tabQuotation` _quote "
+        "where ifnull(_quote.opportunity, '') != ''",
+        "_quote.name",
+        "_quote.opportunity",
+    ),
+    "Sales Order": (
+        "select distinct _item.parent, _quote.opportunity from `tabSales Order Item` _item "
+        "inner join `tabQuotation` _quote on _quote.name = _item.prevdoc_docname "
+        "where ifnull(_quote.opportunity, '') != ''",
+        "_item.parent",
+        "_quote.opportunity",
+    ),
+    "Sales Invoice": (
+        "select distinct _item.parent, _item.sales_order from `tabSales Invoice Item` _item "
+        "where ifnull(_item.sales_order, '') != ''",
+        "_item.parent",
+        "_item.sales_order",
+    ),
+    "Delivery Note": (
+        "select distinct _item.parent, _item.against_sales_order from `tabDelivery Note Item` _item "
+        "where ifnull(_item.against_sales_order, '') != ''",
+        "_item.parent",
+        "_item.against_sales_order",
+    ),
+}
+PARTY_LINK_QUERY = (
+    "select distinct _opp.party_name, _opp.name from `tabOpportunity` _opp "
+    "where _opp.opportunity_from = %(party_type)s and ifnull(_opp.party_name, '') != ''",
+    "_opp.party_name",
+    "_opp.name",
+)
+
+
+def user_visibility_clause(doctype: str, table_ref: str, user: str) -> str | None:
+    """Owned-only clause served from the index, or None while the index is not built."""
+    if doctype not in VISIBILITY_PARENTS or not user_visibility_ready():
+        return None
+    return (
+        f"{table_ref}.name in (select _visibility.reference_name from {VISIBILITY_TABLE} _visibility "
+        f"where _visibility.user = {frappe.db.escape(user)} "
+        f"and _visibility.reference_doctype = {frappe.db.escape(doctype)})"
+    )
+
+
+def user_visibility_ready() -> bool:
+    try:
+        return bool(cint(frappe.defaults.get_global_default(READY_DEFAULT_KEY) or 0))
+    except Exception:
+        return False
+
+
+def refresh_user_visibility(doctype: str, names) -> int:
+    """Recompute the rows of ``names`` and of every document inheriting from them."""
+    names = _unique_names(names)
+    if doctype not in VISIBILITY_PARENTS or not names or not user_visibility_ready():
+        return 0
+
+    changed = 0
+    pending = [(doctype, names)]
+    while pending:
+        doctype, names = pending.pop(0)
+        stored = _stored_pairs(doctype, names)
+        expected = _expected_pairs(doctype, names)
+        if stored == expected:
+            continue
+        _delete_pairs(doctype, stored - expected)
+        _insert_pairs(doctype, expected - stored)
+        changed += len(stored ^ expected)
+        touched = sorted({name for _, name in stored ^ expected})
+        for child_doctype in _child_doctypes(doctype):
+            child_names = sorted({name for name, _ in _parent_links(child_doctype, parents=touched)})
+            if child_names:
+                pending.append((child_doctype, child_names))
+    return changed
+
+
+def sync_document_visibility(doc, method=None) -> None:
+    """Doc event hook for indexed doctypes (``on_update``, ``on_update_after_submit``)."""
+    doctype = getattr(doc, "doctype", None)
+    name = getattr(doc, "name", None)
+    if not name or doctype not in VISIBILITY_PARENTS:
+        return
+    refresh_user_visibility(doctype, [name])
+    if doctype == "Quotation":
+        # Sales Orders reach their Opportunity through the Quotation they were made from.
+        refresh_user_visibility("Sales Order", _sales_orders_for_quotations([name]))
+
+
+def remove_document_visibility(doc, method=None) -> None:
+    """``after_delete`` hook: drop the document's rows and what children inherited."""
+    doctype = getattr(doc, "doctype", None)
+    name = getattr(doc, "name", None)
+    if not name or doctype not in VISIBILITY_PARENTS or not user_visibility_ready():
+        return
+    _delete_pairs(doctype, _stored_pairs(doctype, [name]))
+    for child_doctype in _child_doctypes(doctype):
+        refresh_user_visibility(child_doctype, [child for child, _ in _parent_links(child_doctype, parents=[name])])
+
+
+def rename_document_visibility(doc, method=None, old=None, new=None, merge=False) -> None:
+    """``after_rename`` hook: rows are keyed by name, so recompute under the new name."""
+    doctype = getattr(doc, "doctype", None)
+    if doctype not in VISIBILITY_PARENTS or not old or not user_visibility_ready():
+        return
+    _delete_pairs(doctype, _stored_pairs(doctype, [old]))
+    refresh_user_visibility(doctype, [new or doc.name])
+
+
+def sync_todo_visibility(doc, method=None) -> None:
+    """ToDo ``on_update``/``after_delete`` hook for the referenced document."""
+    references = {(doc.get("reference_type"), doc.get("reference_name"))}
+    previous = doc.get_doc_before_save() if hasattr(doc, "get_doc_before_save") else None
+    if previous:
+        references.add((previous.get("reference_type"), previous.get("reference_name")))
+    for doctype, name in references:
+        if doctype in VISIBILITY_PARENTS and name:
+            refresh_user_visibility(doctype, [name])
+
+
+def sync_sales_person_visibility(doc, method=None) -> None:
+    """Sales Person ``on_update`` hook: the linked user changes customer sales-team rows."""
+    if not doc.get("name") or not user_visibility_ready():
+        return
+    customers = frappe.get_all(
+        "Sales Team",
+        filters={"parenttype": "Customer", "sales_person": doc.name},
+        pluck="parent",
+        distinct=True,
+        limit_page_length=0,
+    )
+    refresh_user_visibility("Customer", customers)
+
+
+@frappe.whitelist()
+def rebuild_user_visibility() -> dict:
+    """Recompute the whole index from the source documents."""
+    frappe.only_for("System Manager")
+    return _rebuild_user_visibility()
+
+
+@frappe.whitelist()
+def check_user_visibility(repair: int | bool = 0) -> dict:
+    """Compare the index with the source documents; optionally repair the drift."""
+    frappe.only_for("System Manager")
+    return _check_user_visibility(repair=bool(cint(repair)))
+
+
+def run_scheduled_consistency_check() -> None:
+    if not user_visibility_ready():
+        return
+    result = _check_user_visibility(repair=True)
+    if not result["consistent"]:
+        frappe.log_error(
+            title="Orderlift user visibility drift repaired",
+            message=frappe.as_json(result["doctypes"], indent=1),
+        )
+
+
+def after_migrate() -> None:
+    if not frappe.db.table_exists(VISIBILITY_DOCTYPE):
+        return
+    ensure_visibility_indexes()
+    if not user_visibility_ready():
+        _rebuild_user_visibility()
+
+
+def ensure_visibility_indexes() -> None:
+    # The unique key leads with user so the permission lookup is an index-only range scan.
+    frappe.db.add_unique(VISIBILITY_DOCTYPE, ["user", "reference_doctype", "reference_name"], UNIQUE_INDEX_NAME)
+    frappe.db.add_index(VISIBILITY_DOCTYPE, ["reference_doctype", "reference_name"], REFERENCE_INDEX_NAME)
+
+
+def _rebuild_user_visibility() -> dict:
+    expected = _expected_index()
+    frappe.db.sql(f"delete from {VISIBILITY_TABLE}")
+    for doctype, pairs in expected.items():
+        _insert_pairs(doctype, pairs)
+    frappe.defaults.set_global_default(READY_DEFAULT_KEY, 1)
+    frappe.db.commit()
+    return {"rows": {doctype: len(pairs) for doctype, pairs in expected.items()}}
+
+
+def _check_user_visibility(repair: bool = False) -> dict:
+    expected = _expected_index()
+    result = {"consistent": True, "repaired": repair, "doctypes": {}}
+    for doctype, expected_pairs in expected.items():
+        stored = _stored_pairs(doctype)
+        missing = expected_pairs - stored
+        extra = stored - expected_pairs
+        result["doctypes"][doctype] = {
+            "expected": len(expected_pairs),
+            "stored": len(stored),
+            "missing": len(missing),
+            "extra": len(extra),
+            "missing_sample": sorted(missing)[:CHECK_SAMPLE_SIZE],
+            "extra_sample": sorted(extra)[:CHECK_SAMPLE_SIZE],
+        }
+        if missing or extra:
+            result["consistent"] = False
+            if repair:
+                _delete_pairs(doctype, extra)
+                _insert_pairs(doctype, missing)
+    if repair and not result["consistent"]:
+        frappe.db.commit()
+    return result
+
+
+def _expected_index() -> dict[str, set]:
+    expected = {}
+    for doctype, parent in VISIBILITY_PARENTS.items():
+        expected[doctype] = _expected_pairs(doctype, parent_pairs=expected.get(parent, set()))
+    return expected
+
+
+def _expected_pairs(doctype: str, names=None, parent_pairs=None) -> set:
+    """(user, name) pairs for ``doctype``; inherited users come from ``parent_pairs``
+    when given, otherwise from the parent's stored rows."""
+    pairs = _direct_pairs(doctype, names)
+    parent = VISIBILITY_PARENTS.get(doctype)
+    if not parent:
+        return pairs
+
+    links = _parent_links(doctype, names=names)
+    if parent_pairs is None:
+        parent_pairs = _stored_pairs(parent, sorted({parent_name for _, parent_name in links}))
+    users_by_parent = {}
+    for user, parent_name in parent_pairs:
+        users_by_parent.setdefault(parent_name, set()).add(user)
+    for name, parent_name in links:
+        pairs.update((user, name) for user in users_by_parent.get(parent_name, ()))
+    return pairs
+
+
+def _direct_pairs(doctype: str, names=None) -> set:
+    if not _table_exists(doctype):
+        return set()
+    table = f"`tab{doctype}`"
+    pairs = set()
+    for field in _owner_fields(doctype):
+        pairs |= _query_pairs(
+            f"select _doc.`{field}`, _doc.name from {table} _doc where ifnull(_doc.`{field}`, '') != ''",
+            "_doc.name",
+            names,
+        )
+    pairs |= _query_pairs(
+        "select _todo.allocated_to, _todo.reference_name from `tabToDo` _todo "
+        "where _todo.reference_type = %(reference_type)s and _todo.status = 'Open' "
+        "and ifnull(_todo.allocated_to, '') != ''",
+        "_todo.reference_name",
+        names,
+        {"reference_type": doctype},
+    )
+    if doctype == "Customer":
+        pairs |= _customer_sales_team_pairs(names)
+    return pairs
+
+
+def _owner_fields(doctype: str) -> tuple[str, ...]:
+    # Mirrors the owner checks of the company_access owned-only clauses.
+    if doctype == "Opportunity":
+        return ("opportunity_owner",) if _has_column(doctype, "opportunity_owner") else ("owner",)
+    if doctype == "Lead":
+        return ("lead_owner",) if _has_column(doctype, "lead_owner") else ()
+    if doctype == "Prospect":
+        return ("prospect_owner",) if _has_column(doctype, "prospect_owner") else ()
+    if doctype == "Customer":
+        return tuple(field for field in ("owner", "account_manager") if _has_column(doctype, field))
+    return ("owner",)
+
+
+def _customer_sales_team_pairs(names=None) -> set:
+    if not _table_exists("Sales Person") or not _has_column("Sales Person", "user"):
+        return set()
+    enabled = " and ifnull(_person.enabled, 0) = 1" if _has_column("Sales Person", "enabled") else ""
+    return _query_pairs(
+        "select _person.user, _team.parent from `tabSales Team` _team "
+        "inner join `tabSales Person` _person on _person.name = _team.sales_person "
+        f"where _team.parenttype = 'Customer' and ifnull(_person.user, '') != ''{enabled}",
+        "_team.parent",
+        names,
+    )
+
+
+def _parent_links(doctype: str, names=None, parents=None) -> set:
+    """(name, parent name) pairs linking ``doctype`` to its visibility parent."""
+    if doctype in ("Customer", "Lead", "Prospect"):
+        query, name_column, parent_column = PARTY_LINK_QUERY
+    elif doctype in PARENT_LINK_QUERIES:
+        query, name_column, parent_column = PARENT_LINK_QUERIES[doctype]
+    else:
+        return set()
+    if not _table_exists(doctype):
+        return set()
+    params = {"party_type": doctype}
+    if parents is not None:
+        parents = _unique_names(parents)
+        if not parents:
+            return set()
+        query += f" and {parent_column} in %(parents)s"
+        params["parents"] = tuple(parents)
+    return _query_pairs(query, name_column, names, params)
+
+
+def _child_doctypes(doctype: str) -> list[str]:
+    return [child for child, parent in VISIBILITY_PARENTS.items() if parent == doctype]
+
+
+def _sales_orders_for_quotations(quotations) -> list[str]:
+    return frappe.get_all(
+        "Sales Order Item",
+        filters={"prevdoc_docname": ["in", quotations]},
+        pluck="parent",
+        distinct=True,
+        limit_page_length=0,
+    )
+
+
+def _stored_pairs(doctype: str, names=None) -> set:
+    return _query_pairs(
+        f"select _visibility.user, _visibility.reference_name from {VISIBILITY_TABLE} _visibility "
+        "where _visibility.reference_doctype = %(reference_doctype)s",
+        "_visibility.reference_name",
+        names,
+        {"reference_doctype": doctype},
+    )
+
+
+def _insert_pairs(doctype: str, pairs) -> None:
+    if not pairs:
+        return
+    from frappe.utils import now
+
+    timestamp = now()
+    values = [
+        (frappe.generate_hash(length=12), user, doctype, name, timestamp, timestamp, "Administrator", "Administrator")
+        for user, name in sorted(pairs)
+    ]
+    frappe.db.bulk_insert(
+        VISIBILITY_DOCTYPE,
+        fields=["name", "user", "reference_doctype", "reference_name", "creation", "modified", "owner", "modified_by"],
+        values=values,
+        ignore_duplicates=True,
+        chunk_size=INSERT_CHUNK_SIZE,
+    )
+
+
+def _delete_pairs(doctype: str, pairs) -> None:
+    names_by_user = {}
+    for user, name in pairs or ():
+        names_by_user.setdefault(user, []).append(name)
+    for user, names in names_by_user.items():
+        frappe.db.sql(
+            f"delete from {VISIBILITY_TABLE} where reference_doctype = %(reference_doctype)s "
+            "and user = %(user)s and reference_name in %(names)s",
+            {"reference_doctype": doctype, "user": user, "names": tuple(names)},
+        )
+
+
+def _query_pairs(query: str, name_column: str, names=None, params=None) -> set:
+    params = dict(params or {})
+    if names is not None:
+        names = _unique_names(names)
+        if not names:
+            return set()
+        query += f" and {name_column} in %(names)s"
+        params["names"] = tuple(names)
+    return {(row[0], row[1]) for row in frappe.db.sql(query, params)}
+
+
+def _table_exists(doctype: str) -> bool:
+    try:
+        return bool(frappe.db.table_exists(doctype))
+    except Exception:
+        return False
+
+
+def _has_column(doctype: str, field: str) -> bool:
+    try:
+        return bool(frappe.db.has_column(doctype, field))
+    except Exception:
+        return False
+
+
+def _unique_names(values) -> list[str]:
+    if isinstance(values, str):
+        values = [values]
+    return list(dict.fromkeys(value for value in values or [] if value))
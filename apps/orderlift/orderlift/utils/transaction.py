@@ -0,0 +1,71 @@
+import frappe
+
+
+# Cache invalidations must not run while the writing transaction is still open:
+# another worker could reload the old rows and cache them under the new state.
+# These helpers defer such side effects to Frappe's commit / rollback callbacks.
+
+
+def run_after_commit(callback, *, on_rollback=False):
+    """Run ``callback`` once the current transaction commits (and, optionally, rolls back).
+
+    Without a database connection exposing commit callbacks the callback runs
+    immediately. A callback already pending for this transaction is not queued again.
+    """
+    db = getattr(frappe, "db", None)
+    after_commit = getattr(db, "after_commit", None)
+    if not callable(getattr(after_commit, "add", None)):
+        callback()
+        return
+
+    pending = _pending_callbacks()
+    if pending is not None:
+        if callback in pending:
+            return
+        pending.add(callback)
+
+    def forget():
+        if pending is not None:
+            pending.discard(callback)
+
+    def run():
+        forget()
+        callback()
+
+    after_commit.add(run)
+    after_rollback = getattr(db, "after_rollback", None)
+    if callable(getattr(after_rollback, "add", None)):
+        after_rollback.add(run if on_rollback else forget)
+
+
+def run_after_rollback(callback):
+    """Run ``callback`` if the current transaction rolls back.
+
+    Frappe drops rollback callbacks when the transaction commits, so callers queue
+    one per transaction. Without a database connection exposing them nothing is queued.
+    """
+    after_rollback = getattr(getattr(frappe, "db", None), "after_rollback", None)
+    if callable(getattr(after_rollback, "add", None)):
+        after_rollback.add(callback)
+
+
+def in_write_transaction() -> bool:
+    """True while the current transaction has uncommitted writes."""
+    db = getattr(frappe, "db", None)
+    try:
+        return bool(getattr(db, "transaction_writes", 0))
+    except Exception:
+        return False
+
+
+def _pending_callbacks():
+    local = getattr(frappe, "local", None)
+    if local is None:
+        return None
+    pending = getattr(local, "orderlift_after_commit_pending", None)
+    if pending is None:
+        try:
+            pending = local.orderlift_after_commit_pending = set()
+        except Exception:
+            return None
+    return pending